@@ -5,6 +5,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from app.services.decision_service import decision_service
+from app.services.anomaly_service import anomaly_service
+from app.services.inference_executor import inference_executor, ExecutorSaturatedError
 
 router = APIRouter(prefix="/api/v1/decisions", tags=["Decisions"])
 
@@ -13,22 +15,76 @@ class DecisionRequest(BaseModel):
     forecast: float
     risk_score: int
     reliability: str
-    is_anomaly: Optional[bool] = False
+    # Scored by the anomaly detector when omitted
+    is_anomaly: Optional[bool] = None
 
 class DecisionResponse(BaseModel):
     actions: List[str]
     priority: str
     reason: str
 
+class DecisionBatchResponse(BaseModel):
+    total_evaluated: int
+    results: List[DecisionResponse]
+
 @router.post("/evaluate", response_model=DecisionResponse)
 async def evaluate_decision(request: DecisionRequest):
     """Evaluate business rules for a forecast"""
     try:
+        is_anomaly = request.is_anomaly
+        if is_anomaly is None:
+            is_anomaly = await inference_executor.run_cpu(anomaly_service.is_anomaly, request.date, request.forecast)
         risk_data = {
             "risk_score": request.risk_score,
             "reliability": request.reliability,
-            "is_anomaly": request.is_anomaly
+            "is_anomaly": is_anomaly
         }
         return decision_service.evaluate(request.forecast, risk_data)
+    except ExecutorSaturatedError:
+        raise
+    except ValueError as e:
+        # e.g. a date outside the scored anomaly range
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/evaluate-batch", response_model=DecisionBatchResponse)
+async def evaluate_decisions_batch(requests: List[DecisionRequest]):
+    """Evaluate business rules for many forecasts in one pass (results in request order)"""
+    try:
+        anomalies = [request.is_anomaly for request in requests]
+        missing = [i for i, flag in enumerate(anomalies) if flag is None]
+        if missing:
+            flags = await inference_executor.run_cpu(
+                anomaly_service.is_anomaly_batch,
+                [requests[i].date for i in missing],
+                [requests[i].forecast for i in missing]
+            )
+            for i, flag in zip(missing, flags.tolist()):
+                anomalies[i] = flag
+        results = decision_service.evaluate_batch(
+            [request.forecast for request in requests],
+            [request.risk_score for request in requests],
+            [request.reliability for request in requests],
+            anomalies
+        )
+        return {
+            "total_evaluated": len(results),
+            "results": results
+        }
+    except ExecutorSaturatedError:
+        raise
+    except ValueError as e:
+        # e.g. a date outside the scored anomaly range
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/rules")
+async def get_rules():
+    """Active rule table (edit the file at DECISION_RULES_PATH to change it)"""
+    try:
+        return decision_service.rules_info()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
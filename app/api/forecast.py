@@ -7,6 +7,7 @@ from app.models.schemas import (
     PredictionResponse
 )
 from app.services.forecast_service import forecast_service
+from app.services.inference_executor import inference_executor, ExecutorSaturatedError
 
 router = APIRouter(prefix="/api/v1/forecast", tags=["Forecast"])
 
@@ -14,8 +15,10 @@ router = APIRouter(prefix="/api/v1/forecast", tags=["Forecast"])
 async def predict_single(request: PredictRequest):
     """Predict sales for a single date"""
     try:
-        result = forecast_service.predict(request.date)
+        result = await inference_executor.run_cpu(forecast_service.predict, request.date)
         return result
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -23,13 +26,17 @@ async def predict_single(request: PredictRequest):
 async def predict_batch(request: BatchPredictRequest):
     """Predict sales for date range"""
     try:
-        results = forecast_service.batch_predict(request.start_date, request.end_date)
+        results = await inference_executor.run_cpu(
+            forecast_service.batch_predict, request.start_date, request.end_date
+        )
         return {
             "start_date": request.start_date,
             "end_date": request.end_date,
             "total_predictions": len(results),
             "predictions": results
         }
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -37,7 +44,9 @@ async def predict_batch(request: BatchPredictRequest):
 async def next_week():
     """Predict next 7 days"""
     try:
-        result = forecast_service.next_week_forecast()
+        result = await inference_executor.run_cpu(forecast_service.next_week_forecast)
         return result
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
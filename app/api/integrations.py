@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 from app.services.salesforce_service import salesforce_service
+from app.services.inference_executor import inference_executor, ExecutorSaturatedError
 
 router = APIRouter(prefix="/api/v1/integrations/salesforce", tags=["Integrations"])
 
@@ -22,7 +23,11 @@ class TaskRequest(BaseModel):
 async def sync_salesforce(request: SyncRequest):
     """Trigger Salesforce Data Sync"""
     try:
-        return salesforce_service.sync_opportunities(request.start_date, request.end_date)
+        return await inference_executor.run_io(
+            salesforce_service.sync_opportunities, request.start_date, request.end_date
+        )
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
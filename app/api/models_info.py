@@ -2,27 +2,153 @@
 Model Info API Endpoints
 """
 from fastapi import APIRouter, HTTPException
-from app.models.schemas import ModelInfoResponse
+from fastapi.responses import JSONResponse
+from app.models.schemas import ModelInfoResponse, ModelReloadRequest, RetrainRequest, BacktestRequest
 from app.models.ml_models import model_loader
-from app.config import settings
+from app.models.registry import model_registry, RegistryError, ChecksumError
+from app.services.inference_executor import inference_executor, ExecutorSaturatedError
+from app.services.retrain_service import retrain_service
+from app.services.forecast_service import forecast_service
+from app.services.backtest_service import backtest_service, BacktestNotReadyError
 
 router = APIRouter(prefix="/api/v1/models", tags=["Models"])
 
 @router.get("/info", response_model=ModelInfoResponse)
 async def get_model_info():
-    """Get model metadata and training info"""
+    """Get model metadata and training info (from the registry manifest)"""
     try:
-        ensemble_config, risk_config = model_loader.get_config()
-        hist_data = model_loader.get_historical_data()
+        ensemble_weights = forecast_service.get_ensemble_weights()
+        mean_prophet = float(ensemble_weights.table.mean())
+        weights = {
+            "prophet": round(mean_prophet, 4),
+            "sarima": round(1 - mean_prophet, 4),
+            "source": ensemble_weights.source,
+            # Prophet weight per horizon bucket (first day ahead) and weekday (Mon..Sun)
+            "horizon_edges": ensemble_weights.horizon_edges.tolist(),
+            "prophet_by_horizon_weekday": ensemble_weights.table.round(4).tolist(),
+            "backtest": ensemble_weights.metrics
+        }
+        manifest = model_loader.manifest
+        if manifest is not None:
+            return {
+                "last_training_date": manifest["training_window"]["end"],
+                "model_version": manifest["version"],
+                "weights": weights,
+                "total_training_samples": manifest["training_window"]["samples"],
+                "checksum": manifest["checksum"],
+                "created_at": manifest["created_at"],
+                "training_window": manifest["training_window"],
+                "metrics": manifest["metrics"],
+                "artifacts": manifest["artifacts"]
+            }
         
+        # Legacy pickles: what the ensemble config recorded at training time
+        ensemble_config, _ = model_loader.get_config()
+        hist_data = model_loader.get_historical_data()
         return {
-            "last_training_date": "2024-01-01",  # This would ideally come from config
-            "model_version": "1.2.0",
-            "weights": {
-                "prophet": settings.WEIGHT_PROPHET,
-                "sarima": settings.WEIGHT_SARIMA
-            },
+            "last_training_date": str(ensemble_config.get("last_training_date", hist_data.index[-1].date())),
+            "model_version": str(ensemble_config.get("model_version", model_loader.model_version[:8])),
+            "weights": weights,
             "total_training_samples": len(hist_data)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/versions")
+async def list_model_versions():
+    """Published registry versions and the one this process is serving"""
+    try:
+        return {
+            "active_version": model_loader.active_version,
+            "current_version": model_registry.current_version(),
+            "versions": [
+                {
+                    "version": version,
+                    "created_at": manifest["created_at"],
+                    "training_window": manifest["training_window"],
+                    "bytes": sum(entry["bytes"] for entry in manifest["artifacts"].values())
+                }
+                for version in model_registry.versions()
+                for manifest in [model_registry.manifest(version)]
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/reload")
+async def reload_models(request: ModelReloadRequest = None):
+    """Hot-swap to a registry version without restarting"""
+    try:
+        version = request.version if request else None
+        return await inference_executor.run_io(model_loader.reload, version)
+    except ExecutorSaturatedError:
+        raise
+    except ChecksumError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except RegistryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/retrain")
+async def start_retrain(request: RetrainRequest = None):
+    """Refit on the latest sales in the background, validate and publish a new version"""
+    request = request or RetrainRequest()
+    try:
+        return retrain_service.start(
+            holdout_days=request.holdout_days,
+            warm_start=request.warm_start,
+            force=request.force
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/retrain")
+async def get_retrain_status(history: int = 10):
+    """Running retrain job and the last runs (wall time per stage, holdout metrics)"""
+    try:
+        return retrain_service.status(history)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/backtest")
+async def get_backtest(horizon: int = None, min_train: int = None, step: int = None):
+    """
+    Rolling-origin backtest of the loaded models: MAPE, sMAPE, MAE and
+    interval coverage per horizon and horizon bucket
+    
+    Cached per model version; the first request starts the run and gets a
+    503 until it is ready.
+    """
+    try:
+        return await inference_executor.run_io(
+            backtest_service.get, horizon=horizon, min_train=min_train, step=step
+        )
+    except ExecutorSaturatedError:
+        raise
+    except BacktestNotReadyError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(e), **backtest_service.status()},
+            headers={"Retry-After": "30"}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/backtest")
+async def start_backtest(request: BacktestRequest = None):
+    """Run a backtest in the background (refresh recomputes a cached one)"""
+    request = request or BacktestRequest()
+    try:
+        return backtest_service.start(
+            refresh=request.refresh,
+            horizon=request.horizon,
+            min_train=request.min_train,
+            step=request.step
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
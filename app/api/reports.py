@@ -2,12 +2,15 @@
 Report Generation API Endpoints
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from datetime import datetime
-from app.models.schemas import ReportRequest, ReportResponse
+import json
+from app.models.schemas import ReportRequest, ReportResponse, WeeklyEmailRequest
 from app.services.forecast_service import forecast_service
 from app.services.risk_service import risk_service
 from app.services.llm_service import llm_service
 from app.services.email_service import email_service
+from app.services.inference_executor import inference_executor, ExecutorSaturatedError
 
 router = APIRouter(prefix="/api/v1/reports", tags=["Reports"])
 
@@ -16,17 +19,18 @@ async def generate_report(request: ReportRequest):
     """Generate full forecast report with AI explanation"""
     try:
         # Get forecast
-        forecast = forecast_service.predict(request.date)
+        forecast = await inference_executor.run_cpu(forecast_service.predict, request.date)
         
-        # Get risk
-        risk = risk_service.assess_risk(
+        # Get risk (off the event loop: the first call loads the history)
+        risk = await inference_executor.run_io(
+            risk_service.assess_risk,
             forecast['ensemble_prediction'],
             request.date,
             forecast.get('confidence_interval')
         )
         
         # Generate explanation
-        explanation = llm_service.generate_explanation(forecast, risk)
+        explanation = await llm_service.generate_explanation(forecast, risk)
         
         # Build report
         report = {
@@ -40,43 +44,132 @@ async def generate_report(request: ReportRequest):
         # Send email if requested
         if request.send_email:
             recipient = request.recipient_email
-            email_service.send_report(report, recipient)
+            await email_service.send_report(report, recipient)
         
         return report
     
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate/stream")
+async def generate_report_stream(request: ReportRequest):
+    """
+    Streaming report (NDJSON, one event per line):
+    forecast and risk first, then explanation deltas as the LLM produces
+    them, then the email status, then done
+    """
+    try:
+        forecast = await inference_executor.run_cpu(forecast_service.predict, request.date)
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events():
+        def event(name: str, data) -> bytes:
+            return (json.dumps({"event": name, "data": data}, default=str) + "\n").encode("utf-8")
+        
+        yield event("forecast", forecast)
+        try:
+            risk = await inference_executor.run_io(
+                risk_service.assess_risk,
+                forecast['ensemble_prediction'],
+                request.date,
+                forecast.get('confidence_interval')
+            )
+            yield event("risk", risk)
+            
+            parts = []
+            async for chunk in llm_service.stream_explanation(forecast, risk):
+                parts.append(chunk)
+                yield event("explanation_delta", chunk)
+            
+            report = {
+                'date': request.date,
+                'forecast': forecast,
+                'risk': risk,
+                'explanation': "".join(parts),
+                'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            
+            if request.send_email:
+                sent = await email_service.send_report(report, request.recipient_email)
+                yield event("email", {"status": "sent" if sent else "failed"})
+            else:
+                yield event("email", {"status": "skipped"})
+            
+            yield event("done", {"generated_at": report['generated_at']})
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            yield event("error", {"detail": str(e)})
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @router.post("/email")
 async def email_report(request: ReportRequest):
     """Generate and email report"""
     request.send_email = True
     return await generate_report(request)
 
+@router.get("/llm-cache")
+async def llm_cache_stats():
+    """LLM response cache hit/miss counters and size"""
+    if llm_service.cache is None:
+        return {"enabled": False}
+    stats = await inference_executor.run_io(llm_service.cache.stats)
+    return {"enabled": True, **stats}
+
 @router.get("/weekly")
 async def weekly_report():
     """Generate 7-day forecast summary"""
     try:
-        forecast_data = forecast_service.next_week_forecast()
-        
-        reports = []
-        for pred in forecast_data['predictions']:
-            risk = risk_service.assess_risk(
-                pred['ensemble_prediction'],
-                pred['date'],
-                pred.get('confidence_interval')
-            )
-            reports.append({
-                'date': pred['date'],
-                'forecast': pred['ensemble_prediction'],
-                'risk_level': risk['risk_level'],
-                'risk_score': risk['risk_score']
-            })
-        
+        return await _build_weekly_report()
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/weekly/email")
+async def email_weekly_report(request: WeeklyEmailRequest):
+    """Send the 7-day summary to many recipients over one SMTP session"""
+    try:
+        weekly = await _build_weekly_report()
+        delivered = await email_service.send_weekly_report(weekly, request.recipients)
         return {
-            'summary': forecast_data,
-            'detailed_reports': reports
+            "sent": sum(delivered.values()),
+            "failed": [recipient for recipient, ok in delivered.items() if not ok],
+            "results": delivered
         }
-    
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _build_weekly_report() -> dict:
+    """7-day forecast with per-day risk"""
+    forecast_data = await inference_executor.run_cpu(forecast_service.next_week_forecast)
+    
+    predictions = forecast_data['predictions']
+    risks = await inference_executor.run_io(
+        risk_service.assess_risk_batch,
+        [p['ensemble_prediction'] for p in predictions],
+        [p['date'] for p in predictions],
+        [p['confidence_interval']['lower'] for p in predictions],
+        [p['confidence_interval']['upper'] for p in predictions]
+    )
+    
+    reports = []
+    for pred, risk in zip(predictions, risks):
+        reports.append({
+            'date': pred['date'],
+            'forecast': pred['ensemble_prediction'],
+            'risk_level': risk['risk_level'],
+            'risk_score': risk['risk_score']
+        })
+    
+    return {
+        'summary': forecast_data,
+        'detailed_reports': reports
+    }
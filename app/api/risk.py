@@ -1,9 +1,13 @@
 """
 Risk Assessment API Endpoints
 """
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import RiskAssessRequest, RiskResponse
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import Response
+from typing import List
+from app.models.schemas import RiskAssessRequest, RiskResponse, AnomalyResponse
 from app.services.risk_service import risk_service
+from app.services.anomaly_service import anomaly_service
+from app.services.inference_executor import inference_executor, ExecutorSaturatedError
 
 router = APIRouter(prefix="/api/v1/risk", tags=["Risk"])
 
@@ -20,29 +24,70 @@ async def assess_risk(request: RiskAssessRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/anomalies", response_model=AnomalyResponse)
+async def get_anomalies(start: str = None, end: str = None):
+    """Anomaly scores for a date range (defaults to the last 90 days of history)"""
+    try:
+        return await inference_executor.run_cpu(anomaly_service.get_anomalies, start, end)
+    except ExecutorSaturatedError:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # --- New Sales Intelligence Agent Features ---
 
 @router.get("/deals/open")
 async def get_open_deals():
     """Fetch open deals from Salesforce (Feature 2)"""
     from app.services.salesforce_service import salesforce_service
-    return salesforce_service.get_open_opportunities()
+    return await inference_executor.run_io(salesforce_service.get_open_opportunities)
 
 @router.post("/deals/score")
 async def score_deal(opportunity: dict):
     """Score a specific deal using XGBoost (Feature 2)"""
     from app.services.deal_risk_service import deal_risk_service
-    return deal_risk_service.predict_risk(opportunity)
+    return await inference_executor.run_io(deal_risk_service.predict_risk, opportunity)
+
+@router.post("/deals/score-batch")
+async def score_deals_batch(opportunities: List[dict]):
+    """Score many deals with a single XGBoost call"""
+    from app.services.deal_risk_service import deal_risk_service
+    results = await inference_executor.run_io(deal_risk_service.predict_risk_batch, opportunities)
+    return {
+        "total_scored": len(results),
+        "results": results
+    }
+
+@router.post("/deals/backtest")
+async def backtest_deals(file: UploadFile = File(...), format: str = None, chunk_size: int = None):
+    """Backtest the deal risk model on a CSV / Parquet export of closed opportunities (Feature 7)"""
+    from app.services.analysis_service import analysis_service
+    from app.services.risk_backtest import export_format
+    if chunk_size is not None and chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+    try:
+        return await inference_executor.run_io(
+            analysis_service.backtest_risk_model_stream, file.file, format or export_format(file.filename), chunk_size
+        )
+    except ExecutorSaturatedError:
+        raise
+    except (ValueError, ImportError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/deals/insights")
 async def get_deal_insights(opportunity: dict):
     """Generate AI insights for a deal (Feature 3)"""
     from app.services.deal_risk_service import deal_risk_service
     from app.services.llm_service import llm_service
-    risk_data = deal_risk_service.predict_risk(opportunity)
+    risk_data = await inference_executor.run_io(deal_risk_service.predict_risk, opportunity)
+    insights = await llm_service.generate_deal_insights(opportunity, risk_data)
     return {
         "risk_data": risk_data,
-        "insights": llm_service.generate_deal_insights(opportunity, risk_data)
+        "insights": insights
     }
 
 @router.post("/automation/run-daily")
@@ -55,6 +100,12 @@ async def run_daily_pipeline():
 async def get_risk_analysis(start_date: str = None, end_date: str = None):
     """Get historical risk analysis"""
     try:
-        return risk_service.get_historical_analysis(start_date, end_date)
+        future = await inference_executor.run_cpu(risk_service.get_future_analysis, start_date, end_date)
+        return Response(
+            content=risk_service.get_historical_analysis_json(start_date, end_date, future),
+            media_type="application/json"
+        )
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Multi-Series Forecast API Endpoints
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from app.models.schemas import SeriesRefitRequest
+from app.services.multi_series_service import multi_series_service, SeriesNotReadyError
+from app.services.inference_executor import inference_executor, ExecutorSaturatedError
+
+router = APIRouter(prefix="/api/v1/series", tags=["Series"])
+
+async def _serve(fn, *args):
+    try:
+        return await inference_executor.run_io(fn, *args)
+    except ExecutorSaturatedError:
+        raise
+    except SeriesNotReadyError as e:
+        return JSONResponse(status_code=503, content={"detail": str(e)}, headers={"Retry-After": "30"})
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("")
+async def list_series(level: str = None, page: int = 1, page_size: int = 100):
+    """Series in the hierarchy, optionally for one level (total, region, ...)"""
+    return await _serve(multi_series_service.list_series, level, page, page_size)
+
+@router.get("/forecasts")
+async def get_series_forecasts(level: str = None, page: int = 1, page_size: int = 100):
+    """Reconciled forecasts for a page of series"""
+    return await _serve(multi_series_service.get_forecasts, level, page, page_size)
+
+@router.get("/status")
+async def get_series_status():
+    """Dataset, last fit and running refit job"""
+    return multi_series_service.status()
+
+@router.post("/refit")
+async def refit_series(request: SeriesRefitRequest = None):
+    """Refit every series in the background"""
+    method = request.method if request else None
+    return await _serve(multi_series_service.start_background_fit, method)
+
+@router.get("/{series_id:path}/forecast")
+async def get_series_forecast(series_id: str):
+    """Reconciled forecast of one series, e.g. 'West/Store 12/Furniture'"""
+    return await _serve(multi_series_service.get_series, series_id)
@@ -21,6 +21,16 @@ class Settings:
     # LLM & API Keys
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+    # Optional base URLs (e.g. a proxy or a local fake server in tests)
+    ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL") or None
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+    # Start the fallback provider if the preferred one is slower than this (0 disables)
+    LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", 3))
+    ANTHROPIC_RATE_PER_SEC = float(os.getenv("ANTHROPIC_RATE_PER_SEC", 5))
+    OPENAI_RATE_PER_SEC = float(os.getenv("OPENAI_RATE_PER_SEC", 5))
+    LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", 10))
     SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
     SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "#sales-alerts")
     
@@ -29,10 +39,25 @@ class Settings:
     SF_PASSWORD = os.getenv("SF_PASSWORD")
     SF_SECURITY_TOKEN = os.getenv("SF_SECURITY_TOKEN")
     SF_DOMAIN = os.getenv("SF_DOMAIN", "login")
+    SF_BATCH_CONCURRENCY = int(os.getenv("SF_BATCH_CONCURRENCY", 4))
+    SF_BULK_THRESHOLD = int(os.getenv("SF_BULK_THRESHOLD", 2000))
+    SF_BULK_BATCH_SIZE = int(os.getenv("SF_BULK_BATCH_SIZE", 10000))
+    # Mock mode fake server behaviour
+    SF_FAKE_LATENCY_MS = float(os.getenv("SF_FAKE_LATENCY_MS", 0))
+    SF_FAKE_FAILURE_RATE = float(os.getenv("SF_FAKE_FAILURE_RATE", 0.0))
     
     # Gmail
     GMAIL_ADDRESS = os.getenv("GMAIL_ADDRESS")
     GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
+    SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+    SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "True").lower() == "true"
+    SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "False").lower() == "true"
+    SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+    EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", 3))
+    EMAIL_RETRY_BACKOFF_SECONDS = float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", 1.0))
+    EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", 1000))
     
     # Model Paths
     BASE_DIR = Path(__file__).parent.parent
@@ -44,9 +69,115 @@ class Settings:
     ENSEMBLE_CONFIG_PATH = MODEL_DIR / "ensemble_config.pkl"
     RISK_CONFIG_PATH = MODEL_DIR / "risk_config.pkl"
     HISTORICAL_DATA_PATH = MODEL_DIR / "historical_sales.csv"
+    RISK_ANALYSIS_PATH = MODEL_DIR / "risk_analysis.csv"
     
-    # Ensemble Weights
+    # Versioned model registry (see app/models/registry.py); the pickles
+    # above are only used when no version has been published. MODEL_VERSION
+    # pins a version instead of following the registry's CURRENT pointer.
+    MODEL_REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", MODEL_DIR / "registry"))
+    MODEL_VERSION = os.getenv("MODEL_VERSION") or None
+    MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", 30))
+    # Serving processes also check the registry on this signal (sent by
+    # the retrain job after publishing)
+    MODEL_RELOAD_SIGNAL = os.getenv("MODEL_RELOAD_SIGNAL", "SIGHUP")
+    
+    # Retraining (see app/models/retrain.py): new sales in the historical_sales.csv
+    # format, holdout window, and how much worse than the previous version's
+    # sMAPE on the same holdout a candidate may be before it is rejected
+    RETRAIN_DATA_PATH = Path(os.getenv("RETRAIN_DATA_PATH", MODEL_DIR / "historical_sales.csv"))
+    RETRAIN_HOLDOUT_DAYS = int(os.getenv("RETRAIN_HOLDOUT_DAYS", 28))
+    RETRAIN_MAX_DEGRADATION = float(os.getenv("RETRAIN_MAX_DEGRADATION", 0.10))
+    RETRAIN_WORKERS = int(os.getenv("RETRAIN_WORKERS", 4))
+    RETRAIN_HISTORY_PATH = Path(os.getenv("RETRAIN_HISTORY_PATH", MODEL_REGISTRY_DIR / "retrain_history.jsonl"))
+    
+    # Model loading: "eager" (at import), "background" (warm-up thread at
+    # startup) or "lazy" (each model on first use)
+    MODEL_LOADING = os.getenv("MODEL_LOADING", "background").lower()
+    
+    # Local cache for derived artifacts (forecast tables etc.)
+    CACHE_DIR = Path(os.getenv("CACHE_DIR", BASE_DIR / ".cache"))
+    # Pids of serving processes listening for MODEL_RELOAD_SIGNAL
+    MODEL_RELOAD_PID_DIR = Path(os.getenv("MODEL_RELOAD_PID_DIR", CACHE_DIR / "serving"))
+    
+    # Historical series and forecast table storage: "mmap" (read-only .npy
+    # files under CACHE_DIR, shared by every worker through the page cache)
+    # or "memory" (private copy per process)
+    SHARED_DATA_MODE = os.getenv("SHARED_DATA_MODE", "mmap").lower()
+    
+    # Incremental Salesforce sync (SQLite copy of opportunities + watermarks)
+    OPPORTUNITY_CACHE_PATH = Path(os.getenv("OPPORTUNITY_CACHE_PATH", CACHE_DIR / "opportunities.sqlite"))
+    
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", CACHE_DIR / "llm_cache.sqlite"))
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+    LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", 50))
+    # Significant figures kept for amounts / predictions in cache keys
+    LLM_CACHE_AMOUNT_PRECISION = int(os.getenv("LLM_CACHE_AMOUNT_PRECISION", 3))
+    
+    # Forecast Table
+    FORECAST_HORIZON_DAYS = int(os.getenv("FORECAST_HORIZON_DAYS", 730))
+    
+    # Inference Executor (process pool for models, thread pool for clients)
+    INFERENCE_PROCESS_WORKERS = int(os.getenv("INFERENCE_PROCESS_WORKERS", 2))
+    INFERENCE_THREAD_WORKERS = int(os.getenv("INFERENCE_THREAD_WORKERS", 16))
+    INFERENCE_MAX_PENDING_CPU = int(os.getenv("INFERENCE_MAX_PENDING_CPU", 32))
+    INFERENCE_MAX_PENDING_IO = int(os.getenv("INFERENCE_MAX_PENDING_IO", 128))
+    
+    # Daily automation pipeline (per-stage queue sizes and concurrency)
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 1000))
+    PIPELINE_INSIGHT_CONCURRENCY = int(os.getenv("PIPELINE_INSIGHT_CONCURRENCY", 8))
+    PIPELINE_WRITE_BATCH_SIZE = int(os.getenv("PIPELINE_WRITE_BATCH_SIZE", 800))
+    PIPELINE_NOTIFY_BATCH_SIZE = int(os.getenv("PIPELINE_NOTIFY_BATCH_SIZE", 50))
+    PIPELINE_NOTIFY_CONCURRENCY = int(os.getenv("PIPELINE_NOTIFY_CONCURRENCY", 4))
+    
+    # Deal risk backtests: opportunities scored per chunk of a streamed export
+    RISK_BACKTEST_CHUNK_SIZE = int(os.getenv("RISK_BACKTEST_CHUNK_SIZE", 50000))
+    
+    # Decision rule table (re-read when the file changes)
+    DECISION_RULES_PATH = Path(os.getenv("DECISION_RULES_PATH", BASE_DIR / "app" / "decision_rules.json"))
+    
+    # Hierarchical multi-series forecasts (see app/services/multi_series_service.py):
+    # long-format CSV with a date column, the level columns and the value column
+    MULTI_SERIES_DATA_PATH = Path(os.getenv("MULTI_SERIES_DATA_PATH", MODEL_DIR / "multi_series_sales.csv"))
+    MULTI_SERIES_LEVELS = os.getenv("MULTI_SERIES_LEVELS", "region,store,category")
+    MULTI_SERIES_VALUE = os.getenv("MULTI_SERIES_VALUE", "Sales")
+    MULTI_SERIES_HORIZON_DAYS = int(os.getenv("MULTI_SERIES_HORIZON_DAYS", 90))
+    # bottom_up, ols, wls_struct, wls_var or mint_shrink
+    MULTI_SERIES_RECONCILIATION = os.getenv("MULTI_SERIES_RECONCILIATION", "mint_shrink")
+    MULTI_SERIES_WORKERS = int(os.getenv("MULTI_SERIES_WORKERS", os.cpu_count() or 1))
+    MULTI_SERIES_BATCH_SIZE = int(os.getenv("MULTI_SERIES_BATCH_SIZE", 4))
+    MULTI_SERIES_MAX_PAGE_SIZE = int(os.getenv("MULTI_SERIES_MAX_PAGE_SIZE", 500))
+    
+    # Ensemble Weights: "fixed" or "learned" (per horizon bucket and day of
+    # week, from models refit at sampled cutoffs and shrunk toward the fixed
+    # weight; see app/models/ensemble_weights.py). Fixed weights come from
+    # the ensemble config, else the defaults below.
+    ENSEMBLE_WEIGHTING = os.getenv("ENSEMBLE_WEIGHTING", "fixed").lower()
+    # First day ahead of each horizon bucket
+    ENSEMBLE_HORIZON_BUCKETS = [int(day) for day in os.getenv("ENSEMBLE_HORIZON_BUCKETS", "1,8,15,29,61").split(",")]
+    ENSEMBLE_BACKTEST_HORIZON = int(os.getenv("ENSEMBLE_BACKTEST_HORIZON", 90))
+    # Observations before the first backtest origin
+    ENSEMBLE_BACKTEST_MIN_TRAIN = int(os.getenv("ENSEMBLE_BACKTEST_MIN_TRAIN", 365))
+    # Cutoffs the models are refit at (one Prophet and one SARIMA fit each)
+    ENSEMBLE_BACKTEST_CUTOFFS = int(os.getenv("ENSEMBLE_BACKTEST_CUTOFFS", 6))
+    # Shrinkage toward the fixed weight, in backtest errors per cell
+    ENSEMBLE_WEIGHT_PRIOR_SAMPLES = float(os.getenv("ENSEMBLE_WEIGHT_PRIOR_SAMPLES", 30))
+    # Largest distance of a learned Prophet weight from WEIGHT_PROPHET
+    ENSEMBLE_WEIGHT_MAX_SHIFT = float(os.getenv("ENSEMBLE_WEIGHT_MAX_SHIFT", 0.25))
     WEIGHT_PROPHET = 0.4
     WEIGHT_SARIMA = 0.6
 
+    # Rolling-origin backtests (see app/models/backtest.py): default horizon
+    # and options of /api/v1/models/backtest, worker processes and origins
+    # per worker task
+    BACKTEST_HORIZON_DAYS = int(os.getenv("BACKTEST_HORIZON_DAYS", 90))
+    BACKTEST_MAX_HORIZON_DAYS = int(os.getenv("BACKTEST_MAX_HORIZON_DAYS", 365))
+    BACKTEST_MIN_TRAIN = int(os.getenv("BACKTEST_MIN_TRAIN", 365))
+    BACKTEST_STEP = int(os.getenv("BACKTEST_STEP", 1))
+    BACKTEST_INTERVAL_WIDTH = float(os.getenv("BACKTEST_INTERVAL_WIDTH", 0.95))
+    BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", os.cpu_count() or 1))
+    BACKTEST_CHUNK_ORIGINS = int(os.getenv("BACKTEST_CHUNK_ORIGINS", 64))
+
 settings = Settings()
\ No newline at end of file
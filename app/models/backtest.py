@@ -0,0 +1,311 @@
+"""
+Backtest - Rolling-origin accuracy of the forecast ensemble by horizon
+
+Every row from `min_train` on (every `step`-th) is a forecast origin: the
+models forecast rows o..o+horizon-1 having seen rows 0..o-1, and each
+forecast is scored against the actual sales. Horizons are counted in rows
+of the sales history, as SARIMA steps (and the serving path) count them.
+
+Nothing is refit. The models keep the parameters fitted on the whole
+history, which includes the rows each origin forecasts, so every figure
+is parameter-in-sample (config.parameters_in_sample in the report):
+optimistic next to a true out-of-sample backtest, see refit_forecasts
+for that at a few cutoffs. From each origin:
+
+- SARIMA forecasts from the Kalman filter's predicted state and
+  covariance there (SARIMAForecaster.forecast_intervals_from_states),
+  i.e. the state updates of the one filter pass over the history
+- Prophet continues its trend (ProphetScorer.predict_from)
+
+so an origin costs a few array products. A ProphetModelScorer (models
+the closed form does not cover) cannot continue from an origin: run_backtest
+then scores Prophet's in-sample fit and flags the report with
+config.prophet_in_sample; other callers get a ValueError. Origins are split
+into chunks; chunks run in spawned worker processes (run_backtest is called
+from a thread of the multi-threaded server, where forking is unsafe) and
+return per-horizon sums, which are added up into MAPE, sMAPE, MAE and
+interval coverage per horizon for Prophet, SARIMA and the weighted ensemble.
+"""
+import multiprocessing
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+MODELS = ('prophet', 'sarima', 'ensemble')
+
+# Per-horizon sums accumulated over origins
+SUMS = ('n', 'ape', 'n_ape', 'sape', 'ae', 'covered')
+
+def backtest_origins(n_rows: int, min_train: int, step: int = 1) -> np.ndarray:
+    """Row positions of the forecast origins"""
+    origins = np.arange(max(min_train, 1), n_rows, max(step, 1))
+    if not len(origins):
+        raise ValueError(f"Need more than {min_train} rows for a rolling-origin backtest")
+    return origins
+
+def forecasts_from_origins(prophet) -> bool:
+    """Whether `prophet` can forecast from an origin (else only in-sample fits)"""
+    return hasattr(prophet, 'predict_from')
+
+def forecast_from_origins(prophet, sarima_results, data: pd.DataFrame, origins: np.ndarray,
+                          horizon: int, alpha: float = None, prophet_in_sample: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Forecasts of both models from `origins` in one pass
+    
+    Returns n_origins x horizon arrays (NaN past the end of the data):
+    'prophet', 'sarima', 'actual', 'dayofweek', plus 'origins'. With
+    `alpha`, also the (1 - alpha) bounds '<model>_lower' / '<model>_upper'.
+    
+    Raises ValueError for a scorer without `predict_from` unless
+    `prophet_in_sample`, which takes its fitted values instead.
+    """
+    from app.models.sarima_forecaster import SARIMAForecaster
+    
+    n = len(data)
+    origins = np.asarray(origins)
+    positions = origins[:, None] + np.arange(horizon)
+    valid = positions < n
+    positions = np.minimum(positions, n - 1)
+    
+    dates = data.index.to_numpy(dtype='datetime64[ns]')
+    target_dates = dates[positions]
+    out = {
+        'origins': origins,
+        'actual': np.where(valid, data['Sales'].to_numpy(dtype=float)[positions], np.nan),
+        'dayofweek': pd.DatetimeIndex(target_dates.ravel()).dayofweek.to_numpy().reshape(positions.shape),
+    }
+    
+    # Column o of predicted_state is the state given rows 0..o-1
+    sarima = SARIMAForecaster.from_results(sarima_results)
+    states = np.asarray(sarima_results.predicted_state)[:, origins]
+    if alpha is None:
+        forecasts = {'sarima': (sarima.forecast_from_states(states, horizon),)}
+    else:
+        state_covs = np.asarray(sarima_results.predicted_state_cov)[:, :, origins]
+        forecasts = {'sarima': sarima.forecast_intervals_from_states(states, state_covs, horizon, alpha)}
+    
+    if not forecasts_from_origins(prophet) and not prophet_in_sample:
+        raise ValueError(f"{type(prophet).__name__} cannot forecast from an origin, only in-sample")
+    
+    origin_dates = dates[origins - 1]
+    if alpha is None and hasattr(prophet, 'predict_yhat_from'):
+        forecasts['prophet'] = (prophet.predict_yhat_from(origin_dates, target_dates),)
+    elif forecasts_from_origins(prophet):
+        forecasts['prophet'] = prophet.predict_from(origin_dates, target_dates)
+    else:
+        forecasts['prophet'] = tuple(
+            values.reshape(positions.shape) for values in prophet.predict(target_dates.ravel())
+        )
+    
+    for name, values in forecasts.items():
+        for suffix, value in zip(('', '_lower', '_upper'), values):
+            out[name + suffix] = np.where(valid, value, np.nan)
+    return out
+
+# ==================== Refit at cutoffs ====================
+
+def sample_cutoffs(n_rows: int, min_train: int, horizon: int, count: int) -> np.ndarray:
+    """Up to `count` evenly spaced cutoffs, each followed by a full horizon of rows"""
+    last = n_rows - horizon
+    if last < max(min_train, 1):
+        raise ValueError(f"Need at least {min_train + horizon} rows to refit at cutoffs")
+    return np.unique(np.linspace(max(min_train, 1), last, max(count, 1)).round().astype(np.int64))
+
+def refit_forecasts(prophet_model, sarima_results, data: pd.DataFrame, cutoffs: Sequence[int],
+                    horizon: int) -> Dict[str, np.ndarray]:
+    """
+    Out-of-sample forecasts: both models refit on rows 0..c-1 at every cutoff c
+    
+    Unlike forecast_from_origins, no parameter has seen the forecast rows.
+    Prophet keeps the fitted model's options (retrain.PROPHET_OPTIONS) and
+    SARIMA its orders, with the optimizer started from the fitted
+    coefficients. Costs one fit of each model per cutoff.
+    
+    Returns n_cutoffs x horizon arrays (NaN past the end of the data):
+    'prophet', 'sarima', 'actual', 'dayofweek', plus 'origins'.
+    """
+    from app.models.retrain import PROPHET_OPTIONS, _fit_prophet_task
+    from app.models.sarima_forecaster import SARIMAForecaster
+    
+    n = len(data)
+    cutoffs = np.asarray(cutoffs, dtype=np.int64)
+    positions = cutoffs[:, None] + np.arange(horizon)
+    valid = positions < n
+    positions = np.minimum(positions, n - 1)
+    dates = data.index.to_numpy(dtype='datetime64[ns]')
+    sales = data['Sales']
+    options = {name: getattr(prophet_model, name) for name in PROPHET_OPTIONS}
+    
+    prophet = np.empty(positions.shape)
+    sarima = np.empty(positions.shape)
+    for i, cutoff in enumerate(cutoffs.tolist()):
+        model, _ = _fit_prophet_task(data.iloc[:cutoff], options, None)
+        prophet[i] = model.predict(pd.DataFrame({'ds': dates[positions[i]]}))['yhat'].to_numpy()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            results = sarima_results.model.clone(sales.iloc[:cutoff]).fit(
+                start_params=sarima_results.params, disp=False, maxiter=200
+            )
+        # Steps are rows, as SARIMA was fitted on the row series
+        sarima[i] = SARIMAForecaster.from_results(results).forecast(horizon)[0]
+    
+    return {
+        'origins': cutoffs,
+        'actual': np.where(valid, sales.to_numpy(dtype=float)[positions], np.nan),
+        'dayofweek': pd.DatetimeIndex(dates[positions].ravel()).dayofweek.to_numpy().reshape(positions.shape),
+        'prophet': np.where(valid, prophet, np.nan),
+        'sarima': np.where(valid, sarima, np.nan),
+    }
+
+# ==================== Scoring ====================
+
+def score_forecasts(forecasts: Dict[str, np.ndarray], weights) -> np.ndarray:
+    """
+    Per-horizon sums (len(MODELS) x len(SUMS) x horizon) for forecasts with bounds
+    
+    The ensemble combines the models with `weights` (EnsembleWeights),
+    as ForecastService does; its lower bound is floored at zero.
+    """
+    horizon = forecasts['actual'].shape[1]
+    w = weights.lookup(np.arange(1, horizon + 1)[None, :], forecasts['dayofweek'])
+    for suffix in ('', '_lower', '_upper'):
+        forecasts['ensemble' + suffix] = w * forecasts['prophet' + suffix] + (1 - w) * forecasts['sarima' + suffix]
+    forecasts['ensemble_lower'] = np.maximum(forecasts['ensemble_lower'], 0)
+    
+    actual = forecasts['actual']
+    sums = np.zeros((len(MODELS), len(SUMS), horizon))
+    for i, name in enumerate(MODELS):
+        predicted = forecasts[name]
+        ok = np.isfinite(actual) & np.isfinite(predicted)
+        error = np.abs(np.where(ok, predicted - actual, 0.0))
+        scale = np.abs(np.where(ok, predicted, 0.0)) + np.abs(np.where(ok, actual, 0.0))
+        nonzero = ok & (actual != 0)
+        covered = ok & (forecasts[name + '_lower'] <= actual) & (actual <= forecasts[name + '_upper'])
+        sums[i] = [
+            ok.sum(axis=0),
+            np.where(nonzero, error / np.where(nonzero, np.abs(actual), 1.0), 0.0).sum(axis=0),
+            nonzero.sum(axis=0),
+            np.where(scale > 0, 2 * error / np.where(scale > 0, scale, 1.0), 0.0).sum(axis=0),
+            error.sum(axis=0),
+            covered.sum(axis=0),
+        ]
+    return sums
+
+def _metrics(sums: np.ndarray) -> Dict[str, np.ndarray]:
+    """MAPE / sMAPE (percent), MAE and coverage from SUMS rows (any trailing shape)"""
+    n, ape, n_ape, sape, ae, covered = sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'n': n,
+            'mape': 100 * ape / n_ape,
+            'smape': 100 * sape / n,
+            'mae': ae / n,
+            'coverage': covered / n,
+        }
+
+def _rounded(values: np.ndarray, digits: int = 4) -> List:
+    return [None if not np.isfinite(v) else round(float(v), digits) for v in np.atleast_1d(values)]
+
+def summarize(sums: np.ndarray, horizon_edges: Sequence[int]) -> Dict:
+    """Metrics per horizon and per horizon bucket for each model"""
+    horizon = sums.shape[-1]
+    edges = [edge for edge in horizon_edges if edge <= horizon]
+    bounds = list(zip(edges, edges[1:] + [horizon + 1]))
+    by_horizon = {'horizon': list(range(1, horizon + 1))}
+    by_bucket = {}
+    for i, name in enumerate(MODELS):
+        metrics = _metrics(sums[i])
+        by_horizon[name] = {key: _rounded(value) for key, value in metrics.items() if key != 'n'}
+        buckets = {}
+        for start, stop in bounds + [(1, horizon + 1)]:
+            label = 'all' if (start, stop) == (1, horizon + 1) else f"{start}-{stop - 1}"
+            bucket = _metrics(sums[i][:, start - 1:stop - 1].sum(axis=1))
+            buckets[label] = {key: _rounded(value)[0] for key, value in bucket.items()}
+            buckets[label]['n'] = int(bucket['n'])
+        by_bucket[name] = buckets
+    return {'summary': by_bucket, 'by_horizon': by_horizon}
+
+# ==================== Parallel run ====================
+
+# Models and data shared with the chunks: set in this process for inline
+# runs, and once per spawned worker by its initializer (not per chunk)
+_BACKTEST_STATE = None
+
+def _init_backtest_worker(state):
+    global _BACKTEST_STATE
+    _BACKTEST_STATE = state
+
+def _backtest_chunk(origins: np.ndarray) -> np.ndarray:
+    prophet, sarima_results, data, weights, horizon, alpha = _BACKTEST_STATE
+    forecasts = forecast_from_origins(prophet, sarima_results, data, origins, horizon, alpha, prophet_in_sample=True)
+    return score_forecasts(forecasts, weights)
+
+def run_backtest(prophet, sarima_results, data: pd.DataFrame, weights, horizon: int = 90,
+                 min_train: int = 365, step: int = 1, interval_width: float = 0.95,
+                 workers: int = 1, chunk_size: int = 64) -> Dict:
+    """
+    Rolling-origin backtest of Prophet, SARIMA and their ensemble
+    
+    Args:
+        prophet: ProphetScorer (a ProphetModelScorer is scored in-sample,
+            see config.prophet_in_sample in the report)
+        sarima_results: Full statsmodels SARIMAX results over `data`
+        data: Sales history the models were fitted on
+        weights: EnsembleWeights used to combine the models
+        horizon: Longest horizon scored (rows ahead)
+        min_train: Rows seen before the first origin
+        step: Rows between origins
+        interval_width: Nominal coverage of the scored bounds
+        workers: Spawned worker processes (chunks run inline with workers <= 1)
+        chunk_size: Origins per worker task
+    """
+    global _BACKTEST_STATE
+    started = time.perf_counter()
+    origins = backtest_origins(len(data), min_train, step)
+    chunks = [origins[i:i + chunk_size] for i in range(0, len(origins), chunk_size)]
+    alpha = 1 - interval_width
+    prophet_in_sample = not forecasts_from_origins(prophet)
+    if prophet_in_sample:
+        print("⚠️ Prophet cannot forecast from an origin, backtesting its in-sample fit")
+    
+    state = (prophet, sarima_results, data, weights, horizon, alpha)
+    if workers <= 1 or len(chunks) == 1:
+        _BACKTEST_STATE = state
+        try:
+            sums = sum(map(_backtest_chunk, chunks), np.zeros((len(MODELS), len(SUMS), horizon)))
+        finally:
+            _BACKTEST_STATE = None
+    else:
+        # Spawn, not fork: the caller's other threads may hold locks a
+        # forked child would inherit held
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_backtest_worker, initargs=(state,)) as executor:
+            sums = sum(executor.map(_backtest_chunk, chunks), np.zeros((len(MODELS), len(SUMS), horizon)))
+    
+    dates = data.index
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'workers': int(min(max(workers, 1), len(chunks))),
+        'config': {
+            'horizon': int(horizon),
+            'min_train': int(min_train),
+            'step': int(step),
+            'interval_width': float(interval_width),
+            'weights': weights.source,
+            'prophet_in_sample': prophet_in_sample,
+            # Fitted on the whole history, forecast rows included (see the module docstring)
+            'parameters_in_sample': list(MODELS),
+        },
+        'origins': {
+            'count': int(len(origins)),
+            'first': str(dates[origins[0] - 1].date()),
+            'last': str(dates[origins[-1] - 1].date()),
+        },
+        **summarize(sums, weights.horizon_edges.tolist()),
+    }
@@ -0,0 +1,177 @@
+"""
+Ensemble Weights - Prophet / SARIMA weights learned from a rolling-origin backtest
+
+The ensemble forecast is w * prophet + (1 - w) * sarima, with w looked up
+per horizon bucket (days ahead) and day of week of the forecast date:
+
+    w = table[bucket(days_ahead), dayofweek]
+
+Weights are learned out of sample only: at a few cutoffs sampled over
+the training history both models are refit on the rows before the
+cutoff and forecast the next `horizon` rows (backtest.refit_forecasts).
+The fixed-parameter rolling-origin pass (forecast_from_origins) is not
+used here: its Prophet was fit on the rows it "forecasts", so its errors
+are biased low and the learned weights would overweight it.
+
+Per cell, the weight minimizing the squared combined error
+e_s - w (e_s - e_p), shrunk toward the fixed weight w0 with the strength
+of `prior_samples` typical errors of the bucket, is
+
+    w = (sum(e_s (e_s - e_p)) + k w0) / (sum((e_s - e_p)^2) + k)
+    k = prior_samples * mean((e_s - e_p)^2 over the bucket)
+
+clipped to w0 +/- `max_shift`: cells with few or noisy errors stay near
+w0 instead of jumping to a 0/1 corner.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+from app.models.backtest import refit_forecasts, sample_cutoffs
+
+# First day ahead of each horizon bucket; the last bucket is open-ended
+HORIZON_EDGES = (1, 8, 15, 29, 61)
+
+class EnsembleWeights:
+    """Prophet weight lookup table (horizon bucket x day of week)"""
+    
+    def __init__(self, horizon_edges: Sequence[int], prophet_weights, source: str = 'fixed',
+                 model_version: str = None, metrics: Dict = None):
+        self.horizon_edges = np.asarray(horizon_edges, dtype=np.int64)
+        self.table = np.asarray(prophet_weights, dtype=float).reshape(len(self.horizon_edges), 7)
+        self.source = source
+        self.model_version = model_version
+        self.metrics = metrics or {}
+    
+    @classmethod
+    def fixed(cls, weight_prophet: float, horizon_edges: Sequence[int] = HORIZON_EDGES) -> 'EnsembleWeights':
+        """Same weight everywhere (the behaviour before weights were learned)"""
+        return cls(horizon_edges, np.full((len(horizon_edges), 7), float(weight_prophet)))
+    
+    def buckets(self, days_ahead) -> np.ndarray:
+        days_ahead = np.maximum(np.asarray(days_ahead, dtype=np.int64), 1)
+        return np.searchsorted(self.horizon_edges, days_ahead, side='right') - 1
+    
+    def lookup(self, days_ahead, dayofweek) -> np.ndarray:
+        """Prophet weights for broadcastable days-ahead and day-of-week arrays"""
+        return self.table[self.buckets(days_ahead), dayofweek]
+    
+    def prophet_weights(self, dates: pd.DatetimeIndex, days_ahead) -> np.ndarray:
+        """Prophet weight per date; the SARIMA weight is 1 minus it"""
+        return self.lookup(days_ahead, np.asarray(pd.DatetimeIndex(dates).dayofweek))
+    
+    # ==================== Persistence ====================
+    
+    def to_dict(self) -> Dict:
+        return {
+            'horizon_edges': self.horizon_edges.tolist(),
+            'prophet_weights': np.round(self.table, 6).tolist(),
+            'source': self.source,
+            'model_version': self.model_version,
+            'metrics': self.metrics,
+        }
+    
+    @classmethod
+    def from_dict(cls, value: Dict) -> 'EnsembleWeights':
+        return cls(
+            value['horizon_edges'],
+            value['prophet_weights'],
+            source=value.get('source', 'learned'),
+            model_version=value.get('model_version'),
+            metrics=value.get('metrics')
+        )
+    
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+    
+    @classmethod
+    def load(cls, path: Path) -> Optional['EnsembleWeights']:
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+# ==================== Fitting ====================
+
+def fit_weights(backtest: Dict[str, np.ndarray], horizon_edges: Sequence[int] = HORIZON_EDGES,
+                prior_samples: float = 30, default: float = 0.5, max_shift: float = 0.25) -> np.ndarray:
+    """
+    Error-minimizing Prophet weight per (horizon bucket, day of week),
+    shrunk toward `default` (see the module docstring)
+    
+    Buckets with no usable errors keep `default`.
+    """
+    horizon_edges = np.asarray(horizon_edges, dtype=np.int64)
+    n_buckets = len(horizon_edges)
+    horizon = backtest['actual'].shape[1]
+    bucket = np.searchsorted(horizon_edges, np.arange(1, horizon + 1), side='right') - 1
+    
+    e_s = backtest['actual'] - backtest['sarima']
+    diff = backtest['prophet'] - backtest['sarima']   # = e_s - e_p
+    ok = np.isfinite(e_s) & np.isfinite(diff)
+    
+    # Per-cell sums via one bincount each over the flattened (bucket, dow) cell id
+    cell = (np.broadcast_to(bucket, e_s.shape) * 7 + backtest['dayofweek'])[ok]
+    size = n_buckets * 7
+    count = np.bincount(cell, minlength=size).reshape(n_buckets, 7)
+    cross = np.bincount(cell, weights=(e_s * diff)[ok], minlength=size).reshape(n_buckets, 7)
+    spread = np.bincount(cell, weights=(diff ** 2)[ok], minlength=size).reshape(n_buckets, 7)
+    
+    # Prior strength per bucket: `prior_samples` errors of the bucket's mean spread
+    bucket_count = count.sum(axis=1, keepdims=True)
+    prior = prior_samples * spread.sum(axis=1, keepdims=True) / np.maximum(bucket_count, 1)
+    total = spread + prior
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = (cross + prior * default) / total
+    low, high = max(default - max_shift, 0.0), min(default + max_shift, 1.0)
+    weights = np.clip(weights, low, high)
+    return np.where(total > 0, weights, default)
+
+def combined_metrics(backtest: Dict[str, np.ndarray], weights: EnsembleWeights, fixed_weight: float) -> Dict:
+    """Backtest MAE of each model, the fixed-weight and the learned-weight ensemble"""
+    horizon = backtest['actual'].shape[1]
+    w = weights.lookup(np.arange(1, horizon + 1)[None, :], backtest['dayofweek'])
+    forecasts = {
+        'prophet': backtest['prophet'],
+        'sarima': backtest['sarima'],
+        'fixed': fixed_weight * backtest['prophet'] + (1 - fixed_weight) * backtest['sarima'],
+        'learned': w * backtest['prophet'] + (1 - w) * backtest['sarima'],
+    }
+    return {name: round(float(np.nanmean(np.abs(forecast - backtest['actual']))), 4) for name, forecast in forecasts.items()}
+
+def learn_weights(prophet_model, sarima_results, data: pd.DataFrame, horizon: int, min_train: int,
+                  cutoffs: int = 6, horizon_edges: Sequence[int] = HORIZON_EDGES, default: float = 0.5,
+                  prior_samples: float = 30, max_shift: float = 0.25, model_version: str = None) -> EnsembleWeights:
+    """
+    Refit both models at `cutoffs` sampled cutoffs and build the weight table
+    
+    Args:
+        prophet_model: Fitted Prophet model (not a scorer: it is refit)
+        sarima_results: Fitted statsmodels SARIMAX results
+        default: Fixed Prophet weight the cells are shrunk toward
+        max_shift: Largest distance of a cell from `default`
+    """
+    sampled = sample_cutoffs(len(data), min_train, horizon, cutoffs)
+    backtest = refit_forecasts(prophet_model, sarima_results, data, sampled, horizon)
+    weights = EnsembleWeights(
+        horizon_edges,
+        fit_weights(backtest, horizon_edges, prior_samples=prior_samples, default=default, max_shift=max_shift),
+        source='learned',
+        model_version=model_version
+    )
+    weights.metrics = {
+        'cutoffs': [f"{data.index[cutoff - 1]:%Y-%m-%d}" for cutoff in sampled.tolist()],
+        'horizon': int(horizon),
+        'prior_samples': prior_samples,
+        'max_shift': max_shift,
+        'mae': combined_metrics(backtest, weights, default),
+    }
+    return weights
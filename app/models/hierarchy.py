@@ -0,0 +1,163 @@
+"""
+Hierarchy - Aggregation structure and forecast reconciliation
+
+A hierarchy of nested levels (e.g. region > store > category) over m
+bottom series has n = n_a + m nodes: the total, every prefix of the
+levels (aggregates, first) and the bottom series (last). With C the
+n_a x m aggregation matrix, the summing matrix is S = [C; I].
+
+Reconciliation maps base forecasts y (n x h) for every node onto
+coherent ones (aggregates equal the sums of their children):
+
+- bottom_up:   S y_bottom
+- ols / wls_struct / wls_var / mint_shrink: the MinT projection
+  S (S' W^-1 S)^-1 S' W^-1 y for W = I, diag(S 1), the residual
+  variances, or the shrunk residual covariance (Schafer-Strimmer
+  shrinkage towards the diagonal, as in Wickramasuriya et al. 2019)
+
+MinT is evaluated in the equivalent form
+
+    b = y_b - (W U)_b (U' W U)^-1 U' y,     U' = [I | -C]
+
+which only solves an n_a x n_a system and, for mint_shrink, only needs
+the residual matrix E (T x n) rather than the n x n covariance.
+"""
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+METHODS = ('bottom_up', 'ols', 'wls_struct', 'wls_var', 'mint_shrink')
+
+TOTAL = 'total'
+
+class Hierarchy:
+    """Nodes, levels and aggregation matrix of a nested hierarchy"""
+    
+    def __init__(self, levels: List[str], bottom_keys: pd.DataFrame):
+        """
+        Args:
+            levels: Level columns, outermost first
+            bottom_keys: One row per bottom series with the level columns;
+                row order is the order of the bottom series
+        """
+        self.levels = list(levels)
+        bottom_keys = bottom_keys[self.levels].astype(str).reset_index(drop=True)
+        if bottom_keys.duplicated().any():
+            raise ValueError("Bottom series keys must be unique")
+        self.m = len(bottom_keys)
+        
+        ids, node_levels, rows, key_rows = [TOTAL], [TOTAL], [np.zeros(self.m, dtype=np.intp)], [{}]
+        for depth in range(1, len(self.levels)):
+            prefix = self.levels[:depth]
+            groups = bottom_keys.groupby(prefix, sort=True)
+            for values in groups.size().index:
+                values = values if isinstance(values, tuple) else (values,)
+                ids.append("/".join(values))
+                node_levels.append(self.levels[depth - 1])
+                key_rows.append(dict(zip(prefix, values)))
+            rows.append(groups.ngroup().to_numpy())
+        
+        self.n_aggregates = len(ids)
+        self.aggregation = np.zeros((self.n_aggregates, self.m))
+        offset = 0
+        for codes in rows:
+            self.aggregation[offset + codes, np.arange(self.m)] = 1.0
+            offset += codes.max() + 1
+        
+        ids.extend("/".join(row) for row in bottom_keys.itertuples(index=False))
+        node_levels.extend([self.levels[-1]] * self.m)
+        key_rows.extend(bottom_keys.to_dict('records'))
+        
+        self.ids = ids
+        self.node_levels = np.array(node_levels)
+        self.keys = pd.DataFrame(key_rows, columns=self.levels)
+        self.index = {series_id: i for i, series_id in enumerate(ids)}
+        # Number of bottom series under each node (diag of S 1)
+        self.sizes = np.concatenate([self.aggregation.sum(axis=1), np.ones(self.m)])
+    
+    @property
+    def n(self) -> int:
+        return self.n_aggregates + self.m
+    
+    @property
+    def level_names(self) -> List[str]:
+        return [TOTAL] + self.levels
+    
+    def aggregate(self, bottom: np.ndarray) -> np.ndarray:
+        """All nodes (n x k) from bottom-level values (m x k)"""
+        bottom = np.asarray(bottom, dtype=float)
+        return np.vstack([self.aggregation @ bottom, bottom])
+    
+    # ==================== Reconciliation ====================
+    
+    def reconcile(self, base: np.ndarray, method: str = 'bottom_up', residuals: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Coherent forecasts for all nodes
+        
+        Args:
+            base: Base forecasts, n x h (only the bottom rows are used by
+                bottom_up)
+            method: One of METHODS
+            residuals: In-sample one-step errors, T x n (wls_var and
+                mint_shrink); rows with non-finite values are ignored
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown reconciliation method '{method}' (use one of {', '.join(METHODS)})")
+        base = np.asarray(base, dtype=float)
+        n_a = self.n_aggregates
+        if method == 'bottom_up':
+            return self.aggregate(base[n_a:])
+        
+        # U = [I; -C'] (n x n_a); WU for the chosen W
+        U = np.vstack([np.eye(n_a), -self.aggregation.T])
+        if method == 'ols':
+            WU = U
+        elif method == 'wls_struct':
+            WU = self.sizes[:, None] * U
+        else:
+            if residuals is None:
+                raise ValueError(f"{method} reconciliation needs in-sample residuals")
+            E = np.asarray(residuals, dtype=float)
+            E = E[np.isfinite(E).all(axis=1)]
+            if len(E) < 2:
+                raise ValueError(f"{method} reconciliation needs at least 2 complete residual rows")
+            variance = np.einsum('ti,ti->i', E, E) / len(E)
+            variance = np.where(variance > 0, variance, 1e-12)
+            if method == 'wls_var':
+                WU = variance[:, None] * U
+            else:
+                lam = shrinkage_intensity(E)
+                EU = E[:, :n_a] - E[:, n_a:] @ self.aggregation.T
+                WU = lam * variance[:, None] * U + (1 - lam) * (E.T @ EU) / len(E)
+        
+        M = WU[:n_a] - self.aggregation @ WU[n_a:]
+        incoherence = base[:n_a] - self.aggregation @ base[n_a:]
+        bottom = base[n_a:] - WU[n_a:] @ np.linalg.solve(M, incoherence)
+        return self.aggregate(bottom)
+
+def shrinkage_intensity(residuals: np.ndarray) -> float:
+    """
+    Schafer-Strimmer shrinkage intensity towards the diagonal
+    
+    Same estimate as shrink.estim() in the R hts package, computed through
+    the T x T (or n x n, whichever is smaller) Gram matrix of the
+    standardized residuals instead of every pairwise correlation.
+    """
+    E = np.asarray(residuals, dtype=float)
+    T, p = E.shape
+    scale = np.sqrt(np.einsum('ti,ti->i', E, E) / T)
+    xs = E / np.where(scale > 0, scale, 1.0)
+    
+    gram = xs @ xs.T if T <= p else xs.T @ xs
+    gram_sq = float(np.sum(gram ** 2))              # sum_ij (xs'xs)_ij^2
+    sq = xs ** 2
+    row_sq = sq.sum(axis=1)                          # sum_i xs_ti^2 per t
+    col_sq = sq.sum(axis=0)                          # sum_t xs_ti^2 per i (T unless constant)
+    
+    # Var(r_ij) summed over i != j, and sum of squared off-diagonal correlations
+    v_all = (np.sum(row_sq ** 2) - gram_sq / T) / (T * (T - 1))
+    v_diag = (np.sum(sq ** 2) - np.sum(col_sq ** 2) / T) / (T * (T - 1))
+    d_off = gram_sq / T ** 2 - np.sum((col_sq / T) ** 2)
+    if d_off <= 0:
+        return 1.0
+    return float(min(max((v_all - v_diag) / d_off, 0.0), 1.0))
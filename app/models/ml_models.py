@@ -1,61 +1,375 @@
 """
-ML Model Loader - Load models once at startup
+ML Model Loader - Load models lazily, on first use or via background warm-up
+
+Artifacts come from the active model registry version (see registry.py),
+or from the legacy pickles in MODEL_DIR if nothing has been published.
 """
+import hashlib
+import os
 import pickle
+import threading
+import time
 import pandas as pd
+from typing import Dict
 from app.config import settings
+from app.models.registry import (
+    model_registry, RegistryError, load_json, load_pickle_gz, load_prophet, load_sarima, load_sarima_results
+)
+from app.models.prophet_scorer import ProphetScorer
+from app.models.sarima_forecaster import SARIMAForecaster
+from app.services.mmap_store import read_bundle, write_bundle
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def _load_prophet_pickle(path):
+    return ProphetScorer.from_model(_load_pickle(path))
+
+def _load_prophet_registry(path):
+    # Serve from the vectorized scorer rather than Prophet.predict()
+    return ProphetScorer.from_model(load_prophet(path))
+
+def _load_sarima_pickle(path):
+    # Keep only the compact state-space form, not the full results object
+    return SARIMAForecaster.from_results(_load_pickle(path))
+
+def _load_historical_data(path):
+    if settings.SHARED_DATA_MODE == "mmap":
+        try:
+            return _load_historical_mmap(path)
+        except OSError as e:
+            print(f"⚠️ Could not memory-map historical data, loading into memory: {e}")
+    return pd.read_csv(path, index_col=0, parse_dates=True)
+
+def _load_historical_mmap(path):
+    """
+    Historical frame backed by read-only .npy files under CACHE_DIR
+    
+    The CSV is converted once per (size, mtime); afterwards every worker
+    maps the same files, so the series exists once in the page cache.
+    """
+    stat = os.stat(path)
+    bundle_path = settings.CACHE_DIR / f"{path.parent.name}_{path.stem}_{stat.st_size}_{stat.st_mtime_ns}"
+    bundle = read_bundle(bundle_path)
+    if bundle is None:
+        data = pd.read_csv(path, index_col=0, parse_dates=True)
+        write_bundle(
+            bundle_path,
+            {'index': data.index.to_numpy(), 'values': data.to_numpy(dtype=float)},
+            {'index_name': data.index.name, 'columns': list(data.columns)}
+        )
+        bundle = read_bundle(bundle_path)
+    arrays, meta = bundle
+    index = pd.DatetimeIndex(arrays['index'], name=meta['index_name'], copy=False)
+    return pd.DataFrame(arrays['values'], index=index, columns=meta['columns'], copy=False)
+
+# name -> (legacy settings path attribute, legacy loader, registry loader);
+# warm-up loads in this order
+ARTIFACTS: Dict[str, tuple] = {
+    'historical_data': ('HISTORICAL_DATA_PATH', _load_historical_data, _load_historical_data),
+    'ensemble_config': ('ENSEMBLE_CONFIG_PATH', _load_pickle, load_json),
+    'risk_config': ('RISK_CONFIG_PATH', _load_pickle, load_json),
+    'prophet_model': ('PROPHET_MODEL_PATH', _load_prophet_pickle, _load_prophet_registry),
+    'sarima_model': ('SARIMA_MODEL_PATH', _load_sarima_pickle, load_sarima),
+    'anomaly_detector': ('ANOMALY_MODEL_PATH', _load_pickle, load_pickle_gz),
+}
 
 class ModelLoader:
-    """Singleton class to load and store ML models"""
+    """
+    Singleton class to load and store ML models
+    
+    Each artifact is loaded on first access (thread-safe, once), so
+    importing the app costs nothing and a worker only pays for the models
+    it uses. `warm_up()` loads everything, optionally on a background
+    thread; `status()` reports per-model load state and time. `reload()`
+    swaps in another registry version while the process keeps serving.
+    """
     
     _instance = None
-    _models_loaded = False
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._init_state()
         return cls._instance
     
     def __init__(self):
-        if not self._models_loaded:
+        if settings.MODEL_LOADING == "eager" and not self.models_loaded:
             self.load_models()
     
+    def _init_state(self):
+        self._values: Dict[str, object] = {}
+        self._state: Dict[str, Dict] = self._empty_state()
+        self._locks = {name: threading.Lock() for name in ARTIFACTS}
+        self._version_lock = threading.Lock()
+        self._source_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._model_version = None
+        self._active_version = None
+        self._source_resolved = False
+        self._warmup_thread = None
+        self._watch_thread = None
+        self._reload_listeners = []
+    
+    @staticmethod
+    def _empty_state() -> Dict[str, Dict]:
+        return {
+            name: {"status": "not_loaded", "load_seconds": None, "error": None}
+            for name in ARTIFACTS
+        }
+    
+    def _after_fork(self):
+        # A load in progress in the parent never finishes in a forked child:
+        # give the child fresh locks and let it load what it needs itself
+        self._locks = {name: threading.Lock() for name in ARTIFACTS}
+        self._version_lock = threading.Lock()
+        self._source_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._warmup_thread = None
+        self._watch_thread = None
+        for name, state in self._state.items():
+            if state["status"] == "loading":
+                state["status"] = "not_loaded"
+    
+    # ==================== Loading ====================
+    
+    @property
+    def active_version(self):
+        """Registry version the artifacts come from (None: legacy pickles)"""
+        if not self._source_resolved:
+            with self._source_lock:
+                if not self._source_resolved:
+                    self._active_version = settings.MODEL_VERSION or model_registry.current_version()
+                    self._source_resolved = True
+        return self._active_version
+    
+    @property
+    def manifest(self):
+        """Manifest of the active registry version, or None"""
+        version = self.active_version
+        return model_registry.manifest(version) if version else None
+    
+    def _load_artifact(self, name: str, version):
+        path_setting, legacy_loader, registry_loader = ARTIFACTS[name]
+        if version is None:
+            return legacy_loader(getattr(settings, path_setting))
+        return registry_loader(model_registry.artifact_path(version, name))
+    
+    def get(self, name: str):
+        """Artifact by name, loading it on first use"""
+        values = self._values
+        if name in values:
+            return values[name]
+        
+        with self._locks[name]:
+            # A reload may have swapped the whole set while we waited
+            values = self._values
+            if name in values:
+                return values[name]
+            
+            version = self.active_version
+            state = self._state[name]
+            state.update(status="loading", error=None)
+            start = time.perf_counter()
+            try:
+                value = self._load_artifact(name, version)
+            except Exception as e:
+                state.update(status="error", error=str(e), load_seconds=round(time.perf_counter() - start, 3))
+                print(f"❌ Error loading {name}: {e}")
+                raise
+            state.update(status="loaded", load_seconds=round(time.perf_counter() - start, 3))
+            values[name] = value
+            return value
+    
     def load_models(self):
         """Load all ML models"""
-        try:
-            # Prophet Model
-            with open(settings.PROPHET_MODEL_PATH, 'rb') as f:
-                self.prophet_model = pickle.load(f)
-            
-            # SARIMA Model
-            with open(settings.SARIMA_MODEL_PATH, 'rb') as f:
-                self.sarima_model = pickle.load(f)
-            
-            # Anomaly Detector
-            with open(settings.ANOMALY_MODEL_PATH, 'rb') as f:
-                self.anomaly_detector = pickle.load(f)
-            
-            # Ensemble Config
-            with open(settings.ENSEMBLE_CONFIG_PATH, 'rb') as f:
-                self.ensemble_config = pickle.load(f)
-            
-            # Risk Config
-            with open(settings.RISK_CONFIG_PATH, 'rb') as f:
-                self.risk_config = pickle.load(f)
-            
-            # Historical Data
-            self.historical_data = pd.read_csv(
-                settings.HISTORICAL_DATA_PATH,
-                index_col=0,
-                parse_dates=True
-            )
+        for name in ARTIFACTS:
+            self.get(name)
+        print("✅ All models loaded successfully!")
+    
+    def warm_up(self, background: bool = True):
+        """Load every artifact now, optionally on a daemon thread"""
+        if not background:
+            self._warm_up()
+            return
+        if self._warmup_thread is not None and self._warmup_thread.is_alive():
+            return
+        self._warmup_thread = threading.Thread(target=self._warm_up, name="model-warmup", daemon=True)
+        self._warmup_thread.start()
+    
+    def wait_for_warm_up(self, timeout: float = None):
+        """Block until a background warm-up (if any) has finished"""
+        thread = self._warmup_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+    
+    def _warm_up(self):
+        start = time.perf_counter()
+        for name in ARTIFACTS:
+            try:
+                self.get(name)
+            except Exception:
+                continue
+        failed = [name for name, state in self._state.items() if state["status"] == "error"]
+        if failed:
+            print(f"⚠️ Model warm-up finished with errors ({', '.join(failed)})")
+        else:
+            print(f"✅ All models loaded successfully! ({time.perf_counter() - start:.2f}s)")
+    
+    # ==================== Hot swap ====================
+    
+    def reload(self, version: str = None) -> Dict:
+        """
+        Load a registry version and swap it in without restarting
+        
+        Defaults to the registry's current version. Requests keep using
+        the previous models until every artifact of the new version has
+        loaded and passed its checksum; on error nothing changes.
+        """
+        with self._reload_lock:
+            version = version or settings.MODEL_VERSION or model_registry.current_version()
+            if version is None:
+                raise RegistryError("No model version has been published")
+            manifest = model_registry.manifest(version)
             
-            self._models_loaded = True
-            print("✅ All models loaded successfully!")
+            start = time.perf_counter()
+            values, state = {}, self._empty_state()
+            for name in ARTIFACTS:
+                artifact_start = time.perf_counter()
+                values[name] = self._load_artifact(name, version)
+                state[name].update(status="loaded", load_seconds=round(time.perf_counter() - artifact_start, 3))
             
+            previous = self._active_version
+            self._values, self._state = values, state
+            self._active_version, self._source_resolved = version, True
+            self._model_version = manifest['checksum']
+            elapsed = time.perf_counter() - start
+            print(f"🔄 Model version {version} active ({elapsed:.2f}s)")
+            for listener in self._reload_listeners:
+                try:
+                    listener()
+                except Exception as e:
+                    print(f"⚠️ Model reload listener failed: {e}")
+            return {
+                "previous_version": previous,
+                "model_version": version,
+                "load_seconds": round(elapsed, 3)
+            }
+    
+    def add_reload_listener(self, callback):
+        """Call `callback()` after every successful reload"""
+        self._reload_listeners.append(callback)
+    
+    def check_for_update(self) -> bool:
+        """Reload if the registry's current version changed (True if swapped)"""
+        if settings.MODEL_VERSION:
+            return False
+        current = model_registry.current_version()
+        if current is None or current == self.active_version:
+            return False
+        self.reload(current)
+        return True
+    
+    def watch_registry(self, interval: float):
+        """Poll the registry for a new current version on a daemon thread"""
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_for_update()
+                except Exception as e:
+                    print(f"⚠️ Model reload failed: {e}")
+        
+        self._watch_thread = threading.Thread(target=watch, name="model-registry-watch", daemon=True)
+        self._watch_thread.start()
+    
+    def listen_for_reload_signal(self):
+        """
+        Check the registry for a new version on settings.MODEL_RELOAD_SIGNAL
+        
+        Registers this process under MODEL_RELOAD_PID_DIR so publishers
+        (see signal_reload()) can reach every serving worker instead of
+        waiting for the next registry poll. The entry holds the process
+        start time so a pid reused by another process is never signalled;
+        where that cannot be read (no /proc) only the poll is used. Must be
+        called from a coroutine on the main thread.
+        """
+        import asyncio
+        import signal
+        signum = getattr(signal, settings.MODEL_RELOAD_SIGNAL, None)
+        if signum is None:
+            return
+        started = _process_start_time(os.getpid())
+        if started is None:
+            print("⚠️ Model reload signal not available: process start time unknown")
+            return
+        
+        def on_signal():
+            # Reloading blocks for seconds: keep it off the event loop
+            threading.Thread(target=self._reload_on_signal, name="model-reload-signal", daemon=True).start()
+        
+        try:
+            asyncio.get_running_loop().add_signal_handler(signum, on_signal)
+        except (NotImplementedError, RuntimeError, ValueError) as e:
+            # No signal support on this platform, or not on the main thread
+            print(f"⚠️ Model reload signal not available: {e}")
+            return
+        settings.MODEL_RELOAD_PID_DIR.mkdir(parents=True, exist_ok=True)
+        (settings.MODEL_RELOAD_PID_DIR / str(os.getpid())).write_text(started)
+    
+    def stop_listening_for_reload_signal(self):
+        try:
+            (settings.MODEL_RELOAD_PID_DIR / str(os.getpid())).unlink()
+        except FileNotFoundError:
+            pass
+    
+    def _reload_on_signal(self):
+        try:
+            if not self.check_for_update():
+                print(f"🔄 Reload signal: model version {self.active_version} is current")
         except Exception as e:
-            print(f"❌ Error loading models: {e}")
-            raise
+            print(f"⚠️ Model reload failed: {e}")
+    
+    @property
+    def models_loaded(self) -> bool:
+        return all(state["status"] == "loaded" for state in self._state.values())
+    
+    def status(self) -> Dict:
+        """Per-model load state and load time"""
+        return {name: dict(state) for name, state in self._state.items()}
+    
+    @property
+    def model_version(self) -> str:
+        """Content hash of the active artifacts (keys derived caches)"""
+        if self._model_version is None:
+            with self._version_lock:
+                if self._model_version is None:
+                    manifest = self.manifest
+                    self._model_version = manifest['checksum'] if manifest else self._hash_artifacts()
+        return self._model_version
+    
+    def _hash_artifacts(self) -> str:
+        """Content hash of the legacy model pickles and training data"""
+        digest = hashlib.sha256()
+        for path in sorted(settings.MODEL_DIR.glob("*.pkl")) + [settings.HISTORICAL_DATA_PATH]:
+            digest.update(path.name.encode())
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
+    
+    # ==================== Accessors ====================
+    
+    prophet_model = property(lambda self: self.get('prophet_model'))
+    sarima_model = property(lambda self: self.get('sarima_model'))
+    anomaly_detector = property(lambda self: self.get('anomaly_detector'))
+    ensemble_config = property(lambda self: self.get('ensemble_config'))
+    risk_config = property(lambda self: self.get('risk_config'))
+    historical_data = property(lambda self: self.get('historical_data'))
     
     def get_prophet(self):
         return self.prophet_model
@@ -72,5 +386,73 @@ class ModelLoader:
     def get_config(self):
         return self.ensemble_config, self.risk_config
 
+    def load_prophet_model(self):
+        """
+        The active Prophet model itself (not cached)
+        
+        Serving keeps only the ProphetScorer; refits that need the model's
+        options load it here.
+        """
+        version = self.active_version
+        if version is None:
+            return _load_pickle(settings.PROPHET_MODEL_PATH)
+        return load_prophet(model_registry.artifact_path(version, 'prophet_model'))
+    
+    def load_sarima_results(self):
+        """
+        Full statsmodels results of the active SARIMA model (not cached)
+        
+        Serving keeps only the compact form; backtests that need the
+        Kalman filter output at every observation rebuild it here without
+        refitting.
+        """
+        version = self.active_version
+        if version is None:
+            return _load_pickle(settings.SARIMA_MODEL_PATH)
+        return load_sarima_results(model_registry.artifact_path(version, 'sarima_model'))
+
+def _process_start_time(pid: int):
+    """Start time of `pid` in clock ticks since boot, or None if unknown"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses: split after it
+    fields = stat[stat.rfind(")") + 2:].split()
+    return fields[19] if len(fields) > 19 else None
+
+def signal_reload() -> int:
+    """
+    Send MODEL_RELOAD_SIGNAL to every process registered by
+    `listen_for_reload_signal()` and return how many were reached
+    
+    Entries whose process has exited, or whose pid now belongs to a
+    process with a different start time, are removed without signalling.
+    """
+    import signal
+    signum = getattr(signal, settings.MODEL_RELOAD_SIGNAL, None)
+    if signum is None or not settings.MODEL_RELOAD_PID_DIR.exists():
+        return 0
+    reached = 0
+    for entry in settings.MODEL_RELOAD_PID_DIR.iterdir():
+        try:
+            pid = int(entry.name)
+            registered = entry.read_text().strip()
+        except (ValueError, OSError):
+            continue
+        if not registered or _process_start_time(pid) != registered:
+            entry.unlink(missing_ok=True)
+            continue
+        try:
+            os.kill(pid, signum)
+            reached += 1
+        except ProcessLookupError:
+            entry.unlink(missing_ok=True)
+        except PermissionError:
+            continue
+    return reached
+
 # Global instance
-model_loader = ModelLoader()
\ No newline at end of file
+model_loader = ModelLoader()
+os.register_at_fork(after_in_child=model_loader._after_fork)
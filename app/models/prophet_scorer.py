@@ -0,0 +1,286 @@
+"""
+Prophet Scorer - Vectorized Prophet predictions without the predict() pipeline
+
+Prophet.predict() rebuilds the seasonal feature frame and simulates
+`uncertainty_samples` trend paths on every call. For a fitted model with
+additive seasonalities and linear or flat growth the point forecast is
+
+    yhat(t) = (k(t) t + m(t)) * y_scale + sum_s X_s(ds) beta_s * y_scale
+
+where k(t), m(t) are the piecewise-linear slope and offset at the fitted
+changepoints and X_s are sin/cos Fourier terms of days since the epoch.
+ProphetScorer keeps just those parameters and evaluates the formula with
+NumPy for any date array.
+
+Interval bounds follow Prophet's generative model:
+- on and before the last training date there is no trend uncertainty, so
+  the bounds are yhat +- the normal quantile of the observation noise
+- after it, the deviation from yhat depends only on the number of days
+  ahead, so its quantiles are simulated once per day of horizon (same
+  scheme as Prophet's vectorized sampler, fixed seed) and cached
+"""
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+DAY_NS = 86_400 * 10**9
+
+# Future days simulated per block; blocks are seeded by their index, so
+# the cached offsets do not depend on the order horizons are requested in
+CHUNK_DAYS = 128
+
+def unsupported_features(model) -> Optional[str]:
+    """Why `model` cannot be scored in closed form, or None"""
+    if model.history is None:
+        return "model has not been fit"
+    if model.growth not in ('linear', 'flat'):
+        return f"{model.growth} growth"
+    if model.holidays is not None or getattr(model, 'country_holidays', None):
+        return "holidays"
+    if model.extra_regressors:
+        return "extra regressors"
+    for name, props in model.seasonalities.items():
+        if props['condition_name'] is not None:
+            return f"conditional seasonality {name}"
+        if props['mode'] != 'additive':
+            return f"{props['mode']} seasonality {name}"
+    if np.asarray(model.params['k']).shape[0] != 1:
+        return "MCMC parameter samples"
+    if not model.uncertainty_samples:
+        return "uncertainty_samples disabled"
+    return None
+
+class ProphetScorer:
+    """
+    yhat, yhat_lower and yhat_upper for arbitrary dates
+    
+    Future interval offsets are simulated in blocks of CHUNK_DAYS up to
+    the longest horizon requested so far; later calls are array lookups.
+    """
+    
+    def __init__(self, start_ns: int, t_scale_ns: float, y_scale: float, growth: str,
+                 k: float, m: float, changepoints_t: np.ndarray, deltas: np.ndarray,
+                 frequencies: np.ndarray, beta_sin: np.ndarray, beta_cos: np.ndarray,
+                 sigma_obs: float, interval_width: float, samples: int, seed: int = 0):
+        self.start_ns = int(start_ns)
+        self.t_scale_ns = float(t_scale_ns)
+        self.y_scale = float(y_scale)
+        self.growth = growth
+        self.frequencies = np.asarray(frequencies, dtype=float)
+        self.beta_sin = np.asarray(beta_sin, dtype=float)
+        self.beta_cos = np.asarray(beta_cos, dtype=float)
+        self.sigma_obs = float(sigma_obs)
+        self.interval_width = float(interval_width)
+        self.samples = int(samples)
+        self.seed = int(seed)
+        
+        # Slope and offset of each trend segment (segment i starts at changepoint i-1)
+        changepoints_t = np.asarray(changepoints_t, dtype=float)
+        deltas = np.asarray(deltas, dtype=float)
+        self.changepoints_t = changepoints_t
+        self.deltas = deltas
+        self.segment_k = float(k) + np.concatenate([[0.0], np.cumsum(deltas)])
+        self.segment_m = float(m) + np.concatenate([[0.0], np.cumsum(-changepoints_t * deltas)])
+        
+        # Historical bounds: observation noise only
+        lower_p = (1 - self.interval_width) / 2
+        self.noise_lower = NormalDist(0, self.sigma_obs * self.y_scale).inv_cdf(lower_p)
+        self.noise_upper = -self.noise_lower
+        
+        # Future bounds: (lower offsets, upper offsets, simulation carry)
+        self._intervals = (np.empty(0), np.empty(0), None)
+    
+    @property
+    def last_ns(self) -> int:
+        """Last training date (t = 1)"""
+        return self.start_ns + int(round(self.t_scale_ns))
+    
+    # ==================== Construction ====================
+    
+    @classmethod
+    def from_model(cls, model, seed: int = 0):
+        """
+        Scorer for a fitted Prophet model
+        
+        Models using features the closed form does not cover (holidays,
+        regressors, multiplicative or conditional seasonalities, logistic
+        growth, MCMC) get a ProphetModelScorer that calls predict() instead.
+        """
+        reason = unsupported_features(model)
+        if reason is not None:
+            print(f"⚠️ Prophet scorer falls back to predict() ({reason})")
+            return ProphetModelScorer(model)
+        
+        params = {name: np.asarray(value, dtype=float) for name, value in model.params.items()}
+        
+        # Columns of the seasonal feature matrix, in Prophet's order:
+        # per seasonality, (sin, cos) for orders 1..fourier_order
+        frequencies = []
+        for props in model.seasonalities.values():
+            frequencies.extend((i + 1) / props['period'] for i in range(props['fourier_order']))
+        beta = params['beta'][0]
+        
+        return cls(
+            start_ns=pd.Timestamp(model.start).as_unit('ns').value,
+            t_scale_ns=pd.Timedelta(model.t_scale).as_unit('ns').value,
+            y_scale=model.y_scale,
+            growth=model.growth,
+            k=params['k'][0, 0],
+            m=params['m'][0, 0],
+            changepoints_t=model.changepoints_t,
+            deltas=params['delta'][0],
+            frequencies=np.array(frequencies),
+            beta_sin=beta[0:2 * len(frequencies):2],
+            beta_cos=beta[1:2 * len(frequencies):2],
+            sigma_obs=params['sigma_obs'][0, 0],
+            interval_width=model.interval_width,
+            samples=model.uncertainty_samples,
+            seed=seed
+        )
+    
+    # ==================== Point forecast ====================
+    
+    def _trend(self, t: np.ndarray) -> np.ndarray:
+        if self.growth == 'flat':
+            return np.full(len(t), self.segment_m[0] * self.y_scale)
+        segment = np.searchsorted(self.changepoints_t, t, side='right')
+        return (self.segment_k[segment] * t + self.segment_m[segment]) * self.y_scale
+    
+    def _seasonality(self, ds_ns: np.ndarray) -> np.ndarray:
+        if not len(self.frequencies):
+            return np.zeros(len(ds_ns))
+        days = ds_ns / DAY_NS
+        angles = np.outer(2 * np.pi * days, self.frequencies)
+        return (np.sin(angles) @ self.beta_sin + np.cos(angles) @ self.beta_cos) * self.y_scale
+    
+    def predict_yhat(self, dates) -> np.ndarray:
+        ds_ns = _to_ns(dates)
+        t = (ds_ns - self.start_ns) / self.t_scale_ns
+        return self._trend(t) + self._seasonality(ds_ns)
+    
+    def predict_yhat_from(self, origins, dates) -> np.ndarray:
+        """
+        yhat for `dates` as forecast from training data ending at `origins`
+        
+        `dates` is n x h with one origin per row. Past its origin the trend
+        continues with the slope in force there, as Prophet extrapolates
+        beyond the end of its history; later changepoints are ignored.
+        The other parameters are the fitted ones (no refit per origin).
+        """
+        origin_ns = _to_ns(origins)
+        ds_ns = np.asarray(dates, dtype='datetime64[ns]').astype(np.int64)
+        seasonal = self._seasonality(ds_ns.ravel()).reshape(ds_ns.shape)
+        if self.growth == 'flat':
+            return self.segment_m[0] * self.y_scale + seasonal
+        origin_t = (origin_ns - self.start_ns) / self.t_scale_ns
+        t = (ds_ns - self.start_ns) / self.t_scale_ns
+        segment = np.searchsorted(self.changepoints_t, origin_t, side='right')
+        trend = self.segment_k[segment][:, None] * t + self.segment_m[segment][:, None]
+        return trend * self.y_scale + seasonal
+    
+    def predict_from(self, origins, dates) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        yhat, yhat_lower, yhat_upper as predict_yhat_from(); bounds use the
+        trend uncertainty for the days between each origin and date
+        """
+        origin_ns = _to_ns(origins)
+        ds_ns = np.asarray(dates, dtype='datetime64[ns]').astype(np.int64)
+        yhat = self.predict_yhat_from(origin_ns, ds_ns)
+        days_ahead = np.maximum(-((origin_ns[:, None] - ds_ns) // DAY_NS), 1)
+        lower_offsets, upper_offsets = self._future_offsets(int(days_ahead.max()))
+        return yhat, yhat + lower_offsets[days_ahead - 1], yhat + upper_offsets[days_ahead - 1]
+    
+    # ==================== Intervals ====================
+    
+    def _simulate_chunk(self, chunk: int, carry):
+        """
+        Quantiles of the deviation from yhat for future days
+        chunk * CHUNK_DAYS + 1 .. (chunk + 1) * CHUNK_DAYS
+        
+        Mirrors Prophet._sample_uncertainty for linear growth: slope changes
+        arrive with probability (changepoints per unit t) * step, have a
+        Laplace(mean |delta|) size, and are averaged with the previous step
+        before integrating twice; observation noise is added on top.
+        """
+        rng = np.random.default_rng([self.seed, chunk])
+        shape = (self.samples, CHUNK_DAYS)
+        step = DAY_NS / self.t_scale_ns
+        
+        if carry is None:
+            carry = (np.zeros(self.samples),) * 3
+        prev_shift, slope, level = carry
+        
+        if self.growth == 'linear':
+            likelihood = len(self.changepoints_t) * step
+            mean_delta = np.mean(np.abs(self.deltas)) + 1e-8
+            shifts = rng.laplace(0, mean_delta, shape) * (rng.uniform(size=shape) < likelihood)
+            smoothed = (np.hstack([prev_shift[:, None], shifts[:, :-1]]) + shifts) / 2
+            slopes = slope[:, None] + np.cumsum(smoothed, axis=1)
+            levels = level[:, None] + np.cumsum(slopes, axis=1)
+            carry = (shifts[:, -1], slopes[:, -1], levels[:, -1])
+            trend = levels * step * self.y_scale
+        else:
+            trend = np.zeros(shape)
+        
+        deviation = trend + rng.normal(0, self.sigma_obs, shape) * self.y_scale
+        lower_p = 100 * (1 - self.interval_width) / 2
+        lower, upper = np.percentile(deviation, [lower_p, 100 - lower_p], axis=0)
+        return lower, upper, carry
+    
+    def _future_offsets(self, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        lower, upper, carry = self._intervals
+        if len(lower) >= days:
+            return lower, upper
+        
+        lower_parts, upper_parts = [lower], [upper]
+        size = len(lower)
+        while size < days:
+            chunk_lower, chunk_upper, carry = self._simulate_chunk(size // CHUNK_DAYS, carry)
+            lower_parts.append(chunk_lower)
+            upper_parts.append(chunk_upper)
+            size += CHUNK_DAYS
+        lower, upper = np.concatenate(lower_parts), np.concatenate(upper_parts)
+        # Computed arrays are only ever replaced whole, so readers need no lock
+        self._intervals = (lower, upper, carry)
+        return lower, upper
+    
+    def predict(self, dates) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        yhat, yhat_lower, yhat_upper aligned with `dates`
+        
+        Dates between whole days after the training end use the bounds of
+        the next whole day.
+        """
+        ds_ns = _to_ns(dates)
+        yhat = self.predict_yhat(ds_ns)
+        lower = yhat + self.noise_lower
+        upper = yhat + self.noise_upper
+        
+        days_ahead = -((self.last_ns - ds_ns) // DAY_NS)
+        future = np.flatnonzero(days_ahead > 0)
+        if len(future):
+            lower_offsets, upper_offsets = self._future_offsets(int(days_ahead[future].max()))
+            lower[future] = yhat[future] + lower_offsets[days_ahead[future] - 1]
+            upper[future] = yhat[future] + upper_offsets[days_ahead[future] - 1]
+        return yhat, lower, upper
+
+class ProphetModelScorer:
+    """Same interface as ProphetScorer, computed by Prophet.predict()"""
+    
+    def __init__(self, model):
+        self.model = model
+    
+    def predict_yhat(self, dates) -> np.ndarray:
+        return self.predict(dates)[0]
+    
+    def predict(self, dates) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        dates = pd.DatetimeIndex(dates)
+        forecast = self.model.predict(pd.DataFrame({'ds': dates}))
+        forecast = forecast.drop_duplicates('ds').set_index('ds').reindex(dates)
+        return tuple(forecast[column].to_numpy(dtype=float) for column in ('yhat', 'yhat_lower', 'yhat_upper'))
+
+def _to_ns(dates) -> np.ndarray:
+    if isinstance(dates, np.ndarray) and dates.dtype == np.int64:
+        return dates
+    return pd.DatetimeIndex(dates).as_unit('ns').asi8
@@ -0,0 +1,388 @@
+"""
+Model Registry - Versioned model artifacts described by a manifest
+
+Layout:
+    models/registry/
+        CURRENT                     active version id
+        <version>/
+            manifest.json           version, training window, checksums, metrics
+            prophet_model.json.gz   Prophet JSON serializer output
+            sarima_model.npz        SARIMAX spec, params, observed series, compact state space
+            anomaly_detector.pkl.gz
+            ensemble_config.json
+            risk_config.json
+            historical_sales.csv
+
+Publishing writes a new version directory and switches CURRENT atomically;
+running processes pick the change up through `ModelLoader.reload()`.
+
+Usage:
+    python -m app.models.registry publish      # from the legacy pickles
+    python -m app.models.registry list
+    python -m app.models.registry activate <version>
+    python -m app.models.registry verify [<version>]
+"""
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.config import settings
+from app.models.sarima_forecaster import SARIMAForecaster
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+class RegistryError(Exception):
+    """Raised for unknown versions and missing artifacts"""
+
+class ChecksumError(RegistryError):
+    """Raised when an artifact on disk does not match its manifest checksum"""
+
+# ==================== Serializers ====================
+
+def save_json(value, path: Path):
+    with open(path, 'w') as f:
+        json.dump(value, f, indent=2, default=str)
+
+def load_json(path: Path):
+    with open(path) as f:
+        return json.load(f)
+
+def _gzip_writer(path: Path):
+    # Fixed header mtime so identical artifacts produce identical checksums
+    return gzip.GzipFile(path, 'wb', mtime=0)
+
+def save_pickle_gz(value, path: Path):
+    with _gzip_writer(path) as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_pickle_gz(path: Path):
+    with gzip.open(path, 'rb') as f:
+        return pickle.load(f)
+
+def save_csv(data: pd.DataFrame, path: Path):
+    data.to_csv(path)
+
+def save_prophet(model, path: Path):
+    from prophet.serialize import model_to_json
+    with _gzip_writer(path) as f:
+        f.write(model_to_json(model).encode())
+
+def load_prophet(path: Path):
+    from prophet.serialize import model_from_json
+    with gzip.open(path, 'rt') as f:
+        return model_from_json(f.read())
+
+def save_sarima(results, path: Path):
+    """
+    Store a fitted SARIMAX as spec + params + observed series, plus its
+    compact state-space form (see SARIMAForecaster)
+    
+    The full results object (tens of MB of filter output) is not kept. The
+    spec, params and series are enough to rebuild it exactly with
+    `load_sarima_results()`; serving only needs the compact form.
+    """
+    model = results.model
+    spec = {k: v for k, v in model._get_init_kwds().items() if k not in ('endog', 'exog')}
+    # The series as passed to SARIMAX: its dates label fittedvalues even
+    # when statsmodels ignores an index without a frequency
+    endog = model.data.orig_endog
+    if isinstance(endog, pd.DataFrame):
+        endog = endog.iloc[:, 0]
+    endog = pd.Series(np.asarray(endog, dtype=float).ravel(), index=getattr(endog, 'index', None))
+    dated = isinstance(endog.index, pd.DatetimeIndex)
+    compact = SARIMAForecaster.from_results(results).to_arrays()
+    np.savez(
+        path,
+        spec=np.array(json.dumps({**spec, 'name': model.endog_names, 'index_name': endog.index.name if dated else None})),
+        param_names=np.array(list(results.params.index)),
+        params=results.params.to_numpy(),
+        endog=endog.to_numpy(),
+        index=endog.index.to_numpy() if dated else np.array([], dtype='datetime64[ns]'),
+        **{f"ss_{name}": value for name, value in compact.items()}
+    )
+
+def load_sarima(path: Path) -> SARIMAForecaster:
+    """Compact SARIMA forecaster from `save_sarima` output"""
+    with np.load(path) as data:
+        if 'ss_design' in data:
+            index_name = json.loads(str(data['spec'][()]))['index_name']
+            return SARIMAForecaster.from_arrays(
+                {key[3:]: data[key] for key in data.files if key.startswith('ss_')},
+                index_name=index_name
+            )
+    # Written before the compact form was stored
+    return SARIMAForecaster.from_results(load_sarima_results(path))
+
+def load_sarima_results(path: Path):
+    """Rebuild full statsmodels SARIMAX results from `save_sarima` output (no refit)"""
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    with np.load(path) as data:
+        spec = json.loads(str(data['spec'][()]))
+        index_name, name = spec.pop('index_name'), spec.pop('name')
+        index = pd.DatetimeIndex(data['index'], name=index_name) if len(data['index']) else None
+        endog = pd.Series(data['endog'], index=index, name=name)
+        params = pd.Series(data['params'], index=list(data['param_names']))
+    for key in ('order', 'seasonal_order'):
+        spec[key] = tuple(spec[key])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return SARIMAX(endog, **spec).filter(params)
+
+# name -> (file name, writer)
+ARTIFACT_FORMATS = {
+    'historical_data': ('historical_sales.csv', save_csv),
+    'ensemble_config': ('ensemble_config.json', save_json),
+    'risk_config': ('risk_config.json', save_json),
+    'prophet_model': ('prophet_model.json.gz', save_prophet),
+    'sarima_model': ('sarima_model.npz', save_sarima),
+    'anomaly_detector': ('anomaly_detector.pkl.gz', save_pickle_gz),
+}
+
+def file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# ==================== Registry ====================
+
+class ModelRegistry:
+    """Versioned artifact directories plus a CURRENT pointer"""
+    
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._manifests: Dict[str, Dict] = {}
+    
+    def current_version(self) -> Optional[str]:
+        """Active version id, or None if nothing has been published"""
+        try:
+            version = (self.root / CURRENT_FILE).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+    
+    def versions(self) -> List[str]:
+        """
+        Published version ids, oldest first
+        
+        Ids start with the training end date, not the publish time (a
+        retrain on the same window can sort either way), so versions are
+        ordered by their manifest's created_at.
+        """
+        if not self.root.exists():
+            return []
+        versions = [p.name for p in self.root.iterdir() if (p / MANIFEST_FILE).exists()]
+        return sorted(versions, key=lambda version: (self.manifest(version).get('created_at', ''), version))
+    
+    def manifest(self, version: str) -> Dict:
+        if version not in self._manifests:
+            path = self.root / version / MANIFEST_FILE
+            if not path.exists():
+                raise RegistryError(f"Unknown model version: {version}")
+            self._manifests[version] = load_json(path)
+        return self._manifests[version]
+    
+    def artifact_path(self, version: str, name: str) -> Path:
+        """Path of one artifact after checking it against the manifest checksum"""
+        entry = self.manifest(version)['artifacts'].get(name)
+        if entry is None:
+            raise RegistryError(f"Model version {version} has no artifact '{name}'")
+        path = self.root / version / entry['file']
+        if not path.exists() or file_checksum(path) != entry['sha256']:
+            raise ChecksumError(f"Artifact '{name}' of model version {version} failed checksum verification")
+        return path
+    
+    def verify(self, version: str):
+        """Check every artifact of `version` (raises RegistryError)"""
+        for name in self.manifest(version)['artifacts']:
+            self.artifact_path(version, name)
+    
+    def publish(self, artifacts: Dict[str, object], metrics: Dict = None, activate: bool = True) -> str:
+        """
+        Write a new version from in-memory artifacts and return its id
+        
+        The version id is the training end date plus a checksum prefix, so
+        republishing identical artifacts is a no-op.
+        """
+        data = artifacts['historical_data']
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.root / f".publish-{os.getpid()}-{time.time_ns()}"
+        tmp_dir.mkdir()
+        try:
+            entries = {}
+            for name, value in artifacts.items():
+                file_name, writer = ARTIFACT_FORMATS[name]
+                path = tmp_dir / file_name
+                writer(value, path)
+                entries[name] = {'file': file_name, 'sha256': file_checksum(path), 'bytes': path.stat().st_size}
+            
+            checksum = hashlib.sha256(
+                json.dumps({name: entry['sha256'] for name, entry in sorted(entries.items())}).encode()
+            ).hexdigest()
+            version = f"{data.index[-1]:%Y%m%d}-{checksum[:8]}"
+            manifest = {
+                'version': version,
+                'checksum': checksum,
+                'created_at': datetime.now().isoformat(timespec='microseconds'),
+                'training_window': {
+                    'start': f"{data.index[0]:%Y-%m-%d}",
+                    'end': f"{data.index[-1]:%Y-%m-%d}",
+                    'samples': len(data)
+                },
+                'metrics': metrics or {},
+                'artifacts': entries
+            }
+            save_json(manifest, tmp_dir / MANIFEST_FILE)
+            
+            if (self.root / version).exists():
+                shutil.rmtree(tmp_dir)
+            else:
+                tmp_dir.rename(self.root / version)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        
+        if activate:
+            self.activate(version)
+        return version
+    
+    def activate(self, version: str):
+        """Point CURRENT at `version` (atomic rename)"""
+        self.verify(version)
+        tmp_path = self.root / f"{CURRENT_FILE}.tmp{os.getpid()}"
+        tmp_path.write_text(version + "\n")
+        tmp_path.replace(self.root / CURRENT_FILE)
+
+# Global instance
+model_registry = ModelRegistry(settings.MODEL_REGISTRY_DIR)
+
+# ==================== Publishing from legacy pickles ====================
+
+def _in_sample_metrics(prophet_model, sarima_results, data: pd.DataFrame, weights: Dict) -> Dict:
+    """MAE / RMSE / sMAPE of each model over the training window"""
+    actual = data['Sales'].to_numpy(dtype=float)
+    predictions = {
+        'prophet': prophet_model.predict(pd.DataFrame({'ds': data.index}))['yhat'].to_numpy(),
+        'sarima': np.asarray(sarima_results.fittedvalues, dtype=float),
+    }
+    predictions['ensemble'] = weights['prophet'] * predictions['prophet'] + weights['sarima'] * predictions['sarima']
+    metrics = {name: _error_metrics(predicted, actual) for name, predicted in predictions.items()}
+    metrics['sarima'].update(aic=round(float(sarima_results.aic), 4), bic=round(float(sarima_results.bic), 4))
+    return metrics
+
+def _error_metrics(predicted: np.ndarray, actual: np.ndarray) -> Dict:
+    """MAE / RMSE / sMAPE (percent) of predictions against actuals"""
+    error = predicted - actual
+    scale = np.abs(predicted) + np.abs(actual)
+    return {
+        'mae': round(float(np.mean(np.abs(error))), 4),
+        'rmse': round(float(np.sqrt(np.mean(error ** 2))), 4),
+        'smape': round(float(np.mean(2 * np.abs(error)[scale > 0] / scale[scale > 0]) * 100), 4),
+    }
+
+def _fit_sarima(data: pd.DataFrame, ensemble_config: Dict, start_params: np.ndarray = None):
+    """
+    Fit SARIMAX with the ensemble config orders
+    
+    `start_params` (e.g. the previous version's coefficients) warm-start
+    the optimizer; they are ignored if the orders changed.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = _sarima_model(data, ensemble_config)
+        if start_params is not None and len(start_params) != model.k_params:
+            start_params = None
+        return model.fit(start_params=start_params, disp=False, maxiter=200)
+
+def _sarima_model(data: pd.DataFrame, ensemble_config: Dict):
+    """Unfitted SARIMAX over `data` with the ensemble config orders"""
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return SARIMAX(
+            data['Sales'],
+            order=tuple(ensemble_config['sarima_order']),
+            seasonal_order=tuple(ensemble_config['sarima_seasonal_order']),
+            enforce_stationarity=False,
+            enforce_invertibility=False
+        )
+
+def publish_from_pickles(activate: bool = True) -> str:
+    """
+    Convert the legacy pickle artifacts in MODEL_DIR into a registry version
+    
+    SARIMA is refit from the order recorded in the ensemble config when its
+    pickle is not present.
+    """
+    def read_pickle(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    
+    data = pd.read_csv(settings.HISTORICAL_DATA_PATH, index_col=0, parse_dates=True)
+    ensemble_config = read_pickle(settings.ENSEMBLE_CONFIG_PATH)
+    prophet_model = read_pickle(settings.PROPHET_MODEL_PATH)
+    if settings.SARIMA_MODEL_PATH.exists():
+        sarima_results = read_pickle(settings.SARIMA_MODEL_PATH)
+    else:
+        print("⚠️ No SARIMA pickle, refitting from the ensemble config order")
+        sarima_results = _fit_sarima(data, ensemble_config)
+    
+    weights = {'prophet': ensemble_config['weight_prophet'], 'sarima': ensemble_config['weight_sarima']}
+    return model_registry.publish(
+        {
+            'historical_data': data,
+            'ensemble_config': ensemble_config,
+            'risk_config': read_pickle(settings.RISK_CONFIG_PATH),
+            'prophet_model': prophet_model,
+            'sarima_model': sarima_results,
+            'anomaly_detector': read_pickle(settings.ANOMALY_MODEL_PATH),
+        },
+        metrics=_in_sample_metrics(prophet_model, sarima_results, data, weights),
+        activate=activate
+    )
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="create a version from the legacy pickles")
+    publish.add_argument("--no-activate", action="store_true")
+    commands.add_parser("list", help="list published versions")
+    activate = commands.add_parser("activate", help="make a version current")
+    activate.add_argument("version")
+    verify = commands.add_parser("verify", help="check artifact checksums")
+    verify.add_argument("version", nargs="?")
+    args = parser.parse_args()
+    
+    if args.command == "publish":
+        version = publish_from_pickles(activate=not args.no_activate)
+        print(f"✅ Published model version {version}")
+    elif args.command == "list":
+        current = model_registry.current_version()
+        for version in model_registry.versions():
+            manifest = model_registry.manifest(version)
+            window = manifest['training_window']
+            size = sum(entry['bytes'] for entry in manifest['artifacts'].values())
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}  {window['start']}..{window['end']}  {size / 1024:.0f} KiB  created {manifest['created_at']}")
+    elif args.command == "activate":
+        model_registry.activate(args.version)
+        print(f"✅ Activated model version {args.version}")
+    elif args.command == "verify":
+        version = args.version or model_registry.current_version()
+        model_registry.verify(version)
+        print(f"✅ Model version {version} verified")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Retraining - Refit Prophet and SARIMA on new sales and publish a registry version
+
+A run:
+1. reads the sales series (settings.RETRAIN_DATA_PATH, same format as
+   historical_sales.csv) and the active version's models
+2. fits Prophet (initialized from the previous version's parameters) and
+   SARIMA (optimizer started from the previous coefficients) in parallel
+   processes, both on the full series and on the series minus the last
+   RETRAIN_HOLDOUT_DAYS
+3. scores the holdout fits, and the previous version's models on the same
+   holdout rows (its Prophet as is, its SARIMA coefficients run over the
+   candidate's training rows); a candidate whose ensemble sMAPE is more
+   than RETRAIN_MAX_DEGRADATION worse than the previous version's is
+   rejected
+4. publishes the full fits as a new registry version (written to a temp
+   directory and renamed, CURRENT switched atomically) and signals the
+   serving processes to reload
+
+Every run, published or not, is appended to RETRAIN_HISTORY_PATH with its
+wall time per stage.
+
+Usage:
+    python -m app.models.retrain run [--data PATH] [--holdout-days N] [--cold] [--force]
+    python -m app.models.retrain history [--limit N]
+"""
+import json
+import logging
+import multiprocessing
+import pickle
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.config import settings
+from app.models.registry import (
+    model_registry, load_json, load_pickle_gz, load_prophet,
+    _error_metrics, _fit_sarima, _in_sample_metrics, _sarima_model
+)
+from app.models.sarima_forecaster import SARIMAForecaster
+
+# Prophet constructor arguments carried over from the previous model
+PROPHET_OPTIONS = (
+    'growth', 'n_changepoints', 'changepoint_range', 'yearly_seasonality',
+    'weekly_seasonality', 'daily_seasonality', 'seasonality_mode',
+    'seasonality_prior_scale', 'changepoint_prior_scale', 'holidays_prior_scale',
+    'interval_width', 'uncertainty_samples',
+)
+
+class RetrainRejected(Exception):
+    """Raised when a candidate fails holdout validation"""
+    
+    def __init__(self, message: str, report: Dict):
+        super().__init__(message)
+        self.report = report
+
+# ==================== Inputs ====================
+
+def load_sales(path: Path) -> pd.DataFrame:
+    """Daily sales frame (DatetimeIndex, 'Sales' column), sorted and de-duplicated"""
+    data = pd.read_csv(path, index_col=0, parse_dates=True)
+    if 'Sales' not in data.columns:
+        raise ValueError(f"{path} has no 'Sales' column")
+    data = data[~data.index.duplicated(keep='last')].sort_index()
+    data = data[data['Sales'].notna()]
+    if len(data) < 2 * 7 * 4:
+        raise ValueError(f"{path} has too little history to retrain ({len(data)} rows)")
+    return data
+
+def previous_models() -> Dict:
+    """Models and configs of the active registry version (or the legacy pickles)"""
+    version = model_registry.current_version()
+    if version is not None:
+        manifest = model_registry.manifest(version)
+        with np.load(model_registry.artifact_path(version, 'sarima_model')) as sarima:
+            sarima_params = sarima['params']
+        return {
+            'version': version,
+            'metrics': manifest['metrics'],
+            'prophet_model': load_prophet(model_registry.artifact_path(version, 'prophet_model')),
+            'sarima_params': sarima_params,
+            'ensemble_config': load_json(model_registry.artifact_path(version, 'ensemble_config')),
+            'risk_config': load_json(model_registry.artifact_path(version, 'risk_config')),
+            'anomaly_detector': load_pickle_gz(model_registry.artifact_path(version, 'anomaly_detector')),
+        }
+    
+    def read_pickle(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    
+    sarima_params = None
+    if settings.SARIMA_MODEL_PATH.exists():
+        sarima_params = np.asarray(read_pickle(settings.SARIMA_MODEL_PATH).params, dtype=float)
+    return {
+        'version': None,
+        'metrics': {},
+        'prophet_model': read_pickle(settings.PROPHET_MODEL_PATH),
+        'sarima_params': sarima_params,
+        'ensemble_config': read_pickle(settings.ENSEMBLE_CONFIG_PATH),
+        'risk_config': read_pickle(settings.RISK_CONFIG_PATH),
+        'anomaly_detector': read_pickle(settings.ANOMALY_MODEL_PATH),
+    }
+
+def warm_start_params(model) -> Dict:
+    """Fitted Prophet parameters in the form Prophet.fit(init=...) expects"""
+    params = model.params
+    init = {name: float(np.mean(params[name])) for name in ('k', 'm', 'sigma_obs')}
+    for name in ('delta', 'beta'):
+        init[name] = np.mean(params[name], axis=0)
+    return init
+
+# ==================== Fitting ====================
+
+def _fit_prophet_task(data: pd.DataFrame, options: Dict, init: Optional[Dict]):
+    from prophet import Prophet
+    for name in ('prophet', 'cmdstanpy'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    start = time.perf_counter()
+    model = Prophet(**options)
+    frame = pd.DataFrame({'ds': data.index, 'y': data['Sales'].to_numpy(dtype=float)})
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        # Prophet falls back to its default init if the shapes no longer match
+        if init is not None:
+            model.fit(frame, init=init)
+        else:
+            model.fit(frame)
+    return model, {'seconds': round(time.perf_counter() - start, 3), 'warm_start': init is not None}
+
+def _fit_sarima_task(data: pd.DataFrame, ensemble_config: Dict, start_params: Optional[np.ndarray]):
+    start = time.perf_counter()
+    results = _fit_sarima(data, ensemble_config, start_params)
+    warm = start_params is not None and len(start_params) == len(results.params)
+    return results, {'seconds': round(time.perf_counter() - start, 3), 'warm_start': warm}
+
+def _run_fits(tasks: Dict[str, tuple], workers: int) -> Dict[str, tuple]:
+    """Run {name: (fn, *args)} in a forked process pool (inline with workers <= 1)"""
+    if workers <= 1:
+        return {name: fn(*args) for name, (fn, *args) in tasks.items()}
+    
+    # Import the model libraries before forking: a child forked while
+    # another thread holds an import lock deadlocks (see inference_executor)
+    from app.models.ml_models import model_loader
+    model_loader.wait_for_warm_up()
+    import prophet, statsmodels.tsa.statespace.sarimax  # noqa: F401
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as executor:
+        futures = {name: executor.submit(fn, *args) for name, (fn, *args) in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+def holdout_metrics(prophet_model, sarima_results, holdout: pd.DataFrame, weights: Dict) -> Dict:
+    """Error metrics of models fitted up to the holdout, over the holdout rows"""
+    actual = holdout['Sales'].to_numpy(dtype=float)
+    predictions = {
+        'prophet': prophet_model.predict(pd.DataFrame({'ds': holdout.index}))['yhat'].to_numpy(),
+        # Steps are rows: the series may skip days, as SARIMA was fitted on it
+        'sarima': SARIMAForecaster.from_results(sarima_results).forecast(len(holdout))[0],
+    }
+    predictions['ensemble'] = weights['prophet'] * predictions['prophet'] + weights['sarima'] * predictions['sarima']
+    metrics = {name: _error_metrics(predicted, actual) for name, predicted in predictions.items()}
+    metrics.update(
+        start=f"{holdout.index[0]:%Y-%m-%d}",
+        end=f"{holdout.index[-1]:%Y-%m-%d}",
+        samples=len(holdout)
+    )
+    return metrics
+
+def previous_holdout_metrics(previous: Dict, train: pd.DataFrame, holdout: pd.DataFrame, weights: Dict) -> Optional[Dict]:
+    """
+    holdout_metrics of the previous version's models over the same rows
+    
+    SARIMA keeps its coefficients and is filtered over `train` (not refit),
+    so it forecasts the holdout from the same state as the candidate.
+    Prophet cannot be conditioned on new rows and predicts as published:
+    if it was trained past the holdout start ('prophet_trained_through') it
+    has seen those rows, which makes the gate stricter, not looser.
+    None if the previous version has no usable SARIMA coefficients.
+    """
+    params = previous['sarima_params']
+    model = _sarima_model(train, previous['ensemble_config'])
+    if params is None or len(params) != model.k_params:
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sarima_results = model.filter(params)
+    metrics = holdout_metrics(previous['prophet_model'], sarima_results, holdout, weights)
+    metrics['prophet_trained_through'] = f"{previous['prophet_model'].history['ds'].max():%Y-%m-%d}"
+    return metrics
+
+# ==================== Retrain ====================
+
+def retrain(data_path: Path = None, holdout_days: int = None, warm_start: bool = True,
+            force: bool = False, activate: bool = True, workers: int = None, notify: bool = True) -> Dict:
+    """
+    Refit on the sales at `data_path`, validate and publish a new version
+    
+    Args:
+        data_path: Sales CSV (defaults to settings.RETRAIN_DATA_PATH)
+        holdout_days: Trailing days held out for validation (0 skips it)
+        warm_start: Initialize the fits from the previous version's models
+        force: Publish even if the holdout check fails
+        activate: Make the new version current
+        workers: Fit processes (<= 1 fits in this process)
+        notify: Signal serving processes to reload once published
+    
+    Returns:
+        Run report (also appended to settings.RETRAIN_HISTORY_PATH)
+    
+    Raises:
+        RetrainRejected: the candidate failed holdout validation
+    """
+    data_path = Path(data_path or settings.RETRAIN_DATA_PATH)
+    holdout_days = settings.RETRAIN_HOLDOUT_DAYS if holdout_days is None else holdout_days
+    workers = settings.RETRAIN_WORKERS if workers is None else workers
+    started = time.perf_counter()
+    report = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'data': str(data_path),
+        'status': 'failed',
+        'stages': {},
+    }
+    
+    def stage(name, since):
+        report['stages'][name] = round(time.perf_counter() - since, 3)
+        return time.perf_counter()
+    
+    try:
+        mark = time.perf_counter()
+        data = load_sales(data_path)
+        previous = previous_models()
+        ensemble_config = previous['ensemble_config']
+        weights = {'prophet': ensemble_config['weight_prophet'], 'sarima': ensemble_config['weight_sarima']}
+        options = {name: getattr(previous['prophet_model'], name) for name in PROPHET_OPTIONS}
+        prophet_init = warm_start_params(previous['prophet_model']) if warm_start else None
+        sarima_init = previous['sarima_params'] if warm_start else None
+        report.update(
+            previous_version=previous['version'],
+            training_window={'start': f"{data.index[0]:%Y-%m-%d}", 'end': f"{data.index[-1]:%Y-%m-%d}", 'samples': len(data)}
+        )
+        mark = stage('load', mark)
+        
+        tasks = {
+            'prophet': (_fit_prophet_task, data, options, prophet_init),
+            'sarima': (_fit_sarima_task, data, ensemble_config, sarima_init),
+        }
+        holdout = data[data.index > data.index[-1] - pd.Timedelta(days=holdout_days)] if holdout_days > 0 else data.iloc[:0]
+        if len(holdout):
+            train = data.iloc[:len(data) - len(holdout)]
+            tasks['prophet_holdout'] = (_fit_prophet_task, train, options, prophet_init)
+            tasks['sarima_holdout'] = (_fit_sarima_task, train, ensemble_config, sarima_init)
+        fits = _run_fits(tasks, workers)
+        report['fits'] = {name: info for name, (_, info) in fits.items()}
+        mark = stage('fit', mark)
+        
+        if len(holdout):
+            report['holdout'] = holdout_metrics(fits['prophet_holdout'][0], fits['sarima_holdout'][0], holdout, weights)
+            smape = report['holdout']['ensemble']['smape']
+            report['holdout_previous'] = previous_holdout_metrics(previous, train, holdout, weights)
+            previous_smape = None
+            if report['holdout_previous'] is not None:
+                previous_smape = report['holdout_previous']['ensemble']['smape']
+            else:
+                print("⚠️ Previous version has no usable SARIMA coefficients, not comparing holdout sMAPE")
+            if not np.isfinite(smape):
+                reason = "holdout sMAPE is not finite"
+            elif previous_smape is not None and smape > previous_smape * (1 + settings.RETRAIN_MAX_DEGRADATION):
+                reason = (f"holdout sMAPE {smape:.2f} is more than {settings.RETRAIN_MAX_DEGRADATION:.0%} "
+                          f"worse than version {previous['version']} on the same rows ({previous_smape:.2f})")
+            else:
+                reason = None
+            if reason is not None and not force:
+                report['status'] = 'rejected'
+                report['reason'] = reason
+                stage('validate', mark)
+                raise RetrainRejected(reason, report)
+        mark = stage('validate', mark)
+        
+        prophet_model, sarima_results = fits['prophet'][0], fits['sarima'][0]
+        ensemble_config = {
+            **ensemble_config,
+            'last_training_date': f"{data.index[-1]:%Y-%m-%d}",
+            'trained_on': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        metrics = _in_sample_metrics(prophet_model, sarima_results, data, weights)
+        if 'holdout' in report:
+            metrics['holdout'] = report['holdout']
+        metrics['retrain'] = {'parent_version': previous['version'], 'fits': report['fits']}
+        version = model_registry.publish(
+            {
+                'historical_data': data,
+                'ensemble_config': ensemble_config,
+                'risk_config': previous['risk_config'],
+                'prophet_model': prophet_model,
+                'sarima_model': sarima_results,
+                # Not retrained here: it scores the same features as before
+                'anomaly_detector': previous['anomaly_detector'],
+            },
+            metrics=metrics,
+            activate=activate
+        )
+        report.update(status='published', version=version, activated=activate)
+        mark = stage('publish', mark)
+        
+        if activate and notify:
+            from app.models.ml_models import signal_reload
+            report['signalled'] = signal_reload()
+        return report
+    except RetrainRejected:
+        raise
+    except Exception as e:
+        report['error'] = str(e)
+        raise
+    finally:
+        report['wall_seconds'] = round(time.perf_counter() - started, 3)
+        report['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        try:
+            record_history(report)
+        except OSError as e:
+            print(f"⚠️ Could not record retrain history: {e}")
+
+# ==================== History ====================
+
+def record_history(report: Dict):
+    path = settings.RETRAIN_HISTORY_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(report, default=str) + "\n")
+
+def read_history(limit: int = None) -> List[Dict]:
+    """Past runs, oldest first (the last `limit` if given)"""
+    try:
+        with open(settings.RETRAIN_HISTORY_PATH) as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+    return runs[-limit:] if limit else runs
+
+def main():
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="refit, validate and publish a new version")
+    run.add_argument("--data", type=Path, help="sales CSV (default: RETRAIN_DATA_PATH)")
+    run.add_argument("--holdout-days", type=int)
+    run.add_argument("--workers", type=int)
+    run.add_argument("--cold", action="store_true", help="do not warm-start from the previous version")
+    run.add_argument("--force", action="store_true", help="publish even if holdout validation fails")
+    run.add_argument("--no-activate", action="store_true")
+    run.add_argument("--no-signal", action="store_true", help="do not signal serving processes")
+    history = commands.add_parser("history", help="list past runs and their wall time")
+    history.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    
+    if args.command == "run":
+        try:
+            report = retrain(
+                data_path=args.data,
+                holdout_days=args.holdout_days,
+                warm_start=not args.cold,
+                force=args.force,
+                activate=not args.no_activate,
+                workers=args.workers,
+                notify=not args.no_signal
+            )
+        except RetrainRejected as e:
+            print(f"❌ Retrain rejected: {e}")
+            sys.exit(2)
+        holdout = report.get('holdout', {}).get('ensemble', {})
+        previous = (report.get('holdout_previous') or {}).get('ensemble', {})
+        print(f"✅ Published model version {report['version']} in {report['wall_seconds']:.1f}s "
+              f"(stages: {', '.join(f'{k} {v:.1f}s' for k, v in report['stages'].items())})")
+        if holdout:
+            print(f"   holdout sMAPE {holdout['smape']:.2f}, MAE {holdout['mae']:.1f}"
+                  + (f" (previous version {previous['smape']:.2f})" if previous else ""))
+        if 'signalled' in report:
+            print(f"   signalled {report['signalled']} serving process(es)")
+    elif args.command == "history":
+        for run in read_history(args.limit):
+            smape = run.get('holdout', {}).get('ensemble', {}).get('smape')
+            print(f"{run['started_at']}  {run['status']:<9}  {run['wall_seconds']:>7.1f}s  "
+                  f"{run.get('version') or '-':<18}  sMAPE {'-' if smape is None else f'{smape:.2f}'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+SARIMA Forecaster - Compact state-space form of a fitted SARIMAX model
+
+Keeps only the time-invariant system matrices, the final predicted state
+and the in-sample one-step predictions. Forecasts unroll the Kalman
+prediction recursion
+
+    y(h)   = d + Z a(h)            Var y(h)   = Z P(h) Z' + H
+    a(h+1) = c + T a(h)            P(h+1)     = T P(h) T' + R Q R'
+
+from a(1), P(1) (the filter's prediction for the first out-of-sample
+step). With G(j) = Z T^j this is
+
+    y(h)      = d + G(h-1) a(1) + sum_{j<h-1} G(j) c
+    Var y(h)  = H + G(h-1) P(1) G(h-1)' + sum_{j<h-1} (G(j) R) Q (G(j) R)'
+
+so all horizons come from one stack of G rows, built by repeated squaring
+of T. No statsmodels import is needed to load or query it.
+"""
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+# Array fields persisted by to_arrays()/from_arrays()
+FIELDS = (
+    'design', 'obs_intercept', 'obs_cov',
+    'transition', 'state_intercept', 'selection', 'state_cov',
+    'state', 'state_cov_final', 'fitted',
+)
+
+class SARIMAForecaster:
+    """
+    Mean forecasts and normal confidence intervals for any horizon.
+    
+    Results are computed once up to the longest horizon requested so far;
+    later calls up to that horizon are array slices.
+    """
+    
+    def __init__(self, design: np.ndarray, obs_intercept: float, obs_cov: float,
+                 transition: np.ndarray, state_intercept: np.ndarray, selection: np.ndarray,
+                 state_cov: np.ndarray, state: np.ndarray, state_cov_final: np.ndarray,
+                 fitted: np.ndarray, index: Optional[pd.DatetimeIndex] = None):
+        self.design = np.asarray(design, dtype=float).ravel()
+        self.obs_intercept = float(obs_intercept)
+        self.obs_cov = float(obs_cov)
+        self.transition = np.asarray(transition, dtype=float)
+        self.state_intercept = np.asarray(state_intercept, dtype=float).ravel()
+        self.selection = np.asarray(selection, dtype=float)
+        self.state_cov = np.asarray(state_cov, dtype=float)
+        self.state = np.asarray(state, dtype=float).ravel()
+        self.state_cov_final = np.asarray(state_cov_final, dtype=float)
+        self.fitted = np.asarray(fitted, dtype=float)
+        self.index = index
+        self._mean = np.empty(0)
+        self._var = np.empty(0)
+    
+    @property
+    def k_states(self) -> int:
+        return len(self.state)
+    
+    @property
+    def nobs(self) -> int:
+        return len(self.fitted)
+    
+    @property
+    def fittedvalues(self) -> pd.Series:
+        """In-sample one-step-ahead predictions (same as SARIMAXResults.fittedvalues)"""
+        return pd.Series(self.fitted, index=self.index)
+    
+    # ==================== Construction ====================
+    
+    @classmethod
+    def from_results(cls, results) -> 'SARIMAForecaster':
+        """Extract the compact form from fitted statsmodels MLE results"""
+        ssm = results.filter_results
+        if ssm.k_endog != 1:
+            raise ValueError("Only univariate models are supported")
+        for name in ('design', 'obs_cov', 'transition', 'selection', 'state_cov'):
+            if getattr(ssm, name).shape[-1] != 1:
+                raise ValueError(f"Time-varying {name} matrix is not supported")
+        
+        fitted = results.fittedvalues
+        index = fitted.index if isinstance(getattr(fitted, 'index', None), pd.DatetimeIndex) else None
+        return cls(
+            design=ssm.design[0, :, 0],
+            obs_intercept=ssm.obs_intercept[0, 0],
+            obs_cov=ssm.obs_cov[0, 0, 0],
+            transition=ssm.transition[:, :, 0],
+            state_intercept=ssm.state_intercept[:, 0],
+            selection=ssm.selection[:, :, 0],
+            state_cov=ssm.state_cov[:, :, 0],
+            state=results.predicted_state[:, -1],
+            state_cov_final=results.predicted_state_cov[:, :, -1],
+            fitted=np.asarray(fitted, dtype=float),
+            index=index
+        )
+    
+    def to_arrays(self) -> dict:
+        """Arrays for persistence (see from_arrays())"""
+        arrays = {name: getattr(self, name) for name in FIELDS}
+        arrays['obs_intercept'] = np.array(self.obs_intercept)
+        arrays['obs_cov'] = np.array(self.obs_cov)
+        arrays['index'] = self.index.to_numpy() if self.index is not None else np.array([], dtype='datetime64[ns]')
+        return arrays
+    
+    @classmethod
+    def from_arrays(cls, arrays, index_name: str = None) -> 'SARIMAForecaster':
+        index = pd.DatetimeIndex(arrays['index'], name=index_name) if len(arrays['index']) else None
+        return cls(**{name: arrays[name] for name in FIELDS}, index=index)
+    
+    # ==================== Forecasting ====================
+    
+    def _design_powers(self, steps: int) -> np.ndarray:
+        """Rows Z T^j for j = 0..steps-1, doubling the block each pass"""
+        G = self.design[None, :]
+        power = self.transition
+        while len(G) < steps:
+            G = np.vstack([G, G @ power])
+            power = power @ power
+        return G[:steps]
+    
+    def _extend(self, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+        mean, var = self._mean, self._var
+        if len(mean) >= steps:
+            return mean, var
+        
+        # Grow geometrically so a slowly increasing horizon stays cheap
+        steps = max(steps, 2 * len(mean))
+        G = self._design_powers(steps)
+        
+        psi = G @ self.selection
+        shock_var = np.einsum('ij,jk,ik->i', psi, self.state_cov, psi)
+        mean = self.obs_intercept + G @ self.state + _exclusive_cumsum(G @ self.state_intercept)
+        var = (
+            self.obs_cov
+            + np.einsum('ij,jk,ik->i', G, self.state_cov_final, G)
+            + _exclusive_cumsum(shock_var)
+        )
+        # Computed arrays are only ever replaced whole, so readers need no lock
+        self._mean, self._var = mean, var
+        return mean, var
+    
+    def forecast(self, steps: int, alpha: float = 0.05) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Mean, lower and upper bounds for steps 1..`steps` after the sample
+        
+        Bounds are the (1 - alpha) normal interval, matching
+        `get_forecast(steps).conf_int(alpha)`.
+        """
+        if steps <= 0:
+            empty = np.empty(0)
+            return empty, empty, empty
+        mean, var = self._extend(steps)
+        mean = mean[:steps]
+        half_width = NormalDist().inv_cdf(1 - alpha / 2) * np.sqrt(var[:steps])
+        return mean, mean - half_width, mean + half_width
+
+    def forecast_from_states(self, states: np.ndarray, steps: int) -> np.ndarray:
+        """
+        Mean forecasts for steps 1..`steps` from many predicted states at once
+        
+        `states` is k_states x n, e.g. columns of a filter's predicted_state
+        (column t is the prediction for observation t given the ones
+        before it), so column t gives the forecasts a model with these
+        parameters would have made after observing t values. Returns n x
+        `steps`; every origin costs one product with the same G rows.
+        """
+        states = np.asarray(states, dtype=float).reshape(self.k_states, -1)
+        if steps <= 0:
+            return np.empty((states.shape[1], 0))
+        G = self._design_powers(steps)
+        drift = self.obs_intercept + _exclusive_cumsum(G @ self.state_intercept)
+        return states.T @ G.T + drift
+
+    def forecast_intervals_from_states(self, states: np.ndarray, state_covs: np.ndarray, steps: int,
+                                       alpha: float = 0.05) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Mean, lower and upper bounds (each n x `steps`) from many predicted
+        states and their covariances (k_states x k_states x n, e.g. columns
+        of predicted_state_cov)
+        """
+        states = np.asarray(states, dtype=float).reshape(self.k_states, -1)
+        state_covs = np.asarray(state_covs, dtype=float).reshape(self.k_states, self.k_states, -1)
+        mean = self.forecast_from_states(states, steps)
+        if steps <= 0:
+            return mean, mean, mean
+        G = self._design_powers(steps)
+        psi = G @ self.selection
+        shock_var = _exclusive_cumsum(np.einsum('ij,jk,ik->i', psi, self.state_cov, psi))
+        # G(h) P G(h)' per origin: (P G') is k x steps per origin
+        state_var = np.einsum('hj,jkn,hk->nh', G, state_covs, G, optimize=True)
+        var = self.obs_cov + state_var + shock_var
+        half_width = NormalDist().inv_cdf(1 - alpha / 2) * np.sqrt(var)
+        return mean, mean - half_width, mean + half_width
+
+def _exclusive_cumsum(values: np.ndarray) -> np.ndarray:
+    """out[i] = sum(values[:i])"""
+    out = np.zeros_like(values)
+    np.cumsum(values[:-1], out=out[1:])
+    return out
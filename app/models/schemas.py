@@ -44,6 +44,31 @@ class ReportRequest(BaseModel):
     send_email: bool = False
     recipient_email: Optional[str] = None
 
+class WeeklyEmailRequest(BaseModel):
+    """Weekly report delivery request"""
+    recipients: List[str]
+
+class ModelReloadRequest(BaseModel):
+    """Model hot-swap request (defaults to the registry's current version)"""
+    version: Optional[str] = None
+
+class RetrainRequest(BaseModel):
+    """Retrain job options (defaults from the RETRAIN_* settings)"""
+    holdout_days: Optional[int] = None
+    warm_start: bool = True
+    force: bool = False
+
+class BacktestRequest(BaseModel):
+    """Backtest options (defaults from the BACKTEST_* settings)"""
+    horizon: Optional[int] = None
+    min_train: Optional[int] = None
+    step: Optional[int] = None
+    refresh: bool = False
+
+class SeriesRefitRequest(BaseModel):
+    """Multi-series refit request (defaults to MULTI_SERIES_RECONCILIATION)"""
+    method: Optional[str] = None
+
 # ==================== Response Models ====================
 
 class PredictionResponse(BaseModel):
@@ -65,6 +90,22 @@ class RiskResponse(BaseModel):
     deviation_from_mean: float
     risk_factors: List[str]
 
+class AnomalyPoint(BaseModel):
+    """Anomaly score for one date"""
+    date: str
+    type: str  # 'historical' or 'future'
+    sales: float  # actual sales, or the ensemble forecast for future dates
+    anomaly_score: float
+    is_anomaly: bool
+
+class AnomalyResponse(BaseModel):
+    """Anomaly scores for a date range"""
+    start: str
+    end: str
+    total_days: int
+    anomaly_count: int
+    results: List[AnomalyPoint]
+
 class ReportResponse(BaseModel):
     """Full report response"""
     date: str
@@ -84,4 +125,9 @@ class ModelInfoResponse(BaseModel):
     last_training_date: str
     model_version: str
     weights: dict
-    total_training_samples: int
\ No newline at end of file
+    total_training_samples: int
+    checksum: Optional[str] = None
+    created_at: Optional[str] = None
+    training_window: Optional[dict] = None
+    metrics: Optional[dict] = None
+    artifacts: Optional[dict] = None
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+Anomaly Detection Service - IsolationForest scores for whole date ranges
+"""
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+from app.config import settings
+from app.models.ml_models import model_loader
+
+# Rolling window of the training notebook's risk features
+WINDOW = 30
+
+def risk_features(sales: np.ndarray, window: int = WINDOW) -> pd.DataFrame:
+    """
+    Risk features of the training notebook (calculate_risk_features), vectorized
+    
+    The per-window linregress slope is computed in closed form from
+    cumulative sums: for x = 0..w-1, slope = (sum x*y - mean(x) * sum y) / Sxx.
+    """
+    sales = np.asarray(sales, dtype=float)
+    series = pd.Series(sales)
+    roll = series.rolling(window=window)
+    rolling_mean = roll.mean()
+    volatility = roll.std()
+    
+    n = len(sales)
+    positions = np.arange(n, dtype=float)
+    csum = np.concatenate([[0.0], np.cumsum(sales)])
+    cxsum = np.concatenate([[0.0], np.cumsum(positions * sales)])
+    trend = np.full(n, np.nan)
+    if n >= window:
+        end = np.arange(window, n + 1)
+        window_sum = csum[end] - csum[end - window]
+        window_xsum = cxsum[end] - cxsum[end - window] - (end - window) * window_sum
+        sxx = window * (window ** 2 - 1) / 12
+        trend[window - 1:] = (window_xsum - (window - 1) / 2 * window_sum) / sxx
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = pd.DataFrame({
+            'Sales': sales,
+            'volatility_30d': volatility,
+            'volatility_7d': series.rolling(window=7).std(),
+            'cv_30d': volatility / rolling_mean,
+            'trend_30d': trend,
+            'momentum_7d': series / series.shift(7) - 1,
+            'momentum_30d': series / series.shift(30) - 1,
+            'zscore': (series - rolling_mean) / volatility,
+        })
+    return features.replace([np.inf, -np.inf], np.nan).bfill().fillna(0)
+
+def window_features(windows: np.ndarray, window: int = WINDOW) -> pd.DataFrame:
+    """
+    risk_features() of the last day only, for many independent series
+    
+    Each row of `windows` is the `window` days before a date followed by
+    that date's sales; rows are scored without building full series.
+    """
+    windows = np.asarray(windows, dtype=float)
+    sales = windows[:, -1]
+    last = windows[:, -window:]
+    rolling_mean = last.mean(axis=1)
+    volatility = last.std(axis=1, ddof=1)
+    x = np.arange(window) - (window - 1) / 2
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = pd.DataFrame({
+            'Sales': sales,
+            'volatility_30d': volatility,
+            'volatility_7d': windows[:, -7:].std(axis=1, ddof=1),
+            'cv_30d': volatility / rolling_mean,
+            'trend_30d': last @ x / (x @ x),
+            'momentum_7d': sales / windows[:, -8] - 1,
+            'momentum_30d': sales / windows[:, -31] - 1 if windows.shape[1] > 30 else np.nan,
+            'zscore': (sales - rolling_mean) / volatility,
+        })
+    return features.replace([np.inf, -np.inf], np.nan).fillna(0)
+
+class AnomalyService:
+    """
+    Anomaly flags from the trained IsolationForest
+    
+    The detector's features are computed for the full history plus the
+    forecast horizon (scored on the ensemble forecast) in one pass and
+    cached per date until the models change.
+    """
+    
+    def __init__(self):
+        self._scores = None
+        self._scores_version = None
+        self._lock = threading.Lock()
+    
+    def __reduce__(self):
+        # Pickle by reference so bound methods can be sent to worker processes
+        return (_get_anomaly_service, ())
+    
+    @property
+    def detector(self):
+        return model_loader.get_anomaly_detector()
+    
+    @property
+    def feature_names(self) -> list:
+        """Columns the detector was fitted on"""
+        names = getattr(self.detector, 'feature_names_in_', None)
+        if names is None:
+            names = model_loader.risk_config['feature_list']
+        return list(names)
+    
+    def score_series(self, sales: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score a daily sales series in one pass
+        
+        Returns:
+            dict with 'anomaly_score' (IsolationForest score_samples, lower
+            is more anomalous) and 'is_anomaly' (score below the detector's
+            offset, i.e. predict() == -1)
+        """
+        detector = self.detector
+        features = risk_features(sales)[self.feature_names]
+        scores = detector.score_samples(features)
+        return {'anomaly_score': scores, 'is_anomaly': scores < detector.offset_}
+    
+    @property
+    def scores(self) -> pd.DataFrame:
+        """Per-date sales, anomaly_score and is_anomaly, built once per model version"""
+        model_version = model_loader.model_version
+        scores = self._scores
+        if scores is not None and self._scores_version == model_version:
+            return scores
+        
+        with self._lock:
+            if self._scores is not None and self._scores_version == model_version:
+                return self._scores
+            
+            from app.services.forecast_service import forecast_service
+            history = model_loader.get_historical_data()['Sales']
+            last_date = history.index[-1]
+            future_dates = pd.date_range(
+                last_date + pd.Timedelta(days=1),
+                periods=settings.FORECAST_HORIZON_DAYS,
+                freq='D'
+            )
+            future = forecast_service._predict_dates(future_dates)
+            sales = np.concatenate([
+                history.to_numpy(dtype=float),
+                [p['ensemble_prediction'] for p in future]
+            ])
+            
+            scores = pd.DataFrame(
+                {'sales': sales, **self.score_series(sales)},
+                index=history.index.append(future_dates)
+            )
+            scores['type'] = np.where(scores.index <= last_date, 'historical', 'future')
+            self._scores, self._scores_version = scores, model_version
+            return scores
+    
+    def get_anomalies(self, start_date: str = None, end_date: str = None) -> dict:
+        """
+        Anomaly scores for every scored date in [start_date, end_date]
+        
+        Defaults to the last 90 days of history.
+        """
+        scores = self.scores
+        last_date = scores.index[scores['type'] == 'historical'][-1]
+        end = pd.to_datetime(end_date) if end_date else last_date
+        start = pd.to_datetime(start_date) if start_date else end - pd.Timedelta(days=89)
+        if start > end:
+            raise ValueError("start must not be after end")
+        
+        window = scores.loc[start:end]
+        results = [
+            {
+                'date': date.strftime('%Y-%m-%d'),
+                'type': kind,
+                'sales': float(sales),
+                'anomaly_score': float(score),
+                'is_anomaly': bool(flag)
+            }
+            for date, kind, sales, score, flag in zip(
+                window.index, window['type'], window['sales'], window['anomaly_score'], window['is_anomaly']
+            )
+        ]
+        return {
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
+            'total_days': len(results),
+            'anomaly_count': int(window['is_anomaly'].sum()),
+            'results': results
+        }
+    
+    def is_anomaly(self, date: str, value: Optional[float] = None) -> bool:
+        """
+        Anomaly flag for a date
+        
+        Historical dates use the observed sales. For a future date with a
+        `value` (e.g. a client's forecast), that value is scored in place of
+        the ensemble forecast, with the preceding days as context; so is a
+        date the history skips.
+        
+        Raises ValueError for a date outside the scored range (the history
+        plus FORECAST_HORIZON_DAYS), which has no context to score against.
+        """
+        return bool(self.is_anomaly_batch([date], None if value is None else [value])[0])
+    
+    def is_anomaly_batch(self, dates, values=None) -> np.ndarray:
+        """is_anomaly() for many dates (and optional values) in one detector call"""
+        scores = self.scores
+        dates = pd.DatetimeIndex(pd.to_datetime(dates))
+        flags = np.zeros(len(dates), dtype=bool)
+        
+        outside = (dates < scores.index[0]) | (dates > scores.index[-1])
+        if outside.any():
+            raise ValueError(
+                f"{dates[outside][0]:%Y-%m-%d} is outside the scored range "
+                f"{scores.index[0]:%Y-%m-%d} to {scores.index[-1]:%Y-%m-%d}"
+            )
+        
+        positions = scores.index.get_indexer(dates)
+        known = positions >= 0
+        flags[known] = scores['is_anomaly'].to_numpy()[positions[known]]
+        if values is None:
+            return flags
+        
+        last_date = scores.index[scores['type'] == 'historical'][-1]
+        rescore = np.flatnonzero((dates > last_date) | ~known)
+        if len(rescore):
+            # The WINDOW days before each date (NaN-padded at the start), then the value
+            padded = np.concatenate([np.full(WINDOW, np.nan), scores['sales'].to_numpy()])
+            ends = scores.index.searchsorted(dates[rescore])
+            windows = np.column_stack([
+                padded[ends[:, None] + np.arange(WINDOW)],
+                np.asarray(values, dtype=float)[rescore]
+            ])
+            detector = self.detector
+            flags[rescore] = detector.score_samples(window_features(windows)[self.feature_names]) < detector.offset_
+        return flags
+
+def _get_anomaly_service():
+    return anomaly_service
+
+anomaly_service = AnomalyService()
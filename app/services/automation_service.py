@@ -1,11 +1,79 @@
 """
 Automation Service - Orchestrates the Sales Intelligence Agent Pipeline
 """
+import asyncio
+import time
+from app.config import settings
 from app.services.salesforce_service import salesforce_service
 from app.services.deal_risk_service import deal_risk_service
 from app.services.llm_service import llm_service
 from app.services.slack_service import slack_service
-from typing import Dict, List
+from app.services.inference_executor import inference_executor
+from typing import AsyncIterator, Dict, List
+
+# End-of-stream marker passed between stages
+_DONE = object()
+
+class StageMetrics:
+    """Item count, busy time and wall time for one pipeline stage"""
+    
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.items = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+    
+    def begin(self) -> float:
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = now
+        return now
+    
+    def end(self, began: float, items: int):
+        now = time.perf_counter()
+        self.busy += now - began
+        self.items += items
+        self.finished = now
+    
+    def to_dict(self) -> Dict:
+        wall = (self.finished - self.started) if self.started is not None else 0.0
+        return {
+            "items": self.items,
+            "concurrency": self.concurrency,
+            "wall_seconds": round(wall, 3),
+            "busy_seconds": round(self.busy, 3),
+            "throughput_per_sec": round(self.items / wall, 1) if wall > 0 else None
+        }
+
+async def _batches(queue: asyncio.Queue, size: int) -> AsyncIterator[List]:
+    """Yield whatever is queued (up to `size` items) until _DONE arrives"""
+    done = False
+    while not done:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        batch = [item]
+        while len(batch) < size:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is _DONE:
+                done = True
+                break
+            batch.append(item)
+        yield batch
+
+def _drain(queue: asyncio.Queue) -> List:
+    """Remove and return every queued item except _DONE markers"""
+    items = []
+    while not queue.empty():
+        item = queue.get_nowait()
+        if item is not _DONE:
+            items.append(item)
+    return items
 
 class AutomationService:
     """
@@ -14,17 +82,20 @@ class AutomationService:
     
     async def run_daily_pipeline(self) -> Dict:
         """
-        Executes the full agent pipeline:
-        1. Sync Opportunities
-        2. Score Risk
-        3. Generate Insights
-        4. Update SF Fields
-        5. Create Tasks (if needed)
-        6. Send Notifications
+        Executes the full agent pipeline as concurrent stages joined by
+        bounded queues:
+        1. Sync Opportunities (page by page)
+        2. Score Risk (one batched model call per page)
+        3. Generate Insights (bounded-parallel LLM calls)
+        4. Update SF Fields / Create Tasks (batched writes)
+        5. Send Notifications (batched, bounded-parallel)
+        
+        Stages overlap, so wall time tracks the slowest stage rather than
+        the sum of every call.
         """
         print("🚀 Starting Daily Sales Intelligence Pipeline...")
+        pipeline_start = time.perf_counter()
         
-        opportunities = salesforce_service.get_open_opportunities()
         results = {
             "processed": 0,
             "tasks_created": 0,
@@ -32,46 +103,171 @@ class AutomationService:
             "errors": 0
         }
         
-        for opp in opportunities:
+        queue_size = settings.PIPELINE_QUEUE_SIZE
+        insight_workers = settings.PIPELINE_INSIGHT_CONCURRENCY
+        write_batch = settings.PIPELINE_WRITE_BATCH_SIZE
+        
+        stages = {
+            "fetch": StageMetrics("fetch", 1),
+            "score": StageMetrics("score", 1),
+            "insights": StageMetrics("insights", insight_workers),
+            "sf_updates": StageMetrics("sf_updates", settings.SF_BATCH_CONCURRENCY),
+            "sf_tasks": StageMetrics("sf_tasks", settings.SF_BATCH_CONCURRENCY),
+            "notifications": StageMetrics("notifications", settings.PIPELINE_NOTIFY_CONCURRENCY)
+        }
+        
+        page_queue = asyncio.Queue(maxsize=4)
+        update_queue = asyncio.Queue(maxsize=queue_size)
+        insight_queue = asyncio.Queue(maxsize=queue_size)
+        task_queue = asyncio.Queue(maxsize=queue_size)
+        alert_queue = asyncio.Queue(maxsize=queue_size)
+        
+        async def fetch():
+            # 1. Sync Opportunities
             try:
-                # 1. Score Risk
-                risk_data = deal_risk_service.predict_risk(opp)
-                
-                # 2. Update Salesforce Fields (Feature 6)
-                sf_update = {
-                    "AI_Risk_Score__c": risk_data['risk_score'],
-                    "Risk_Category__c": risk_data['risk_category']
-                }
-                salesforce_service.update_opportunity(opp['Id'], sf_update)
-                
-                # 3. Decision Logic for Heavy Actions (Feature 4)
-                if risk_data['risk_category'] == "HIGH" or risk_data['win_probability'] < 0.5:
-                    
-                    # Generate Insights (Feature 3)
-                    insights = llm_service.generate_deal_insights(opp, risk_data)
-                    
-                    # Create Task (Feature 4)
-                    task_data = {
-                        "Subject": f"High Risk Follow-up: {opp['Name']}",
-                        "Description": insights,
-                        "WhatId": opp['Id'],
-                        "Priority": "High",
-                        "Status": "Not Started"
-                    }
-                    salesforce_service.create_task(task_data)
-                    results["tasks_created"] += 1
-                    
-                    # Send Slack Alert (Feature 5)
-                    insights_link = f"https://force.com/{opp['Id']}" # In real app, links to dashboard
-                    slack_service.send_deal_alert(opp, risk_data, insights_link)
-                    results["alerts_sent"] += 1
-                
-                results["processed"] += 1
-                
+                pages = salesforce_service.iter_open_opportunity_pages()
+                while True:
+                    began = stages["fetch"].begin()
+                    page = await inference_executor.run_io(next, pages, None)
+                    if page is None:
+                        break
+                    stages["fetch"].end(began, len(page))
+                    await page_queue.put(page)
             except Exception as e:
-                print(f"❌ Error processing opportunity {opp.get('Id')}: {e}")
+                print(f"❌ SF Query Error: {e}")
                 results["errors"] += 1
+            await page_queue.put(_DONE)
+        
+        async def score():
+            # 2. Score Risk (one batched model call per page)
+            while (page := await page_queue.get()) is not _DONE:
+                began = stages["score"].begin()
+                try:
+                    risk_scores = await inference_executor.run_io(deal_risk_service.predict_risk_batch, page)
+                except Exception as e:
+                    print(f"❌ Error scoring {len(page)} opportunities: {e}")
+                    results["errors"] += len(page)
+                    continue
+                stages["score"].end(began, len(page))
+                results["processed"] += len(page)
+                
+                for opp, risk_data in zip(page, risk_scores):
+                    # Update Salesforce Fields (Feature 6)
+                    await update_queue.put({
+                        "Id": opp['Id'],
+                        "AI_Risk_Score__c": risk_data['risk_score'],
+                        "Risk_Category__c": risk_data['risk_category']
+                    })
+                    # Decision Logic for Heavy Actions (Feature 4)
+                    if risk_data['risk_category'] == "HIGH" or risk_data['win_probability'] < 0.5:
+                        await insight_queue.put((opp, risk_data))
+            
+            await update_queue.put(_DONE)
+            for _ in range(insight_workers):
+                await insight_queue.put(_DONE)
+        
+        async def generate_insights():
+            # 3. Generate Insights (Feature 3)
+            while (item := await insight_queue.get()) is not _DONE:
+                opp, risk_data = item
+                began = stages["insights"].begin()
+                try:
+                    insights = await llm_service.generate_deal_insights(opp, risk_data)
+                except Exception as e:
+                    print(f"❌ Error processing opportunity {opp.get('Id')}: {e}")
+                    results["errors"] += 1
+                    continue
+                stages["insights"].end(began, 1)
                 
+                task_data = {
+                    "Subject": f"High Risk Follow-up: {opp['Name']}",
+                    "Description": insights,
+                    "WhatId": opp['Id'],
+                    "Priority": "High",
+                    "Status": "Not Started"
+                }
+                await task_queue.put((task_data, opp, risk_data))
+        
+        async def insight_stage():
+            await asyncio.gather(*(generate_insights() for _ in range(insight_workers)))
+            await task_queue.put(_DONE)
+        
+        async def write_updates():
+            # 4a. Update SF Fields, batched into Collections requests
+            async for batch in _batches(update_queue, write_batch):
+                began = stages["sf_updates"].begin()
+                try:
+                    update_results = await inference_executor.run_io(salesforce_service.update_opportunities, batch)
+                except Exception as e:
+                    print(f"❌ SF Update Error for {len(batch)} opportunities: {e}")
+                    results["errors"] += len(batch)
+                    continue
+                stages["sf_updates"].end(began, len(batch))
+                for update_result in update_results:
+                    if not update_result['success']:
+                        print(f"❌ SF Update Error for {update_result['id']}: {update_result['errors']}")
+        
+        async def write_tasks():
+            # 4b. Create Tasks (Feature 4), batched
+            async for batch in _batches(task_queue, write_batch):
+                began = stages["sf_tasks"].begin()
+                try:
+                    task_results = await inference_executor.run_io(
+                        salesforce_service.create_tasks, [task_data for task_data, _, _ in batch]
+                    )
+                except Exception as e:
+                    # No task, no alert (as when create_task raised per opportunity)
+                    print(f"❌ SF Task Creation Error for {len(batch)} opportunities: {e}")
+                    results["errors"] += len(batch)
+                    continue
+                stages["sf_tasks"].end(began, len(batch))
+                results["tasks_created"] += sum(1 for r in task_results if r['status'] == "success")
+                for _, opp, risk_data in batch:
+                    await alert_queue.put((opp, risk_data))
+            await alert_queue.put(_DONE)
+        
+        async def notify():
+            # 5. Send Slack Alerts (Feature 5), batched with bounded parallelism
+            limit = asyncio.Semaphore(settings.PIPELINE_NOTIFY_CONCURRENCY)
+            
+            async def send(opp: Dict, risk_data: Dict):
+                insights_link = f"https://force.com/{opp['Id']}" # In real app, links to dashboard
+                async with limit:
+                    try:
+                        await inference_executor.run_io(slack_service.send_deal_alert, opp, risk_data, insights_link)
+                        results["alerts_sent"] += 1
+                    except Exception as e:
+                        print(f"❌ Error alerting for opportunity {opp.get('Id')}: {e}")
+                        results["errors"] += 1
+            
+            async for batch in _batches(alert_queue, settings.PIPELINE_NOTIFY_BATCH_SIZE):
+                began = stages["notifications"].begin()
+                await asyncio.gather(*(send(opp, risk_data) for opp, risk_data in batch))
+                stages["notifications"].end(began, len(batch))
+        
+        # Stages catch their per-batch errors; if one still fails, the others
+        # would block on its queue forever, so cancel them all and count
+        # whatever was left queued as failed
+        tasks = [
+            asyncio.create_task(stage(), name=f"pipeline-{stage.__name__}")
+            for stage in (fetch, score, insight_stage, write_updates, write_tasks, notify)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            print(f"❌ Pipeline stage failed, stopping the pipeline: {e!r}")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            unprocessed = sum(len(page) for page in _drain(page_queue)) + sum(
+                len(_drain(queue)) for queue in (update_queue, insight_queue, task_queue, alert_queue)
+            )
+            results["errors"] += 1 + unprocessed
+            results["error"] = repr(e)
+        
+        results["wall_time_seconds"] = round(time.perf_counter() - pipeline_start, 3)
+        results["stages"] = {name: metrics.to_dict() for name, metrics in stages.items()}
+        
         print(f"✅ Pipeline Completed: {results}")
         return results
 
@@ -0,0 +1,144 @@
+"""
+Backtest Service - Rolling-origin backtests of the served ensemble, cached per model version
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict
+from app.config import settings
+from app.models.backtest import run_backtest
+from app.models.ml_models import model_loader
+from app.services.forecast_service import forecast_service
+
+class BacktestNotReadyError(Exception):
+    """Raised while the requested backtest is still running"""
+
+class BacktestService:
+    """
+    Backtests of the loaded models (see app/models/backtest.py)
+    
+    Reports are keyed on the model version, the ensemble weights and the
+    backtest options, and persisted under settings.CACHE_DIR, so each
+    combination is computed once per model version. Runs happen one at a
+    time on a daemon thread.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._job = {'state': 'idle'}
+        self._reports: Dict[str, Dict] = {}
+    
+    def _options(self, horizon: int = None, min_train: int = None, step: int = None) -> Dict:
+        options = {
+            'horizon': horizon or settings.BACKTEST_HORIZON_DAYS,
+            'min_train': min_train or settings.BACKTEST_MIN_TRAIN,
+            'step': step or settings.BACKTEST_STEP,
+        }
+        if not 1 <= options['horizon'] <= settings.BACKTEST_MAX_HORIZON_DAYS:
+            raise ValueError(f"horizon must be between 1 and {settings.BACKTEST_MAX_HORIZON_DAYS}")
+        if options['min_train'] < 1 or options['step'] < 1:
+            raise ValueError("min_train and step must be positive")
+        return options
+    
+    def _report_path(self, model_version: str, weights_source: str, options: Dict):
+        return settings.CACHE_DIR / (
+            f"backtest_{model_version[:16]}_{weights_source}"
+            f"_{options['horizon']}_{options['min_train']}_{options['step']}.json"
+        )
+    
+    def _cached(self, path) -> Dict:
+        report = self._reports.get(str(path))
+        if report is None and path.exists():
+            try:
+                with open(path) as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._reports[str(path)] = report
+        return report
+    
+    def run(self, refresh: bool = False, workers: int = None, **options) -> Dict:
+        """Backtest the loaded models now (cached report unless `refresh`)"""
+        options = self._options(**options)
+        model_loader.wait_for_warm_up()
+        model_version = model_loader.model_version
+        weights = forecast_service.build_ensemble_weights()
+        path = self._report_path(model_version, weights.source, options)
+        if not refresh:
+            report = self._cached(path)
+            if report is not None:
+                return report
+        
+        report = run_backtest(
+            model_loader.get_prophet(),
+            model_loader.load_sarima_results(),
+            model_loader.get_historical_data(),
+            weights,
+            interval_width=settings.BACKTEST_INTERVAL_WIDTH,
+            workers=workers or settings.BACKTEST_WORKERS,
+            chunk_size=settings.BACKTEST_CHUNK_ORIGINS,
+            **options
+        )
+        report = {'model_version': model_version, 'registry_version': model_loader.active_version, **report}
+        if model_loader.model_version != model_version:
+            print("⚠️ Model version changed during backtest, not caching the report")
+            return report
+        
+        self._reports[str(path)] = report
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+            with open(tmp, 'w') as f:
+                json.dump(report, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ Could not persist backtest report: {e}")
+        ensemble = report['summary']['ensemble']['all']
+        print(f"✅ Backtest of {report['origins']['count']} origins x {options['horizon']} days "
+              f"in {report['wall_seconds']:.1f}s (ensemble sMAPE {ensemble['smape']}, coverage {ensemble['coverage']})")
+        return report
+    
+    def get(self, **options) -> Dict:
+        """
+        Cached report for the loaded models, or start computing it and
+        raise BacktestNotReadyError
+        """
+        options = self._options(**options)
+        weights = forecast_service.get_ensemble_weights()
+        report = self._cached(self._report_path(model_loader.model_version, weights.source, options))
+        if report is not None:
+            return report
+        self.start(**options)
+        raise BacktestNotReadyError("Backtest is running, retry later")
+    
+    def start(self, refresh: bool = False, **options) -> Dict:
+        """Run a backtest on a daemon thread; no-op if one is running"""
+        options = self._options(**options)
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self.status()
+            
+            def run():
+                try:
+                    report = self.run(refresh=refresh, **options)
+                    self._job.update(state='done', wall_seconds=report['wall_seconds'])
+                except Exception as e:
+                    print(f"⚠️ Backtest failed: {e}")
+                    self._job.update(state='failed', error=str(e))
+                self._job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            
+            self._job = {
+                'state': 'running',
+                'options': options,
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._thread = threading.Thread(target=run, name="forecast-backtest", daemon=True)
+            self._thread.start()
+            return self.status()
+    
+    def status(self) -> Dict:
+        return {'job': dict(self._job)}
+
+backtest_service = BacktestService()
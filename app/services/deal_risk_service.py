@@ -3,11 +3,24 @@ Deal Risk Scoring System - XGBoost Classifier
 """
 import pandas as pd
 import numpy as np
+import threading
 import xgboost as xgb
 from datetime import datetime
 from typing import Dict, List, Optional
 from app.config import settings
 
+STAGES = ['Prospecting', 'Qualification', 'Needs Analysis', 'Proposal', 'Negotiation']
+
+# Model feature order (matches the columns of engineer_features)
+FEATURE_NAMES = [
+    'amount', 'days_open', 'days_to_close', 'probability', 'is_high_value',
+    'deal_velocity', 'urgency_factor',
+] + [f'stage_{stage.lower().replace(" ", "_")}' for stage in STAGES] + ['activity_score']
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# Opportunity fields read by feature engineering
+RAW_FIELDS = ['Amount', 'CloseDate', 'CreatedDate', 'Probability', 'StageName', 'ActivityScore']
+
 class DealRiskService:
     """
     Predicts Win/Loss probability for Salesforce Opportunities
@@ -15,104 +28,159 @@ class DealRiskService:
     
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path or (settings.MODEL_DIR / "deal_risk_model.json")
-        self.model = None
-        self._load_model()
+        self._model = None
+        self._model_checked = False
+        self._model_lock = threading.Lock()
+    
+    @property
+    def model(self) -> Optional[xgb.Booster]:
+        """XGBoost model, loaded on first use (None: baseline logic)"""
+        if not self._model_checked:
+            with self._model_lock:
+                if not self._model_checked:
+                    self._load_model()
+                    self._model_checked = True
+        return self._model
 
     def _load_model(self):
         """Load XGBoost model"""
         try:
             if self.model_path.exists():
-                self.model = xgb.Booster()
-                self.model.load_model(str(self.model_path))
+                self._model = xgb.Booster()
+                self._model.load_model(str(self.model_path))
             else:
                 print(f"⚠️ Deal Risk Model not found at {self.model_path}. Using baseline logic.")
         except Exception as e:
             print(f"❌ Error loading Deal Risk Model: {e}")
 
+    def __reduce__(self):
+        # Pickle by reference so bound methods can be sent to worker processes
+        return (_get_deal_risk_service, ())
+    
     def engineer_features(self, opportunity: Dict) -> pd.DataFrame:
         """
         Engineers 15-20 attributes from SF Opportunity data
         """
-        now = datetime.now()
-        close_date = pd.to_datetime(opportunity.get('CloseDate'))
-        created_date = pd.to_datetime(opportunity.get('CreatedDate'))
+        return pd.DataFrame(self.engineer_features_batch([opportunity]), columns=FEATURE_NAMES)
+    
+    def engineer_features_batch(self, opportunities: List[Dict]) -> np.ndarray:
+        """
+        Engineers the same attributes for N opportunities as one
+        (N, len(FEATURE_NAMES)) float matrix, column-wise
+        """
+        return self.engineer_features_frame(pd.DataFrame.from_records(opportunities, columns=RAW_FIELDS))
+    
+    def engineer_features_frame(self, raw: pd.DataFrame) -> np.ndarray:
+        """
+        Same matrix from a DataFrame of opportunity fields (e.g. a chunk of a
+        CSV export); missing RAW_FIELDS columns count as empty
+        """
+        raw = raw.reindex(columns=RAW_FIELDS)
+        now = np.datetime64(datetime.now())
+        one_day = np.timedelta64(1, 'D')
         
-        # Core Features
-        features = {
-            'amount': float(opportunity.get('Amount', 0)),
-            'days_open': (now - created_date).days,
-            'days_to_close': (close_date - now).days,
-            'probability': float(opportunity.get('Probability', 0)) / 100.0,
-            'is_high_value': 1 if float(opportunity.get('Amount', 0)) > 100000 else 0,
-        }
+        close_date = _to_naive_datetime(raw['CloseDate'])
+        created_date = _to_naive_datetime(raw['CreatedDate'])
         
-        # Derived Features
-        features['deal_velocity'] = features['amount'] / max(1, features['days_open'])
-        features['urgency_factor'] = 1.0 / max(1, features['days_to_close'])
+        # Core Features
+        amount = pd.to_numeric(raw['Amount'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        days_open = np.floor((now - created_date) / one_day)
+        days_to_close = np.floor((close_date - now) / one_day)
+        probability = pd.to_numeric(raw['Probability'], errors='coerce').fillna(0).to_numpy(dtype=float) / 100.0
         
         # Stage Encoding (Simple version)
-        stages = ['Prospecting', 'Qualification', 'Needs Analysis', 'Proposal', 'Negotiation']
-        current_stage = opportunity.get('StageName', 'Prospecting')
-        for stage in stages:
-            features[f'stage_{stage.lower().replace(" ", "_")}'] = 1 if current_stage == stage else 0
+        current_stage = raw['StageName'].fillna('Prospecting').to_numpy()
             
         # Activity Metrics (Mocking if not present)
-        features['activity_score'] = float(opportunity.get('ActivityScore', 50)) / 100.0
+        activity_score = pd.to_numeric(raw['ActivityScore'], errors='coerce').fillna(50).to_numpy(dtype=float) / 100.0
+        
+        columns = [
+            amount,
+            days_open,
+            days_to_close,
+            probability,
+            (amount > 100000).astype(float),
+            # Derived Features (fmax: a missing date counts as 1 day, as max(1, nan) did)
+            amount / np.fmax(1, days_open),
+            1.0 / np.fmax(1, days_to_close),
+        ]
+        columns += [(current_stage == stage).astype(float) for stage in STAGES]
+        columns.append(activity_score)
         
-        return pd.DataFrame([features])
+        return np.column_stack(columns)
 
     def predict_risk(self, opportunity: Dict) -> Dict:
         """
         Returns Win Probability and Risk Category
         """
-        df = self.engineer_features(opportunity)
+        return self.predict_risk_batch([opportunity])[0]
+    
+    def predict_risk_batch(self, opportunities: List[Dict]) -> List[Dict]:
+        """
+        Score N opportunities with one feature matrix and one model call
+        """
+        if not opportunities:
+            return []
         
-        if self.model:
-            dmatrix = xgb.DMatrix(df)
-            win_prob = float(self.model.predict(dmatrix)[0])
-        else:
-            # Baseline Scoring Logic (Feature Engineering based)
-            win_prob = self._calculate_baseline_prob(df)
+        X = self.engineer_features_batch(opportunities)
+        win_prob = self.predict_win_probability(X)
         
         # Categorize Risk
-        if win_prob > 0.75:
-            category = "LOW"
-            priority = "LOW"
-        elif win_prob > 0.50:
-            category = "MEDIUM"
-            priority = "MEDIUM"
-        else:
-            category = "HIGH"
-            priority = "HIGH"
+        category = risk_categories(win_prob)
+        factor_masks = self._get_key_factor_masks(X, win_prob)
             
-        return {
-            "opportunity_id": opportunity.get('Id'),
-            "win_probability": round(win_prob, 4),
-            "risk_score": round((1 - win_prob) * 100, 2),
-            "risk_category": category,
-            "action_priority": priority,
-            "key_factors": self._get_key_factors(df, win_prob)
-        }
+        results = []
+        for i, opportunity in enumerate(opportunities):
+            prob = float(win_prob[i])
+            results.append({
+                "opportunity_id": opportunity.get('Id'),
+                "win_probability": round(prob, 4),
+                "risk_score": round((1 - prob) * 100, 2),
+                "risk_category": str(category[i]),
+                "action_priority": str(category[i]),
+                "key_factors": [factor for factor, mask in factor_masks if mask[i]]
+            })
+        return results
+    
+    def predict_win_probability(self, X: np.ndarray) -> np.ndarray:
+        """Win probability for each row of a feature matrix (one model call)"""
+        if self.model:
+            dmatrix = xgb.DMatrix(X, feature_names=FEATURE_NAMES)
+            return self.model.predict(dmatrix).astype(float)
+        # Baseline Scoring Logic (Feature Engineering based)
+        return self._calculate_baseline_prob(X)
 
-    def _calculate_baseline_prob(self, df: pd.DataFrame) -> float:
+    def _calculate_baseline_prob(self, X: np.ndarray) -> np.ndarray:
         """Heuristic-based probability when model is missing"""
-        row = df.iloc[0]
-        prob = row['probability'] * 0.5 # Start with SF probability weight
+        col = FEATURE_INDEX
+        prob = X[:, col['probability']] * 0.5 # Start with SF probability weight
         
         # Adjustments
-        if row['days_to_close'] < 7: prob -= 0.1
-        if row['activity_score'] > 0.7: prob += 0.2
-        if row['stage_negotiation'] == 1: prob += 0.1
+        prob = prob - np.where(X[:, col['days_to_close']] < 7, 0.1, 0.0)
+        prob = prob + np.where(X[:, col['activity_score']] > 0.7, 0.2, 0.0)
+        prob = prob + np.where(X[:, col['stage_negotiation']] == 1, 0.1, 0.0)
         
-        return float(np.clip(prob, 0.05, 0.95))
+        return np.clip(prob, 0.05, 0.95)
+
+    def _get_key_factor_masks(self, X: np.ndarray, prob: np.ndarray) -> List:
+        col = FEATURE_INDEX
+        return [
+            ("Close date approaching", X[:, col['days_to_close']] < 14),
+            ("High-value deal", X[:, col['amount']] > 100000),
+            ("Low interaction activity", X[:, col['activity_score']] < 0.3),
+            ("Below historical win threshold for stage", prob < 0.5),
+        ]
+
+def risk_categories(win_prob: np.ndarray) -> np.ndarray:
+    """LOW / MEDIUM / HIGH risk for each win probability"""
+    return np.select([win_prob > 0.75, win_prob > 0.50], ["LOW", "MEDIUM"], "HIGH")
+
+def _to_naive_datetime(values: pd.Series) -> np.ndarray:
+    """Parse mixed date / ISO timestamp strings to naive datetime64 (UTC wall time)"""
+    parsed = pd.to_datetime(values, errors='coerce', utc=True, format='mixed')
+    return parsed.dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
 
-    def _get_key_factors(self, df: pd.DataFrame, prob: float) -> List[str]:
-        row = df.iloc[0]
-        factors = []
-        if row['days_to_close'] < 14: factors.append("Close date approaching")
-        if row['amount'] > 100000: factors.append("High-value deal")
-        if row['activity_score'] < 0.3: factors.append("Low interaction activity")
-        if prob < 0.5: factors.append("Below historical win threshold for stage")
-        return factors
+def _get_deal_risk_service():
+    return deal_risk_service
 
 deal_risk_service = DealRiskService()
@@ -1,56 +1,187 @@
 """
 Decision Service - Rules Engine
+
+Rules are a declarative table (settings.DECISION_RULES_PATH, JSON), read
+top to bottom with the first matching rule winning:
+
+    {"name": "high_risk", "when": [["risk_score", ">=", 70]],
+     "actions": ["SEND_EMAIL_ALERT"], "priority": "MEDIUM", "reason": "..."}
+
+`when` is a list of [field, operator, value] conditions that must all
+hold; the last rule must have an empty `when` (the default). The table
+is compiled into one boolean mask per rule over whole input arrays, and
+re-read whenever the file changes.
 """
-from typing import List, Dict
+import json
+import os
+import threading
+import numpy as np
+from datetime import datetime
+from typing import List, Dict, Optional
+from app.config import settings
+
+# Input fields and the value used when a row does not provide one
+FIELDS = {
+    'forecast': None,
+    'risk_score': 0,
+    'reliability': 'MEDIUM',
+    'is_anomaly': False,
+}
+
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    'in': np.isin,
+    'not in': lambda values, options: ~np.isin(values, options),
+}
+
+class RuleError(ValueError):
+    """Raised for an invalid rule table"""
+
+class RuleTable:
+    """A validated rule table, evaluated with vectorized masks"""
+    
+    def __init__(self, rules: List[Dict]):
+        if not rules:
+            raise RuleError("Rule table is empty")
+        for i, rule in enumerate(rules):
+            name = rule.get('name', f"rule {i}")
+            for key in ('actions', 'priority', 'reason'):
+                if key not in rule:
+                    raise RuleError(f"{name}: missing '{key}'")
+            for condition in rule.get('when', []):
+                if len(condition) != 3:
+                    raise RuleError(f"{name}: conditions are [field, operator, value]")
+                field, op, _ = condition
+                if field not in FIELDS:
+                    raise RuleError(f"{name}: unknown field '{field}'")
+                if op not in OPERATORS:
+                    raise RuleError(f"{name}: unknown operator '{op}'")
+        if rules[-1].get('when'):
+            raise RuleError("The last rule must have an empty 'when' (default)")
+        
+        self.rules = rules
+        # Shared per-rule results: treat as read-only
+        self.outcomes = [
+            {'actions': tuple(rule['actions']), 'priority': rule['priority'], 'reason': rule['reason']}
+            for rule in rules
+        ]
+    
+    @classmethod
+    def from_file(cls, path) -> 'RuleTable':
+        with open(path) as f:
+            return cls(json.load(f))
+    
+    def match(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Index of the first matching rule for every row"""
+        n = len(columns['forecast'])
+        masks = []
+        for rule in self.rules[:-1]:
+            mask = np.ones(n, dtype=bool)
+            for field, op, value in rule.get('when', []):
+                mask &= OPERATORS[op](columns[field], value)
+            masks.append(mask)
+        if not masks:
+            return np.zeros(n, dtype=np.intp)
+        return np.select(masks, np.arange(len(masks)), default=len(masks))
 
 class DecisionService:
     """
     Evaluates forecasts and risks to determine necessary actions.
     """
-
+    
+    def __init__(self, rules_path=None):
+        self.rules_path = rules_path or settings.DECISION_RULES_PATH
+        self._table: Optional[RuleTable] = None
+        self._table_mtime = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+    
+    @property
+    def table(self) -> RuleTable:
+        """Current rule table, re-read if the file changed since last use"""
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._table is not None and mtime == self._table_mtime:
+            return self._table
+        
+        with self._lock:
+            if self._table is None or mtime != self._table_mtime:
+                try:
+                    self._table = RuleTable.from_file(self.rules_path)
+                    self._loaded_at = datetime.now().isoformat(timespec='seconds')
+                    print(f"✅ Decision rules loaded ({len(self._table.rules)} rules)")
+                except (OSError, ValueError) as e:
+                    # Keep serving the last good table; the first load must succeed
+                    if self._table is None:
+                        raise
+                    print(f"⚠️ Decision rules not reloaded, keeping previous table: {e}")
+                self._table_mtime = mtime
+            return self._table
+    
+    def rules_info(self) -> Dict:
+        table = self.table
+        return {
+            'source': str(self.rules_path),
+            'loaded_at': self._loaded_at,
+            'rules': table.rules
+        }
+    
     def evaluate(self, forecast_value: float, risk_data: dict) -> Dict:
         """
         Evaluate rules and return actions.
         """
-        actions = []
-        risk_score = risk_data.get('risk_score', 0)
-        reliability = risk_data.get('reliability', 'MEDIUM')
+        result = self.evaluate_batch(
+            [forecast_value],
+            [risk_data.get('risk_score', FIELDS['risk_score'])],
+            [risk_data.get('reliability', FIELDS['reliability'])],
+            [risk_data.get('is_anomaly', FIELDS['is_anomaly'])]
+        )[0]
+        return {**result, 'actions': list(result['actions'])}
+    
+    @staticmethod
+    def _columns(forecasts, risk_scores=None, reliabilities=None, anomalies=None) -> Dict[str, np.ndarray]:
+        forecasts = np.asarray(forecasts, dtype=float)
+        n = len(forecasts)
+        
+        def column(values, field, dtype):
+            if values is None:
+                return np.full(n, FIELDS[field], dtype=dtype)
+            return np.asarray(values, dtype=dtype)
         
-        # Rule 1: High Risk & Low Reliability -> Alert + Task
-        if risk_score >= 70 and reliability == "LOW":
-            actions.append("SEND_EMAIL_ALERT")
-            actions.append("CREATE_SALESFORCE_TASK")
-            priority = "HIGH"
-            reason = "High risk with low reliability"
-            
-        # Rule 2: High Risk but High Reliability -> Just Alert
-        elif risk_score >= 70:
-            actions.append("SEND_EMAIL_ALERT")
-            priority = "MEDIUM"
-            reason = "High risk detected"
-            
-        # Rule 3: Anomaly Detected -> Flag
-        elif risk_data.get('is_anomaly', False):
-            actions.append("FLAG_FOR_REVIEW")
-            actions.append("INCLUDE_IN_WEEKLY_REPORT")
-            priority = "MEDIUM"
-            reason = "Anomaly detected"
-
-        # Rule 4: Critical Drop (Mock threshold)
-        elif forecast_value < 2000: # Example threshold
-             actions.append("INVENTORY_WARNING")
-             priority = "HIGH"
-             reason = "Forecast below critical threshold"
-
-        else:
-            actions.append("LOG_ONLY")
-            priority = "LOW"
-            reason = "Normal forecast"
-
         return {
-            "actions": actions,
-            "priority": priority,
-            "reason": reason
+            'forecast': forecasts,
+            'risk_score': column(risk_scores, 'risk_score', float),
+            'reliability': column(reliabilities, 'reliability', str),
+            'is_anomaly': column(anomalies, 'is_anomaly', bool),
         }
+    
+    def match(self, forecasts, risk_scores=None, reliabilities=None, anomalies=None) -> np.ndarray:
+        """Index into self.table.rules of the rule applied to each row"""
+        return self.table.match(self._columns(forecasts, risk_scores, reliabilities, anomalies))
+    
+    def evaluate_batch(self, forecasts, risk_scores=None, reliabilities=None, anomalies=None) -> List[Dict]:
+        """
+        Evaluate rules for many rows in one pass
+        
+        Args:
+            forecasts: Forecast values (array-like)
+            risk_scores / reliabilities / anomalies: Same length as
+                forecasts, or None to use the defaults for every row
+        
+        Returns:
+            One {'actions', 'priority', 'reason'} dict per row. Rows that hit
+            the same rule share one dict (actions as a tuple); do not mutate.
+        """
+        table = self.table
+        columns = self._columns(forecasts, risk_scores, reliabilities, anomalies)
+        outcomes = table.outcomes
+        return [outcomes[i] for i in table.match(columns).tolist()]
 
 decision_service = DecisionService()
@@ -1,97 +1,357 @@
 """
 Email Service - Gmail Alerts
 """
-import smtplib
+import asyncio
+import aiosmtplib
+from contextlib import asynccontextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from string import Template
+from typing import Dict, List, Optional
 from app.config import settings
 
-class EmailService:
-    """Email alert service"""
-    
-    def __init__(self):
-        self.sender = settings.GMAIL_ADDRESS
-        self.password = settings.GMAIL_APP_PASSWORD.replace(" ", "") if settings.GMAIL_APP_PASSWORD else ""
-    
-    def send_report(self, report: dict, recipient: str = None) -> bool:
-        """
-        Send forecast report via email
-        
-        Args:
-            report: Report dict
-            recipient: Recipient email (default: self)
-        
-        Returns:
-            bool: Success status
-        """
-        
-        if recipient is None:
-            recipient = self.sender
-        
-        forecast = report['forecast']
-        risk = report['risk']
-        explanation = report['explanation']
-        
-        # Build HTML email
-        color_map = {'Low': '#4CAF50', 'Medium': '#FF9800', 'High': '#F44336'}
-        risk_level = risk.get('risk_level', 'Medium')
-        risk_color = color_map.get(risk_level, '#2196F3')
-        
-        html_body = f"""
+# Compiled once at import; `$$` is a literal dollar sign
+REPORT_TEMPLATE = Template("""
 <html>
 <body style="font-family: Arial, sans-serif;">
     <h2 style="color: #2196F3;">📊 Sales Forecast Report</h2>
     
     <div style="background: #f5f5f5; padding: 15px; margin: 10px 0; border-left: 4px solid #2196F3;">
-        <h3>🔮 Prediction for {forecast['date']}</h3>
-        <p><strong>Expected Sales:</strong> ${forecast['ensemble_prediction']:,.2f}</p>
+        <h3>🔮 Prediction for $date</h3>
+        <p><strong>Expected Sales:</strong> $$$expected</p>
         <p style="font-size: 14px; color: #666;">
-            Prophet: ${forecast['prophet_prediction']:,.2f} | 
-            SARIMA: ${forecast.get('sarima_prediction', 0):,.2f}
+            Prophet: $$$prophet |
+            SARIMA: $$$sarima
         </p>
     </div>
     
-    <div style="background: {risk_color}20; padding: 15px; margin: 10px 0; border-left: 4px solid {risk_color};">
+    <div style="background: ${risk_color}20; padding: 15px; margin: 10px 0; border-left: 4px solid $risk_color;">
         <h3>⚠️ Risk Assessment</h3>
-        <p><strong>Risk Level:</strong> <span style="color: {risk_color}; font-weight: bold;">{risk['risk_level']}</span> ({risk['risk_score']}/100)</p>
-        <p><strong>Reliability:</strong> {risk['reliability']}</p>
-        <p><strong>Deviation:</strong> {risk['deviation_from_mean']:+.1f}% from average</p>
-        {'<p><strong>Factors:</strong><br>' + '<br>'.join('• ' + f for f in risk['risk_factors']) + '</p>' if risk['risk_factors'] else ''}
+        <p><strong>Risk Level:</strong> <span style="color: $risk_color; font-weight: bold;">$risk_level</span> ($risk_score/100)</p>
+        <p><strong>Reliability:</strong> $reliability</p>
+        <p><strong>Deviation:</strong> $deviation% from average</p>
+        $factors
     </div>
     
     <div style="background: #e3f2fd; padding: 15px; margin: 10px 0; border-left: 4px solid #2196F3;">
         <h3>🤖 AI Analysis</h3>
-        <p style="white-space: pre-line;">{explanation}</p>
+        <p style="white-space: pre-line;">$explanation</p>
     </div>
     
     <hr style="margin: 20px 0;">
     <p style="color: #999; font-size: 12px;">
-        Generated: {report['generated_at']}<br>
+        Generated: $generated_at<br>
         System: Retail Sales Forecasting API v1.0
     </p>
 </body>
 </html>
-"""
+""")
+
+WEEKLY_TEMPLATE = Template("""
+<html>
+<body style="font-family: Arial, sans-serif;">
+    <h2 style="color: #2196F3;">📅 Weekly Sales Forecast</h2>
+    <p><strong>$start to $end</strong> | Average Daily Sales: $$$average | Total: $$$total</p>
+    <table style="border-collapse: collapse; width: 100%;">
+        <tr style="background: #f5f5f5;"><th align="left">Date</th><th align="right">Forecast</th><th align="left">Risk</th></tr>
+$rows
+    </table>
+    <hr style="margin: 20px 0;">
+    <p style="color: #999; font-size: 12px;">System: Retail Sales Forecasting API v1.0</p>
+</body>
+</html>
+""")
+
+WEEKLY_ROW_TEMPLATE = Template(
+    '        <tr><td>$date</td><td align="right">$$$forecast</td>'
+    '<td style="color: $risk_color;">$risk_level ($risk_score/100)</td></tr>'
+)
+
+RISK_COLORS = {'Low': '#4CAF50', 'Medium': '#FF9800', 'High': '#F44336'}
+
+def render_report_html(report: dict) -> str:
+    """Report email body"""
+    forecast = report['forecast']
+    risk = report['risk']
+    risk_level = risk.get('risk_level', 'Medium')
+    factors = (
+        '<p><strong>Factors:</strong><br>' + '<br>'.join('• ' + f for f in risk['risk_factors']) + '</p>'
+        if risk['risk_factors'] else ''
+    )
+    return REPORT_TEMPLATE.substitute(
+        date=forecast['date'],
+        expected=f"{forecast['ensemble_prediction']:,.2f}",
+        prophet=f"{forecast['prophet_prediction']:,.2f}",
+        sarima=f"{forecast.get('sarima_prediction', 0):,.2f}",
+        risk_color=RISK_COLORS.get(risk_level, '#2196F3'),
+        risk_level=risk['risk_level'],
+        risk_score=risk['risk_score'],
+        reliability=risk['reliability'],
+        deviation=f"{risk['deviation_from_mean']:+.1f}",
+        factors=factors,
+        explanation=report['explanation'],
+        generated_at=report['generated_at']
+    )
+
+def render_weekly_html(weekly: dict) -> str:
+    """Weekly summary email body (output of the /weekly endpoint)"""
+    rows = "\n".join(
+        WEEKLY_ROW_TEMPLATE.substitute(
+            date=r['date'],
+            forecast=f"{r['forecast']:,.2f}",
+            risk_color=RISK_COLORS.get(r['risk_level'], '#2196F3'),
+            risk_level=r['risk_level'],
+            risk_score=r['risk_score']
+        )
+        for r in weekly['detailed_reports']
+    )
+    summary = weekly['summary']
+    return WEEKLY_TEMPLATE.substitute(
+        start=summary['forecast_start'],
+        end=summary['forecast_end'],
+        average=f"{summary['average_daily_sales']:,.2f}",
+        total=f"{sum(r['forecast'] for r in weekly['detailed_reports']):,.2f}",
+        rows=rows
+    )
+
+def _is_permanent(error: Exception) -> bool:
+    """5xx replies (bad recipient, auth rejected, ...) will not succeed on retry"""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(e.code >= 500 for e in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+
+class SMTPConnectionPool:
+    """
+    Up to `size` persistent, authenticated SMTP sessions.
+    
+    Sessions are reused across sends and reconnected when the server has
+    dropped them; a session that errors is closed and replaced.
+    """
+    
+    def __init__(self, hostname: str, port: int, username: Optional[str], password: Optional[str],
+                 use_tls: bool, start_tls: bool, timeout: float, size: int):
+        self.options = dict(
+            hostname=hostname, port=port, use_tls=use_tls, start_tls=start_tls, timeout=timeout,
+            username=username or None, password=password or None
+        )
+        self.size = size
+        self._idle: List[aiosmtplib.SMTP] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.connects = 0
+    
+    @asynccontextmanager
+    async def acquire(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            smtp = self._idle.pop() if self._idle else None
+            if smtp is None or not smtp.is_connected:
+                smtp = aiosmtplib.SMTP(**self.options)
+                await smtp.connect()
+                self.connects += 1
+            try:
+                yield smtp
+            except BaseException:
+                smtp.close()
+                raise
+            self._idle.append(smtp)
+    
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for smtp in idle:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+class EmailService:
+    """
+    Email alert service
+    
+    Sends go through a bounded queue drained by one worker per pooled SMTP
+    session; transient failures are retried with exponential backoff.
+    """
+    
+    def __init__(self, sender: str = None, password: str = None, hostname: str = None, port: int = None,
+                 use_tls: bool = None, pool_size: int = None, max_retries: int = None, backoff: float = None):
+        self.sender = sender or settings.GMAIL_ADDRESS
+        password = password if password is not None else settings.GMAIL_APP_PASSWORD
+        self.password = password.replace(" ", "") if password else ""
+        use_tls = settings.SMTP_USE_TLS if use_tls is None else use_tls
+        self.pool = SMTPConnectionPool(
+            hostname=hostname or settings.SMTP_HOST,
+            port=port or settings.SMTP_PORT,
+            username=self.sender if self.password else None,
+            password=self.password,
+            use_tls=use_tls,
+            start_tls=settings.SMTP_STARTTLS and not use_tls,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+            size=pool_size or settings.SMTP_POOL_SIZE
+        )
+        self.max_retries = settings.EMAIL_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = settings.EMAIL_RETRY_BACKOFF_SECONDS if backoff is None else backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+    
+    # ==================== Messages ====================
+    
+    def _message(self, subject: str, html_body: str, recipient: str) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html_body, 'html'))
+        return msg
+    
+    # ==================== Public API ====================
+    
+    async def send_report(self, report: dict, recipient: str = None) -> bool:
+        """
+        Send forecast report via email
         
-        try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = self.sender
-            msg['To'] = recipient
-            msg['Subject'] = f"Sales Forecast Alert - {forecast['date']}"
-            
-            msg.attach(MIMEText(html_body, 'html'))
-            
-            # Send via Gmail
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.login(self.sender, self.password)
-                server.send_message(msg)
-            
-            print(f"✅ Email sent to {recipient}")
-            return True
+        Args:
+            report: Report dict
+            recipient: Recipient email (default: self)
         
-        except Exception as e:
-            print(f"❌ Email failed: {e}")
+        Returns:
+            bool: Success status
+        """
+        if recipient is None:
+            recipient = self.sender
+        if not self.sender:
+            print("❌ Email failed: GMAIL_ADDRESS is not configured")
             return False
+        
+        subject = f"Sales Forecast Alert - {report['forecast']['date']}"
+        ok = await self.enqueue(self._message(subject, render_report_html(report), recipient))
+        if ok:
+            print(f"✅ Email sent to {recipient}")
+        return ok
+    
+    async def send_report_bulk(self, report: dict, recipients: List[str]) -> Dict[str, bool]:
+        """Send one report to many recipients (rendered once, one SMTP session)"""
+        subject = f"Sales Forecast Alert - {report['forecast']['date']}"
+        return await self.send_bulk(subject, render_report_html(report), recipients)
+    
+    async def send_weekly_report(self, weekly: dict, recipients: List[str]) -> Dict[str, bool]:
+        """Send the weekly summary to many recipients over one SMTP session"""
+        subject = f"Weekly Sales Forecast - {weekly['summary']['forecast_start']}"
+        return await self.send_bulk(subject, render_weekly_html(weekly), recipients)
+    
+    async def send_bulk(self, subject: str, html_body: str, recipients: List[str]) -> Dict[str, bool]:
+        """
+        Deliver the same body to each recipient in a single pooled session.
+        Recipients that fail transiently are retried with backoff.
+        
+        Returns:
+            {recipient: delivered}
+        """
+        results = {recipient: False for recipient in recipients}
+        pending = list(dict.fromkeys(recipients))
+        if not self.sender:
+            print("❌ Email failed: GMAIL_ADDRESS is not configured")
+            pending = []
+        
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                self.retries += len(pending)
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            
+            retry = []
+            try:
+                async with self.pool.acquire() as smtp:
+                    for i, recipient in enumerate(pending):
+                        try:
+                            await smtp.send_message(self._message(subject, html_body, recipient))
+                            results[recipient] = True
+                            self.sent += 1
+                        except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPResponseException) as e:
+                            if not _is_permanent(e):
+                                retry.append(recipient)
+                            else:
+                                print(f"❌ Email to {recipient} rejected: {e}")
+                        except Exception:
+                            # Session is broken: retry this and all remaining recipients
+                            retry.extend(pending[i:])
+                            raise
+            except Exception as e:
+                print(f"❌ Email session failed: {e}")
+            pending = retry
+        
+        self.failed += sum(1 for ok in results.values() if not ok)
+        return results
+    
+    # ==================== Queue ====================
+    
+    async def enqueue(self, msg: MIMEMultipart) -> bool:
+        """Queue a message and wait for its delivery result"""
+        if self._queue is None:
+            self.start()
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put((msg, done))
+        return await done
+    
+    def start(self):
+        """Start the send workers (one per pooled session) on the running loop"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.EMAIL_QUEUE_SIZE)
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.pool.size)]
+    
+    async def _worker(self):
+        while True:
+            msg, done = await self._queue.get()
+            try:
+                ok = await self._deliver(msg)
+                if not done.done():
+                    done.set_result(ok)
+            except BaseException as e:
+                if not done.done():
+                    done.set_exception(e)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+            finally:
+                self._queue.task_done()
+    
+    async def _deliver(self, msg: MIMEMultipart) -> bool:
+        """Send one message with retry / exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.pool.acquire() as smtp:
+                    await smtp.send_message(msg)
+                self.sent += 1
+                return True
+            except Exception as e:
+                if _is_permanent(e) or attempt == self.max_retries:
+                    print(f"❌ Email failed: {e}")
+                    self.failed += 1
+                    return False
+                self.retries += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+        return False
+    
+    async def close(self):
+        """Flush queued messages, stop workers and close pooled sessions"""
+        if self._queue is not None:
+            await self._queue.join()
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._queue, self._workers = None, []
+        await self.pool.close()
+    
+    def stats(self) -> Dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "connections_opened": self.pool.connects
+        }
 
-email_service = EmailService()
\ No newline at end of file
+email_service = EmailService()
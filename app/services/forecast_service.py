@@ -1,10 +1,17 @@
 """
 Forecasting Service - Core prediction logic
 """
+import os
+import numpy as np
 import pandas as pd
+import threading
+import time
 import warnings
 from datetime import timedelta
 from app.models.ml_models import model_loader
+from app.models.backtest import forecasts_from_origins
+from app.models.ensemble_weights import EnsembleWeights, learn_weights
+from app.services.forecast_table import ForecastTable, COLUMNS
 from app.config import settings
 
 # Suppress statsmodels warnings
@@ -15,15 +22,49 @@ try:
 except ImportError:
     pass
 
+# Seconds a forked worker waits between looks for the learned weights
+WEIGHTS_RECHECK_SECONDS = 10.0
+
 class ForecastService:
     """Forecasting service for sales predictions"""
     
     def __init__(self):
-        self.prophet_model = model_loader.get_prophet()
-        self.sarima_model = model_loader.get_sarima()
-        self.historical_data = model_loader.get_historical_data()
-        self.weight_prophet = settings.WEIGHT_PROPHET
-        self.weight_sarima = settings.WEIGHT_SARIMA
+        self.ensemble_weights = None
+        self.forecast_table = None
+        self._table_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._weights_lock = threading.Lock()
+        self._table_thread = None
+        self._forked = False
+        self._pending_weights = None
+        self._weights_checked_at = None
+    
+    def _after_fork(self):
+        # A forked child (inference worker) may inherit these locks held by
+        # a parent build thread that does not exist in the child. It gets
+        # fresh ones, and never builds: it reads what the parent persisted
+        self._table_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._weights_lock = threading.Lock()
+        self._table_thread = None
+        self._forked = True
+    
+    def __reduce__(self):
+        # Pickle by reference so bound methods can be sent to worker processes
+        return (_get_forecast_service, ())
+    
+    # Models are read through the loader so reloaded artifacts are picked up
+    @property
+    def prophet_model(self):
+        return model_loader.get_prophet()
+    
+    @property
+    def sarima_model(self):
+        return model_loader.get_sarima()
+    
+    @property
+    def historical_data(self):
+        return model_loader.get_historical_data()
     
     def predict(self, date_str: str) -> dict:
         """
@@ -36,85 +77,311 @@ class ForecastService:
             dict with prediction details
         """
         target_date = pd.to_datetime(date_str)
-        last_date = self.historical_data.index[-1]
-        is_historical = target_date <= last_date
+        return self._predict_dates(pd.DatetimeIndex([target_date]))[0]
+    
+    def _predict_dates(self, dates: pd.DatetimeIndex) -> list:
+        """
+        Generate ensemble predictions for many dates
+        
+        Served from the precomputed forecast table when it covers the dates,
+        otherwise computed directly in a single model pass.
+        """
+        if len(dates) == 0:
+            return []
+        
+        components = None
+        table = self.get_forecast_table()
+        if table is not None:
+            components = table.take(dates)
+        if components is None:
+            components = self._compute_components(dates)
         
-        if is_historical:
-            return self._predict_historical(target_date)
-        else:
-            return self._predict_future(target_date)
+        return self._build_predictions(dates, components)
     
-    def _predict_historical(self, target_date):
-        """Predict for historical date"""
+    def _compute_components(self, dates: pd.DatetimeIndex) -> dict:
+        """
+        Run the models for `dates` and return per-model component arrays
         
-        # Actual value
-        actual = None
-        if target_date in self.historical_data.index:
-            actual = float(self.historical_data.loc[target_date, 'Sales'])
+        Prophet is scored once on exactly the requested dates and SARIMA
+        is forecast once up to the furthest requested horizon; each date then
+        slices its values out of those shared results.
+        """
+        n = len(dates)
+        components = {name: np.full(n, np.nan) for name in COLUMNS}
         
-        # Prophet
-        prophet_df = pd.DataFrame({'ds': [target_date]})
-        prophet_forecast = self.prophet_model.predict(prophet_df)
-        prophet_pred = float(prophet_forecast['yhat'].values[0])
+        last_date = self.historical_data.index[-1]
+        is_historical = np.asarray(dates <= last_date)
         
-        # SARIMA
-        sarima_pred = None
-        try:
-            if target_date in self.sarima_model.fittedvalues.index:
-                sarima_pred = float(self.sarima_model.fittedvalues.loc[target_date])
-        except:
-            pass
+        # Prophet (single pass over the requested dates only)
+        components['prophet'], components['prophet_lower'], components['prophet_upper'] = self.prophet_model.predict(dates)
         
-        # Ensemble
-        if sarima_pred is not None:
-            ensemble = (self.weight_prophet * prophet_pred) + (self.weight_sarima * sarima_pred)
-        else:
-            ensemble = prophet_pred
+        hist_pos = np.flatnonzero(is_historical)
+        if len(hist_pos):
+            hist_dates = dates[hist_pos]
+            components['actual'][hist_pos] = self.historical_data['Sales'].reindex(hist_dates).to_numpy(dtype=float)
+            try:
+                components['sarima'][hist_pos] = self.sarima_model.fittedvalues.reindex(hist_dates).to_numpy(dtype=float)
+            except Exception:
+                pass
         
-        return {
-            'date': target_date.strftime('%Y-%m-%d'),
-            'type': 'historical',
-            'actual_sales': actual,
-            'prophet_prediction': prophet_pred,
-            'sarima_prediction': sarima_pred,
-            'ensemble_prediction': float(ensemble)
-        }
+        future_pos = np.flatnonzero(~is_historical)
+        if len(future_pos):
+            days_ahead = np.asarray((dates[future_pos] - last_date).days)
+            steps = int(days_ahead.max())
+            
+            # SARIMA (one forecast to the furthest horizon, sliced per date)
+            sarima_mean, sarima_lower, sarima_upper = self.sarima_model.forecast(steps)
+            components['sarima'][future_pos] = sarima_mean[days_ahead - 1]
+            components['sarima_lower'][future_pos] = sarima_lower[days_ahead - 1]
+            components['sarima_upper'][future_pos] = sarima_upper[days_ahead - 1]
+        
+        return components
     
-    def _predict_future(self, target_date):
-        """Predict for future date"""
+    def _build_predictions(self, dates: pd.DatetimeIndex, components: dict) -> list:
+        """Combine component arrays into ensemble prediction dicts"""
         
         last_date = self.historical_data.index[-1]
-        days_ahead = (target_date - last_date).days
+        is_historical = np.asarray(dates <= last_date)
         
-        # Prophet
-        future = self.prophet_model.make_future_dataframe(periods=days_ahead)
-        prophet_forecast = self.prophet_model.predict(future)
-        prophet_row = prophet_forecast[prophet_forecast['ds'] == target_date].iloc[0]
+        actual = components['actual']
+        prophet_pred = components['prophet']
+        sarima_pred = components['sarima']
         
-        # SARIMA
-        sarima_forecast = self.sarima_model.get_forecast(steps=days_ahead)
-        sarima_pred = float(sarima_forecast.predicted_mean.iloc[-1])
-        sarima_ci = sarima_forecast.conf_int().iloc[-1]
+        # Weights by horizon and day of week (historical dates are SARIMA's
+        # one-step predictions, i.e. 1 day ahead)
+        days_ahead = np.where(is_historical, 1, np.asarray((dates - last_date).days))
+        weight_prophet = self.get_ensemble_weights().prophet_weights(dates, days_ahead)
+        weight_sarima = 1 - weight_prophet
         
-        # Ensemble
-        prophet_pred = float(prophet_row['yhat'])
-        ensemble = (self.weight_prophet * prophet_pred) + (self.weight_sarima * sarima_pred)
+        # Ensemble (historical dates fall back to Prophet without a SARIMA fit)
+        weighted = (weight_prophet * prophet_pred) + (weight_sarima * sarima_pred)
+        ensemble = np.where(np.isnan(sarima_pred), prophet_pred, weighted)
+        ensemble_lower = (weight_prophet * components['prophet_lower']) + (weight_sarima * components['sarima_lower'])
+        ensemble_upper = (weight_prophet * components['prophet_upper']) + (weight_sarima * components['sarima_upper'])
         
-        ensemble_lower = (self.weight_prophet * prophet_row['yhat_lower']) + (self.weight_sarima * sarima_ci.iloc[0])
-        ensemble_upper = (self.weight_prophet * prophet_row['yhat_upper']) + (self.weight_sarima * sarima_ci.iloc[1])
+        predictions = []
+        for i, date in enumerate(dates):
+            if is_historical[i]:
+                predictions.append({
+                    'date': date.strftime('%Y-%m-%d'),
+                    'type': 'historical',
+                    'actual_sales': None if np.isnan(actual[i]) else float(actual[i]),
+                    'prophet_prediction': float(prophet_pred[i]),
+                    'sarima_prediction': None if np.isnan(sarima_pred[i]) else float(sarima_pred[i]),
+                    'ensemble_prediction': float(ensemble[i])
+                })
+            else:
+                predictions.append({
+                    'date': date.strftime('%Y-%m-%d'),
+                    'type': 'future',
+                    'actual_sales': None,
+                    'prophet_prediction': float(prophet_pred[i]),
+                    'sarima_prediction': float(sarima_pred[i]),
+                    'ensemble_prediction': float(ensemble[i]),
+                    'confidence_interval': {
+                        'lower': float(max(0, ensemble_lower[i])),
+                        'upper': float(ensemble_upper[i])
+                    }
+                })
         
-        return {
-            'date': target_date.strftime('%Y-%m-%d'),
-            'type': 'future',
-            'actual_sales': None,
-            'prophet_prediction': prophet_pred,
-            'sarima_prediction': sarima_pred,
-            'ensemble_prediction': float(ensemble),
-            'confidence_interval': {
-                'lower': float(max(0, ensemble_lower)),
-                'upper': float(ensemble_upper)
-            }
-        }
+        return predictions
+    
+    # ==================== Ensemble Weights ====================
+    
+    def _weights_path(self, model_version: str):
+        return settings.CACHE_DIR / f"ensemble_weights_{model_version[:16]}.json"
+    
+    def _fixed_weights(self, model_version: str) -> EnsembleWeights:
+        """Weights recorded in the ensemble config, else the settings defaults"""
+        try:
+            weight = float(model_loader.ensemble_config['weight_prophet'])
+        except Exception:
+            weight = settings.WEIGHT_PROPHET
+        weights = EnsembleWeights.fixed(weight, settings.ENSEMBLE_HORIZON_BUCKETS)
+        weights.model_version = model_version
+        return weights
+    
+    def get_ensemble_weights(self) -> EnsembleWeights:
+        """
+        Weight table for the loaded models
+        
+        Learned weights are built with the forecast table; until they are
+        ready the fixed weights are used.
+        """
+        weights = self.ensemble_weights
+        model_version = model_loader.model_version
+        if weights is not None and weights.model_version == model_version:
+            return weights
+        if settings.ENSEMBLE_WEIGHTING != "learned":
+            self.ensemble_weights = self._fixed_weights(model_version)
+            return self.ensemble_weights
+        
+        # Not on disk on every call while the weights are pending: the build
+        # sets self.ensemble_weights when done, and a forked worker (which
+        # never builds) looks for the parent's copy every few seconds
+        pending = self._pending_weights
+        if pending is None or pending.model_version != model_version:
+            pending = self._pending_weights = self._fixed_weights(model_version)
+            self._weights_checked_at = None
+        if not self._forked:
+            self.start_background_build()
+            return pending
+        now = time.monotonic()
+        if self._weights_checked_at is None or now - self._weights_checked_at >= WEIGHTS_RECHECK_SECONDS:
+            self._weights_checked_at = now
+            weights = EnsembleWeights.load(self._weights_path(model_version))
+            if weights is not None and weights.model_version == model_version:
+                self.ensemble_weights = weights
+                return weights
+        return pending
+    
+    def build_ensemble_weights(self) -> EnsembleWeights:
+        """
+        Learn the weight table from the loaded models refit at sampled
+        cutoffs (persisted under settings.CACHE_DIR per model version)
+        
+        Falls back to the fixed weights (for this model version) if the
+        refits cannot run, or if Prophet uses features the scorer does not
+        cover (ProphetModelScorer): the refit keeps only its constructor
+        options and would not forecast like the served model.
+        """
+        with self._weights_lock:
+            return self._build_ensemble_weights()
+    
+    def _build_ensemble_weights(self) -> EnsembleWeights:
+        model_version = model_loader.model_version
+        weights = self.ensemble_weights
+        if weights is not None and weights.model_version == model_version:
+            return weights
+        if settings.ENSEMBLE_WEIGHTING != "learned":
+            return self.get_ensemble_weights()
+        
+        path = self._weights_path(model_version)
+        weights = EnsembleWeights.load(path)
+        if weights is None or weights.model_version != model_version:
+            fixed = self._fixed_weights(model_version)
+            if not forecasts_from_origins(self.prophet_model):
+                print(f"⚠️ Prophet model cannot be refit as served ({type(self.prophet_model).__name__}), "
+                      f"using fixed ensemble weights")
+                self.ensemble_weights = fixed
+                return fixed
+            try:
+                weights = learn_weights(
+                    model_loader.load_prophet_model(),
+                    model_loader.load_sarima_results(),
+                    self.historical_data,
+                    horizon=settings.ENSEMBLE_BACKTEST_HORIZON,
+                    min_train=settings.ENSEMBLE_BACKTEST_MIN_TRAIN,
+                    cutoffs=settings.ENSEMBLE_BACKTEST_CUTOFFS,
+                    horizon_edges=settings.ENSEMBLE_HORIZON_BUCKETS,
+                    default=float(fixed.table[0, 0]),
+                    prior_samples=settings.ENSEMBLE_WEIGHT_PRIOR_SAMPLES,
+                    max_shift=settings.ENSEMBLE_WEIGHT_MAX_SHIFT,
+                    model_version=model_version
+                )
+            except Exception as e:
+                print(f"⚠️ Could not learn ensemble weights, using fixed weights: {e}")
+                self.ensemble_weights = fixed
+                return fixed
+            if model_loader.model_version != model_version:
+                print("⚠️ Model version changed while learning ensemble weights, discarding")
+                return weights
+            try:
+                weights.save(path)
+            except OSError as e:
+                print(f"⚠️ Could not persist ensemble weights: {e}")
+            mae = weights.metrics['mae']
+            print(f"✅ Ensemble weights learned (backtest MAE {mae['fixed']:.1f} fixed -> {mae['learned']:.1f} learned)")
+        
+        self.ensemble_weights = weights
+        return weights
+    
+    # ==================== Forecast Table ====================
+    
+    def _table_path(self, model_version: str):
+        return settings.CACHE_DIR / f"forecast_table_{model_version[:16]}_{settings.FORECAST_HORIZON_DAYS}"
+    
+    def get_forecast_table(self):
+        """
+        Return the forecast table if it matches the loaded models
+        
+        A stale or missing table triggers a background rebuild; callers get
+        None until it is ready and compute directly in the meantime. Forked
+        workers instead pick up the table the parent persisted, once there.
+        """
+        table = self.forecast_table
+        model_version = model_loader.model_version
+        if table is not None and table.model_version == model_version:
+            return table
+        if self._forked:
+            table = ForecastTable.load(self._table_path(model_version), mmap=settings.SHARED_DATA_MODE == "mmap")
+            if table is None or table.model_version != model_version:
+                return None
+            self.forecast_table = table
+            return table
+        self.start_background_build()
+        return None
+    
+    def start_background_build(self):
+        """Build the forecast table on a daemon thread (no-op if running or in a forked worker)"""
+        if self._forked:
+            return
+        with self._table_lock:
+            if self._table_thread is not None and self._table_thread.is_alive():
+                return
+            self._table_thread = threading.Thread(
+                target=self.build_forecast_table,
+                name="forecast-table-build",
+                daemon=True
+            )
+            self._table_thread.start()
+    
+    def build_forecast_table(self) -> ForecastTable:
+        """
+        Precompute model components for the full history plus the horizon
+        
+        The table is keyed on the loaded model version; a copy is persisted
+        under settings.CACHE_DIR so restarts with the same artifacts skip the
+        model passes entirely. In "mmap" mode the table is then served from
+        that copy, so all workers share one set of pages.
+        """
+        with self._build_lock:
+            self.build_ensemble_weights()
+            model_version = model_loader.model_version
+            if self.forecast_table is not None and self.forecast_table.model_version == model_version:
+                return self.forecast_table
+            
+            path = self._table_path(model_version)
+            
+            mmap = settings.SHARED_DATA_MODE == "mmap"
+            table = ForecastTable.load(path, mmap=mmap)
+            if table is None or table.model_version != model_version:
+                hist_index = self.historical_data.index
+                dates = pd.date_range(
+                    hist_index[0],
+                    hist_index[-1] + timedelta(days=settings.FORECAST_HORIZON_DAYS),
+                    freq='D'
+                )
+                table = ForecastTable(
+                    start=dates[0],
+                    last_historical=hist_index[-1],
+                    columns=self._compute_components(dates),
+                    model_version=model_version
+                )
+                if model_loader.model_version != model_version:
+                    # Models were hot-swapped mid-build: the columns may mix versions
+                    print("⚠️ Model version changed during forecast table build, discarding")
+                    return table
+                try:
+                    table.save(path)
+                    if mmap:
+                        table = ForecastTable.load(path) or table
+                except OSError as e:
+                    print(f"⚠️ Could not persist forecast table: {e}")
+                print(f"✅ Forecast table built ({table.size} days, model {model_version[:8]})")
+            
+            self.forecast_table = table
+            return table
     
     def batch_predict(self, start_date: str, end_date: str) -> list:
         """Predict for date range"""
@@ -123,24 +390,15 @@ class ForecastService:
         end = pd.to_datetime(end_date)
         
         date_range = pd.date_range(start, end, freq='D')
-        predictions = []
-        
-        for date in date_range:
-            pred = self.predict(date.strftime('%Y-%m-%d'))
-            predictions.append(pred)
-        
-        return predictions
+        return self._predict_dates(date_range)
     
     def next_week_forecast(self) -> dict:
         """Get next 7 days forecast"""
         
         last_date = self.historical_data.index[-1]
-        predictions = []
-        
-        for i in range(1, 8):
-            future_date = last_date + timedelta(days=i)
-            pred = self.predict(future_date.strftime('%Y-%m-%d'))
-            predictions.append(pred)
+        predictions = self._predict_dates(
+            pd.date_range(last_date + timedelta(days=1), periods=7, freq='D')
+        )
         
         avg_prediction = sum(p['ensemble_prediction'] for p in predictions) / len(predictions)
         
@@ -151,4 +409,11 @@ class ForecastService:
             'predictions': predictions
         }
 
-forecast_service = ForecastService()
\ No newline at end of file
+def _get_forecast_service():
+    return forecast_service
+
+forecast_service = ForecastService()
+os.register_at_fork(after_in_child=forecast_service._after_fork)
+
+# Rebuild the forecast table as soon as new models are swapped in
+model_loader.add_reload_listener(forecast_service.start_background_build)
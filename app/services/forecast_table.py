@@ -0,0 +1,81 @@
+"""
+Forecast Table - Precomputed columnar forecast horizon
+"""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional
+from app.services.mmap_store import write_bundle, read_bundle
+
+# Component columns stored per day (see ForecastService._compute_components)
+COLUMNS = (
+    'actual',
+    'prophet', 'prophet_lower', 'prophet_upper',
+    'sarima', 'sarima_lower', 'sarima_upper',
+)
+
+class ForecastTable:
+    """
+    Columnar table of model outputs, one row per calendar day.
+    
+    Rows start at `start` and are contiguous, so a date maps to its row with
+    a single subtraction: lookups are O(1) and slices are O(k).
+    """
+    
+    def __init__(self, start: pd.Timestamp, last_historical: pd.Timestamp,
+                 columns: Dict[str, np.ndarray], model_version: str):
+        self.start = pd.Timestamp(start).normalize()
+        self.last_historical = pd.Timestamp(last_historical)
+        self.columns = columns
+        self.model_version = model_version
+        self.size = len(columns['prophet'])
+        self.end = self.start + pd.Timedelta(days=self.size - 1)
+    
+    def positions(self, dates: pd.DatetimeIndex) -> Optional[np.ndarray]:
+        """Row positions for `dates`, or None if any date is outside the table"""
+        pos = np.asarray((dates.normalize() - self.start).days)
+        if len(pos) == 0 or pos.min() < 0 or pos.max() >= self.size:
+            return None
+        return pos
+    
+    def take(self, dates: pd.DatetimeIndex) -> Optional[Dict[str, np.ndarray]]:
+        """Component arrays for `dates`, or None if not covered"""
+        pos = self.positions(dates)
+        if pos is None:
+            return None
+        return {name: col[pos] for name, col in self.columns.items()}
+    
+    def save(self, path: Path):
+        """Persist the table as a directory of .npy columns (see mmap_store)"""
+        write_bundle(
+            path,
+            self.columns,
+            {
+                'start': self.start.strftime('%Y-%m-%d'),
+                'last_historical': self.last_historical.isoformat(),
+                'model_version': self.model_version
+            }
+        )
+    
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> Optional['ForecastTable']:
+        """
+        Load a persisted table, or None if missing or unreadable
+        
+        With `mmap` the columns stay on disk and are paged in on demand;
+        workers opening the same table share those pages.
+        """
+        try:
+            bundle = read_bundle(path, mmap=mmap)
+            if bundle is None:
+                return None
+            columns, meta = bundle
+            return cls(
+                start=pd.Timestamp(meta['start']),
+                last_historical=pd.Timestamp(meta['last_historical']),
+                columns={name: columns[name] for name in COLUMNS},
+                model_version=meta['model_version']
+            )
+        except Exception as e:
+            print(f"⚠️ Could not load forecast table {path}: {e}")
+            return None
@@ -0,0 +1,152 @@
+"""
+Historical Statistics - Precomputed and incrementally updated sales aggregates
+"""
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Dict, Optional
+
+class _GrowableArray:
+    """Append-only float array with amortized O(1) appends"""
+    
+    def __init__(self, values: np.ndarray):
+        self._buf = np.array(values, dtype=float)
+        self._size = len(self._buf)
+    
+    def append(self, value: float):
+        if self._size == len(self._buf):
+            grown = np.empty(max(16, 2 * len(self._buf)))
+            grown[:self._size] = self._buf[:self._size]
+            self._buf = grown
+        self._buf[self._size] = value
+        self._size += 1
+    
+    @property
+    def values(self) -> np.ndarray:
+        return self._buf[:self._size]
+
+class _RollingWindow:
+    """Mean / variance over the last `size` values (windowed Welford update)"""
+    
+    def __init__(self, size: int, tail: np.ndarray):
+        self.size = size
+        self.window = deque(tail[-size:].tolist(), maxlen=size)
+        self._resync()
+    
+    def _resync(self):
+        # Exact two-pass recompute, once every `size` pushes, so rounding
+        # errors of the running update cannot build up over many appends
+        values = np.fromiter(self.window, dtype=float, count=len(self.window))
+        self.average = float(values.mean()) if len(values) else 0.0
+        self._m2 = float(np.square(values - self.average).sum())
+        self._pushes = 0
+    
+    def push(self, value: float):
+        if len(self.window) == self.size:
+            old, previous = self.window[0], self.average
+            self.window.append(value)
+            self.average += (value - old) / self.size
+            self._m2 += (value - old) * (value - self.average + old - previous)
+        else:
+            self.window.append(value)
+            delta = value - self.average
+            self.average += delta / len(self.window)
+            self._m2 += delta * (value - self.average)
+        self._pushes += 1
+        if self._pushes >= self.size:
+            self._resync()
+    
+    def mean(self) -> float:
+        if len(self.window) < self.size:
+            return np.nan
+        return self.average
+    
+    def std(self) -> float:
+        if len(self.window) < self.size:
+            return np.nan
+        return float(np.sqrt(max(self._m2, 0.0) / (self.size - 1)))
+
+class HistoricalStats:
+    """
+    Sales aggregates used by risk scoring.
+    
+    Global mean/std, the recent (last 30 days) mean and rolling 7/30/90-day
+    mean, std and CV arrays are computed once per data load. `append` folds
+    a new daily value into all of them in O(1) (amortized), so a history
+    that grows by a few days is extended rather than recomputed.
+    """
+    
+    WINDOWS = (7, 30, 90)
+    RECENT_WINDOW = 30
+    
+    def __init__(self, sales: pd.Series):
+        values = sales.to_numpy(dtype=float)
+        self.last_date: Optional[pd.Timestamp] = sales.index[-1] if len(sales) else None
+        
+        # Global aggregates (same reductions as the original per-call pandas code)
+        self.count = len(values)
+        self.mean = float(sales.mean())
+        self.std = float(sales.std())
+        self.recent_mean = float(sales[-self.RECENT_WINDOW:].mean())
+        self._m2 = self.std ** 2 * (self.count - 1) if self.count > 1 else 0.0
+        
+        # Rolling windows as NumPy arrays aligned with the sales index
+        self.rolling: Dict[int, Dict[str, _GrowableArray]] = {}
+        self._windows: Dict[int, _RollingWindow] = {}
+        for w in self.WINDOWS:
+            roll = sales.rolling(window=w)
+            mean = roll.mean().to_numpy()
+            std = roll.std().to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cv = std / mean
+            self.rolling[w] = {
+                'mean': _GrowableArray(mean),
+                'std': _GrowableArray(std),
+                'cv': _GrowableArray(cv)
+            }
+            self._windows[w] = _RollingWindow(w, values)
+        
+        self._recent = _RollingWindow(self.RECENT_WINDOW, values)
+    
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, column: str = 'Sales') -> 'HistoricalStats':
+        return cls(df[column])
+    
+    @property
+    def cv(self) -> float:
+        return self.std / self.mean
+    
+    def window(self, size: int, stat: str) -> np.ndarray:
+        """Rolling `stat` ('mean', 'std' or 'cv') array for a window size"""
+        return self.rolling[size][stat].values
+    
+    def append(self, value: float, date: Optional[pd.Timestamp] = None):
+        """Fold one new daily sales value into every aggregate in O(1)"""
+        value = float(value)
+        
+        # Welford update of global mean / variance
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.std = float(np.sqrt(self._m2 / (self.count - 1))) if self.count > 1 else np.nan
+        
+        self._recent.push(value)
+        self.recent_mean = self._recent.average
+        
+        for w, running in self._windows.items():
+            running.push(value)
+            mean, std = running.mean(), running.std()
+            self.rolling[w]['mean'].append(mean)
+            self.rolling[w]['std'].append(std)
+            self.rolling[w]['cv'].append(std / mean if mean else np.nan)
+        
+        if date is not None:
+            self.last_date = pd.Timestamp(date)
+
+    def extend(self, sales: pd.Series):
+        """Append the days of `sales` after `last_date`, in order"""
+        if self.last_date is not None:
+            sales = sales[sales.index > self.last_date]
+        for date, value in zip(sales.index, sales.to_numpy(dtype=float)):
+            self.append(value, date)
@@ -0,0 +1,137 @@
+"""
+Inference Executor - Run blocking model and client calls off the event loop
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Callable, Dict, Optional
+from app.config import settings
+from app.models.ml_models import model_loader
+
+class ExecutorSaturatedError(Exception):
+    """Raised when a pool already has its maximum number of pending calls"""
+    
+    def __init__(self, pool_name: str, max_pending: int):
+        self.pool_name = pool_name
+        self.max_pending = max_pending
+        super().__init__(f"{pool_name} pool saturated ({max_pending} pending calls)")
+
+class BoundedPool:
+    """
+    Executor wrapper with a queue-depth limit.
+    
+    Calls beyond `max_pending` in flight are rejected immediately with
+    ExecutorSaturatedError instead of queueing without bound.
+    """
+    
+    def __init__(self, name: str, factory: Callable[[], Executor], max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+    
+    @property
+    def executor(self) -> Executor:
+        # Created on first use so importing the app never forks workers
+        if self._executor is None:
+            self._executor = self._factory()
+        return self._executor
+    
+    async def run(self, fn: Callable, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturatedError(self.name, self.max_pending)
+        
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+        except BaseException as e:
+            # Errors, cancellations and dead workers count as failed calls
+            self.failed += 1
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. OOM); replace the pool for the next call
+                self.shutdown(wait=False)
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+    
+    def stats(self) -> Dict:
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+    
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def recycle(self):
+        """Start fresh workers on the next call; in-flight calls finish on the old ones"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+class InferenceExecutor:
+    """
+    Two bounded pools shared by all endpoints:
+    - cpu: process pool for Prophet/SARIMA work (GIL-bound)
+    - io:  thread pool for network clients (LLM, SMTP, Salesforce, XGBoost)
+    """
+    
+    def __init__(self):
+        self.cpu = BoundedPool("cpu", self._make_cpu_executor, settings.INFERENCE_MAX_PENDING_CPU)
+        self.io = BoundedPool("io", self._make_io_executor, settings.INFERENCE_MAX_PENDING_IO)
+    
+    def _make_cpu_executor(self) -> Executor:
+        workers = settings.INFERENCE_PROCESS_WORKERS
+        if workers <= 0:
+            # Process pool disabled: keep CPU work on dedicated threads
+            return ThreadPoolExecutor(max_workers=2, thread_name_prefix="inference-cpu")
+        # Fork so workers inherit already-loaded models and forecast tables.
+        # Workers reset the loader's and forecast service's locks after the
+        # fork and never start builds of their own (see their _after_fork).
+        # Not while the warm-up thread is mid-load: a child forked while it
+        # holds an import lock (model libraries are imported lazily) deadlocks
+        model_loader.wait_for_warm_up()
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    
+    def _make_io_executor(self) -> Executor:
+        return ThreadPoolExecutor(
+            max_workers=settings.INFERENCE_THREAD_WORKERS,
+            thread_name_prefix="inference-io"
+        )
+    
+    async def run_cpu(self, fn: Callable, *args, **kwargs):
+        """Run a CPU-bound callable in the process pool (must be picklable)"""
+        return await self.cpu.run(fn, *args, **kwargs)
+    
+    async def run_io(self, fn: Callable, *args, **kwargs):
+        """Run a blocking I/O-bound callable in the thread pool"""
+        return await self.io.run(fn, *args, **kwargs)
+    
+    def stats(self) -> Dict:
+        return {"cpu": self.cpu.stats(), "io": self.io.stats()}
+    
+    def shutdown(self):
+        self.cpu.shutdown()
+        self.io.shutdown()
+
+inference_executor = InferenceExecutor()
+
+# Process workers hold the models they were forked with: re-fork after a hot swap
+model_loader.add_reload_listener(inference_executor.cpu.recycle)
@@ -0,0 +1,160 @@
+"""
+LLM Cache - Content-addressed on-disk cache for LLM responses
+"""
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from app.config import settings
+
+# Bump when prompt templates change so stale responses are not served
+CACHE_VERSION = 1
+
+def round_significant(value: float, digits: int) -> float:
+    """Round to `digits` significant figures (so nearby predictions share a key)"""
+    value = float(value)
+    if not value or not math.isfinite(value):
+        return value
+    return float(round(value, digits - 1 - int(math.floor(math.log10(abs(value))))))
+
+def make_key(kind: str, fields: Dict) -> str:
+    """Stable sha256 key for a prompt kind and its normalized input fields"""
+    payload = json.dumps({"v": CACHE_VERSION, "kind": kind, "fields": fields}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """
+    SQLite-backed response cache.
+    
+    - Entries expire `ttl_seconds` after they are written.
+    - Reads only read: last access times are kept in memory and written
+      with the next `set` (or every TOUCH_BATCH reads), so a hit never
+      commits. When the cache exceeds `max_entries` or `max_bytes`, least
+      recently used entries are evicted.
+    - WAL with synchronous=NORMAL: commits do not fsync (a crash can lose
+      the last few writes, which are only cached responses).
+    - Hit / miss / eviction counters are kept per process.
+    
+    Calls block on disk I/O; async code runs them in the io pool.
+    """
+    
+    TOUCH_BATCH = 256
+    
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app never touches the disk
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, kind TEXT, value TEXT, size INTEGER, "
+                "created_at REAL, accessed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                # Expired rows are replaced by the next set() or dropped by _evict()
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            self.hits += 1
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touched()
+                self.conn.commit()
+            return row[0]
+    
+    def set(self, key: str, value: str, kind: str = ""):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._flush_touched()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, value, size, now, now)
+            )
+            self._evict(now)
+            self.conn.commit()
+    
+    def _flush_touched(self):
+        """Write pending last access times (caller commits)"""
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+    
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones over the limits"""
+        expired = self.conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        self.expirations += max(expired, 0)
+        
+        count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes
+        }
+
+llm_cache = LLMCache(
+    settings.LLM_CACHE_PATH,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    max_bytes=settings.LLM_CACHE_MAX_MB * 1024 * 1024
+)
@@ -0,0 +1,237 @@
+"""
+LLM Gateway - Async provider calls with limits, coalescing and hedging
+"""
+import asyncio
+import hashlib
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts up to `burst`"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class LLMProvider:
+    """One LLM backend; subclasses implement `complete`"""
+    
+    name = "provider"
+    
+    def __init__(self, rate_per_sec: float = 0, burst: int = 1, timeout: float = 30.0):
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.timeout = timeout
+        self.calls = 0
+        self.failures = 0
+    
+    async def complete(self, prompt: str, system_prompt: str) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, system_prompt: str) -> AsyncIterator[str]:
+        """Text chunks as they arrive (default: the whole completion at once)"""
+        yield await self.complete(prompt, system_prompt)
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+    
+    def __init__(self, client, model: str = "claude-3-sonnet-20240229", max_tokens: int = 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+    
+    async def complete(self, prompt: str, system_prompt: str) -> str:
+        message = await self.client.messages.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            system=system_prompt,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return message.content[0].text
+    
+    async def stream(self, prompt: str, system_prompt: str) -> AsyncIterator[str]:
+        async with self.client.messages.stream(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            system=system_prompt,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+    
+    def __init__(self, client, model: str = "gpt-3.5-turbo", max_tokens: int = 500, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+    
+    async def complete(self, prompt: str, system_prompt: str) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=self.max_tokens
+        )
+        return response.choices[0].message.content.strip()
+    
+    async def stream(self, prompt: str, system_prompt: str) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class LLMGateway:
+    """
+    Async front door for LLM providers (in preference order).
+    
+    - A global semaphore caps in-flight provider calls across the process,
+      and each provider has its own token-bucket rate limit.
+    - Single-flight: concurrent calls with the same prompt share one
+      upstream request.
+    - Hedging: if the preferred provider has not answered within
+      `hedge_delay` seconds, the next provider is started as well and the
+      first successful answer wins. A failure starts the next provider
+      immediately.
+    """
+    
+    def __init__(self, providers: List[LLMProvider], max_concurrency: int = 16, hedge_delay: Optional[float] = 2.0):
+        self.providers = providers
+        self.max_concurrency = max_concurrency
+        self.hedge_delay = hedge_delay
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.hedges = 0
+        self.wins: Dict[str, int] = {p.name: 0 for p in providers}
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily inside the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def complete(self, prompt: str, system_prompt: str) -> Optional[str]:
+        """Answer from the first provider that succeeds, or None if all fail"""
+        if not self.providers:
+            return None
+        
+        self.requests += 1
+        key = hashlib.sha256(f"{system_prompt}\x00{prompt}".encode("utf-8")).hexdigest()
+        shared = self._inflight.get(key)
+        if shared is not None:
+            self.coalesced += 1
+            return await asyncio.shield(shared)
+        
+        task = asyncio.ensure_future(self._hedged(prompt, system_prompt))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _call(self, provider: LLMProvider, prompt: str, system_prompt: str) -> str:
+        async with self.semaphore:
+            await provider.bucket.acquire()
+            provider.calls += 1
+            try:
+                return await asyncio.wait_for(provider.complete(prompt, system_prompt), provider.timeout)
+            except Exception as e:
+                provider.failures += 1
+                print(f"⚠️ {provider.name} API error: {e!r}")
+                raise
+    
+    async def _hedged(self, prompt: str, system_prompt: str) -> Optional[str]:
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        remaining = list(self.providers)
+        
+        def start_next():
+            provider = remaining.pop(0)
+            pending[asyncio.ensure_future(self._call(provider, prompt, system_prompt))] = provider
+        
+        start_next()
+        try:
+            while pending:
+                timeout = self.hedge_delay if remaining and self.hedge_delay is not None else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Preferred provider is slow: fire the next one alongside it
+                    self.hedges += 1
+                    start_next()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        self.wins[provider.name] += 1
+                        return task.result()
+                if remaining:
+                    # Everything that finished failed: fall back right away
+                    start_next()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def stream(self, prompt: str, system_prompt: str) -> AsyncIterator[str]:
+        """
+        Stream text chunks from the first provider that answers. Providers
+        that fail before sending anything fall through to the next one; a
+        failure mid-stream is raised, since part of the answer is already out.
+        """
+        self.requests += 1
+        for provider in self.providers:
+            started = False
+            try:
+                async with self.semaphore:
+                    await provider.bucket.acquire()
+                    provider.calls += 1
+                    async for chunk in provider.stream(prompt, system_prompt):
+                        started = True
+                        yield chunk
+                self.wins[provider.name] += 1
+                return
+            except Exception as e:
+                provider.failures += 1
+                print(f"⚠️ {provider.name} API error: {e!r}")
+                if started:
+                    raise
+    
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "hedges": self.hedges,
+            "inflight": len(self._inflight),
+            "providers": {
+                p.name: {"calls": p.calls, "failures": p.failures, "wins": self.wins[p.name]}
+                for p in self.providers
+            }
+        }
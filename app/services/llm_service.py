@@ -1,10 +1,15 @@
 """
 LLM Service - OpenAI & Anthropic Claude
 """
-import openai
-import anthropic
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Optional, Tuple
 from app.config import settings
+from app.services.inference_executor import inference_executor
+from app.services.llm_cache import llm_cache, make_key, round_significant
+from app.services.llm_gateway import LLMGateway, AnthropicProvider, OpenAIProvider
+
+# Fallback text when no provider answered (never cached)
+LLM_UNAVAILABLE = "LLM Service unavailable. Please check API keys."
+EXPLANATION_SYSTEM_PROMPT = "You are a sales forecasting expert."
 
 class LLMService:
     """LLM explanation and insights service"""
@@ -12,16 +17,70 @@ class LLMService:
     def __init__(self):
         self.openai_client = None
         self.anthropic_client = None
+        providers = []
+        
+        # Anthropic first (preferred), OpenAI as fallback / hedge
+        # SDKs are imported only when configured (they dominate import time)
+        if settings.ANTHROPIC_API_KEY:
+            import anthropic
+            self.anthropic_client = anthropic.AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                base_url=settings.ANTHROPIC_BASE_URL,
+                timeout=settings.LLM_TIMEOUT_SECONDS
+            )
+            providers.append(AnthropicProvider(
+                self.anthropic_client,
+                rate_per_sec=settings.ANTHROPIC_RATE_PER_SEC,
+                burst=settings.LLM_RATE_BURST,
+                timeout=settings.LLM_TIMEOUT_SECONDS
+            ))
         
         if settings.OPENAI_API_KEY:
-            self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+            import openai
+            self.openai_client = openai.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                timeout=settings.LLM_TIMEOUT_SECONDS
+            )
+            providers.append(OpenAIProvider(
+                self.openai_client,
+                rate_per_sec=settings.OPENAI_RATE_PER_SEC,
+                burst=settings.LLM_RATE_BURST,
+                timeout=settings.LLM_TIMEOUT_SECONDS
+            ))
         
-        if settings.ANTHROPIC_API_KEY:
-            self.anthropic_client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.gateway = LLMGateway(
+            providers,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            hedge_delay=settings.LLM_HEDGE_DELAY_SECONDS if settings.LLM_HEDGE_DELAY_SECONDS > 0 else None
+        )
+        self.cache = llm_cache if settings.LLM_CACHE_ENABLED else None
     
-    def generate_explanation(self, forecast: dict, risk: dict) -> str:
+    async def generate_explanation(self, forecast: dict, risk: dict) -> str:
         """Generate explanation using OpenAI or Anthropic"""
+        prompt, cache_key = self._explanation_request(forecast, risk)
+        return await self._cached_call("explanation", cache_key, prompt, system_prompt=EXPLANATION_SYSTEM_PROMPT)
+        
+    async def stream_explanation(self, forecast: dict, risk: dict) -> AsyncIterator[str]:
+        """Stream the explanation text as the provider produces it"""
+        prompt, cache_key = self._explanation_request(forecast, risk)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        async for chunk in self.gateway.stream(prompt, EXPLANATION_SYSTEM_PROMPT):
+            parts.append(chunk)
+            yield chunk
         
+        if not parts:
+            yield LLM_UNAVAILABLE
+        else:
+            await self._cache_set(cache_key, "".join(parts), kind="explanation")
+    
+    def _explanation_request(self, forecast: dict, risk: dict) -> Tuple[str, str]:
+        """Prompt and cache key for a forecast explanation"""
         prompt = f"""
 You are a sales analyst. Explain this forecast concisely:
 
@@ -39,9 +98,18 @@ Provide:
 2. Risk explanation
 3. 3 actionable recommendations
 """
-        return self._call_llm(prompt, system_prompt="You are a sales forecasting expert.")
+        cache_key = make_key("explanation", {
+            "date": str(forecast['date'])[:10],
+            "prediction": round_significant(forecast['ensemble_prediction'], settings.LLM_CACHE_AMOUNT_PRECISION),
+            "risk_level": risk['risk_level'],
+            "risk_score": round(risk['risk_score']),
+            "reliability": risk['reliability'],
+            "deviation": round(risk.get('deviation_from_mean', 0)),
+            "factors": sorted(risk.get('risk_factors', []))
+        })
+        return prompt, cache_key
 
-    def generate_deal_insights(self, opportunity: Dict, risk_data: Dict) -> str:
+    async def generate_deal_insights(self, opportunity: Dict, risk_data: Dict) -> str:
         """
         Feature 3: AI Deal Insights Generator
         Generates analysis + recommendations + email template
@@ -66,39 +134,41 @@ Please provide:
 3. **Outreach Email Draft**: A personalized email template for the customer.
 4. **Competitive Strategy**: Advice on positioning.
 """
-        return self._call_llm(prompt, system_prompt="You are a senior sales strategist and Claude Sonnet 4 expert.")
-
-    def _call_llm(self, prompt: str, system_prompt: str) -> str:
-        """Helper to call available LLM (Prefers Anthropic)"""
+        cache_key = make_key("deal_insights", {
+            "name": opportunity.get('Name'),
+            "amount": round_significant(float(opportunity.get('Amount') or 0), settings.LLM_CACHE_AMOUNT_PRECISION),
+            "stage": opportunity.get('StageName'),
+            "close_date": str(opportunity.get('CloseDate')),
+            "win_probability": round(risk_data['win_probability'] * 100),
+            "risk_category": risk_data['risk_category'],
+            "factors": sorted(risk_data['key_factors'])
+        })
+        return await self._cached_call("deal_insights", cache_key, prompt, system_prompt="You are a senior sales strategist and Claude Sonnet 4 expert.")
+    
+    async def _cached_call(self, kind: str, cache_key: str, prompt: str, system_prompt: str) -> str:
+        """Serve from the response cache, calling the LLM only on a miss"""
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
         
-        # Anthropic (Claude)
-        if self.anthropic_client:
-            try:
-                message = self.anthropic_client.messages.create(
-                    model="claude-3-sonnet-20240229",
-                    max_tokens=1000,
-                    system=system_prompt,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return message.content[0].text
-            except Exception as e:
-                print(f"⚠️ Anthropic API error: {e}")
-
-        # OpenAI (GPT)
-        if self.openai_client:
-            try:
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=500
-                )
-                return response.choices[0].message.content.strip()
-            except Exception as e:
-                print(f"⚠️ OpenAI API error: {e}")
+        text = await self._call_llm(prompt, system_prompt)
+        if text != LLM_UNAVAILABLE:
+            await self._cache_set(cache_key, text, kind=kind)
+        return text
+    
+    # The cache reads and writes SQLite: keep it off the event loop
+    async def _cache_get(self, cache_key: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return await inference_executor.run_io(self.cache.get, cache_key)
+    
+    async def _cache_set(self, cache_key: str, text: str, kind: str):
+        if self.cache is not None:
+            await inference_executor.run_io(self.cache.set, cache_key, text, kind=kind)
 
-        return "LLM Service unavailable. Please check API keys."
+    async def _call_llm(self, prompt: str, system_prompt: str) -> str:
+        """Helper to call available LLM via the gateway (Prefers Anthropic)"""
+        text = await self.gateway.complete(prompt, system_prompt)
+        return text if text is not None else LLM_UNAVAILABLE
 
 llm_service = LLMService()
@@ -0,0 +1,89 @@
+"""
+Memory-mapped array bundles shared across worker processes
+"""
+import json
+import os
+import shutil
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+META_FILE = "meta.json"
+
+def _versions(path: Path) -> List[Path]:
+    """Version directories of the bundle at `path`, oldest first"""
+    return sorted(path.parent.glob(f"{path.name}.v*"), key=lambda version: version.name)
+
+def _current(path: Path) -> Optional[Path]:
+    """Directory the pointer at `path` selects (a directory `path` is a legacy bundle)"""
+    if path.is_dir():
+        return path
+    try:
+        version = path.read_text().strip()
+    except FileNotFoundError:
+        return None
+    return path.with_name(version) if version else None
+
+def write_bundle(path: Path, arrays: Dict[str, np.ndarray], meta: Dict):
+    """
+    Persist named arrays as one .npy file each plus a JSON metadata file
+    
+    Each write goes to a new version directory next to `path`
+    (<name>.v<time_ns>-<pid>). `path` itself is a pointer file holding the
+    current version's name, switched with os.replace like the model
+    registry's CURRENT file, so readers see the old bundle or the new one
+    and never a mix. Older versions are removed afterwards; processes that
+    already mapped their files keep them until they unmap.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir()
+    for name, array in arrays.items():
+        np.save(tmp_path / f"{name}.npy", np.ascontiguousarray(array))
+    with open(tmp_path / META_FILE, "w") as f:
+        json.dump({**meta, "arrays": list(arrays)}, f)
+    
+    version = path.with_name(f"{path.name}.v{time.time_ns():020d}-{os.getpid()}")
+    tmp_path.rename(version)
+    current = _current(path)
+    if current is not None and current != path and current.name > version.name and current.exists():
+        # A concurrent writer already published a newer version
+        shutil.rmtree(version, ignore_errors=True)
+        return
+    
+    if path.is_dir():
+        # Bundle directory from before pointer files
+        shutil.rmtree(path, ignore_errors=True)
+    pointer = path.with_name(f"{path.name}.pointer{os.getpid()}")
+    pointer.write_text(version.name + "\n")
+    os.replace(pointer, path)
+    
+    current = _current(path)
+    for old in _versions(path):
+        if old.name < version.name and old != current:
+            shutil.rmtree(old, ignore_errors=True)
+
+def read_bundle(path: Path, mmap: bool = True) -> Optional[Tuple[Dict[str, np.ndarray], Dict]]:
+    """
+    Open a bundle written by `write_bundle`, or None if missing
+    
+    With `mmap` the arrays are read-only views onto the files: every
+    process opening the same bundle shares one copy in the page cache
+    instead of holding its own.
+    """
+    mode = "r" if mmap else None
+    for _ in range(3):
+        current = _current(path)
+        if current is None:
+            return None
+        try:
+            with open(current / META_FILE) as f:
+                meta = json.load(f)
+            arrays = {name: np.load(current / f"{name}.npy", mmap_mode=mode) for name in meta.pop("arrays")}
+        except FileNotFoundError:
+            # Removed after a newer version was published: follow the pointer again
+            continue
+        return arrays, meta
+    return None
@@ -0,0 +1,483 @@
+"""
+Multi-Series Forecasting - Hierarchical ensemble forecasts per store/region/category
+
+The panel (settings.MULTI_SERIES_DATA_PATH) is a long-format CSV with a
+date column, one column per hierarchy level and a value column:
+
+    date,region,store,category,Sales
+    2018-01-01,West,Store 12,Furniture,812.5
+
+Every bottom series (and, unless reconciling bottom-up, every aggregate)
+gets its own Prophet + SARIMA ensemble with the production settings. Fits
+run in a forked process pool; workers pull small batches of series from
+a shared queue as they finish, so uneven fit times balance out across
+workers. Base forecasts are then reconciled up the hierarchy (see
+app/models/hierarchy.py) and persisted under CACHE_DIR, keyed on the
+panel's checksum.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from statistics import NormalDist
+from typing import Dict, List, Optional
+from app.config import settings
+from app.models.hierarchy import Hierarchy, METHODS
+from app.models.ml_models import model_loader
+from app.models.registry import file_checksum
+from app.services.mmap_store import write_bundle, read_bundle
+
+class SeriesNotReadyError(Exception):
+    """Raised while the series forecasts are still being fitted"""
+
+# ==================== Per-series fit ====================
+
+def fit_series(values: np.ndarray, dates: pd.DatetimeIndex, horizon: int, config: Dict) -> Dict[str, np.ndarray]:
+    """
+    Fit the Prophet + SARIMA ensemble to one daily series
+    
+    Returns:
+        dict with 'mean', 'lower', 'upper' (horizon days after the last
+        date), 'residuals' (in-sample ensemble errors, NaN where SARIMA has
+        no one-step prediction yet) and 'fallback' (True if a model failed
+        and a weekly seasonal naive forecast was used instead)
+    """
+    try:
+        return _fit_ensemble(values, dates, horizon, config)
+    except Exception:
+        return _fit_seasonal_naive(values, horizon, config)
+
+def _quiet_fit_logs():
+    for name in ('prophet', 'cmdstanpy'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+def _fit_ensemble(values, dates, horizon, config):
+    from prophet import Prophet
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    from app.models.prophet_scorer import ProphetScorer
+    from app.models.sarima_forecaster import SARIMAForecaster
+    _quiet_fit_logs()
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        prophet = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=True,
+            daily_seasonality=False,
+            interval_width=config['interval_width']
+        )
+        prophet.fit(pd.DataFrame({'ds': dates, 'y': values}))
+        sarima = SARIMAForecaster.from_results(SARIMAX(
+            values,
+            order=config['order'],
+            seasonal_order=config['seasonal_order'],
+            enforce_stationarity=False,
+            enforce_invertibility=False
+        ).fit(disp=False, maxiter=200))
+    
+    future = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    prophet_mean, prophet_lower, prophet_upper = ProphetScorer.from_model(prophet).predict(dates.append(future))
+    sarima_mean, sarima_lower, sarima_upper = sarima.forecast(horizon, alpha=1 - config['interval_width'])
+    
+    w_prophet, w_sarima = config['weights']
+    n = len(values)
+    fitted = w_prophet * prophet_mean[:n] + w_sarima * sarima.fitted
+    residuals = values - fitted
+    residuals[:config['burn_in']] = np.nan
+    return {
+        'mean': w_prophet * prophet_mean[n:] + w_sarima * sarima_mean,
+        'lower': w_prophet * prophet_lower[n:] + w_sarima * sarima_lower,
+        'upper': w_prophet * prophet_upper[n:] + w_sarima * sarima_upper,
+        'residuals': residuals,
+        'fallback': False,
+    }
+
+def _fit_seasonal_naive(values, horizon, config):
+    values = np.asarray(values, dtype=float)
+    residuals = np.full(len(values), np.nan)
+    residuals[7:] = values[7:] - values[:-7]
+    scale = np.nanstd(residuals) if len(values) > 8 else 0.0
+    weeks = np.arange(horizon) // 7 + 1
+    mean = np.resize(values[-7:], horizon) if len(values) >= 7 else np.full(horizon, values.mean())
+    half_width = NormalDist().inv_cdf(0.5 + config['interval_width'] / 2) * scale * np.sqrt(weeks)
+    return {'mean': mean, 'lower': mean - half_width, 'upper': mean + half_width, 'residuals': residuals, 'fallback': True}
+
+# Panel shared with the fit workers: set before the pool forks, so each
+# worker inherits it instead of receiving a pickled copy
+_FIT_STATE = None
+
+def _fit_rows(rows: List[int]):
+    values, dates, horizon, config = _FIT_STATE
+    results = []
+    for row in rows:
+        start = time.perf_counter()
+        result = fit_series(values[row], dates, horizon, config)
+        result['seconds'] = time.perf_counter() - start
+        results.append((row, result))
+    return results
+
+# ==================== Results ====================
+
+ARRAYS = ('base_mean', 'base_lower', 'base_upper', 'mean', 'lower', 'upper', 'fitted', 'fallback')
+
+class HierarchicalForecast:
+    """
+    Base and reconciled forecasts for every node of a hierarchy
+    
+    Arrays are n_nodes x horizon in Hierarchy order (aggregates, then
+    bottom series). Base rows of nodes that were not fitted (aggregates
+    under bottom_up) are NaN; `fitted` and `fallback` flag each node.
+    """
+    
+    def __init__(self, hierarchy: Hierarchy, start: pd.Timestamp, arrays: Dict[str, np.ndarray], meta: Dict):
+        self.hierarchy = hierarchy
+        self.start = pd.Timestamp(start)
+        self.arrays = arrays
+        self.meta = meta
+        self.horizon = arrays['mean'].shape[1]
+    
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.date_range(self.start, periods=self.horizon, freq='D')
+    
+    def save(self, path: Path):
+        keys = self.hierarchy.keys.iloc[self.hierarchy.n_aggregates:]
+        write_bundle(
+            path,
+            self.arrays,
+            {
+                **self.meta,
+                'start': self.start.strftime('%Y-%m-%d'),
+                'levels': self.hierarchy.levels,
+                'bottom_keys': keys.to_numpy().tolist(),
+            }
+        )
+    
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> Optional['HierarchicalForecast']:
+        try:
+            bundle = read_bundle(path, mmap=mmap)
+            if bundle is None:
+                return None
+            arrays, meta = bundle
+            levels = meta.pop('levels')
+            hierarchy = Hierarchy(levels, pd.DataFrame(meta.pop('bottom_keys'), columns=levels))
+            return cls(hierarchy, meta.pop('start'), {name: arrays[name] for name in ARRAYS}, meta)
+        except Exception as e:
+            print(f"⚠️ Could not load series forecasts {path}: {e}")
+            return None
+
+# ==================== Service ====================
+
+class MultiSeriesService:
+    """Fits, reconciles and pages through per-series forecasts"""
+    
+    def __init__(self, data_path=None):
+        self.data_path = Path(data_path or settings.MULTI_SERIES_DATA_PATH)
+        self.levels = [level.strip() for level in settings.MULTI_SERIES_LEVELS.split(",") if level.strip()]
+        self.result: Optional[HierarchicalForecast] = None
+        self._lock = threading.Lock()
+        self._job_thread = None
+        self._job = {'state': 'idle'}
+    
+    def __reduce__(self):
+        # Pickle by reference so bound methods can be sent to worker processes
+        return (_get_multi_series_service, ())
+    
+    @property
+    def available(self) -> bool:
+        return self.data_path.exists()
+    
+    def load_panel(self) -> pd.DataFrame:
+        if not self.available:
+            raise FileNotFoundError(f"Multi-series dataset not found: {self.data_path}")
+        return pd.read_csv(self.data_path, parse_dates=['date'])
+    
+    # ==================== Fitting ====================
+    
+    def _fit_config(self) -> Dict:
+        ensemble_config, _ = model_loader.get_config()
+        order = tuple(ensemble_config.get('sarima_order', (0, 1, 1)))
+        seasonal_order = tuple(ensemble_config.get('sarima_seasonal_order', (0, 0, 0, 0)))
+        return {
+            'order': order,
+            'seasonal_order': seasonal_order,
+            'weights': (settings.WEIGHT_PROPHET, settings.WEIGHT_SARIMA),
+            'interval_width': 0.95,
+            # SARIMA's first one-step predictions are from the diffuse prior
+            'burn_in': 1 + order[1] + seasonal_order[1] * seasonal_order[3],
+        }
+    
+    def fit(self, panel: pd.DataFrame, method: str = None, horizon: int = None,
+            workers: int = None, batch_size: int = None, config: Dict = None, progress=None) -> HierarchicalForecast:
+        """
+        Fit every series of a long-format panel and reconcile the forecasts
+        
+        Args:
+            panel: Columns 'date', the level columns and the value column;
+                missing days count as zero
+            method: Reconciliation method (see hierarchy.METHODS)
+            horizon: Days to forecast after the panel's last date
+            workers: Fit processes (<= 1 fits in this process)
+            batch_size: Series per task pulled by a worker
+            config: Per-series model settings (defaults to _fit_config())
+            progress: Optional callback(done, total)
+        """
+        method = method or settings.MULTI_SERIES_RECONCILIATION
+        if method not in METHODS:
+            raise ValueError(f"Unknown reconciliation method '{method}' (use one of {', '.join(METHODS)})")
+        horizon = horizon or settings.MULTI_SERIES_HORIZON_DAYS
+        workers = settings.MULTI_SERIES_WORKERS if workers is None else workers
+        batch_size = batch_size or settings.MULTI_SERIES_BATCH_SIZE
+        config = config or self._fit_config()
+        
+        wide = panel.pivot_table(
+            index=self.levels, columns='date', values=settings.MULTI_SERIES_VALUE, aggfunc='sum'
+        )
+        dates = pd.date_range(wide.columns.min(), wide.columns.max(), freq='D')
+        wide = wide.reindex(columns=dates).fillna(0.0)
+        hierarchy = Hierarchy(self.levels, wide.index.to_frame(index=False))
+        values = hierarchy.aggregate(wide.to_numpy(dtype=float))
+        
+        # Bottom-up only needs the bottom series' base forecasts
+        rows = list(range(hierarchy.n_aggregates if method == 'bottom_up' else 0, hierarchy.n))
+        n, T = hierarchy.n, len(dates)
+        base = {name: np.full((n, horizon), np.nan) for name in ('mean', 'lower', 'upper')}
+        residuals = np.full((T, n), np.nan)
+        fitted = np.zeros(n, dtype=bool)
+        fallback = np.zeros(n, dtype=bool)
+        fit_seconds = 0.0
+        
+        global _FIT_STATE
+        started = time.perf_counter()
+        _FIT_STATE = (values, dates, horizon, config)
+        try:
+            batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+            if workers <= 1:
+                completed = map(_fit_rows, batches)
+                executor = None
+            else:
+                # Import the model libraries before forking (see inference_executor)
+                model_loader.wait_for_warm_up()
+                import prophet, statsmodels.tsa.statespace.sarimax  # noqa: F401
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("fork" if "fork" in methods else None)
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                completed = (future.result() for future in as_completed(
+                    [executor.submit(_fit_rows, batch) for batch in batches]
+                ))
+            done = 0
+            try:
+                for results in completed:
+                    for row, result in results:
+                        for name in base:
+                            base[name][row] = result[name]
+                        residuals[:, row] = result['residuals']
+                        fitted[row] = True
+                        fallback[row] = result['fallback']
+                        fit_seconds += result['seconds']
+                    done += len(results)
+                    if progress is not None:
+                        progress(done, len(rows))
+            finally:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+        finally:
+            _FIT_STATE = None
+        wall_seconds = time.perf_counter() - started
+        
+        mean = hierarchy.reconcile(base['mean'], method, residuals)
+        lower_width, upper_width = base['mean'] - base['lower'], base['upper'] - base['mean']
+        if method == 'bottom_up':
+            # Aggregates have no base interval: combine bottom widths assuming independent errors
+            n_a = hierarchy.n_aggregates
+            lower_width[:n_a] = np.sqrt(hierarchy.aggregation @ lower_width[n_a:] ** 2)
+            upper_width[:n_a] = np.sqrt(hierarchy.aggregation @ upper_width[n_a:] ** 2)
+        
+        return HierarchicalForecast(
+            hierarchy,
+            dates[-1] + pd.Timedelta(days=1),
+            {
+                'base_mean': base['mean'], 'base_lower': base['lower'], 'base_upper': base['upper'],
+                'mean': mean, 'lower': mean - lower_width, 'upper': mean + upper_width,
+                'fitted': fitted, 'fallback': fallback,
+            },
+            {
+                'method': method,
+                'history_start': dates[0].strftime('%Y-%m-%d'),
+                'history_end': dates[-1].strftime('%Y-%m-%d'),
+                'series_fitted': len(rows),
+                'fallbacks': int(fallback.sum()),
+                'workers': max(workers, 1),
+                'batch_size': batch_size,
+                'wall_seconds': round(wall_seconds, 3),
+                'fit_seconds': round(fit_seconds, 3),
+                'fitted_at': datetime.now().isoformat(timespec='seconds'),
+            }
+        )
+    
+    def _result_path(self, checksum: str, method: str) -> Path:
+        return settings.CACHE_DIR / f"series_forecasts_{checksum[:16]}_{method}_{settings.MULTI_SERIES_HORIZON_DAYS}"
+    
+    def refit(self, method: str = None) -> HierarchicalForecast:
+        """Fit the configured panel, persist the result and start serving it"""
+        method = method or settings.MULTI_SERIES_RECONCILIATION
+        checksum = file_checksum(self.data_path)
+        path = self._result_path(checksum, method)
+        
+        def progress(done, total):
+            self._job.update(done=done, total=total)
+        
+        result = self.fit(self.load_panel(), method=method, progress=progress)
+        result.meta['data_checksum'] = checksum
+        try:
+            result.save(path)
+            if settings.SHARED_DATA_MODE == "mmap":
+                result = HierarchicalForecast.load(path) or result
+        except OSError as e:
+            print(f"⚠️ Could not persist series forecasts: {e}")
+        self.result = result
+        print(f"✅ Series forecasts fitted ({result.meta['series_fitted']} series, {result.meta['wall_seconds']}s)")
+        return result
+    
+    def start_background_fit(self, method: str = None) -> Dict:
+        """Refit on a daemon thread (no-op if a fit is running)"""
+        if method is not None and method not in METHODS:
+            raise ValueError(f"Unknown reconciliation method '{method}' (use one of {', '.join(METHODS)})")
+        if not self.available:
+            raise FileNotFoundError(f"Multi-series dataset not found: {self.data_path}")
+        with self._lock:
+            if self._job_thread is not None and self._job_thread.is_alive():
+                return self.status()
+            
+            def run():
+                try:
+                    self.refit(method)
+                    self._job.update(state='done', finished_at=datetime.now().isoformat(timespec='seconds'))
+                except Exception as e:
+                    print(f"⚠️ Series fit failed: {e}")
+                    self._job.update(state='failed', error=str(e))
+            
+            self._job = {
+                'state': 'running',
+                'method': method or settings.MULTI_SERIES_RECONCILIATION,
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+                'done': 0,
+                'total': None,
+            }
+            self._job_thread = threading.Thread(target=run, name="multi-series-fit", daemon=True)
+            self._job_thread.start()
+            return self.status()
+    
+    def status(self) -> Dict:
+        result = self.result
+        return {
+            'dataset': str(self.data_path),
+            'available': self.available,
+            'job': dict(self._job),
+            'result': None if result is None else {
+                **result.meta,
+                'series': result.hierarchy.n,
+                'horizon': result.horizon,
+            },
+        }
+    
+    def get_result(self) -> HierarchicalForecast:
+        """
+        Forecasts for the configured panel and reconciliation method
+        
+        Loads a persisted result for the current panel if there is one,
+        otherwise starts a background fit and raises SeriesNotReadyError.
+        """
+        if self.result is not None:
+            return self.result
+        if not self.available:
+            raise FileNotFoundError(f"Multi-series dataset not found: {self.data_path}")
+        with self._lock:
+            if self.result is None:
+                path = self._result_path(file_checksum(self.data_path), settings.MULTI_SERIES_RECONCILIATION)
+                self.result = HierarchicalForecast.load(path, mmap=settings.SHARED_DATA_MODE == "mmap")
+        if self.result is None:
+            self.start_background_fit()
+            raise SeriesNotReadyError("Series forecasts are being fitted, retry later")
+        return self.result
+    
+    # ==================== Queries ====================
+    
+    def _select(self, result: HierarchicalForecast, level: Optional[str]) -> np.ndarray:
+        hierarchy = result.hierarchy
+        if level is None:
+            return np.arange(hierarchy.n)
+        if level not in hierarchy.level_names:
+            raise ValueError(f"Unknown level '{level}' (use one of {', '.join(hierarchy.level_names)})")
+        return np.flatnonzero(hierarchy.node_levels == level)
+    
+    def _series(self, result: HierarchicalForecast, row: int, with_forecast: bool) -> Dict:
+        hierarchy = result.hierarchy
+        keys = hierarchy.keys.iloc[row]
+        series = {
+            'series_id': hierarchy.ids[row],
+            'level': str(hierarchy.node_levels[row]),
+            'keys': {level: keys[level] for level in hierarchy.levels if isinstance(keys[level], str)},
+            'n_bottom': int(hierarchy.sizes[row]),
+        }
+        if with_forecast:
+            arrays = result.arrays
+            series.update(
+                fallback=bool(arrays['fallback'][row]),
+                forecast=np.round(arrays['mean'][row], 2).tolist(),
+                lower=np.round(np.maximum(arrays['lower'][row], 0), 2).tolist(),
+                upper=np.round(arrays['upper'][row], 2).tolist(),
+                base_forecast=np.round(arrays['base_mean'][row], 2).tolist() if arrays['fitted'][row] else None,
+            )
+        return series
+    
+    def _page(self, level, page, page_size, with_forecast) -> Dict:
+        if page < 1 or not 1 <= page_size <= settings.MULTI_SERIES_MAX_PAGE_SIZE:
+            raise ValueError(f"page must be >= 1 and page_size between 1 and {settings.MULTI_SERIES_MAX_PAGE_SIZE}")
+        result = self.get_result()
+        rows = self._select(result, level)
+        selected = rows[(page - 1) * page_size:page * page_size]
+        response = {
+            'level': level,
+            'page': page,
+            'page_size': page_size,
+            'total': len(rows),
+            'pages': -(-len(rows) // page_size),
+            'method': result.meta['method'],
+        }
+        if with_forecast:
+            response['dates'] = [date.strftime('%Y-%m-%d') for date in result.dates]
+        response['results'] = [self._series(result, row, with_forecast) for row in selected.tolist()]
+        return response
+    
+    def list_series(self, level: str = None, page: int = 1, page_size: int = 100) -> Dict:
+        """Series ids and keys, optionally for one level"""
+        return self._page(level, page, page_size, with_forecast=False)
+    
+    def get_forecasts(self, level: str = None, page: int = 1, page_size: int = 100) -> Dict:
+        """Reconciled forecasts for a page of series"""
+        return self._page(level, page, page_size, with_forecast=True)
+    
+    def get_series(self, series_id: str) -> Dict:
+        """Reconciled forecast of one series (KeyError if unknown)"""
+        result = self.get_result()
+        row = result.hierarchy.index.get(series_id)
+        if row is None:
+            raise KeyError(f"Unknown series '{series_id}'")
+        return {
+            'dates': [date.strftime('%Y-%m-%d') for date in result.dates],
+            'method': result.meta['method'],
+            **self._series(result, row, with_forecast=True),
+        }
+
+def _get_multi_series_service():
+    return multi_series_service
+
+multi_series_service = MultiSeriesService()
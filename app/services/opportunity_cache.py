@@ -0,0 +1,110 @@
+"""
+Opportunity Cache - Local SQLite copy of synced Salesforce opportunities
+"""
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from app.config import settings
+
+# Opportunity fields mirrored locally (also the SOQL select list for syncs)
+OPPORTUNITY_FIELDS = (
+    'Id', 'Name', 'Amount', 'StageName', 'CloseDate', 'CreatedDate',
+    'Probability', 'OwnerId', 'IsClosed', 'SystemModstamp',
+)
+
+class OpportunityCache:
+    """
+    Upsert-only opportunity table plus one SystemModstamp watermark per
+    sync scope, so repeat syncs only need to fetch records modified since
+    the previous run.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app never touches the disk
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = ", ".join(f"{name} {'TEXT PRIMARY KEY' if name == 'Id' else ''}".strip() for name in OPPORTUNITY_FIELDS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS opportunities ({columns})")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_opportunities_close ON opportunities (CloseDate)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                "scope TEXT PRIMARY KEY, watermark TEXT, last_synced_at TEXT, records INTEGER)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def get_watermark(self, scope: str) -> Optional[str]:
+        """Highest SystemModstamp seen by the last sync of `scope`"""
+        with self._lock:
+            row = self.conn.execute("SELECT watermark FROM sync_state WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else None
+    
+    def set_watermark(self, scope: str, watermark: Optional[str], records: int):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO sync_state (scope, watermark, last_synced_at, records) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(scope) DO UPDATE SET watermark = excluded.watermark, "
+                "last_synced_at = excluded.last_synced_at, records = sync_state.records + excluded.records",
+                (scope, watermark, datetime.now(timezone.utc).isoformat(), records)
+            )
+            self.conn.commit()
+    
+    def upsert(self, records: Iterable[Dict]) -> int:
+        """Insert or replace a page of records; returns the number written"""
+        rows = [
+            tuple(_to_sql(record.get(name)) for name in OPPORTUNITY_FIELDS)
+            for record in records
+        ]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" for _ in OPPORTUNITY_FIELDS)
+        with self._lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO opportunities ({', '.join(OPPORTUNITY_FIELDS)}) VALUES ({placeholders})",
+                rows
+            )
+            self.conn.commit()
+        return len(rows)
+    
+    def query(self, start_date: str = None, end_date: str = None) -> List[Dict]:
+        """Cached opportunities with start_date <= CloseDate <= end_date"""
+        sql = f"SELECT {', '.join(OPPORTUNITY_FIELDS)} FROM opportunities WHERE 1 = 1"
+        params = []
+        if start_date:
+            sql += " AND CloseDate >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND CloseDate <= ?"
+            params.append(end_date)
+        with self._lock:
+            rows = self.conn.execute(sql + " ORDER BY CloseDate", params).fetchall()
+        return [dict(zip(OPPORTUNITY_FIELDS, row)) for row in rows]
+    
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM opportunities").fetchone()[0]
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+def _to_sql(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return str(value)
+    return value
+
+opportunity_cache = OpportunityCache(settings.OPPORTUNITY_CACHE_PATH)
@@ -0,0 +1,46 @@
+"""
+Retrain Service - Runs app.models.retrain as a background job
+"""
+import threading
+from datetime import datetime
+from typing import Dict
+from app.models.retrain import retrain, read_history, RetrainRejected
+
+class RetrainService:
+    """One retrain job at a time on a daemon thread, plus past runs"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._job = {'state': 'idle'}
+    
+    def start(self, **options) -> Dict:
+        """Start a retrain (options as for retrain()); no-op if one is running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self.status()
+            
+            def run():
+                try:
+                    report = retrain(**options)
+                    self._job.update(state='published', version=report['version'], wall_seconds=report['wall_seconds'])
+                except RetrainRejected as e:
+                    self._job.update(state='rejected', error=str(e), wall_seconds=e.report.get('wall_seconds'))
+                except Exception as e:
+                    print(f"⚠️ Retrain failed: {e}")
+                    self._job.update(state='failed', error=str(e))
+                self._job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            
+            self._job = {
+                'state': 'running',
+                'options': options,
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._thread = threading.Thread(target=run, name="model-retrain", daemon=True)
+            self._thread.start()
+            return self.status()
+    
+    def status(self, history: int = 10) -> Dict:
+        return {'job': dict(self._job), 'history': read_history(history)}
+
+retrain_service = RetrainService()
@@ -0,0 +1,123 @@
+"""
+Risk Analysis Store - Indexed, cached view of risk_analysis.csv
+"""
+import json
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+
+# Output column names expected by the dashboard
+COLUMN_RENAMES = {'Order Date': 'date', 'Sales': 'forecast_value'}
+
+class RiskAnalysisStore:
+    """
+    Loads the risk analysis CSV once into date-sorted typed columns.
+    
+    - Dates are kept as a sorted array of 'YYYY-MM-DD' strings, so a range
+      query is two binary searches plus a slice: O(log n + k).
+    - Integer columns are downcast and text columns stored as categoricals.
+    - The file is re-read only when its mtime changes.
+    - Serialized JSON for recently requested ranges is cached.
+    """
+    
+    JSON_CACHE_SIZE = 32
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.dates = np.array([], dtype=str)
+        self.columns: Dict[str, object] = {}
+        self._json_cache: OrderedDict = OrderedDict()
+    
+    def _ensure_loaded(self) -> bool:
+        """(Re)load the CSV if it changed on disk; False if it does not exist"""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return True
+        
+        with self._lock:
+            if mtime == self._mtime:
+                return True
+            
+            df = pd.read_csv(self.path).rename(columns=COLUMN_RENAMES)
+            df['date'] = df['date'].astype(str)
+            df = df.sort_values('date', kind='stable').reset_index(drop=True)
+            
+            columns = {}
+            for name in df.columns:
+                if name == 'date':
+                    continue
+                col = df[name]
+                if pd.api.types.is_integer_dtype(col):
+                    columns[name] = pd.to_numeric(col, downcast='integer').to_numpy()
+                elif pd.api.types.is_float_dtype(col):
+                    columns[name] = col.to_numpy(dtype=float)
+                else:
+                    columns[name] = pd.Categorical(col.astype(str))
+            
+            self.dates = df['date'].to_numpy(dtype=str)
+            self.columns = columns
+            self._json_cache.clear()
+            self._mtime = mtime
+        return True
+    
+    @property
+    def last_date(self) -> Optional[str]:
+        self._ensure_loaded()
+        return str(self.dates[-1]) if len(self.dates) else None
+    
+    def _bounds(self, start_date: Optional[str], end_date: Optional[str]) -> Tuple[int, int]:
+        lo = int(np.searchsorted(self.dates, start_date, side='left')) if start_date else 0
+        hi = int(np.searchsorted(self.dates, end_date, side='right')) if end_date else len(self.dates)
+        return lo, max(lo, hi)
+    
+    def query(self, start_date: str = None, end_date: str = None, descending: bool = False) -> List[Dict]:
+        """Records with start_date <= date <= end_date"""
+        if not self._ensure_loaded():
+            return []
+        
+        lo, hi = self._bounds(start_date, end_date)
+        if hi == lo:
+            return []
+        order = slice(hi - 1, lo - 1 if lo > 0 else None, -1) if descending else slice(lo, hi)
+        
+        names = ['date'] + list(self.columns)
+        values = [self.dates[order].tolist()]
+        for col in self.columns.values():
+            if isinstance(col, pd.Categorical):
+                values.append(np.asarray(col.categories)[col.codes[order]].tolist())
+            else:
+                values.append(col[order].tolist())
+        
+        return [dict(zip(names, row)) for row in zip(*values)]
+    
+    def query_json(self, start_date: str = None, end_date: str = None, descending: bool = True) -> bytes:
+        """Pre-serialized JSON array for a range (cached per range)"""
+        if not self._ensure_loaded():
+            return b"[]"
+        
+        key = (start_date, end_date, descending)
+        cached = self._json_cache.get(key)
+        if cached is not None:
+            self._json_cache.move_to_end(key)
+            return cached
+        
+        payload = dumps_json(self.query(start_date, end_date, descending))
+        self._json_cache[key] = payload
+        if len(self._json_cache) > self.JSON_CACHE_SIZE:
+            self._json_cache.popitem(last=False)
+        return payload
+
+def dumps_json(data) -> bytes:
+    """Serialize like FastAPI's JSONResponse"""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+risk_analysis_store = RiskAnalysisStore(settings.RISK_ANALYSIS_PATH)
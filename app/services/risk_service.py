@@ -1,13 +1,44 @@
 """
 Risk Assessment Service
 """
+import copy
+import numpy as np
 from app.models.ml_models import model_loader
+from app.services.historical_stats import HistoricalStats
 
 class RiskService:
     """Risk assessment service"""
     
     def __init__(self):
-        self.historical_data = model_loader.get_historical_data()
+        self._stats = None
+        self._stats_source = None
+    
+    def __reduce__(self):
+        # Pickle by reference so bound methods can be sent to worker processes
+        return (_get_risk_service, ())
+    
+    @property
+    def historical_data(self):
+        return model_loader.get_historical_data()
+    
+    @property
+    def stats(self) -> HistoricalStats:
+        """
+        Aggregates over the historical data, updated once per data load
+        
+        A reload whose history only adds days after the previous one (e.g.
+        a retrain on newly exported sales) appends those days to a copy of
+        the current stats; anything else rebuilds them.
+        """
+        data = self.historical_data
+        if self._stats is None or self._stats_source is not data:
+            stats = None
+            if self._stats is not None and _extends(self._stats_source, data):
+                stats = copy.deepcopy(self._stats)
+                stats.extend(data['Sales'].iloc[len(self._stats_source):])
+            self._stats = stats or HistoricalStats.from_dataframe(data)
+            self._stats_source = data
+        return self._stats
     
     def assess_risk(self, forecast_value: float, date: str, confidence_interval: dict = None) -> dict:
         """
@@ -21,94 +52,130 @@ class RiskService:
         Returns:
             Risk assessment dict
         """
-        hist_sales = self.historical_data['Sales']
-        hist_mean = hist_sales.mean()
-        hist_std = hist_sales.std()
-        recent_mean = hist_sales[-30:].mean()
+        ci_lower = ci_upper = None
+        if confidence_interval:
+            ci_lower = [confidence_interval['lower']]
+            ci_upper = [confidence_interval['upper']]
+        return self.assess_risk_batch([forecast_value], [date], ci_lower, ci_upper)[0]
+    
+    def assess_risk_batch(self, values, dates, ci_lower=None, ci_upper=None) -> list:
+        """
+        Assess risk for many forecasts in one vectorized pass
         
-        # Deviations
-        deviation_pct = ((forecast_value - hist_mean) / hist_mean) * 100
-        recent_deviation_pct = ((forecast_value - recent_mean) / recent_mean) * 100
+        Args:
+            values: Predicted sales (array-like)
+            dates: Date strings, same length as values
+            ci_lower / ci_upper: Optional CI bounds; NaN marks a row without CI
         
-        # CI width
-        ci_width_pct = None
-        if confidence_interval:
-            ci_range = confidence_interval['upper'] - confidence_interval['lower']
-            ci_width_pct = (ci_range / forecast_value) * 100
+        Returns:
+            List of risk assessment dicts (same shape as assess_risk)
+        """
+        stats = self.stats
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Deviations
+            deviation_pct = ((values - stats.mean) / stats.mean) * 100
+            recent_deviation_pct = ((values - stats.recent_mean) / stats.recent_mean) * 100
+            
+            # CI width
+            ci_width_pct = np.full(n, np.nan)
+            if ci_lower is not None and ci_upper is not None:
+                ci_range = np.asarray(ci_upper, dtype=float) - np.asarray(ci_lower, dtype=float)
+                ci_width_pct = (ci_range / values) * 100
+        
+        abs_dev = np.abs(deviation_pct)
+        large_dev = abs_dev > 50
+        trend_dev = np.abs(recent_deviation_pct) > 30
+        wide_ci = ci_width_pct > 100
+        cv = stats.cv
+        high_volatility = cv > 1.0
         
         # Calculate risk score
-        risk_score = 0
-        factors = []
-        
-        # Large deviation
-        if abs(deviation_pct) > 50:
-            risk_score += 30
-            factors.append(f"Large deviation from mean ({deviation_pct:+.1f}%)")
-        elif abs(deviation_pct) > 25:
-            risk_score += 15
-        
-        # Recent trend deviation
-        if abs(recent_deviation_pct) > 30:
-            risk_score += 25
-            factors.append(f"Deviates from recent trend ({recent_deviation_pct:+.1f}%)")
-        
-        # Wide CI
-        if ci_width_pct and ci_width_pct > 100:
-            risk_score += 30
-            factors.append(f"Wide confidence interval ({ci_width_pct:.0f}%)")
-        elif ci_width_pct and ci_width_pct > 50:
-            risk_score += 15
-        
-        # Volatility
-        cv = hist_std / hist_mean
-        if cv > 1.0:
-            risk_score += 15
-            factors.append(f"High volatility (CV={cv:.2f})")
+        risk_score = (
+            np.where(large_dev, 30, np.where(abs_dev > 25, 15, 0))
+            + np.where(trend_dev, 25, 0)
+            + np.where(wide_ci, 30, np.where(ci_width_pct > 50, 15, 0))
+            + (15 if high_volatility else 0)
+        )
         
         # Risk level
-        if risk_score >= 70:
-            risk_level = 'High'
-            reliability = 'Low'
-        elif risk_score >= 40:
-            risk_level = 'Medium'
-            reliability = 'Medium'
-        else:
-            risk_level = 'Low'
-            reliability = 'High'
-        
-        return {
-            'date': date,
-            'risk_score': min(risk_score, 100),
-            'risk_level': risk_level,
-            'reliability': reliability,
-            'deviation_from_mean': deviation_pct,
-            'risk_factors': factors
-        }
+        risk_level = np.select([risk_score >= 70, risk_score >= 40], ['High', 'Medium'], 'Low')
+        reliability = np.select([risk_score >= 70, risk_score >= 40], ['Low', 'Medium'], 'High')
+        
+        results = []
+        for i in range(n):
+            factors = []
+            if large_dev[i]:
+                factors.append(f"Large deviation from mean ({deviation_pct[i]:+.1f}%)")
+            if trend_dev[i]:
+                factors.append(f"Deviates from recent trend ({recent_deviation_pct[i]:+.1f}%)")
+            if wide_ci[i]:
+                factors.append(f"Wide confidence interval ({ci_width_pct[i]:.0f}%)")
+            if high_volatility:
+                factors.append(f"High volatility (CV={cv:.2f})")
+            
+            results.append({
+                'date': dates[i],
+                'risk_score': int(min(risk_score[i], 100)),
+                'risk_level': str(risk_level[i]),
+                'reliability': str(reliability[i]),
+                'deviation_from_mean': float(deviation_pct[i]),
+                'risk_factors': factors
+            })
+        
+        return results
     
     def get_historical_analysis(self, start_date: str = None, end_date: str = None) -> list:
         """Get historical risk analysis or generate new predictions for future dates"""
+        from app.services.risk_analysis_store import risk_analysis_store
+        
+        results = []
+        try:
+            # 1. Historical rows from the indexed CSV store (sorted by date descending)
+            results = risk_analysis_store.query(start_date, end_date, descending=True)
+            
+            # 2. Dynamically generated future rows
+            future = self.get_future_analysis(start_date, end_date)
+            return _merge_descending(future, results)
+            
+        except Exception as e:
+            print(f"Error in dynamic risk analysis: {e}")
+            return results
+    
+    def get_historical_analysis_json(self, start_date: str = None, end_date: str = None, future: list = None) -> bytes:
+        """
+        Same payload as get_historical_analysis, serialized to JSON bytes
+        
+        The historical part comes pre-serialized from the store; `future`
+        rows (from get_future_analysis) are serialized and prepended.
+        """
+        from app.services.risk_analysis_store import risk_analysis_store, dumps_json
+        
+        future = future or []
+        historical_json = risk_analysis_store.query_json(start_date, end_date, descending=True)
+        if not future:
+            return historical_json
+        
+        last_hist_date = risk_analysis_store.last_date
+        if last_hist_date is None or future[-1]['date'] > last_hist_date:
+            future_json = dumps_json(future)
+            if historical_json == b"[]":
+                return future_json
+            return future_json[:-1] + b"," + historical_json[1:]
+        
+        # Overlapping ranges: fall back to a full merge
+        historical = risk_analysis_store.query(start_date, end_date, descending=True)
+        return dumps_json(_merge_descending(future, historical))
+    
+    def get_future_analysis(self, start_date: str = None, end_date: str = None) -> list:
+        """Generate risk rows for dates past the training data (sorted by date descending)"""
         import pandas as pd
-        from app.config import settings
         from app.services.forecast_service import forecast_service
         
         results = []
         try:
-            # 1. Load Historical Data from CSV
-            analysis_path = settings.MODEL_DIR / "risk_analysis.csv"
-            if analysis_path.exists():
-                df = pd.read_csv(analysis_path)
-                df = df.rename(columns={'Order Date': 'date', 'Sales': 'forecast_value'})
-                df['date'] = df['date'].astype(str)
-                
-                # Filter historical data if range provided
-                if start_date:
-                    df = df[df['date'] >= start_date]
-                if end_date:
-                    df = df[df['date'] <= end_date]
-                
-                results = df.to_dict(orient='records')
-
-            # 2. Check if we need to generate future predictions
             # If end_date is after the last date in our CSV (2018-12-30), we generate more
             last_hist_date = "2018-12-30" # The training data boundary
             
@@ -145,12 +212,14 @@ class RiskService:
                     print(f"🔮 Generating dynamic future risks from {gen_start} to {gen_end}...")
                     future_predictions = forecast_service.batch_predict(gen_start, gen_end)
                     
-                    for pred in future_predictions:
-                        risk = self.assess_risk(
-                            pred['ensemble_prediction'],
-                            pred['date'],
-                            pred.get('confidence_interval')
-                        )
+                    risks = self.assess_risk_batch(
+                        [p['ensemble_prediction'] for p in future_predictions],
+                        [p['date'] for p in future_predictions],
+                        [p['confidence_interval']['lower'] if p.get('confidence_interval') else np.nan for p in future_predictions],
+                        [p['confidence_interval']['upper'] if p.get('confidence_interval') else np.nan for p in future_predictions]
+                    )
+                    
+                    for pred, risk in zip(future_predictions, risks):
                         results.append({
                             'date': pred['date'],
                             'forecast_value': pred['ensemble_prediction'],
@@ -159,7 +228,6 @@ class RiskService:
                             'risk_factors': "; ".join(risk['risk_factors']) if risk['risk_factors'] else "Stable forecast"
                         })
 
-            # Sort by date descending
             results.sort(key=lambda x: x['date'], reverse=True)
             return results
             
@@ -167,4 +235,27 @@ class RiskService:
             print(f"Error in dynamic risk analysis: {e}")
             return results
 
+def _extends(previous, data) -> bool:
+    """True if `data` is `previous` with more days appended"""
+    n = len(previous)
+    return (
+        len(data) > n > 0
+        and data.index[:n].equals(previous.index)
+        and data.index[n] > previous.index[-1]
+        and np.array_equal(data['Sales'].to_numpy()[:n], previous['Sales'].to_numpy(), equal_nan=True)
+    )
+
+def _merge_descending(first: list, second: list) -> list:
+    """Concatenate two date-descending record lists, keeping the order"""
+    if not first:
+        return second
+    if not second or first[-1]['date'] > second[0]['date']:
+        return first + second
+    merged = first + second
+    merged.sort(key=lambda x: x['date'], reverse=True)
+    return merged
+
+def _get_risk_service():
+    return risk_service
+
 risk_service = RiskService()
@@ -0,0 +1,284 @@
+"""
+Local Salesforce stand-in used in Mock mode and for offline benchmarks
+"""
+import itertools
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+class FakeSalesforceError(Exception):
+    """Raised for requests the fake cannot serve"""
+
+_DATETIME = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+_CONDITION = re.compile(r"(\w+)\s*(>=|<=|!=|=|>|<)\s*('[^']*'|[\w:.+-]+)", re.IGNORECASE)
+
+def _parse_datetime(raw: str) -> datetime:
+    return datetime.fromisoformat(raw.replace("Z", "+00:00").replace("+0000", "+00:00"))
+
+def _parse_value(raw: str):
+    if raw.startswith("'"):
+        return raw.strip("'")
+    if _DATETIME.match(raw):
+        return _parse_datetime(raw)
+    if raw.lower() in ("true", "false"):
+        return raw.lower() == "true"
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+def _compare(left, op: str, right) -> bool:
+    if left is None:
+        return False
+    if isinstance(right, datetime):
+        left = _parse_datetime(str(left))
+    elif isinstance(right, str):
+        left = str(left)
+    return {
+        "=": left == right, "!=": left != right,
+        ">": left > right, "<": left < right,
+        ">=": left >= right, "<=": left <= right,
+    }[op]
+
+def _now_stamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "+0000"
+
+class _FakeSObject:
+    """Per-object API (sf.Opportunity / sf.Task)"""
+    
+    def __init__(self, server: 'FakeSalesforce', name: str):
+        self._server = server
+        self._name = name
+    
+    def create(self, data: Dict) -> Dict:
+        return self._server._roundtrip(lambda: self._server._create(self._name, data))
+    
+    def update(self, record_id: str, data: Dict) -> int:
+        result = self._server._roundtrip(lambda: self._server._update(self._name, record_id, data))
+        if not result["success"]:
+            raise FakeSalesforceError(result["errors"][0]["message"])
+        return 204
+
+class _FakeBulkObject:
+    def __init__(self, server: 'FakeSalesforce', name: str):
+        self._server = server
+        self._name = name
+    
+    def update(self, records: List[Dict], batch_size: int = 10000, use_serial: bool = False) -> List[Dict]:
+        return self._server._bulk(self._name, "update", records, batch_size)
+    
+    def insert(self, records: List[Dict], batch_size: int = 10000, use_serial: bool = False) -> List[Dict]:
+        return self._server._bulk(self._name, "insert", records, batch_size)
+
+class _FakeBulk:
+    def __init__(self, server: 'FakeSalesforce'):
+        self._server = server
+    
+    def __getattr__(self, name: str) -> _FakeBulkObject:
+        return _FakeBulkObject(self._server, name)
+
+class FakeSalesforce:
+    """
+    In-process stand-in for the subset of simple_salesforce.Salesforce the
+    app uses: query / query_more, sObject create / update, the REST
+    sObject Collections endpoint (restful('composite/sobjects')) and Bulk
+    API update / insert.
+    
+    Every request sleeps `latency_ms` to simulate a network round-trip, and
+    each record write fails with probability `failure_rate`, so throughput
+    and partial-failure handling can be benchmarked offline.
+    """
+    
+    COLLECTION_LIMIT = 200
+    
+    def __init__(self, latency_ms: float = 0, failure_rate: float = 0.0,
+                 page_size: int = 2000, opportunities: Optional[List[Dict]] = None,
+                 seed: Optional[int] = None):
+        self.latency = latency_ms / 1000.0
+        self.failure_rate = failure_rate
+        self.page_size = page_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._cursors: Dict[str, tuple] = {}
+        self.request_count = 0
+        self.records: Dict[str, Dict[str, Dict]] = {"Opportunity": {}, "Task": {}}
+        self.bulk = _FakeBulk(self)
+        
+        for opp in (opportunities if opportunities is not None else self.default_opportunities()):
+            record = dict(opp)
+            record.setdefault("IsClosed", False)
+            record.setdefault("SystemModstamp", _now_stamp())
+            self.records["Opportunity"][record["Id"]] = record
+    
+    def __getattr__(self, name: str) -> _FakeSObject:
+        # sObject accessors, e.g. sf.Opportunity / sf.Task
+        if name[:1].isupper():
+            return _FakeSObject(self, name)
+        raise AttributeError(name)
+    
+    @staticmethod
+    def default_opportunities() -> List[Dict]:
+        """Fallback mock data for development"""
+        return [
+            {
+                "Id": "001", "Name": "Acme Corp Renewal", "Amount": 125000,
+                "StageName": "Negotiation", "Probability": 40,
+                "CloseDate": (datetime.now() + timedelta(days=10)).strftime('%Y-%m-%d'),
+                "CreatedDate": (datetime.now() - timedelta(days=45)).isoformat()
+            },
+            {
+                "Id": "002", "Name": "Globex Expansion", "Amount": 45000,
+                "StageName": "Qualification", "Probability": 60,
+                "CloseDate": (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d'),
+                "CreatedDate": (datetime.now() - timedelta(days=5)).isoformat()
+            }
+        ]
+    
+    @staticmethod
+    def synthetic_opportunities(count: int, seed: int = 0) -> List[Dict]:
+        """Generate `count` random open opportunities"""
+        rng = random.Random(seed)
+        stages = ['Prospecting', 'Qualification', 'Needs Analysis', 'Proposal', 'Negotiation']
+        now = datetime.now()
+        return [
+            {
+                "Id": f"006{i:012d}", "Name": f"Synthetic Deal {i}",
+                "Amount": round(rng.uniform(1000, 250000), 2),
+                "StageName": rng.choice(stages), "Probability": rng.randint(5, 95),
+                "CloseDate": (now + timedelta(days=rng.randint(-10, 120))).strftime('%Y-%m-%d'),
+                "CreatedDate": (now - timedelta(days=rng.randint(1, 365))).isoformat(),
+                "OwnerId": f"005{rng.randint(1, 50):012d}",
+                "ActivityScore": rng.randint(0, 100)
+            }
+            for i in range(count)
+        ]
+    
+    # ==================== Transport ====================
+    
+    def _roundtrip(self, handler):
+        """Simulate one HTTP request"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.request_count += 1
+            return handler()
+    
+    def _fails(self) -> bool:
+        return self.failure_rate > 0 and self._random.random() < self.failure_rate
+    
+    def _error(self, message: str, code: str = "UNABLE_TO_LOCK_ROW") -> Dict:
+        return {"id": None, "success": False, "errors": [{"statusCode": code, "message": message, "fields": []}]}
+    
+    # ==================== Record operations (lock held) ====================
+    
+    def _create(self, sobject: str, data: Dict) -> Dict:
+        if self._fails():
+            return self._error("Simulated create failure")
+        prefix = "00T" if sobject == "Task" else "006"
+        record_id = f"{prefix}{next(self._ids):012d}"
+        record = {k: v for k, v in data.items() if k != "attributes"}
+        record.update({"Id": record_id, "SystemModstamp": _now_stamp()})
+        self.records.setdefault(sobject, {})[record_id] = record
+        return {"id": record_id, "success": True, "errors": []}
+    
+    def _update(self, sobject: str, record_id: str, data: Dict) -> Dict:
+        table = self.records.setdefault(sobject, {})
+        if record_id not in table:
+            return self._error(f"Record {record_id} not found", code="INVALID_CROSS_REFERENCE_KEY")
+        if self._fails():
+            return self._error("Simulated update failure")
+        table[record_id].update({k: v for k, v in data.items() if k not in ("attributes", "id", "Id")})
+        table[record_id]["SystemModstamp"] = _now_stamp()
+        return {"id": record_id, "success": True, "errors": []}
+    
+    # ==================== REST API ====================
+    
+    def restful(self, path: str, params: Optional[Dict] = None, method: str = "GET", json: Optional[Dict] = None, **kwargs):
+        """sObject Collections: PATCH (update) / POST (create) composite/sobjects"""
+        if path.strip("/") != "composite/sobjects" or method not in ("PATCH", "POST"):
+            raise FakeSalesforceError(f"Unsupported request {method} {path}")
+        records = (json or {}).get("records", [])
+        if len(records) > self.COLLECTION_LIMIT:
+            raise FakeSalesforceError(f"Collections are limited to {self.COLLECTION_LIMIT} records")
+        
+        def handle():
+            results = []
+            for record in records:
+                sobject = record.get("attributes", {}).get("type")
+                if method == "PATCH":
+                    results.append(self._update(sobject, record.get("id"), record))
+                else:
+                    results.append(self._create(sobject, record))
+            return results
+        return self._roundtrip(handle)
+    
+    def _bulk(self, sobject: str, operation: str, records: List[Dict], batch_size: int) -> List[Dict]:
+        results = []
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            
+            def handle():
+                out = []
+                for record in batch:
+                    if operation == "update":
+                        result = self._update(sobject, record.get("Id"), record)
+                    else:
+                        result = self._create(sobject, record)
+                    out.append({**result, "created": operation == "insert" and result["success"]})
+                return out
+            results.extend(self._roundtrip(handle))
+        return results
+    
+    # ==================== Query API ====================
+    
+    def query(self, soql: str, include_deleted: bool = False, **kwargs) -> Dict:
+        match = re.search(r"SELECT\s+(.*?)\s+FROM\s+(\w+)(?:\s+WHERE\s+(.*?))?(?:\s+ORDER\s+BY\s+(\w+)(?:\s+(ASC|DESC))?)?\s*$",
+                          soql.strip(), re.IGNORECASE | re.DOTALL)
+        if not match:
+            raise FakeSalesforceError(f"Unsupported SOQL: {soql}")
+        fields = [f.strip() for f in match.group(1).split(",")]
+        sobject, where, order_by, direction = match.group(2), match.group(3), match.group(4), match.group(5)
+        
+        conditions = []
+        if where:
+            for clause in re.split(r"\s+AND\s+", where, flags=re.IGNORECASE):
+                cond = _CONDITION.fullmatch(clause.strip())
+                if not cond:
+                    raise FakeSalesforceError(f"Unsupported WHERE clause: {clause}")
+                conditions.append((cond.group(1), cond.group(2), _parse_value(cond.group(3))))
+        
+        def handle():
+            rows = [
+                r for r in self.records.get(sobject, {}).values()
+                if all(_compare(r.get(f), op, v) for f, op, v in conditions)
+            ]
+            if order_by:
+                rows.sort(key=lambda r: (r.get(order_by) is None, r.get(order_by)), reverse=(direction or "").upper() == "DESC")
+            rows = [
+                {"attributes": {"type": sobject}, **{f: r.get(f) for f in fields}}
+                for r in rows
+            ]
+            return self._page(rows)
+        return self._roundtrip(handle)
+    
+    def query_more(self, next_records_identifier: str, identifier_is_url: bool = False, include_deleted: bool = False, **kwargs) -> Dict:
+        def handle():
+            cursor = self._cursors.pop(next_records_identifier, None)
+            if cursor is None:
+                raise FakeSalesforceError(f"Unknown query locator {next_records_identifier}")
+            return self._page(*cursor)
+        return self._roundtrip(handle)
+    
+    def _page(self, rows: List[Dict], total: Optional[int] = None) -> Dict:
+        total = len(rows) if total is None else total
+        page, rest = rows[:self.page_size], rows[self.page_size:]
+        result = {"totalSize": total, "done": not rest, "records": page}
+        if rest:
+            locator = f"/services/data/v59.0/query/01g{next(self._ids):012d}-{self.page_size}"
+            self._cursors[locator] = (rest, total)
+            result["nextRecordsUrl"] = locator
+        return result
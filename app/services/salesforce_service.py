@@ -2,8 +2,16 @@
 Salesforce Integration Service
 """
 from simple_salesforce import Salesforce
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Dict, Iterator, List, Optional
 from app.config import settings
+from app.services.opportunity_cache import OPPORTUNITY_FIELDS, opportunity_cache
+from app.services.salesforce_fake import FakeSalesforce
+
+# sObject Collections requests accept at most 200 records
+COLLECTION_LIMIT = 200
 
 class SalesforceService:
     """
@@ -12,6 +20,7 @@ class SalesforceService:
     
     def __init__(self):
         self.sf = None
+        self.mock = False
         self._connect()
 
     def _connect(self):
@@ -29,15 +38,40 @@ class SalesforceService:
         else:
             print("⚠️ Salesforce credentials missing. Running in Mock mode.")
 
+        if self.sf is None:
+            # Mock mode: serve requests from the local fake server
+            self.mock = True
+            self.sf = FakeSalesforce(
+                latency_ms=settings.SF_FAKE_LATENCY_MS,
+                failure_rate=settings.SF_FAKE_FAILURE_RATE
+            )
+
+    def iter_query_pages(self, soql: str) -> Iterator[List[Dict]]:
+        """
+        Run a SOQL query and yield its records one page at a time,
+        following nextRecordsUrl until the result set is exhausted
+        """
+        result = self.sf.query(soql)
+        while True:
+            yield result.get('records', [])
+            if result.get('done', True) or not result.get('nextRecordsUrl'):
+                return
+            result = self.sf.query_more(result['nextRecordsUrl'], identifier_is_url=True)
+    
+    def iter_open_opportunity_pages(self) -> Iterator[List[Dict]]:
+        """Stream open opportunities page by page"""
+        query = "SELECT Id, Name, Amount, StageName, CloseDate, CreatedDate, Probability, OwnerId FROM Opportunity WHERE IsClosed = false"
+        return self.iter_query_pages(query)
+    
+    def iter_open_opportunities(self) -> Iterator[Dict]:
+        """Stream open opportunities record by record"""
+        for page in self.iter_open_opportunity_pages():
+            yield from page
+    
     def get_open_opportunities(self) -> List[Dict]:
-        """Fetch open opportunities from SF"""
-        if not self.sf:
-            return self._mock_opportunities()
-            
+        """Fetch open opportunities from SF (all pages)"""
         try:
-            query = "SELECT Id, Name, Amount, StageName, CloseDate, CreatedDate, Probability, OwnerId FROM Opportunity WHERE IsClosed = false"
-            result = self.sf.query(query)
-            return result.get('records', [])
+            return list(self.iter_open_opportunities())
         except Exception as e:
             print(f"❌ SF Query Error: {e}")
             return []
@@ -46,10 +80,6 @@ class SalesforceService:
         """
         Feature 6: Opportunity Field Auto-Update
         """
-        if not self.sf:
-            print(f"Mock: Updated Opp {opp_id} with {data}")
-            return True
-            
         try:
             self.sf.Opportunity.update(opp_id, data)
             return True
@@ -61,63 +91,168 @@ class SalesforceService:
         """
         Feature 4: Automated Task Creation
         """
-        if not self.sf:
-            import random
-            task_id = f"sf_task_{random.randint(10000, 99999)}"
-            return {"status": "success", "id": task_id, "link": f"https://force.com/tasks/{task_id}"}
-            
         try:
             result = self.sf.Task.create(task_data)
+            if not result.get('success', True):
+                raise Exception(_error_message(result.get('errors')))
             return {"status": "success", "id": result.get('id'), "link": f"https://force.com/{result.get('id')}"}
         except Exception as e:
             print(f"❌ SF Task Creation Error: {e}")
             return {"status": "error", "message": str(e)}
+    
+    def update_opportunities(self, updates: List[Dict]) -> List[Dict]:
+        """
+        Feature 6 (batched): update many opportunities
+        
+        Args:
+            updates: Dicts with 'Id' plus the fields to set
+        
+        Returns:
+            One {"id", "success", "errors"} result per update, in input order
+        """
+        return self._write_batch("Opportunity", "update", updates)
+    
+    def create_tasks(self, tasks: List[Dict]) -> List[Dict]:
+        """
+        Feature 4 (batched): create many tasks
+        
+        Returns:
+            One create_task-style result per task, in input order
+        """
+        results = []
+        for result in self._write_batch("Task", "insert", tasks):
+            if result["success"]:
+                results.append({"status": "success", "id": result["id"], "link": f"https://force.com/{result['id']}"})
+            else:
+                results.append({"status": "error", "message": _error_message(result["errors"])})
+        return results
+    
+    def _write_batch(self, sobject: str, operation: str, records: List[Dict]) -> List[Dict]:
+        """
+        Write records via sObject Collections (chunks of 200, sent
+        concurrently) or, for large volumes, a Bulk API job
+        """
+        if not records:
+            return []
+        
+        if len(records) >= settings.SF_BULK_THRESHOLD:
+            return self._bulk_write(sobject, operation, records)
+        
+        chunks = [records[i:i + COLLECTION_LIMIT] for i in range(0, len(records), COLLECTION_LIMIT)]
+        workers = max(1, min(settings.SF_BATCH_CONCURRENCY, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sf-write") as pool:
+            chunk_results = pool.map(partial(self._collections_request, sobject, operation), chunks)
+            return [result for chunk in chunk_results for result in chunk]
+    
+    def _collections_request(self, sobject: str, operation: str, records: List[Dict]) -> List[Dict]:
+        """One sObject Collections round-trip (allOrNone=false, per-record results)"""
+        payload_records = []
+        for record in records:
+            fields = {k: v for k, v in record.items() if k != 'Id'}
+            entry = {"attributes": {"type": sobject}, **fields}
+            if operation == "update":
+                entry["id"] = record['Id']
+            payload_records.append(entry)
+        
+        try:
+            response = self.sf.restful(
+                "composite/sobjects",
+                method="PATCH" if operation == "update" else "POST",
+                json={"allOrNone": False, "records": payload_records}
+            )
+            return [
+                {
+                    "id": result.get('id') or record.get('Id'),
+                    "success": bool(result.get('success')),
+                    "errors": result.get('errors') or []
+                }
+                for record, result in zip(records, response)
+            ]
+        except Exception as e:
+            print(f"❌ SF Collections {operation} Error: {e}")
+            return [
+                {"id": record.get('Id'), "success": False, "errors": [{"message": str(e)}]}
+                for record in records
+            ]
+    
+    def _bulk_write(self, sobject: str, operation: str, records: List[Dict]) -> List[Dict]:
+        """Bulk API job; results come back in input order"""
+        try:
+            job = getattr(self.sf.bulk, sobject)
+            method = job.update if operation == "update" else job.insert
+            response = method(records, batch_size=settings.SF_BULK_BATCH_SIZE)
+            return [
+                {
+                    "id": result.get('id') or record.get('Id'),
+                    "success": bool(result.get('success')),
+                    "errors": result.get('errors') or []
+                }
+                for record, result in zip(records, response)
+            ]
+        except Exception as e:
+            print(f"❌ SF Bulk {operation} Error: {e}")
+            return [
+                {"id": record.get('Id'), "success": False, "errors": [{"message": str(e)}]}
+                for record in records
+            ]
 
     def sync_opportunities(self, start_date: str, end_date: str) -> Dict:
         """
         Sync opportunities within a date range (Feature 1)
+        
+        Pages are upserted into the local opportunity cache as they arrive.
+        The highest SystemModstamp seen is stored per date range, so repeat
+        syncs only fetch records modified since the previous run.
         """
         print(f"🔄 Syncing Salesforce opportunities from {start_date} to {end_date}...")
         
-        # In a real scenario, this would fetch data and update local DB/CSV
-        # For now, we mock the success and return counts
-        if not self.sf:
+        scope = f"{start_date}:{end_date}"
+        watermark = opportunity_cache.get_watermark(scope)
+        
+        try:
+            query = (
+                f"SELECT {', '.join(OPPORTUNITY_FIELDS)} FROM Opportunity "
+                f"WHERE CloseDate >= {start_date} AND CloseDate <= {end_date}"
+            )
+            if watermark:
+                # Second precision with >=: same-second records are re-fetched, upserts are idempotent
+                query += f" AND SystemModstamp >= {_soql_datetime(watermark)}"
+            query += " ORDER BY SystemModstamp ASC"
+            
+            synced = 0
+            latest = watermark
+            for page in self.iter_query_pages(query):
+                synced += opportunity_cache.upsert(page)
+                stamps = [r['SystemModstamp'] for r in page if r.get('SystemModstamp')]
+                if stamps:
+                    latest = max([latest] + stamps if latest else stamps, key=_parse_sf_datetime)
+            
+            opportunity_cache.set_watermark(scope, latest, synced)
             return {
                 "status": "success",
-                "synced_records": 12,
+                "synced_records": synced,
                 "range": f"{start_date} to {end_date}",
-                "mode": "mock"
-            }
-            
-        try:
-            # Placeholder for actual sync logic (querying and saving)
-            query = f"SELECT Id, Name, Amount FROM Opportunity WHERE CloseDate >= {start_date} AND CloseDate <= {end_date}"
-            # This is a mock implementation of the sync process
-            return {
-                "status": "success", 
-                "synced_records": 5, 
-                "range": f"{start_date} to {end_date}"
+                "mode": "incremental" if watermark else "full",
+                "watermark": latest,
+                "cached_records": opportunity_cache.count()
             }
         except Exception as e:
             print(f"❌ SF Sync Error: {e}")
             return {"status": "error", "message": str(e)}
 
-    def _mock_opportunities(self) -> List[Dict]:
-        """Fallback mock data for development"""
-        from datetime import datetime, timedelta
-        return [
-            {
-                "Id": "001", "Name": "Acme Corp Renewal", "Amount": 125000, 
-                "StageName": "Negotiation", "Probability": 40,
-                "CloseDate": (datetime.now() + timedelta(days=10)).strftime('%Y-%m-%d'),
-                "CreatedDate": (datetime.now() - timedelta(days=45)).isoformat()
-            },
-            {
-                "Id": "002", "Name": "Globex Expansion", "Amount": 45000, 
-                "StageName": "Qualification", "Probability": 60,
-                "CloseDate": (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d'),
-                "CreatedDate": (datetime.now() - timedelta(days=5)).isoformat()
-            }
-        ]
+def _parse_sf_datetime(value: str) -> datetime:
+    """Parse a Salesforce datetime such as 2024-01-31T10:15:00.000+0000"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00").replace("+0000", "+00:00"))
+
+def _soql_datetime(value: str) -> str:
+    """Format a datetime as a SOQL literal (UTC, second precision)"""
+    return _parse_sf_datetime(value).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _error_message(errors) -> str:
+    """First error message from a Salesforce per-record errors list"""
+    if not errors:
+        return "Unknown Salesforce error"
+    first = errors[0]
+    return first.get('message', str(first)) if isinstance(first, dict) else str(first)
 
 salesforce_service = SalesforceService()
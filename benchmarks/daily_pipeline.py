@@ -0,0 +1,59 @@
+"""
+Daily automation pipeline benchmark (offline)
+
+Runs AutomationService.run_daily_pipeline against the fake Salesforce
+server with simulated LLM and Slack latencies and prints per-stage timing.
+With overlapping stages the wall time should be close to the slowest
+stage's wall time, not the sum of all calls.
+
+Usage:
+    python benchmarks/daily_pipeline.py --opportunities 5000 --llm-ms 200 --slack-ms 30 --sf-ms 80
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.automation_service import automation_service
+from app.services.llm_service import llm_service
+from app.services.salesforce_fake import FakeSalesforce
+from app.services.salesforce_service import salesforce_service
+from app.services.slack_service import slack_service
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--opportunities", type=int, default=5000)
+    parser.add_argument("--llm-ms", type=float, default=200)
+    parser.add_argument("--slack-ms", type=float, default=30)
+    parser.add_argument("--sf-ms", type=float, default=80)
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    
+    salesforce_service.sf = FakeSalesforce(
+        latency_ms=args.sf_ms,
+        failure_rate=args.failure_rate,
+        opportunities=FakeSalesforce.synthetic_opportunities(args.opportunities),
+        seed=7
+    )
+    
+    # Simulated network latency for the external calls
+    async def fake_insights(opportunity, risk_data):
+        await asyncio.sleep(args.llm_ms / 1000.0)
+        return f"Insights for {opportunity.get('Name')}"
+    
+    def fake_alert(title, message, color="#36a64f", channel=None):
+        time.sleep(args.slack_ms / 1000.0)
+        return True
+    
+    llm_service.generate_deal_insights = fake_insights
+    slack_service.send_alert = fake_alert
+    
+    results = asyncio.run(automation_service.run_daily_pipeline())
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Decision rules benchmark: per-row if/elif chain vs the compiled rule table
+
+Generates random (forecast, risk_score, reliability, is_anomaly) rows
+and reports throughput of:
+- the original per-row if/elif DecisionService.evaluate (timed on a
+  sample and extrapolated)
+- DecisionService.match: rule index per row (masks only)
+- DecisionService.evaluate_batch: per-row result dicts
+and checks that all three agree on the sample.
+
+Usage:
+    python benchmarks/decision_rules.py --rows 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.services.decision_service import decision_service
+
+def evaluate_if_elif(forecast_value: float, risk_data: dict) -> dict:
+    """The rules engine before the rule table (same rules as app/decision_rules.json)"""
+    risk_score = risk_data.get('risk_score', 0)
+    reliability = risk_data.get('reliability', 'MEDIUM')
+    if risk_score >= 70 and reliability == "LOW":
+        return {"actions": ["SEND_EMAIL_ALERT", "CREATE_SALESFORCE_TASK"], "priority": "HIGH", "reason": "High risk with low reliability"}
+    elif risk_score >= 70:
+        return {"actions": ["SEND_EMAIL_ALERT"], "priority": "MEDIUM", "reason": "High risk detected"}
+    elif risk_data.get('is_anomaly', False):
+        return {"actions": ["FLAG_FOR_REVIEW", "INCLUDE_IN_WEEKLY_REPORT"], "priority": "MEDIUM", "reason": "Anomaly detected"}
+    elif forecast_value < 2000:
+        return {"actions": ["INVENTORY_WARNING"], "priority": "HIGH", "reason": "Forecast below critical threshold"}
+    return {"actions": ["LOG_ONLY"], "priority": "LOW", "reason": "Normal forecast"}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=100_000, help="rows timed for the per-row chain")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    forecasts = rng.uniform(0, 8000, args.rows)
+    risk_scores = rng.integers(0, 101, args.rows)
+    reliabilities = rng.choice(np.array(["LOW", "MEDIUM", "HIGH"]), args.rows)
+    anomalies = rng.random(args.rows) < 0.05
+    decision_service.table  # load once outside the timings
+    
+    sample = min(args.sample, args.rows)
+    start = time.perf_counter()
+    chain = [
+        evaluate_if_elif(float(forecasts[i]), {'risk_score': int(risk_scores[i]), 'reliability': str(reliabilities[i]), 'is_anomaly': bool(anomalies[i])})
+        for i in range(sample)
+    ]
+    chain_s = (time.perf_counter() - start) * args.rows / sample
+    
+    start = time.perf_counter()
+    decision_service.match(forecasts, risk_scores, reliabilities, anomalies)
+    match_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batch = decision_service.evaluate_batch(forecasts, risk_scores, reliabilities, anomalies)
+    batch_s = time.perf_counter() - start
+    
+    mismatches = sum(
+        (list(b['actions']), b['priority'], b['reason']) != (c['actions'], c['priority'], c['reason'])
+        for b, c in zip(batch[:sample], chain)
+    )
+    print(f"{'engine':<28}{'seconds':>10}{'rows/s':>14}   ({args.rows:,} rows)")
+    for label, seconds in (("if/elif per row (extrap.)", chain_s), ("rule table: match", match_s), ("rule table: evaluate_batch", batch_s)):
+        print(f"{label:<28}{seconds:>10.3f}{args.rows / seconds:>14,.0f}")
+    print(f"mismatches on {sample:,} sampled rows: {mismatches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Rolling-origin backtest benchmark: one filter pass vs refiltering per cutoff
+
+Backtests the active models over the whole sales history (every day from
+--min-train on is a cutoff, horizons 1..--horizon) and reports:
+- wall time of app.models.backtest.run_backtest for each worker count
+- the naive approach for a sample of cutoffs: SARIMAX filtered on the
+  history up to the cutoff + get_forecast(), Prophet.predict() on the
+  horizon dates; extrapolated to all cutoffs
+
+Usage:
+    python benchmarks/forecast_backtest.py --workers 1 2 4 --sample 20
+"""
+import argparse
+import logging
+import sys
+import time
+import warnings
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.models.backtest import run_backtest, backtest_origins
+from app.models.ensemble_weights import EnsembleWeights
+from app.models.ml_models import model_loader
+from app.models.registry import model_registry, load_prophet
+
+def naive_cutoff(prophet_model, results, data, origin, horizon):
+    prefix = results.model.clone(data['Sales'].to_numpy()[:origin]).filter(results.params)
+    prefix.get_forecast(horizon).conf_int()
+    dates = data.index[origin:origin + horizon]
+    prophet_model.predict(pd.DataFrame({'ds': dates}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horizon", type=int, default=90)
+    parser.add_argument("--min-train", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sample", type=int, default=20, help="cutoffs timed for the naive approach")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    
+    version = model_registry.current_version()
+    if version is None:
+        sys.exit("No registry version published (python -m app.models.registry publish)")
+    data = model_loader.get_historical_data()
+    results = model_loader.load_sarima_results()
+    weights = EnsembleWeights.fixed(0.4)
+    origins = backtest_origins(len(data), args.min_train)
+    print(f"Model version {version}: {len(origins)} cutoffs "
+          f"({data.index[origins[0] - 1].date()}..{data.index[origins[-1] - 1].date()}) x {args.horizon} horizons")
+    
+    for workers in args.workers:
+        report = run_backtest(model_loader.get_prophet(), results, data, weights, horizon=args.horizon,
+                              min_train=args.min_train, workers=workers)
+        ensemble = report['summary']['ensemble']['all']
+        print(f"  run_backtest, {workers} worker(s): {report['wall_seconds']:7.2f}s  "
+              f"(ensemble sMAPE {ensemble['smape']:.2f}, coverage {ensemble['coverage']:.3f})")
+    
+    prophet_model = load_prophet(model_registry.artifact_path(version, 'prophet_model'))
+    sample = np.random.default_rng(0).choice(origins, size=min(args.sample, len(origins)), replace=False)
+    start = time.perf_counter()
+    for origin in sample:
+        naive_cutoff(prophet_model, results, data, origin, args.horizon)
+    per_cutoff = (time.perf_counter() - start) / len(sample)
+    print(f"  refilter + predict per cutoff: {per_cutoff * 1000:7.1f} ms -> "
+          f"{per_cutoff * len(origins) / 60:.1f} min for all cutoffs (1 worker)")
+
+if __name__ == "__main__":
+    main()
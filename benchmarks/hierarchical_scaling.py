@@ -0,0 +1,107 @@
+"""
+Hierarchical multi-series benchmark: fit scaling and reconciliation cost
+
+Generates a synthetic region > store > category panel (default 10 x 50
+x 10 = 5,000 bottom series, 3 years of daily sales with region-level
+demand shocks shared by every series in a region) and reports:
+- per-series Prophet + SARIMA fits of a sample of bottom series with 1,
+  2, 4, ... worker processes (wall time, speedup, efficiency, and the
+  projected time for the full panel)
+- reconciliation time of every method over the full hierarchy, using
+  seasonal naive base forecasts and residuals for all nodes
+
+Speedup is bounded by the physical cores available (printed first).
+
+Usage:
+    python benchmarks/hierarchical_scaling.py --workers 1,2,4,8 --sample 64
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.models.hierarchy import Hierarchy, METHODS
+from app.services.multi_series_service import multi_series_service, _fit_seasonal_naive
+
+def synthetic_panel(regions: int, stores: int, categories: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """Long-format panel: date, region, store, category, Sales"""
+    rng = np.random.default_rng(seed)
+    m = regions * stores * categories
+    t = np.arange(days)
+    keys = pd.MultiIndex.from_product(
+        [[f"R{r:02d}" for r in range(regions)], [f"S{s:03d}" for s in range(stores)], [f"C{c:02d}" for c in range(categories)]],
+        names=['region', 'store', 'category']
+    ).to_frame(index=False)
+    keys['store'] = keys['region'] + keys['store']
+    
+    region_effect = rng.normal(0, 0.2, (regions, days)).cumsum(axis=1) / np.sqrt(days)
+    level = rng.lognormal(4, 0.5, m)
+    weekly = 1 + rng.uniform(0.05, 0.3, m)[:, None] * np.sin(2 * np.pi * (t[None, :] + rng.integers(0, 7, m)[:, None]) / 7)
+    yearly = 1 + rng.uniform(0.05, 0.4, m)[:, None] * np.sin(2 * np.pi * t[None, :] / 365.25)
+    trend = 1 + rng.normal(0, 0.2, m)[:, None] * t[None, :] / days
+    region_codes = np.repeat(np.arange(regions), stores * categories)
+    sales = level[:, None] * weekly * yearly * trend * np.exp(region_effect[region_codes])
+    sales *= rng.lognormal(0, 0.15, (m, days))
+    
+    dates = pd.date_range("2017-01-01", periods=days, freq='D')
+    panel = keys.loc[np.repeat(np.arange(m), days)].reset_index(drop=True)
+    panel.insert(0, 'date', np.tile(dates, m))
+    panel['Sales'] = sales.ravel().round(2)
+    return panel
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=10)
+    parser.add_argument("--stores", type=int, default=50, help="stores per region")
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--days", type=int, default=1095)
+    parser.add_argument("--horizon", type=int, default=90)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--sample", type=int, default=64, help="bottom series fitted per worker count")
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+    
+    panel = synthetic_panel(args.regions, args.stores, args.categories, args.days)
+    levels = multi_series_service.levels
+    bottom = panel[levels].drop_duplicates()
+    print(f"cores: {os.cpu_count()}   bottom series: {len(bottom):,}   days: {args.days}")
+    
+    # Fit scaling on a fixed sample of bottom series (bottom_up: one fit per series)
+    sample = bottom.sample(min(args.sample, len(bottom)), random_state=0)
+    sample_panel = panel.merge(sample, on=levels)
+    print(f"\n{'workers':>8}{'wall (s)':>10}{'series/s':>10}{'speedup':>9}{'efficiency':>12}{'full panel (min)':>18}")
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        result = multi_series_service.fit(
+            sample_panel, method='bottom_up', horizon=args.horizon, workers=workers, batch_size=args.batch_size
+        )
+        wall = result.meta['wall_seconds']
+        baseline = baseline or wall
+        rate = len(sample) / wall
+        print(f"{workers:>8}{wall:>10.2f}{rate:>10.2f}{baseline / wall:>9.2f}{baseline / wall / workers:>12.0%}{len(bottom) / rate / 60:>18.1f}")
+    
+    # Reconciliation over the full hierarchy
+    wide = panel.pivot_table(index=levels, columns='date', values='Sales')
+    hierarchy = Hierarchy(levels, wide.index.to_frame(index=False))
+    values = hierarchy.aggregate(wide.to_numpy())
+    config = {'interval_width': 0.95}
+    fits = [_fit_seasonal_naive(row, args.horizon, config) for row in values]
+    base = np.array([fit['mean'] for fit in fits])
+    residuals = np.array([fit['residuals'] for fit in fits]).T
+    print(f"\n{'method':<14}{'seconds':>10}{'max incoherence':>18}   ({hierarchy.n:,} nodes, {hierarchy.n_aggregates:,} aggregates)")
+    for method in METHODS:
+        start = time.perf_counter()
+        reconciled = hierarchy.reconcile(base, method, residuals)
+        seconds = time.perf_counter() - start
+        n_a = hierarchy.n_aggregates
+        incoherence = np.abs(reconciled[:n_a] - hierarchy.aggregation @ reconciled[n_a:]).max()
+        print(f"{method:<14}{seconds:>10.3f}{incoherence:>18.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Model artifact benchmark: legacy pickles vs the model registry
+
+For each source, starts a fresh interpreter with the model libraries
+already imported (so only artifact loading is timed) and reports the
+per-artifact load time from ModelLoader.status() plus the bytes on disk.
+With --cold the artifact files are first evicted from the page cache
+(posix_fadvise DONTNEED), as after a deploy or on a fresh node.
+
+Usage:
+    python -m app.models.registry publish    # once, if no version exists
+    python benchmarks/model_registry.py --runs 5 --cold
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.config import settings
+from app.models.ml_models import ARTIFACTS
+from app.models.registry import model_registry
+
+PROBE = r"""
+import json, time, warnings
+warnings.filterwarnings("ignore")
+import prophet.serialize, statsmodels.tsa.statespace.sarimax, sklearn.ensemble
+from app.models.ml_models import model_loader
+start = time.perf_counter()
+model_loader.warm_up(background=False)
+total = time.perf_counter() - start
+print(json.dumps({"total": total, **{name: s["load_seconds"] for name, s in model_loader.status().items()}}))
+"""
+
+def artifact_files(source: str) -> list:
+    if source == "legacy":
+        return [getattr(settings, path_setting) for path_setting, _, _ in ARTIFACTS.values()]
+    version = model_registry.current_version()
+    return [model_registry.root / version / entry['file'] for entry in model_registry.manifest(version)['artifacts'].values()]
+
+def evict(paths: list):
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+def run(source: str, cold: bool) -> dict:
+    if cold:
+        evict(artifact_files(source))
+    env = dict(os.environ, PYTHONPATH=str(ROOT), MODEL_LOADING="lazy", SHARED_DATA_MODE="memory")
+    if source == "legacy":
+        env["MODEL_REGISTRY_DIR"] = str(ROOT / ".no-registry")
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="evict artifacts from the page cache before each run")
+    args = parser.parse_args()
+    
+    sources = ["legacy", "registry"]
+    if model_registry.current_version() is None:
+        sys.exit("No registry version published (python -m app.models.registry publish)")
+    if not settings.SARIMA_MODEL_PATH.exists():
+        print(f"⚠️ {settings.SARIMA_MODEL_PATH.name} missing, skipping the legacy source")
+        sources.remove("legacy")
+    
+    results = {}
+    for source in sources:
+        samples = [run(source, args.cold) for _ in range(args.runs)]
+        results[source] = {k: statistics.median(s[k] for s in samples) for k in samples[0]}
+        results[source]["bytes"] = sum(path.stat().st_size for path in artifact_files(source))
+    
+    print(f"{'artifact':<18}" + "".join(f"{source + ' (s)':>16}" for source in sources) + f"   (median of {args.runs}, {'cold' if args.cold else 'warm'} page cache)")
+    for name in list(ARTIFACTS) + ["total"]:
+        print(f"{name:<18}" + "".join(f"{results[source][name]:>16.3f}" for source in sources))
+    print(f"{'size (MiB)':<18}" + "".join(f"{results[source]['bytes'] / 2**20:>16.2f}" for source in sources))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Prophet serving benchmark: Prophet.predict() vs the vectorized scorer
+
+Loads the active registry version's Prophet model and reports per-call
+latency of yhat + bounds for a single future date and for the history
+plus several horizons. For the scorer both the first call on a fresh
+instance (simulates the interval offsets) and repeat calls are timed.
+
+Usage:
+    python benchmarks/prophet_scorer.py --repeat 10
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.models.registry import model_registry, load_prophet
+from app.models.prophet_scorer import ProphetScorer
+
+HORIZONS = (7, 90, 730)
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+    
+    version = model_registry.current_version()
+    if version is None:
+        sys.exit("No registry version published (python -m app.models.registry publish)")
+    model = load_prophet(model_registry.artifact_path(version, 'prophet_model'))
+    scorer = ProphetScorer.from_model(model)
+    first, last = model.history['ds'].min(), model.history['ds'].max()
+    
+    cases = [("1 future date", pd.DatetimeIndex([last + pd.Timedelta(days=3)]))]
+    for steps in HORIZONS:
+        cases.append((f"history + {steps}d", pd.date_range(first, last + pd.Timedelta(days=steps), freq='D')))
+    
+    print(f"{'dates':<20}{'rows':>7}{'prophet (ms)':>15}{'scorer first (ms)':>19}{'scorer cached (ms)':>20}{'max |dyhat|':>13}")
+    for label, dates in cases:
+        frame = pd.DataFrame({'ds': dates})
+        prophet_ms = timed(lambda: model.predict(frame), args.repeat)
+        first_ms = timed(lambda: ProphetScorer.from_model(model).predict(dates), args.repeat)
+        scorer.predict(dates)
+        cached_ms = timed(lambda: scorer.predict(dates), args.repeat)
+        error = np.abs(scorer.predict_yhat(dates) - model.predict(frame)['yhat'].to_numpy()).max()
+        print(f"{label:<20}{len(dates):>7}{prophet_ms:>15.2f}{first_ms:>19.2f}{cached_ms:>20.3f}{error:>13.2e}")
+
+if __name__ == "__main__":
+    main()
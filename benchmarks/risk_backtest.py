@@ -0,0 +1,99 @@
+"""
+Deal risk backtest benchmark: chunked streaming vs the per-deal loop
+
+Writes a synthetic CSV export of --deals closed opportunities and reports:
+- rows/s and peak RSS growth of AnalysisService.backtest_risk_model_stream
+  reading the file in --chunk-size rows
+- the same for the previous approach (whole export loaded as a list of
+  dicts, predict_risk() per deal), on --sample deals and extrapolated
+
+Each approach runs in its own child process so peak RSS is measured
+separately.
+
+Usage:
+    python benchmarks/risk_backtest.py --deals 1000000 --chunk-size 50000
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+def write_export(path: Path, deals: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    block = 100000
+    for start in range(0, deals, block):
+        n = min(block, deals - start)
+        created = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D")
+        activity = rng.uniform(0, 100, n)
+        pd.DataFrame({
+            'Id': [f"006{i:09d}" for i in range(start, start + n)],
+            'Amount': rng.lognormal(10.5, 1.0, n).round(2),
+            'CreatedDate': created.strftime("%Y-%m-%d"),
+            'CloseDate': (created + pd.to_timedelta(rng.integers(5, 200, n), unit="D")).strftime("%Y-%m-%d"),
+            'Probability': rng.integers(10, 90, n),
+            'StageName': rng.choice(["Prospecting", "Proposal", "Negotiation"], n),
+            'ActivityScore': activity.round(1),
+            'IsWon': rng.uniform(0, 100, n) < 20 + 0.6 * activity,
+            'Description': "Synthetic opportunity",
+        }).to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_streaming(path, chunk_size, queue):
+    from app.services.analysis_service import analysis_service
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    report = analysis_service.backtest_risk_model_stream(path, chunk_size=chunk_size)
+    queue.put((time.perf_counter() - start, peak_rss_mb() - baseline, report['metrics']['total_deals_analyzed']))
+
+def run_per_deal(path, sample, queue):
+    from app.services.deal_risk_service import deal_risk_service
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    deals = pd.read_csv(path).to_dict('records')
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    for deal in deals[:sample]:
+        deal_risk_service.predict_risk(deal)
+    per_deal = (time.perf_counter() - start) / min(sample, len(deals))
+    queue.put((load + per_deal * len(deals), peak_rss_mb() - baseline, len(deals)))
+
+def measure(target, *args):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=target, args=(*args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deals", type=int, default=1000000)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--sample", type=int, default=2000, help="deals timed for the per-deal loop")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "opportunities.csv"
+        write_export(path, args.deals)
+        print(f"{args.deals} deals, {path.stat().st_size / 1e6:.0f} MB CSV")
+        
+        seconds, rss, deals = measure(run_streaming, str(path), args.chunk_size)
+        print(f"  streaming, {args.chunk_size} rows/chunk: {seconds:7.2f}s  "
+              f"{deals / seconds:10.0f} rows/s  peak RSS +{rss:.0f} MB")
+        seconds, rss, deals = measure(run_per_deal, str(path), args.sample)
+        print(f"  list of dicts + per-deal loop:    {seconds:7.2f}s  "
+              f"{deals / seconds:10.0f} rows/s  peak RSS +{rss:.0f} MB (time extrapolated)")
+
+if __name__ == "__main__":
+    main()
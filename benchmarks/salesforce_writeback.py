@@ -0,0 +1,72 @@
+"""
+Salesforce write-back benchmark against the local fake server
+
+Compares one request per record (update_opportunity / create_task) with the
+batched Collections / Bulk API writes.
+
+Usage:
+    python benchmarks/salesforce_writeback.py --records 1000 --latency-ms 40 --failure-rate 0.02
+"""
+import argparse
+import time
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.salesforce_fake import FakeSalesforce
+from app.services.salesforce_service import SalesforceService
+
+def make_service(args) -> SalesforceService:
+    service = SalesforceService.__new__(SalesforceService)
+    service.mock = True
+    service.sf = FakeSalesforce(
+        latency_ms=args.latency_ms,
+        failure_rate=args.failure_rate,
+        opportunities=FakeSalesforce.synthetic_opportunities(args.records),
+        seed=42
+    )
+    return service
+
+def report(label: str, elapsed: float, count: int, requests: int, failures: int):
+    print(f"{label:<22} {elapsed:8.2f}s {count / elapsed:10.0f} rec/s {requests:8d} requests {failures:6d} failed")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    service = make_service(args)
+    opportunities = list(service.sf.records["Opportunity"].values())
+    updates = [{"Id": opp["Id"], "AI_Risk_Score__c": 50, "Risk_Category__c": "MEDIUM"} for opp in opportunities]
+    tasks = [
+        {"Subject": f"High Risk Follow-up: {opp['Name']}", "WhatId": opp["Id"], "Priority": "High", "Status": "Not Started"}
+        for opp in opportunities
+    ]
+
+    print(f"{args.records} records, {args.latency_ms:.0f} ms latency, {args.failure_rate:.1%} failure rate\n")
+
+    if not args.skip_sequential:
+        start, before = time.perf_counter(), service.sf.request_count
+        ok = sum(service.update_opportunity(u["Id"], {k: v for k, v in u.items() if k != "Id"}) for u in updates)
+        report("sequential updates", time.perf_counter() - start, len(updates), service.sf.request_count - before, len(updates) - ok)
+
+        start, before = time.perf_counter(), service.sf.request_count
+        ok = sum(service.create_task(t)["status"] == "success" for t in tasks)
+        report("sequential tasks", time.perf_counter() - start, len(tasks), service.sf.request_count - before, len(tasks) - ok)
+
+    start, before = time.perf_counter(), service.sf.request_count
+    results = service.update_opportunities(updates)
+    report("batched updates", time.perf_counter() - start, len(updates), service.sf.request_count - before,
+           sum(not r["success"] for r in results))
+
+    start, before = time.perf_counter(), service.sf.request_count
+    results = service.create_tasks(tasks)
+    report("batched tasks", time.perf_counter() - start, len(tasks), service.sf.request_count - before,
+           sum(r["status"] != "success" for r in results))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+SARIMA serving benchmark: statsmodels results vs the compact forecaster
+
+Loads the active registry version's SARIMA both ways and reports:
+- retained memory after load (tracemalloc) and pickled size
+- per-call latency of mean + 95% CI for several horizons; for the compact
+  forecaster both the first call on a fresh instance (runs the
+  recursion) and repeat calls (cached slice)
+
+Usage:
+    python benchmarks/sarima_forecaster.py --repeat 20
+"""
+import argparse
+import gc
+import pickle
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.models.registry import model_registry, load_sarima, load_sarima_results
+
+HORIZONS = (7, 90, 730)
+
+def retained(load, path):
+    gc.collect()
+    tracemalloc.start()
+    obj = load(path)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    
+    version = model_registry.current_version()
+    if version is None:
+        sys.exit("No registry version published (python -m app.models.registry publish)")
+    path = model_registry.artifact_path(version, 'sarima_model')
+    
+    results, results_bytes = retained(load_sarima_results, path)
+    compact, compact_bytes = retained(load_sarima, path)
+    print(f"{'':<28}{'statsmodels':>14}{'compact':>14}")
+    print(f"{'retained memory (KiB)':<28}{results_bytes / 1024:>14.0f}{compact_bytes / 1024:>14.0f}")
+    print(f"{'pickled size (KiB)':<28}{len(pickle.dumps(results)) / 1024:>14.0f}{len(pickle.dumps(compact.to_arrays())) / 1024:>14.0f}")
+    
+    print(f"\n{'horizon':<10}{'statsmodels (ms)':>18}{'compact first (ms)':>20}{'compact cached (ms)':>21}")
+    for steps in HORIZONS:
+        # As ForecastService called it before (the training index has no freq)
+        index = pd.date_range(compact.index[-1] + pd.Timedelta(days=1), periods=steps, freq='D')
+        
+        def statsmodels_call():
+            forecast = results.get_forecast(steps, index=index)
+            forecast.predicted_mean, forecast.conf_int()
+        
+        def compact_first():
+            load_sarima(path).forecast(steps)
+        
+        compact.forecast(steps)
+        statsmodels_ms = timed(statsmodels_call, args.repeat)
+        # Fresh instance each time, minus the load itself
+        first_ms = timed(compact_first, args.repeat) - timed(lambda: load_sarima(path), args.repeat)
+        cached_ms = timed(lambda: compact.forecast(steps), args.repeat)
+        print(f"{steps:<10}{statsmodels_ms:>18.3f}{first_ms:>20.3f}{cached_ms:>21.3f}")
+
+if __name__ == "__main__":
+    main()
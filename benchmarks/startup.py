@@ -0,0 +1,62 @@
+"""
+Cold-start benchmark
+
+For each MODEL_LOADING mode, starts a fresh interpreter and measures:
+- import:  `import main` (app + every service singleton)
+- serving: app startup until the first /health response
+- ready:   until /ready reports every model loaded
+
+"eager" is the previous behaviour (all models unpickled at import).
+
+Usage:
+    python benchmarks/startup.py --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.get("/health")
+    t_serving = time.perf_counter() - t0
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.01)
+    t_ready = time.perf_counter() - t0
+print(json.dumps({"import": t_import, "serving": t_serving, "ready": t_ready}))
+"""
+
+def run(mode: str) -> dict:
+    env = dict(os.environ, MODEL_LOADING=mode, PYTHONPATH=str(ROOT), ANTHROPIC_API_KEY="", OPENAI_API_KEY="")
+    if mode == "lazy":
+        # Lazy never loads on its own; probe readiness after a forced warm-up
+        probe = PROBE.replace("while client", "main.model_loader.warm_up(background=False)\n    while client")
+    else:
+        probe = PROBE
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["eager", "background", "lazy"])
+    args = parser.parse_args()
+    
+    print(f"{'mode':<12}{'import (s)':>12}{'serving (s)':>14}{'ready (s)':>12}   (median of {args.runs})")
+    for mode in args.modes:
+        samples = [run(mode) for _ in range(args.runs)]
+        med = {k: statistics.median(s[k] for s in samples) for k in samples[0]}
+        print(f"{mode:<12}{med['import']:>12.2f}{med['serving']:>14.2f}{med['ready']:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Per-worker memory benchmark
+
+Emulates a pre-forking server (gunicorn with `preload_app`, see
+gunicorn.conf.py): a master imports the app, optionally loads everything
+and forks N workers. Each worker serves a forecast + risk workload, then
+the master reads every worker's /proc/<pid>/smaps_rollup while all of them
+are still alive:
+- rss:     resident set size
+- pss:     proportional set size (shared pages split between sharers)
+- private: pages only this worker holds
+
+Configurations:
+- no-preload: each worker loads models and data itself
+- preload:    loaded once in the master, data kept in private memory
+- preload+mmap: loaded in the master, historical series and forecast
+                table memory-mapped from CACHE_DIR (SHARED_DATA_MODE=mmap)
+
+Linux only (reads /proc). Usage:
+    python benchmarks/worker_memory.py --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import gc, json, os, sys
+preload, workers = sys.argv[1] == "1", int(sys.argv[2])
+import main
+from app.models.ml_models import model_loader
+from app.services.forecast_service import forecast_service
+from app.services.risk_service import risk_service
+
+def load():
+    model_loader.warm_up(background=False)
+    forecast_service.build_forecast_table()
+
+def serve():
+    forecasts = forecast_service.batch_predict("2015-01-03", "2019-03-31")
+    risk_service.assess_risk_batch([f["ensemble_prediction"] for f in forecasts], [f["date"] for f in forecasts])
+
+def memory(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0])
+    return {
+        "rss": fields["Rss"] / 1024,
+        "pss": fields["Pss"] / 1024,
+        "private": (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024,
+    }
+
+if preload:
+    load()
+    gc.freeze()
+
+children = []
+for _ in range(workers):
+    ready_r, ready_w = os.pipe()
+    release_r, release_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        load()
+        serve()
+        os.write(ready_w, b"1")
+        os.read(release_r, 1)
+        os._exit(0)
+    children.append((pid, ready_r, release_w))
+
+for pid, ready_r, _ in children:
+    os.read(ready_r, 1)
+stats = [memory(pid) for pid, _, _ in children]
+for pid, _, release_w in children:
+    os.write(release_w, b"1")
+    os.waitpid(pid, 0)
+print(json.dumps({"master": memory(os.getpid()), "workers": stats}))
+"""
+
+CONFIGS = {
+    "no-preload": {"preload": False, "SHARED_DATA_MODE": "memory"},
+    "preload": {"preload": True, "SHARED_DATA_MODE": "memory"},
+    "preload+mmap": {"preload": True, "SHARED_DATA_MODE": "mmap"},
+}
+
+def run(config: dict, workers: int) -> dict:
+    env = dict(
+        os.environ, PYTHONPATH=str(ROOT), MODEL_LOADING="lazy",
+        SHARED_DATA_MODE=config["SHARED_DATA_MODE"], ANTHROPIC_API_KEY="", OPENAI_API_KEY=""
+    )
+    args = [sys.executable, "-c", PROBE, "1" if config["preload"] else "0", str(workers)]
+    out = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    args = parser.parse_args()
+    
+    print(f"{'config':<14}{'rss/worker':>12}{'pss/worker':>12}{'private/worker':>16}{'total pss':>12}   (MiB, {args.workers} workers)")
+    for name in args.configs:
+        result = run(CONFIGS[name], args.workers)
+        workers = result["workers"]
+        avg = {k: sum(w[k] for w in workers) / len(workers) for k in workers[0]}
+        total_pss = result["master"]["pss"] + sum(w["pss"] for w in workers)
+        print(f"{name:<14}{avg['rss']:>12.1f}{avg['pss']:>12.1f}{avg['private']:>16.1f}{total_pss:>12.1f}")
+
+if __name__ == "__main__":
+    main()
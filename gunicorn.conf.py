@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for multi-worker deployments
+
+    pip install gunicorn
+    gunicorn main:app -c gunicorn.conf.py
+
+The app is preloaded in the master: models are unpickled and the forecast
+table is built once, then workers fork and share those pages copy-on-write.
+The historical series and forecast table are memory-mapped files (see
+SHARED_DATA_MODE), so they stay shared however long the workers run.
+"""
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+def when_ready(server):
+    """Load shared state in the master, after preload and before workers fork"""
+    if not preload_app:
+        return
+    from app.models.ml_models import model_loader
+    from app.services.forecast_service import forecast_service
+    
+    model_loader.warm_up(background=False)
+    try:
+        forecast_service.build_forecast_table()
+    except Exception as e:
+        server.log.warning(f"Forecast table not built in master: {e}")
+    
+    # Keep the collector from touching (and so copying) preloaded objects
+    gc.freeze()
+    server.log.info("Models and forecast table loaded in master")
@@ -3,10 +3,13 @@ FastAPI Application Entry Point
 """
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from app.api import forecast, risk, reports, models_info
 from app.models.schemas import HealthResponse
 from app.models.ml_models import model_loader
+from app.services.forecast_service import forecast_service
+from app.services.inference_executor import inference_executor, ExecutorSaturatedError
+from app.services.email_service import email_service
 from app.config import settings
 import os
 
@@ -36,19 +39,86 @@ app.include_router(risk.router)
 app.include_router(reports.router)
 app.include_router(models_info.router)
 # New Routers
-from app.api import decisions, integrations
+from app.api import decisions, integrations, series
 app.include_router(decisions.router)
 app.include_router(integrations.router)
+app.include_router(series.router)
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Load models on a background thread so startup does not wait for them"""
+    if settings.MODEL_LOADING == "background":
+        model_loader.warm_up(background=True)
+
+@app.on_event("startup")
+async def watch_model_registry():
+    """Pick up newly activated registry versions without a restart"""
+    if settings.MODEL_REGISTRY_POLL_SECONDS > 0:
+        model_loader.watch_registry(settings.MODEL_REGISTRY_POLL_SECONDS)
+
+@app.on_event("startup")
+async def listen_for_model_reload():
+    """Reload models as soon as a publisher (e.g. the retrain job) signals"""
+    model_loader.listen_for_reload_signal()
+
+@app.on_event("startup")
+async def build_forecast_table():
+    """
+    Precompute the forecast horizon table in the background
+    
+    Not in lazy mode: the build loads every model, so the first forecast
+    triggers it instead.
+    """
+    if settings.MODEL_LOADING != "lazy":
+        forecast_service.start_background_build()
+
+@app.on_event("shutdown")
+async def stop_listening_for_model_reload():
+    """Deregister this process from reload signals"""
+    model_loader.stop_listening_for_reload_signal()
+
+@app.on_event("shutdown")
+async def shutdown_inference_pools():
+    """Stop inference worker pools"""
+    inference_executor.shutdown()
+
+@app.on_event("shutdown")
+async def close_email_sessions():
+    """Flush the email queue and close pooled SMTP sessions"""
+    await email_service.close()
+
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request, exc: ExecutorSaturatedError):
+    """Backpressure: tell clients to retry when an inference pool is full"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
 
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """API Health Check"""
     return {
         "status": "healthy",
-        "models_loaded": model_loader._models_loaded,
+        "models_loaded": model_loader.models_loaded,
         "api_version": settings.API_VERSION
     }
 
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness: per-model load state and time (503 until all models are loaded)"""
+    ready = model_loader.models_loaded
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "model_version": model_loader.active_version,
+            "models": model_loader.status(),
+            "forecast_table_ready": forecast_service.forecast_table is not None
+        }
+    )
+
 # Run app
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,118 @@
+"""
+Anomaly scoring tests against the training notebook's per-window features
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from sklearn.ensemble import IsolationForest
+from app.models.ml_models import model_loader
+from app.services.anomaly_service import AnomalyService, risk_features, window_features, WINDOW
+
+FEATURES = ['Sales', 'volatility_30d', 'volatility_7d', 'cv_30d', 'trend_30d', 'momentum_7d', 'momentum_30d', 'zscore']
+
+def calculate_risk_features(ts_data, window=30):
+    """calculate_risk_features() of sales-forecasting.ipynb (the columns the detector can use)"""
+    df = ts_data.copy()
+    df['volatility_30d'] = df['Sales'].rolling(window=window).std()
+    df['volatility_7d'] = df['Sales'].rolling(window=7).std()
+    df['cv_30d'] = df['volatility_30d'] / df['Sales'].rolling(window=window).mean()
+    
+    def calculate_trend(series):
+        if len(series) < 2:
+            return 0
+        slope, _, _, _, _ = stats.linregress(np.arange(len(series)), series)
+        return slope
+    
+    df['trend_30d'] = df['Sales'].rolling(window=window).apply(calculate_trend, raw=False)
+    df['momentum_7d'] = df['Sales'].pct_change(7)
+    df['momentum_30d'] = df['Sales'].pct_change(30)
+    rolling_mean = df['Sales'].rolling(window=window).mean()
+    rolling_std = df['Sales'].rolling(window=window).std()
+    df['zscore'] = (df['Sales'] - rolling_mean) / rolling_std
+    return df.bfill().fillna(0)
+
+def make_sales(n=400, seed=2):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    sales = 4000 + 3 * t + 600 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 300, n)
+    sales[[120, 250, 333]] *= [2.5, 0.2, 3.0]
+    return sales
+
+@pytest.fixture
+def service(monkeypatch):
+    sales = make_sales()
+    detector = IsolationForest(contamination=0.02, random_state=0).fit(risk_features(sales)[FEATURES])
+    monkeypatch.setattr(model_loader, "get_anomaly_detector", lambda: detector)
+    
+    service = AnomalyService()
+    dates = pd.date_range("2018-01-01", periods=len(sales), freq="D")
+    last_date = dates[-31]
+    scores = pd.DataFrame({'sales': sales, **service.score_series(sales)}, index=dates)
+    scores['type'] = np.where(scores.index <= last_date, 'historical', 'future')
+    monkeypatch.setattr(service, "_scores", scores)
+    monkeypatch.setattr(service, "_scores_version", model_loader.model_version)
+    return service, detector, sales, dates, last_date
+
+def test_risk_features_match_the_notebook():
+    sales = make_sales()
+    expected = calculate_risk_features(pd.DataFrame({'Sales': sales}))[FEATURES]
+    pd.testing.assert_frame_equal(risk_features(sales)[FEATURES], expected, rtol=1e-8, atol=1e-9)
+
+def test_window_features_match_the_last_row_of_the_series():
+    sales = make_sales()
+    full = risk_features(sales)[FEATURES]
+    ends = np.arange(WINDOW + 1, len(sales))
+    windows = np.stack([sales[end - WINDOW:end + 1] for end in ends])
+    got = window_features(windows)[FEATURES]
+    np.testing.assert_allclose(got.to_numpy(), full.iloc[ends].to_numpy(), rtol=1e-8, atol=1e-9)
+
+def test_series_scores_match_detector_predict(service):
+    service, detector, sales, _, _ = service
+    result = service.score_series(sales)
+    features = risk_features(sales)[FEATURES]
+    np.testing.assert_allclose(result['anomaly_score'], detector.score_samples(features))
+    np.testing.assert_array_equal(result['is_anomaly'], detector.predict(features) == -1)
+    assert result['is_anomaly'][[120, 250, 333]].all()
+
+def test_future_values_are_scored_in_context(service):
+    service, detector, sales, dates, last_date = service
+    future = np.flatnonzero(dates > last_date)[:10]
+    values = sales[future] * np.linspace(0.5, 3.0, len(future))
+    
+    flags = service.is_anomaly_batch(dates[future], values)
+    
+    # One day at a time: the series up to the day before, then the value
+    expected = []
+    for position, value in zip(future, values):
+        series = np.append(sales[:position], value)
+        expected.append(detector.predict(risk_features(series)[FEATURES].iloc[[-1]])[0] == -1)
+    np.testing.assert_array_equal(flags, expected)
+    assert service.is_anomaly(dates[future[-1]].strftime('%Y-%m-%d'), values[-1]) == expected[-1]
+    
+    # Historical dates keep their observed flags whatever value is given
+    history = np.array([120, 121])
+    np.testing.assert_array_equal(
+        service.is_anomaly_batch(dates[history], [1.0, 1.0]),
+        service.scores['is_anomaly'].to_numpy()[history]
+    )
+
+def test_dates_outside_the_scored_range_are_rejected(service):
+    service, _, sales, dates, _ = service
+    before, after = dates[0] - pd.Timedelta(days=1), dates[-1] + pd.Timedelta(days=1)
+    for date in (before, after):
+        with pytest.raises(ValueError, match="outside the scored range"):
+            service.is_anomaly_batch([dates[5], date], [1.0, 1.0])
+        with pytest.raises(ValueError):
+            service.is_anomaly(date.strftime('%Y-%m-%d'))
+
+def test_skipped_history_dates_are_scored_in_context(service, monkeypatch):
+    service, detector, sales, dates, _ = service
+    gap = 200
+    monkeypatch.setattr(service, "_scores", service.scores.drop(dates[gap]))
+    value = sales[gap] * 2.5
+    
+    expected = detector.predict(risk_features(np.append(sales[:gap], value))[FEATURES].iloc[[-1]])[0] == -1
+    assert expected and service.is_anomaly_batch([dates[gap]], [value])[0]
+    # Without a value there is nothing observed to flag
+    assert not service.is_anomaly_batch([dates[gap]])[0]
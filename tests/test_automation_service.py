@@ -0,0 +1,98 @@
+"""
+Staged daily pipeline tests against the fake Salesforce server
+"""
+import asyncio
+import pytest
+from app.config import settings
+from app.services.automation_service import automation_service
+from app.services.deal_risk_service import deal_risk_service
+from app.services.llm_service import llm_service
+from app.services.salesforce_fake import FakeSalesforce
+from app.services.salesforce_service import salesforce_service
+from app.services.slack_service import slack_service
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    opportunities = FakeSalesforce.synthetic_opportunities(230, seed=3)
+    fake = FakeSalesforce(opportunities=opportunities, page_size=50, seed=1)
+    monkeypatch.setattr(salesforce_service, "sf", fake)
+    monkeypatch.setattr(settings, "PIPELINE_WRITE_BATCH_SIZE", 40)
+    monkeypatch.setattr(settings, "PIPELINE_QUEUE_SIZE", 16)
+    alerts = []
+    
+    async def generate_deal_insights(opportunity, risk_data):
+        await asyncio.sleep(0)
+        return f"Insights for {opportunity['Name']}"
+    
+    monkeypatch.setattr(llm_service, "generate_deal_insights", generate_deal_insights)
+    monkeypatch.setattr(slack_service, "send_deal_alert", lambda opp, risk_data, link: alerts.append(opp['Id']))
+    
+    # What the per-opportunity pipeline did: score the fetched records, update
+    # them, and create a task + alert for risky deals
+    risky = [
+        opp['Id'] for opp in salesforce_service.get_open_opportunities()
+        if (risk := deal_risk_service.predict_risk(opp))['risk_category'] == "HIGH" or risk['win_probability'] < 0.5
+    ]
+    assert 0 < len(risky) < len(opportunities)
+    return fake, opportunities, risky, alerts
+
+def run():
+    return asyncio.run(asyncio.wait_for(automation_service.run_daily_pipeline(), timeout=30))
+
+def test_pipeline_matches_per_opportunity_processing(pipeline):
+    fake, opportunities, risky, alerts = pipeline
+    results = run()
+    assert {k: results[k] for k in ("processed", "tasks_created", "alerts_sent", "errors")} == {
+        "processed": len(opportunities), "tasks_created": len(risky), "alerts_sent": len(risky), "errors": 0,
+    }
+    for opp in salesforce_service.get_open_opportunities():
+        risk = deal_risk_service.predict_risk(opp)
+        record = fake.records["Opportunity"][opp['Id']]
+        assert (record["AI_Risk_Score__c"], record["Risk_Category__c"]) == (risk['risk_score'], risk['risk_category'])
+    tasks = fake.records["Task"].values()
+    assert sorted(task["WhatId"] for task in tasks) == sorted(risky) == sorted(alerts)
+    assert all(task["Description"].startswith("Insights for ") for task in tasks)
+    assert results["stages"]["fetch"]["items"] == len(opportunities)
+
+def test_failing_writers_are_counted_and_the_pipeline_finishes(pipeline, monkeypatch):
+    fake, opportunities, risky, alerts = pipeline
+    calls = {"updates": 0, "tasks": 0}
+    update_opportunities, create_tasks = salesforce_service.update_opportunities, salesforce_service.create_tasks
+    
+    def failing_updates(batch):
+        calls["updates"] += 1
+        if calls["updates"] == 2:
+            raise ConnectionError("Salesforce unavailable")
+        return update_opportunities(batch)
+    
+    def failing_tasks(tasks):
+        calls["tasks"] += 1
+        if calls["tasks"] == 1:
+            failing_tasks.lost = len(tasks)
+            raise ConnectionError("Salesforce unavailable")
+        return create_tasks(tasks)
+    
+    monkeypatch.setattr(salesforce_service, "update_opportunities", failing_updates)
+    monkeypatch.setattr(salesforce_service, "create_tasks", failing_tasks)
+    results = run()
+    
+    updated = sum("AI_Risk_Score__c" in r for r in fake.records["Opportunity"].values())
+    lost_updates = len(opportunities) - updated
+    assert calls["updates"] > 2 and 0 < lost_updates <= settings.PIPELINE_WRITE_BATCH_SIZE
+    assert results["processed"] == len(opportunities)
+    assert results["tasks_created"] == results["alerts_sent"] == len(alerts) == len(risky) - failing_tasks.lost
+    assert results["errors"] == lost_updates + failing_tasks.lost
+    assert "error" not in results
+
+def test_a_crashed_stage_stops_the_pipeline(pipeline, monkeypatch):
+    predict_risk_batch = deal_risk_service.predict_risk_batch
+    
+    def bad_scores(page):
+        if page[0]['Id'] == pipeline[1][100]['Id']:
+            return [{}] * len(page)
+        return predict_risk_batch(page)
+    
+    monkeypatch.setattr(deal_risk_service, "predict_risk_batch", bad_scores)
+    results = run()
+    assert "KeyError" in results["error"] and results["errors"] >= 1
+    assert results["processed"] >= 100
@@ -0,0 +1,108 @@
+"""
+Rolling-origin backtest tests against per-cutoff forecasts
+"""
+import logging
+import threading
+import warnings
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from app.models.backtest import run_backtest, forecast_from_origins, backtest_origins, refit_forecasts, sample_cutoffs
+from app.models.ensemble_weights import EnsembleWeights
+from app.models.prophet_scorer import ProphetScorer, ProphetModelScorer
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+@lru_cache(maxsize=None)
+def fit_models():
+    rng = np.random.default_rng(11)
+    t = np.arange(500)
+    sales = 3000 + 2 * t + 500 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 200, len(t)).cumsum() * 0.3
+    data = pd.DataFrame({'Sales': sales}, index=pd.date_range("2017-01-01", periods=len(t), freq="D", name="Date"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sarima = SARIMAX(data['Sales'], order=(0, 1, 1), seasonal_order=(0, 0, 2, 7)).fit(disp=False, maxiter=200)
+        prophet = Prophet(weekly_seasonality=True, yearly_seasonality=False).fit(
+            pd.DataFrame({'ds': data.index, 'y': data['Sales']})
+        )
+    return data, prophet, sarima
+
+@lru_cache(maxsize=None)
+def fit():
+    data, prophet, sarima = fit_models()
+    return data, ProphetScorer.from_model(prophet), sarima
+
+def test_workers_give_the_same_report():
+    data, prophet, sarima = fit()
+    weights = EnsembleWeights.fixed(0.4, (1, 8, 15))
+    serial = run_backtest(prophet, sarima, data, weights, horizon=30, min_train=100, step=3, workers=1, chunk_size=16)
+    # From a daemon thread, as backtest_service runs it
+    reports = []
+    thread = threading.Thread(target=lambda: reports.append(run_backtest(
+        prophet, sarima, data, weights, horizon=30, min_train=100, step=3, workers=2, chunk_size=16
+    )), daemon=True)
+    thread.start()
+    thread.join(timeout=120)
+    parallel = reports[0]
+    assert serial['summary'] == parallel['summary'] and serial['by_horizon'] == parallel['by_horizon']
+    assert serial['config']['parameters_in_sample'] == ['prophet', 'sarima', 'ensemble']
+    assert serial['origins']['count'] == len(backtest_origins(len(data), 100, 3)) == 134
+    assert list(serial['summary']['ensemble']) == ['1-7', '8-14', '15-30', 'all']
+    assert serial['summary']['sarima']['all']['n'] == sum(min(30, len(data) - o) for o in range(100, 500, 3))
+
+def test_metrics_match_direct_computation():
+    data, prophet, sarima = fit()
+    weights = EnsembleWeights.fixed(0.25)
+    report = run_backtest(prophet, sarima, data, weights, horizon=14, min_train=200, workers=1)
+    
+    # Horizon 5 from every cutoff, one cutoff at a time
+    actual, ensemble, covered = [], [], []
+    for origin in range(200, len(data) - 4):
+        forecasts = forecast_from_origins(prophet, sarima, data, [origin], 5, alpha=0.05)
+        p, s = forecasts['prophet'][0, 4], forecasts['sarima'][0, 4]
+        lower = max(0.25 * forecasts['prophet_lower'][0, 4] + 0.75 * forecasts['sarima_lower'][0, 4], 0)
+        upper = 0.25 * forecasts['prophet_upper'][0, 4] + 0.75 * forecasts['sarima_upper'][0, 4]
+        actual.append(forecasts['actual'][0, 4])
+        ensemble.append(0.25 * p + 0.75 * s)
+        covered.append(lower <= actual[-1] <= upper)
+    actual, ensemble = np.array(actual), np.array(ensemble)
+    
+    metrics = {name: values[4] for name, values in report['by_horizon']['ensemble'].items()}
+    assert metrics['mae'] == round(float(np.mean(np.abs(ensemble - actual))), 4)
+    assert metrics['mape'] == round(float(np.mean(np.abs(ensemble - actual) / actual) * 100), 4)
+    assert metrics['smape'] == round(float(np.mean(2 * np.abs(ensemble - actual) / (ensemble + actual)) * 100), 4)
+    assert metrics['coverage'] == round(float(np.mean(covered)), 4)
+    # The series is an integrated random walk: SARIMA's bounds fit it, Prophet's do not
+    assert report['summary']['sarima']['all']['coverage'] > 0.9
+    assert report['summary']['prophet']['all']['coverage'] < report['summary']['sarima']['all']['coverage']
+
+def test_predict_scorer_is_flagged_in_sample():
+    data, model, sarima = fit_models()
+    prophet = ProphetModelScorer(model)
+    with pytest.raises(ValueError):
+        forecast_from_origins(prophet, sarima, data, [300], 5)
+    
+    report = run_backtest(prophet, sarima, data, EnsembleWeights.fixed(0.5), horizon=7, min_train=480, workers=1)
+    assert report['config']['prophet_in_sample'] is True
+    assert run_backtest(fit()[1], sarima, data, EnsembleWeights.fixed(0.5), horizon=7, min_train=480)['config']['prophet_in_sample'] is False
+
+def test_refit_forecasts_never_see_the_forecast_rows():
+    data, model, sarima = fit_models()
+    cutoffs = sample_cutoffs(len(data), 300, 30, 2)
+    assert cutoffs.tolist() == [300, 470]
+    
+    forecasts = refit_forecasts(model, sarima, data, cutoffs[:1], 30)
+    # Changing everything from the cutoff on changes the actuals only
+    shifted = data.copy()
+    shifted.iloc[300:, 0] *= 1.5
+    refit = refit_forecasts(model, sarima, shifted, cutoffs[:1], 30)
+    np.testing.assert_allclose(refit['prophet'], forecasts['prophet'], rtol=1e-6)
+    np.testing.assert_allclose(refit['sarima'], forecasts['sarima'], rtol=1e-6)
+    np.testing.assert_allclose(refit['actual'], 1.5 * forecasts['actual'])
+    
+    # The fixed-parameter pass from the same origin has seen those rows
+    in_sample = forecast_from_origins(fit()[1], sarima, data, cutoffs[:1], 30)
+    assert not np.allclose(in_sample['prophet'], forecasts['prophet'], rtol=1e-3)
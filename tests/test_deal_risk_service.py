@@ -0,0 +1,108 @@
+"""
+Batched deal scoring tests against the per-opportunity feature path
+"""
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.deal_risk_service import DealRiskService, FEATURE_NAMES
+
+def engineer_features_baseline(opportunity):
+    """DealRiskService.engineer_features before batching (one dict at a time)"""
+    now = datetime.now()
+    close_date = pd.to_datetime(opportunity.get('CloseDate'))
+    created_date = pd.to_datetime(opportunity.get('CreatedDate'))
+    features = {
+        'amount': float(opportunity.get('Amount', 0)),
+        'days_open': (now - created_date).days,
+        'days_to_close': (close_date - now).days,
+        'probability': float(opportunity.get('Probability', 0)) / 100.0,
+        'is_high_value': 1 if float(opportunity.get('Amount', 0)) > 100000 else 0,
+    }
+    features['deal_velocity'] = features['amount'] / max(1, features['days_open'])
+    features['urgency_factor'] = 1.0 / max(1, features['days_to_close'])
+    current_stage = opportunity.get('StageName', 'Prospecting')
+    for stage in ['Prospecting', 'Qualification', 'Needs Analysis', 'Proposal', 'Negotiation']:
+        features[f'stage_{stage.lower().replace(" ", "_")}'] = 1 if current_stage == stage else 0
+    features['activity_score'] = float(opportunity.get('ActivityScore', 50)) / 100.0
+    return pd.DataFrame([features])
+
+def predict_risk_baseline(opportunity):
+    row = engineer_features_baseline(opportunity).iloc[0]
+    prob = row['probability'] * 0.5
+    if row['days_to_close'] < 7: prob -= 0.1
+    if row['activity_score'] > 0.7: prob += 0.2
+    if row['stage_negotiation'] == 1: prob += 0.1
+    prob = float(np.clip(prob, 0.05, 0.95))
+    category = "LOW" if prob > 0.75 else "MEDIUM" if prob > 0.50 else "HIGH"
+    factors = []
+    if row['days_to_close'] < 14: factors.append("Close date approaching")
+    if row['amount'] > 100000: factors.append("High-value deal")
+    if row['activity_score'] < 0.3: factors.append("Low interaction activity")
+    if prob < 0.5: factors.append("Below historical win threshold for stage")
+    return {
+        "opportunity_id": opportunity.get('Id'), "win_probability": round(prob, 4),
+        "risk_score": round((1 - prob) * 100, 2), "risk_category": category,
+        "action_priority": category, "key_factors": factors,
+    }
+
+def day(offset):
+    # Noon, so the day counts cannot flip while the test runs
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%dT12:00:00")
+
+OPPORTUNITIES = [
+    {'Id': "a", 'Amount': 150000, 'CreatedDate': day(-40), 'CloseDate': day(5), 'Probability': 60,
+     'StageName': "Negotiation", 'ActivityScore': 80},
+    {'Id': "b", 'Amount': "2500.5", 'CreatedDate': day(0), 'CloseDate': day(-3), 'Probability': "30",
+     'StageName': "Needs Analysis", 'ActivityScore': 10},
+    {'Id': "c", 'Amount': 90000, 'CreatedDate': day(-400), 'CloseDate': day(60), 'Probability': 90,
+     'StageName': "Closed Won"},
+    {'Id': "d", 'Amount': 40000, 'CreatedDate': day(-10), 'CloseDate': day(20)},
+    # Empty dates parse as NaT: the derived features fall back to 1 day
+    {'Id': "e", 'Amount': 75000, 'CreatedDate': "", 'CloseDate': day(12), 'Probability': 50,
+     'StageName': "Proposal", 'ActivityScore': 55},
+    {'Id': "f", 'Amount': 120000, 'CreatedDate': day(-30), 'CloseDate': "", 'Probability': 70},
+    {'Id': "g", 'CreatedDate': "", 'CloseDate': ""},
+]
+
+@pytest.fixture
+def service(tmp_path):
+    return DealRiskService(model_path=tmp_path / "missing_model.json")
+
+def test_batch_features_match_per_opportunity_features(service):
+    X = service.engineer_features_batch(OPPORTUNITIES)
+    assert X.shape == (len(OPPORTUNITIES), len(FEATURE_NAMES))
+    for opportunity, row in zip(OPPORTUNITIES, X):
+        expected = engineer_features_baseline(opportunity)
+        assert list(expected.columns) == FEATURE_NAMES
+        np.testing.assert_array_equal(row, expected.to_numpy(dtype=float)[0], err_msg=opportunity['Id'])
+        pd.testing.assert_frame_equal(service.engineer_features(opportunity), expected.astype(float))
+    assert np.isnan(X[4, FEATURE_NAMES.index('days_open')]) and X[4, FEATURE_NAMES.index('deal_velocity')] == 75000
+
+def test_missing_or_invalid_fields_match_empty_ones(service):
+    # The per-opportunity path raised on these; the batch treats them as empty
+    missing = [
+        {'Id': "h", 'Amount': 75000, 'CloseDate': day(12), 'Probability': 50, 'StageName': "Proposal", 'ActivityScore': 55},
+        {'Id': "i", 'Amount': 75000, 'CreatedDate': "not a date", 'CloseDate': day(12), 'Probability': 50,
+         'StageName': "Proposal", 'ActivityScore': 55},
+        {'Id': "j", 'Amount': 75000, 'CreatedDate': None, 'CloseDate': day(12), 'Probability': 50,
+         'StageName': "Proposal", 'ActivityScore': 55},
+    ]
+    X = service.engineer_features_batch(missing)
+    expected = engineer_features_baseline(OPPORTUNITIES[4]).to_numpy(dtype=float)[0]
+    for row in X:
+        np.testing.assert_array_equal(row, expected)
+    
+    # Missing / unparsable numbers use the per-opportunity defaults
+    X = service.engineer_features_batch([{'Amount': None, 'Probability': "n/a", 'ActivityScore': None}])
+    assert X[0, FEATURE_NAMES.index('amount')] == 0
+    assert X[0, FEATURE_NAMES.index('probability')] == 0
+    assert X[0, FEATURE_NAMES.index('activity_score')] == 0.5
+    assert X[0, FEATURE_NAMES.index('stage_prospecting')] == 1
+
+def test_batch_scores_match_per_opportunity_scores(service):
+    assert service.model is None
+    batch = service.predict_risk_batch(OPPORTUNITIES)
+    assert batch == [predict_risk_baseline(opportunity) for opportunity in OPPORTUNITIES]
+    assert service.predict_risk(OPPORTUNITIES[0]) == batch[0]
+    assert service.predict_risk_batch([]) == []
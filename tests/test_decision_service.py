@@ -0,0 +1,83 @@
+"""
+Decision rules engine tests against the hard-coded if/elif chain it replaced
+"""
+import itertools
+import json
+import numpy as np
+import pytest
+from app.services.decision_service import DecisionService, RuleError, RuleTable
+
+def evaluate_chain(forecast_value, risk_data):
+    """DecisionService.evaluate() before the rules moved to decision_rules.json"""
+    risk_score = risk_data.get('risk_score', 0)
+    reliability = risk_data.get('reliability', 'MEDIUM')
+    if risk_score >= 70 and reliability == "LOW":
+        return {"actions": ["SEND_EMAIL_ALERT", "CREATE_SALESFORCE_TASK"], "priority": "HIGH",
+                "reason": "High risk with low reliability"}
+    elif risk_score >= 70:
+        return {"actions": ["SEND_EMAIL_ALERT"], "priority": "MEDIUM", "reason": "High risk detected"}
+    elif risk_data.get('is_anomaly', False):
+        return {"actions": ["FLAG_FOR_REVIEW", "INCLUDE_IN_WEEKLY_REPORT"], "priority": "MEDIUM",
+                "reason": "Anomaly detected"}
+    elif forecast_value < 2000:
+        return {"actions": ["INVENTORY_WARNING"], "priority": "HIGH", "reason": "Forecast below critical threshold"}
+    return {"actions": ["LOG_ONLY"], "priority": "LOW", "reason": "Normal forecast"}
+
+FORECASTS = [0.0, 1999.99, 2000.0, 5000.0, float('nan')]
+RISK_SCORES = [0, 50, 69.99, 70, 70.01, 100]
+RELIABILITIES = ['LOW', 'MEDIUM', 'HIGH']
+ANOMALIES = [False, True]
+
+def test_rules_file_reproduces_the_chain_row_for_row():
+    service = DecisionService()
+    rows = list(itertools.product(FORECASTS, RISK_SCORES, RELIABILITIES, ANOMALIES))
+    forecasts, risk_scores, reliabilities, anomalies = (list(column) for column in zip(*rows))
+    
+    batch = service.evaluate_batch(forecasts, risk_scores, reliabilities, anomalies)
+    assert len(batch) == len(rows)
+    for row, result in zip(rows, batch):
+        forecast, risk_score, reliability, is_anomaly = row
+        risk = {'risk_score': risk_score, 'reliability': reliability, 'is_anomaly': is_anomaly}
+        expected = evaluate_chain(forecast, risk)
+        assert service.evaluate(forecast, risk) == expected, row
+        assert {**result, 'actions': list(result['actions'])} == expected, row
+
+def test_missing_risk_fields_use_the_chain_defaults():
+    service = DecisionService()
+    for forecast in FORECASTS:
+        assert service.evaluate(forecast, {}) == evaluate_chain(forecast, {})
+        assert service.evaluate(forecast, {'risk_score': 80}) == evaluate_chain(forecast, {'risk_score': 80})
+    
+    rng = np.random.default_rng(5)
+    forecasts = rng.uniform(0, 6000, 500)
+    expected = [evaluate_chain(value, {}) for value in forecasts]
+    assert [{**r, 'actions': list(r['actions'])} for r in service.evaluate_batch(forecasts)] == expected
+
+def test_invalid_tables_are_rejected():
+    default = {'actions': ['LOG_ONLY'], 'priority': 'LOW', 'reason': 'Normal'}
+    with pytest.raises(RuleError):
+        RuleTable([])
+    with pytest.raises(RuleError):
+        RuleTable([{**default, 'when': [['margin', '<', 1]]}, default])
+    with pytest.raises(RuleError):
+        RuleTable([{**default, 'when': [['forecast', '~', 1]]}, default])
+    with pytest.raises(RuleError):
+        RuleTable([{**default, 'when': [['forecast', '<', 1]]}])
+
+def test_edited_rules_file_is_picked_up(tmp_path):
+    path = tmp_path / "rules.json"
+    default = {'name': 'default', 'when': [], 'actions': ['LOG_ONLY'], 'priority': 'LOW', 'reason': 'Normal'}
+    path.write_text(json.dumps([default]))
+    service = DecisionService(rules_path=path)
+    assert service.evaluate(100.0, {})['priority'] == 'LOW'
+    
+    low = {'name': 'low', 'when': [['forecast', '<', 500]], 'actions': ['INVENTORY_WARNING'],
+           'priority': 'HIGH', 'reason': 'Low'}
+    path.write_text(json.dumps([low, default]))
+    service._table_mtime = None
+    assert service.evaluate(100.0, {})['priority'] == 'HIGH'
+    
+    # A broken edit keeps the last good table
+    path.write_text("[")
+    service._table_mtime = None
+    assert service.evaluate(100.0, {})['priority'] == 'HIGH'
@@ -0,0 +1,155 @@
+"""
+Email service tests against a local SMTP stand-in
+"""
+import asyncio
+import base64
+import email
+from app.services.email_service import EmailService, render_report_html, render_weekly_html
+
+REPORT = {
+    'date': '2019-01-10',
+    'forecast': {'date': '2019-01-10', 'ensemble_prediction': 15234.5, 'prophet_prediction': 14000.0, 'sarima_prediction': 16057.0},
+    'risk': {
+        'risk_level': 'High', 'risk_score': 70, 'reliability': 'Low',
+        'deviation_from_mean': 12.34, 'risk_factors': ['Wide confidence interval']
+    },
+    'explanation': 'Sales look steady.',
+    'generated_at': '2019-01-01 09:00:00'
+}
+
+class LocalSMTPServer:
+    """
+    Tiny SMTP server: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT.
+    `fail_data` transient (451) DATA failures are returned before accepting.
+    """
+    
+    def __init__(self, fail_data=0, reject=()):
+        self.fail_data = fail_data
+        self.reject = set(reject)
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+    
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+    
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+    
+    def service(self, **kwargs):
+        return EmailService(
+            sender="agent@example.com", password="app password", hostname="127.0.0.1",
+            port=self.port, use_tls=False, backoff=0.01, **kwargs
+        )
+    
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        
+        def reply(line):
+            writer.write((line + "\r\n").encode())
+        
+        reply("220 localhost ESMTP")
+        mail_from, rcpts = None, []
+        try:
+            while line := await reader.readline():
+                command = line.decode().rstrip("\r\n")
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    reply("250-localhost")
+                    reply("250 AUTH PLAIN")
+                elif verb == "AUTH":
+                    credentials = base64.b64decode(command.split()[-1]).split(b"\0")
+                    assert credentials[1:] == [b"agent@example.com", b"apppassword"]
+                    self.logins += 1
+                    reply("235 Authentication successful")
+                elif verb == "MAIL":
+                    mail_from, rcpts = command, []
+                    reply("250 OK")
+                elif verb == "RCPT":
+                    address = command.split("<", 1)[1].rstrip(">")
+                    if address in self.reject:
+                        reply("550 No such user")
+                    else:
+                        rcpts.append(address)
+                        reply("250 OK")
+                elif verb == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    data = []
+                    while (chunk := await reader.readline()) != b".\r\n":
+                        data.append(chunk)
+                    if self.fail_data:
+                        self.fail_data -= 1
+                        reply("451 Try again later")
+                    else:
+                        self.messages.append((rcpts, email.message_from_bytes(b"".join(data))))
+                        reply("250 Queued")
+                elif verb in ("RSET", "NOOP"):
+                    reply("250 OK")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 Not implemented")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+def test_report_template_renders_sections():
+    html = render_report_html(REPORT)
+    assert "$15,234.50" in html
+    assert "Prophet: $14,000.00" in html
+    assert "+12.3% from average" in html
+    assert "• Wide confidence interval" in html
+    assert "#F44336" in html
+
+def test_send_report_reuses_one_authenticated_session():
+    async def scenario():
+        async with LocalSMTPServer() as server:
+            service = server.service(pool_size=1)
+            for i in range(3):
+                assert await service.send_report(REPORT, f"user{i}@example.com")
+            await service.close()
+            assert server.connections == 1
+            assert server.logins == 1
+            assert [rcpts for rcpts, _ in server.messages] == [[f"user{i}@example.com"] for i in range(3)]
+            assert server.messages[0][1]["Subject"] == "Sales Forecast Alert - 2019-01-10"
+    asyncio.run(scenario())
+
+def test_transient_failures_are_retried():
+    async def scenario():
+        async with LocalSMTPServer(fail_data=2) as server:
+            service = server.service(max_retries=3)
+            assert await service.send_report(REPORT, "boss@example.com")
+            await service.close()
+            assert len(server.messages) == 1
+            assert service.stats()["retries"] == 2
+    asyncio.run(scenario())
+
+def test_bulk_weekly_report_uses_one_session_and_reports_per_recipient():
+    weekly = {
+        'summary': {'forecast_start': '2018-12-31', 'forecast_end': '2019-01-06', 'average_daily_sales': 1500.0},
+        'detailed_reports': [
+            {'date': '2018-12-31', 'forecast': 1000.0, 'risk_level': 'Low', 'risk_score': 10},
+            {'date': '2019-01-01', 'forecast': 2000.0, 'risk_level': 'High', 'risk_score': 80},
+        ]
+    }
+    assert "Total: $3,000.00" in render_weekly_html(weekly)
+    
+    async def scenario():
+        async with LocalSMTPServer(reject={"gone@example.com"}) as server:
+            service = server.service()
+            recipients = [f"team{i}@example.com" for i in range(5)] + ["gone@example.com"]
+            results = await service.send_weekly_report(weekly, recipients)
+            await service.close()
+            assert results == {**{r: True for r in recipients[:-1]}, "gone@example.com": False}
+            assert server.connections == 1
+            assert len(server.messages) == 5
+            assert server.messages[0][1]["Subject"] == "Weekly Sales Forecast - 2018-12-31"
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+"""
+Ensemble weight table tests on synthetic backtest errors
+"""
+import numpy as np
+import pandas as pd
+from app.models.ensemble_weights import EnsembleWeights, fit_weights, combined_metrics
+
+def make_backtest(n_origins=400, horizon=40, seed=5):
+    """Prophet is the better model on weekends and at long horizons"""
+    rng = np.random.default_rng(seed)
+    start = pd.date_range("2018-01-01", periods=n_origins, freq="D").to_numpy()
+    dates = start[:, None] + np.arange(horizon).astype('timedelta64[D]')
+    dayofweek = pd.DatetimeIndex(dates.ravel()).dayofweek.to_numpy().reshape(dates.shape)
+    weekend = dayofweek >= 5
+    long = np.arange(horizon) >= 14
+    
+    actual = rng.normal(1000, 100, dates.shape)
+    prophet_sd = np.where(weekend | long, 20.0, 80.0)
+    sarima_sd = np.where(weekend | long, 80.0, 20.0)
+    return {
+        'prophet': actual + rng.normal(size=dates.shape) * prophet_sd,
+        'sarima': actual + rng.normal(size=dates.shape) * sarima_sd,
+        'actual': actual,
+        'dayofweek': dayofweek,
+    }
+
+def test_fit_weights_recovers_inverse_variance_weights():
+    backtest = make_backtest()
+    table = fit_weights(backtest, horizon_edges=(1, 15), prior_samples=0, max_shift=0.5)
+    # Independent errors: w = var_s / (var_p + var_s)
+    good, bad = 80.0 ** 2 / (20.0 ** 2 + 80.0 ** 2), 20.0 ** 2 / (20.0 ** 2 + 80.0 ** 2)
+    np.testing.assert_allclose(table[0, :5], bad, atol=0.03)
+    np.testing.assert_allclose(table[0, 5:], good, atol=0.03)
+    np.testing.assert_allclose(table[1], good, atol=0.03)
+    
+    weights = EnsembleWeights((1, 15), table, source='learned')
+    metrics = combined_metrics(backtest, weights, fixed_weight=0.5)
+    assert metrics['learned'] < min(metrics['fixed'], metrics['prophet'], metrics['sarima'])
+
+def test_lookup_and_round_trip(tmp_path):
+    table = np.arange(21, dtype=float).reshape(3, 7) / 20
+    weights = EnsembleWeights((1, 8, 31), table, source='learned', model_version='abc')
+    dates = pd.DatetimeIndex(["2019-01-07", "2019-01-13", "2019-02-01", "2020-01-01"])  # Mon, Sun, Fri, Wed
+    np.testing.assert_array_equal(weights.prophet_weights(dates, [0, 7, 8, 400]), table[[0, 0, 1, 2], [0, 6, 4, 2]])
+    
+    weights.save(tmp_path / "weights.json")
+    loaded = EnsembleWeights.load(tmp_path / "weights.json")
+    np.testing.assert_allclose(loaded.table, table)
+    assert (loaded.source, loaded.model_version) == ('learned', 'abc')
+    assert EnsembleWeights.load(tmp_path / "missing.json") is None
+    
+    fixed = EnsembleWeights.fixed(0.4)
+    assert np.all(fixed.prophet_weights(dates, [1, 2, 3, 4]) == 0.4)
+
+def test_few_errors_stay_near_the_fixed_weight():
+    # Six cutoffs: 12 errors per cell in the first bucket
+    backtest = {name: values[:6] for name, values in make_backtest().items()}
+    table = fit_weights(backtest, horizon_edges=(1, 15), prior_samples=30, default=0.4)
+    assert np.all((table > 0) & (table < 1))
+    np.testing.assert_allclose(table, 0.4, atol=0.25)
+    
+    # Without the prior and the bound the same errors put cells at the 0/1 corners
+    corners = fit_weights(backtest, horizon_edges=(1, 15), prior_samples=0, default=0.4, max_shift=1.0)
+    assert np.any((corners == 0) | (corners == 1))
+    bounded = fit_weights(backtest, horizon_edges=(1, 15), prior_samples=0, default=0.4, max_shift=0.2)
+    assert bounded.min() >= 0.2 - 1e-12 and bounded.max() <= 0.6 + 1e-12
+    
+    # No usable errors at all: the fixed weight
+    empty = {**backtest, 'actual': np.full_like(backtest['actual'], np.nan)}
+    np.testing.assert_array_equal(fit_weights(empty, horizon_edges=(1, 15), default=0.4), 0.4)
@@ -0,0 +1,187 @@
+"""
+ForecastService tests against the per-date prediction path
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from app.config import settings
+from app.models.ml_models import model_loader
+from app.models.registry import model_registry
+from app.services.forecast_service import forecast_service
+from app.services.forecast_table import ForecastTable, COLUMNS
+
+@pytest.fixture
+def service(monkeypatch):
+    if model_registry.current_version() is None and not settings.SARIMA_MODEL_PATH.exists():
+        pytest.skip("no published model version to forecast with")
+    monkeypatch.setattr(settings, "ENSEMBLE_WEIGHTING", "fixed")
+    monkeypatch.setattr(forecast_service, "ensemble_weights", None)
+    # Direct model passes only (no background table build)
+    monkeypatch.setattr(forecast_service, "get_forecast_table", lambda: None)
+    return forecast_service
+
+def predict_one(date: pd.Timestamp, weight: float) -> dict:
+    """One date at a time, as ForecastService.predict() did before batching"""
+    data = model_loader.get_historical_data()
+    prophet, sarima = model_loader.get_prophet(), model_loader.get_sarima()
+    last_date = data.index[-1]
+    yhat, lower, upper = (float(v[0]) for v in prophet.predict(pd.DatetimeIndex([date])))
+    if date <= last_date:
+        actual = float(data.loc[date, 'Sales']) if date in data.index else None
+        sarima_pred = float(sarima.fittedvalues.loc[date]) if date in sarima.fittedvalues.index else None
+        ensemble = yhat if sarima_pred is None else weight * yhat + (1 - weight) * sarima_pred
+        return {
+            'date': date.strftime('%Y-%m-%d'), 'type': 'historical', 'actual_sales': actual,
+            'prophet_prediction': yhat, 'sarima_prediction': sarima_pred, 'ensemble_prediction': ensemble,
+        }
+    days_ahead = (date - last_date).days
+    mean, sarima_lower, sarima_upper = (float(v[-1]) for v in sarima.forecast(days_ahead))
+    return {
+        'date': date.strftime('%Y-%m-%d'), 'type': 'future', 'actual_sales': None,
+        'prophet_prediction': yhat, 'sarima_prediction': mean,
+        'ensemble_prediction': weight * yhat + (1 - weight) * mean,
+        'confidence_interval': {
+            'lower': max(0, weight * lower + (1 - weight) * sarima_lower),
+            'upper': weight * upper + (1 - weight) * sarima_upper,
+        },
+    }
+
+def assert_same(predictions, expected):
+    assert len(predictions) == len(expected)
+    for got, want in zip(predictions, expected):
+        assert got.keys() == want.keys() and got['date'] == want['date'] and got['type'] == want['type']
+        for key, value in want.items():
+            if isinstance(value, float):
+                assert got[key] == pytest.approx(value, rel=1e-9), (want['date'], key)
+            elif isinstance(value, dict):
+                assert got[key] == pytest.approx(value, rel=1e-9), (want['date'], key)
+            else:
+                assert got[key] == value, (want['date'], key)
+
+def test_batch_predict_matches_per_date_predictions(service):
+    last_date = model_loader.get_historical_data().index[-1]
+    weight = float(service.get_ensemble_weights().table[0, 0])
+    # Spans history (including closed days missing from it) and the horizon
+    dates = pd.date_range(last_date - pd.Timedelta(days=20), last_date + pd.Timedelta(days=40), freq='D')
+    
+    predictions = service.batch_predict(dates[0].strftime('%Y-%m-%d'), dates[-1].strftime('%Y-%m-%d'))
+    assert_same(predictions, [predict_one(date, weight) for date in dates])
+    assert {p['type'] for p in predictions} == {'historical', 'future'}
+    assert_same([service.predict(dates[-1].strftime('%Y-%m-%d'))], [predict_one(dates[-1], weight)])
+
+def test_next_week_forecast(service):
+    last_date = model_loader.get_historical_data().index[-1]
+    weight = float(service.get_ensemble_weights().table[0, 0])
+    forecast = service.next_week_forecast()
+    expected = [predict_one(last_date + pd.Timedelta(days=i), weight) for i in range(1, 8)]
+    assert_same(forecast['predictions'], expected)
+    assert forecast['average_daily_sales'] == round(np.mean([p['ensemble_prediction'] for p in expected]), 2)
+
+def test_forecast_table_matches_direct_computation(service, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(service, "forecast_table", None)
+    table = service.build_forecast_table()
+    data = model_loader.get_historical_data()
+    assert table.start == data.index[0] and table.last_historical == data.index[-1]
+    assert table.end == data.index[-1] + pd.Timedelta(days=settings.FORECAST_HORIZON_DAYS)
+    
+    dates = pd.DatetimeIndex([data.index[0], data.index[-1] - pd.Timedelta(days=3), table.end,
+                              data.index[-1] + pd.Timedelta(days=1), data.index[-1]])
+    direct = service._compute_components(dates)
+    for name, values in table.take(dates).items():
+        np.testing.assert_allclose(values, direct[name], rtol=1e-9, equal_nan=True, err_msg=name)
+    assert table.take(pd.DatetimeIndex([table.end + pd.Timedelta(days=1)])) is None
+    
+    # A restart with the same models reads the persisted copy instead of recomputing
+    monkeypatch.setattr(service, "forecast_table", None)
+    monkeypatch.setattr(service, "_compute_components", None)
+    reloaded = service.build_forecast_table()
+    assert reloaded.model_version == table.model_version == model_loader.model_version
+    for name, values in table.columns.items():
+        np.testing.assert_array_equal(reloaded.columns[name], values)
+    
+    # Served predictions are the same with and without the table
+    monkeypatch.setattr(service, "get_forecast_table", lambda: reloaded)
+    weight = float(service.get_ensemble_weights().table[0, 0])
+    assert_same(service._predict_dates(dates), [predict_one(date, weight) for date in dates])
+
+def test_unsupported_prophet_keeps_fixed_weights(service, tmp_path, monkeypatch):
+    from app.models.prophet_scorer import ProphetModelScorer
+    from app.services import forecast_service as forecast_module
+    
+    def learn_weights(*args, **kwargs):
+        raise AssertionError("weights learned for an unsupported Prophet model")
+    
+    monkeypatch.setattr(settings, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(settings, "ENSEMBLE_WEIGHTING", "learned")
+    monkeypatch.setattr(model_loader, "get_prophet", lambda: ProphetModelScorer(None))
+    monkeypatch.setattr(forecast_module, "learn_weights", learn_weights)
+    
+    weights = service.build_ensemble_weights()
+    assert weights.source == 'fixed' and weights.model_version == model_loader.model_version
+    np.testing.assert_array_equal(weights.table, service._fixed_weights(model_loader.model_version).table)
+
+def test_pending_learned_weights_do_not_touch_disk_per_call(service, tmp_path, monkeypatch):
+    from app.models.ensemble_weights import EnsembleWeights
+    
+    loads, builds = [], []
+    load = EnsembleWeights.load
+    monkeypatch.setattr(settings, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(settings, "ENSEMBLE_WEIGHTING", "learned")
+    monkeypatch.setattr(EnsembleWeights, "load", classmethod(lambda cls, path: loads.append(path) or load(path)))
+    monkeypatch.setattr(service, "start_background_build", lambda: builds.append(1))
+    monkeypatch.setattr(service, "_pending_weights", None)
+    model_version = model_loader.model_version
+    fixed = service._fixed_weights(model_version)
+    
+    # Building: fixed weights from memory
+    for _ in range(50):
+        np.testing.assert_array_equal(service.get_ensemble_weights().table, fixed.table)
+    assert loads == [] and len(builds) == 50
+    
+    # A forked worker looks for the parent's weights at most every WEIGHTS_RECHECK_SECONDS
+    monkeypatch.setattr(service, "_forked", True)
+    learned = EnsembleWeights(fixed.horizon_edges, np.full_like(fixed.table, 0.3), source='learned', model_version=model_version)
+    for _ in range(50):
+        assert service.get_ensemble_weights().source == 'fixed'
+        if len(loads) == 1:
+            learned.save(service._weights_path(model_version))
+    assert len(loads) == 1 and len(builds) == 50
+    monkeypatch.setattr(service, "_weights_checked_at", service._weights_checked_at - 60)
+    assert service.get_ensemble_weights().source == 'learned' and len(loads) == 2
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_never_builds_and_reads_the_parent_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(model_loader, "_model_version", "f" * 64)
+    monkeypatch.setattr(forecast_service, "forecast_table", None)
+    columns = {name: np.arange(10.0) for name in COLUMNS}
+    
+    def child():
+        # Locks the parent holds mid-build are free, and the child builds nothing
+        if not (forecast_service._build_lock.acquire(timeout=1) and forecast_service._table_lock.acquire(timeout=1)):
+            return 1
+        forecast_service._build_lock.release()
+        forecast_service._table_lock.release()
+        if forecast_service.get_forecast_table() is not None or forecast_service._table_thread is not None:
+            return 2
+        # The parent persists its table: the child serves from it
+        ForecastTable(pd.Timestamp("2019-01-01"), pd.Timestamp("2019-01-05"), columns, "f" * 64).save(
+            forecast_service._table_path("f" * 64)
+        )
+        table = forecast_service.get_forecast_table()
+        if table is None or not np.array_equal(table.columns['prophet'], columns['prophet']):
+            return 3
+        return 0 if forecast_service._table_thread is None else 4
+    
+    with forecast_service._build_lock, forecast_service._table_lock:
+        pid = os.fork()
+        if pid == 0:
+            code = 5
+            try:
+                code = child()
+            finally:
+                os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,81 @@
+"""
+Hierarchy reconciliation tests against the dense MinT formula
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.models.hierarchy import Hierarchy, shrinkage_intensity
+from app.services.multi_series_service import MultiSeriesService
+
+LEVELS = ['region', 'store', 'category']
+
+def make_hierarchy():
+    keys = pd.DataFrame(
+        [(region, f"{region}{store}", category) for region in "BA" for store in range(3) for category in "xyz"],
+        columns=LEVELS
+    )
+    return Hierarchy(LEVELS, keys.sample(frac=1, random_state=0))
+
+def shrunk_covariance(residuals):
+    """shrink.estim() from the R hts package, with the full correlation matrix"""
+    T, p = residuals.shape
+    covariance = residuals.T @ residuals / T
+    xs = residuals / np.sqrt(np.diag(covariance))
+    correlation = xs.T @ xs / T
+    v = ((xs ** 2).T @ xs ** 2 - (xs.T @ xs) ** 2 / T) / (T * (T - 1))
+    np.fill_diagonal(v, 0)
+    lam = min(max(v.sum() / ((correlation - np.eye(p)) ** 2).sum(), 0), 1)
+    return lam * np.diag(np.diag(covariance)) + (1 - lam) * covariance, lam
+
+def test_structure():
+    hierarchy = make_hierarchy()
+    assert hierarchy.ids[:3] == ['total', 'A', 'B']
+    assert hierarchy.n_aggregates == 1 + 2 + 6 and hierarchy.m == 18
+    assert list(hierarchy.sizes[:3]) == [18, 9, 9]
+    bottom = np.arange(18.0)[:, None]
+    assert hierarchy.aggregate(bottom)[0, 0] == bottom.sum()
+
+@pytest.mark.parametrize("method", ['ols', 'wls_struct', 'wls_var', 'mint_shrink'])
+def test_reconcile_matches_dense_formula(method):
+    hierarchy = make_hierarchy()
+    rng = np.random.default_rng(1)
+    base = rng.normal(100, 20, (hierarchy.n, 7))
+    # Correlated residuals with fewer rows than series, as for long hierarchies
+    residuals = rng.normal(size=(20, 5)) @ rng.normal(size=(5, hierarchy.n)) + rng.normal(size=(20, hierarchy.n))
+    
+    S = np.vstack([hierarchy.aggregation, np.eye(hierarchy.m)])
+    W = {
+        'ols': np.eye(hierarchy.n),
+        'wls_struct': np.diag(S.sum(axis=1)),
+        'wls_var': np.diag((residuals ** 2).mean(axis=0)),
+        'mint_shrink': shrunk_covariance(residuals)[0],
+    }[method]
+    W_inv = np.linalg.inv(W)
+    expected = S @ np.linalg.solve(S.T @ W_inv @ S, S.T @ W_inv @ base)
+    
+    reconciled = hierarchy.reconcile(base, method, residuals)
+    np.testing.assert_allclose(reconciled, expected, rtol=1e-9, atol=1e-9)
+
+def test_shrinkage_intensity_matches_reference():
+    rng = np.random.default_rng(2)
+    for T, p in ((30, 12), (12, 30)):
+        residuals = rng.normal(size=(T, 3)) @ rng.normal(size=(3, p)) + rng.normal(size=(T, p))
+        assert shrinkage_intensity(residuals) == pytest.approx(shrunk_covariance(residuals)[1], rel=1e-10)
+
+def test_fit_panel_is_coherent():
+    dates = pd.date_range("2017-01-01", periods=400, freq="D")
+    rng = np.random.default_rng(3)
+    panel = pd.DataFrame([
+        {'date': date, 'region': region, 'store': f"{region}{store}", 'category': category,
+         'Sales': 100 + 20 * np.sin(2 * np.pi * i / 7) + rng.normal(0, 5)}
+        for region in "AB" for store in range(2) for category in "xy" for i, date in enumerate(dates)
+    ])
+    config = {'order': (0, 1, 1), 'seasonal_order': (0, 0, 0, 0), 'weights': (0.4, 0.6), 'interval_width': 0.95, 'burn_in': 2}
+    
+    result = MultiSeriesService().fit(panel, method='mint_shrink', horizon=14, workers=1, config=config)
+    hierarchy, arrays = result.hierarchy, result.arrays
+    n_a = hierarchy.n_aggregates
+    np.testing.assert_allclose(arrays['mean'][:n_a], hierarchy.aggregation @ arrays['mean'][n_a:], rtol=1e-9)
+    assert arrays['fitted'].all() and not arrays['fallback'].any()
+    assert (arrays['lower'] < arrays['mean']).all() and (arrays['mean'] < arrays['upper']).all()
+    assert result.dates[0] == dates[-1] + pd.Timedelta(days=1)
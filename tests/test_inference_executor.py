@@ -0,0 +1,29 @@
+"""
+Bounded pool accounting tests
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.services.inference_executor import BoundedPool, ExecutorSaturatedError
+
+def fail():
+    raise RuntimeError("boom")
+
+def test_failed_calls_are_not_counted_as_completed():
+    pool = BoundedPool("test", lambda: ThreadPoolExecutor(max_workers=1), max_pending=1)
+    
+    async def run():
+        assert await pool.run(sum, [1, 2]) == 3
+        with pytest.raises(RuntimeError):
+            await pool.run(fail)
+        slow = asyncio.ensure_future(pool.run(asyncio.run, asyncio.sleep(0.2)))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturatedError):
+            await pool.run(sum, [1])
+        await slow
+    
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert pool.stats() == {"pending": 0, "max_pending": 1, "completed": 2, "failed": 1, "rejected": 1}
@@ -0,0 +1,116 @@
+"""
+LLM response cache tests: read-only hits, LRU eviction and off-loop access
+"""
+import asyncio
+import threading
+import time
+from app.services.llm_cache import LLMCache
+from app.services.llm_service import LLMService, LLM_UNAVAILABLE
+
+def make_cache(tmp_path, **kwargs):
+    options = {"ttl_seconds": 3600, "max_entries": 100, "max_bytes": 1 << 20}
+    options.update(kwargs)
+    return LLMCache(tmp_path / "cache.sqlite", **options)
+
+def test_a_hit_does_not_write(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", "alpha")
+    changes = cache.conn.total_changes
+    
+    for _ in range(10):
+        assert cache.get("a") == "alpha"
+    
+    assert cache.conn.total_changes == changes
+    assert not cache.conn.in_transaction
+    assert cache.hits == 10
+
+def test_eviction_follows_reads_not_writes(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.set("a", "alpha")
+    time.sleep(0.01)
+    cache.set("b", "beta")
+    time.sleep(0.01)
+    # "a" was written first but read last: "b" is the least recently used
+    assert cache.get("a") == "alpha"
+    time.sleep(0.01)
+    cache.set("c", "gamma")
+    
+    assert cache.get("a") == "alpha"
+    assert cache.get("b") is None
+    assert cache.get("c") == "gamma"
+    assert cache.evictions == 1
+
+def test_reads_are_flushed_in_batches(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.TOUCH_BATCH = 3
+    for key in "abc":
+        cache.set(key, key)
+    before = dict(cache.conn.execute("SELECT key, accessed_at FROM responses"))
+    time.sleep(0.01)
+    
+    for key in "abc":
+        cache.get(key)
+    
+    after = dict(cache.conn.execute("SELECT key, accessed_at FROM responses"))
+    assert all(after[key] > before[key] for key in "abc")
+    assert not cache._touched
+
+def test_expired_entries_miss(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0.05)
+    cache.set("a", "alpha")
+    time.sleep(0.1)
+    
+    assert cache.get("a") is None
+    cache.set("b", "beta")
+    assert cache.stats()["entries"] == 1
+    assert cache.expirations == 1
+
+class ThreadRecordingCache(LLMCache):
+    """Records which threads touched the cache"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+    
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+    
+    def set(self, key, value, kind=""):
+        self.threads.add(threading.get_ident())
+        super().set(key, value, kind)
+
+def test_service_keeps_cache_access_off_the_event_loop(tmp_path):
+    service = LLMService()
+    service.cache = ThreadRecordingCache(tmp_path / "cache.sqlite", ttl_seconds=3600, max_entries=100, max_bytes=1 << 20)
+    calls = []
+    
+    async def fake_llm(prompt, system_prompt):
+        calls.append(prompt)
+        return "analysis"
+    
+    service._call_llm = fake_llm
+    
+    async def run():
+        loop_thread = threading.get_ident()
+        first = await service._cached_call("test", "key", "prompt", "system")
+        second = await service._cached_call("test", "key", "prompt", "system")
+        return loop_thread, first, second
+    
+    loop_thread, first, second = asyncio.run(run())
+    
+    assert first == second == "analysis"
+    assert len(calls) == 1
+    assert service.cache.threads and loop_thread not in service.cache.threads
+
+def test_unavailable_responses_are_not_cached(tmp_path):
+    service = LLMService()
+    service.cache = make_cache(tmp_path)
+    
+    async def fake_llm(prompt, system_prompt):
+        return LLM_UNAVAILABLE
+    
+    service._call_llm = fake_llm
+    asyncio.run(service._cached_call("test", "key", "prompt", "system"))
+    
+    assert service.cache.stats()["entries"] == 0
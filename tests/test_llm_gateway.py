@@ -0,0 +1,150 @@
+"""
+LLM gateway tests against a local fake LLM server
+"""
+import asyncio
+import json
+import time
+import anthropic
+import openai
+from app.services.llm_gateway import LLMGateway, AnthropicProvider, OpenAIProvider, TokenBucket
+
+class FakeLLMServer:
+    """Minimal HTTP server speaking the Anthropic Messages and OpenAI Chat APIs"""
+    
+    def __init__(self, anthropic_delay=0.0, openai_delay=0.0, anthropic_status=200):
+        self.delays = {"anthropic": anthropic_delay, "openai": openai_delay}
+        self.anthropic_status = anthropic_status
+        self.calls = {"anthropic": 0, "openai": 0}
+        self.active = 0
+        self.max_active = 0
+    
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+    
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+    
+    def clients(self):
+        return (
+            anthropic.AsyncAnthropic(api_key="test", base_url=f"http://127.0.0.1:{self.port}", max_retries=0),
+            openai.AsyncOpenAI(api_key="test", base_url=f"http://127.0.0.1:{self.port}/v1", max_retries=0)
+        )
+    
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                path = request_line.decode().split()[1]
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))) or b"{}")
+                status, payload = await self._respond(path, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _respond(self, path, body):
+        provider = "anthropic" if path.endswith("/messages") else "openai"
+        self.calls[provider] += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delays[provider])
+        finally:
+            self.active -= 1
+        
+        prompt = body["messages"][-1]["content"]
+        if provider == "anthropic":
+            if self.anthropic_status != 200:
+                return self.anthropic_status, {"type": "error", "error": {"type": "api_error", "message": "boom"}}
+            return 200, {
+                "id": "msg_1", "type": "message", "role": "assistant", "model": body["model"],
+                "content": [{"type": "text", "text": f"anthropic:{prompt}"}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": 1, "output_tokens": 1}
+            }
+        return 200, {
+            "id": "chat_1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"openai:{prompt}"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }
+
+def make_gateway(server, **kwargs):
+    anthropic_client, openai_client = server.clients()
+    return LLMGateway(
+        [AnthropicProvider(anthropic_client, timeout=5), OpenAIProvider(openai_client, timeout=5)],
+        **kwargs
+    )
+
+def test_concurrent_identical_prompts_share_one_call():
+    async def scenario():
+        async with FakeLLMServer(anthropic_delay=0.2) as server:
+            gateway = make_gateway(server, hedge_delay=None)
+            answers = await asyncio.gather(*(gateway.complete("same", "sys") for _ in range(10)))
+            assert answers == ["anthropic:same"] * 10
+            assert server.calls == {"anthropic": 1, "openai": 0}
+            assert gateway.stats()["coalesced"] == 9
+    asyncio.run(scenario())
+
+def test_slow_primary_is_hedged():
+    async def scenario():
+        async with FakeLLMServer(anthropic_delay=2.0) as server:
+            gateway = make_gateway(server, hedge_delay=0.1)
+            start = time.perf_counter()
+            answer = await gateway.complete("hedge me", "sys")
+            assert answer == "openai:hedge me"
+            assert time.perf_counter() - start < 1.0
+            assert gateway.hedges == 1
+            assert gateway.wins == {"anthropic": 0, "openai": 1}
+    asyncio.run(scenario())
+
+def test_failed_primary_falls_back_without_waiting_for_hedge_delay():
+    async def scenario():
+        async with FakeLLMServer(anthropic_status=500) as server:
+            gateway = make_gateway(server, hedge_delay=5.0)
+            start = time.perf_counter()
+            assert await gateway.complete("fallback", "sys") == "openai:fallback"
+            assert time.perf_counter() - start < 1.0
+            assert gateway.stats()["providers"]["anthropic"]["failures"] == 1
+    asyncio.run(scenario())
+
+def test_global_semaphore_limits_in_flight_calls():
+    async def scenario():
+        async with FakeLLMServer(anthropic_delay=0.1) as server:
+            gateway = make_gateway(server, max_concurrency=2, hedge_delay=None)
+            answers = await asyncio.gather(*(gateway.complete(f"p{i}", "sys") for i in range(6)))
+            assert answers == [f"anthropic:p{i}" for i in range(6)]
+            assert server.max_active == 2
+    asyncio.run(scenario())
+
+def test_all_providers_failing_returns_none():
+    async def scenario():
+        async with FakeLLMServer(anthropic_status=500) as server:
+            anthropic_client, _ = server.clients()
+            gateway = LLMGateway([AnthropicProvider(anthropic_client, timeout=5)], hedge_delay=0.1)
+            assert await gateway.complete("nothing", "sys") is None
+            assert await LLMGateway([]).complete("nothing", "sys") is None
+    asyncio.run(scenario())
+
+def test_token_bucket_rate_limits():
+    async def scenario():
+        bucket = TokenBucket(rate=20, burst=1)
+        start = time.perf_counter()
+        for _ in range(5):
+            await bucket.acquire()
+        assert time.perf_counter() - start >= 0.18
+    asyncio.run(scenario())
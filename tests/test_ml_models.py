@@ -0,0 +1,121 @@
+"""
+Model loader tests: lazy loading, warm-up and reload signalling
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from app.config import settings
+from app.models.ml_models import ARTIFACTS, ModelLoader, signal_reload, _process_start_time
+
+class CountingLoader(ModelLoader):
+    """A fresh (non-singleton) loader whose artifacts are counted stand-ins"""
+    
+    def __new__(cls, delay=0.0, failing=()):
+        loader = object.__new__(cls)
+        loader._init_state()
+        loader.delay = delay
+        loader.failing = set(failing)
+        loader.loads = []
+        return loader
+    
+    def __init__(self, *args, **kwargs):
+        pass
+    
+    def _load_artifact(self, name, version):
+        self.loads.append(name)
+        time.sleep(self.delay)
+        if name in self.failing:
+            raise OSError(f"cannot read {name}")
+        return object()
+
+def test_artifacts_load_on_first_use_only():
+    loader = CountingLoader(delay=0.05)
+    assert loader.loads == [] and not loader.models_loaded
+    assert all(state['status'] == 'not_loaded' for state in loader.status().values())
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(loader.get('risk_config'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert loader.loads == ['risk_config']
+    assert len({id(value) for value in results}) == 1 and results[0] is loader.risk_config
+    status = loader.status()
+    assert status['risk_config']['status'] == 'loaded' and status['risk_config']['load_seconds'] >= 0.05
+    assert status['prophet_model']['status'] == 'not_loaded'
+
+def test_failed_load_is_reported_and_retried():
+    loader = CountingLoader(failing={'anomaly_detector'})
+    with pytest.raises(OSError):
+        loader.get_anomaly_detector()
+    state = loader.status()['anomaly_detector']
+    assert state['status'] == 'error' and state['error'] == 'cannot read anomaly_detector'
+    
+    loader.failing.clear()
+    assert loader.get_anomaly_detector() is not None
+    assert loader.loads == ['anomaly_detector', 'anomaly_detector']
+    assert loader.status()['anomaly_detector']['error'] is None
+
+def test_background_warm_up_loads_the_rest_despite_a_failure():
+    loader = CountingLoader(delay=0.01, failing={'sarima_model'})
+    loader.warm_up(background=True)
+    loader.wait_for_warm_up(timeout=10)
+    
+    assert sorted(loader.loads) == sorted(ARTIFACTS)
+    status = loader.status()
+    assert status['sarima_model']['status'] == 'error'
+    assert all(status[name]['status'] == 'loaded' for name in ARTIFACTS if name != 'sarima_model')
+    assert not loader.models_loaded
+    
+    # Loaded artifacts are served without loading again
+    loader.get('historical_data')
+    assert loader.loads.count('historical_data') == 1
+
+def test_import_loads_nothing_in_lazy_mode():
+    code = (
+        "import sys; from app.models.ml_models import model_loader; "
+        "print(len(model_loader._values), 'prophet' in sys.modules)"
+    )
+    env = {**os.environ, "MODEL_LOADING": "lazy", "PYTHONPATH": os.getcwd()}
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["0", "False"]
+
+def test_lazy_startup_leaves_the_forecast_table_to_the_first_forecast():
+    code = (
+        "import asyncio, main; from app.models.ml_models import model_loader; "
+        "asyncio.run(main.build_forecast_table()); "
+        "print(main.forecast_service._table_thread is None, len(model_loader._values))"
+    )
+    env = {**os.environ, "MODEL_LOADING": "lazy", "PYTHONPATH": os.getcwd()}
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.split()[-2:] == ["True", "0"]
+
+def sleeper():
+    return subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+
+@pytest.mark.skipif(_process_start_time(os.getpid()) is None, reason="needs /proc")
+def test_signal_reload_skips_stale_and_reused_pids(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_RELOAD_PID_DIR", tmp_path)
+    monkeypatch.setattr(settings, "MODEL_RELOAD_SIGNAL", "SIGTERM")
+    registered, reused = sleeper(), sleeper()
+    try:
+        (tmp_path / str(registered.pid)).write_text(_process_start_time(registered.pid))
+        # Same pid, but the registered process started at another time
+        (tmp_path / str(reused.pid)).write_text("1")
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        (tmp_path / str(exited.pid)).write_text("1")
+        
+        assert signal_reload() == 1
+        assert registered.wait(timeout=10) == -15
+        assert reused.poll() is None
+        assert sorted(entry.name for entry in tmp_path.iterdir()) == [str(registered.pid)]
+    finally:
+        for proc in (registered, reused):
+            proc.kill()
+            proc.wait()
@@ -0,0 +1,70 @@
+"""
+Memory-mapped bundle tests: atomic replacement and old version cleanup
+"""
+import json
+import threading
+import numpy as np
+from app.services.mmap_store import write_bundle, read_bundle, META_FILE
+
+def write(path, value, size=1000):
+    write_bundle(path, {'a': np.full(size, value), 'b': np.full(size, -value)}, {'value': value})
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "bundle"
+    assert read_bundle(path) is None
+    write(path, 1.0)
+    arrays, meta = read_bundle(path)
+    assert meta == {'value': 1.0}
+    assert np.all(arrays['a'] == 1.0) and not arrays['a'].flags.writeable
+    assert read_bundle(path, mmap=False)[0]['b'].flags.writeable
+
+def test_rewrite_switches_pointer_and_removes_old_versions(tmp_path):
+    path = tmp_path / "bundle"
+    write(path, 1.0)
+    mapped, _ = read_bundle(path)
+    write(path, 2.0)
+
+    arrays, meta = read_bundle(path)
+    assert meta['value'] == 2.0 and np.all(arrays['a'] == 2.0)
+    assert path.is_file()
+    assert [p.name for p in tmp_path.iterdir() if p.is_dir()] == [path.read_text().strip()]
+    # Pages mapped from the removed version stay readable
+    assert np.all(mapped['a'] == 1.0)
+
+def test_legacy_directory_bundle_is_read_then_replaced(tmp_path):
+    path = tmp_path / "bundle"
+    path.mkdir()
+    np.save(path / "a.npy", np.arange(3.0))
+    (path / META_FILE).write_text(json.dumps({'value': 0.0, 'arrays': ['a']}))
+    assert read_bundle(path)[1] == {'value': 0.0}
+
+    write(path, 1.0)
+    assert path.is_file() and read_bundle(path)[1] == {'value': 1.0}
+
+def test_readers_never_see_a_mixed_bundle(tmp_path):
+    path = tmp_path / "bundle"
+    write(path, 0.0)
+    done = threading.Event()
+    errors = []
+
+    def reader():
+        while not done.is_set():
+            bundle = read_bundle(path, mmap=False)
+            if bundle is None:
+                errors.append("missing")
+                continue
+            arrays, meta = bundle
+            if not (np.all(arrays['a'] == meta['value']) and np.all(arrays['b'] == -meta['value'])):
+                errors.append(meta['value'])
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    for value in range(1, 50):
+        write(path, float(value), size=20000)
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert read_bundle(path)[1]['value'] == 49.0
@@ -0,0 +1,109 @@
+"""
+Vectorized Prophet scorer tests against Prophet.predict()
+"""
+import logging
+import warnings
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+from app.models.prophet_scorer import ProphetScorer, ProphetModelScorer
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+def make_history(n=730, seed=3):
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range("2016-01-01", periods=n, freq="D")
+    t = np.arange(n)
+    y = (5000 + 4 * t - 0.003 * t ** 2
+         + 600 * np.sin(2 * np.pi * t / 365.25) + 300 * np.sin(2 * np.pi * t / 7)
+         + rng.normal(0, 250, n))
+    # Gaps like the real sales history (closed days are missing)
+    keep = rng.random(n) > 0.1
+    return pd.DataFrame({"ds": ds[keep], "y": y[keep]})
+
+@lru_cache(maxsize=None)
+def fit(**kwargs):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return Prophet(yearly_seasonality=True, weekly_seasonality=True, **kwargs).fit(make_history())
+
+def test_yhat_matches_prophet():
+    model = fit()
+    scorer = ProphetScorer.from_model(model)
+    last = model.history["ds"].max()
+    dates = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(model.history["ds"].min(), last + pd.Timedelta(days=400), freq="D"),
+        # Unsorted, repeated and intra-day timestamps
+        pd.DatetimeIndex(["2017-03-01 12:00", "2016-06-01", "2016-06-01", "2018-05-05 06:00"]),
+    ]))
+    expected = model.predict(pd.DataFrame({"ds": dates})).drop_duplicates("ds").set_index("ds")["yhat"]
+    np.testing.assert_allclose(scorer.predict_yhat(dates), expected.reindex(dates).to_numpy(), rtol=1e-9)
+
+def test_intervals_agree_with_prophet_sampling():
+    model = fit()
+    scorer = ProphetScorer.from_model(model)
+    last = model.history["ds"].max()
+    dates = pd.date_range(last - pd.Timedelta(days=59), last + pd.Timedelta(days=365), freq="D")
+    
+    # Prophet's own bounds are Monte Carlo estimates; use plenty of samples
+    # and compare averages over windows
+    model.uncertainty_samples = 5000
+    try:
+        expected = model.predict(pd.DataFrame({"ds": dates}))
+    finally:
+        model.uncertainty_samples = 1000
+    yhat, lower, upper = scorer.predict(dates)
+    
+    for start, stop in ((0, 60), (60, 90), (150, 200), (375, 425)):
+        window = slice(start, stop)
+        np.testing.assert_allclose((lower - yhat)[window].mean(), (expected["yhat_lower"] - expected["yhat"])[window].mean(), rtol=0.06)
+        np.testing.assert_allclose((upper - yhat)[window].mean(), (expected["yhat_upper"] - expected["yhat"])[window].mean(), rtol=0.06)
+    
+    # Trend uncertainty only widens the bounds after the training end
+    width = upper - lower
+    assert np.allclose(width[:60], width[0])
+    assert width[-30:].mean() > width[:60].mean()
+
+def test_intervals_are_deterministic_and_order_independent():
+    model = fit()
+    last = model.history["ds"].max()
+    dates = pd.date_range(last + pd.Timedelta(days=1), periods=500, freq="D")
+    
+    short_first = ProphetScorer.from_model(model)
+    short = short_first.predict(dates[:10])
+    full = short_first.predict(dates)
+    direct = ProphetScorer.from_model(model).predict(dates)
+    for a, b, c in zip(short, full, direct):
+        np.testing.assert_array_equal(a, b[:10])
+        np.testing.assert_array_equal(b, c)
+
+def test_unsupported_model_falls_back_to_predict():
+    model = fit(seasonality_mode="multiplicative")
+    scorer = ProphetScorer.from_model(model)
+    assert isinstance(scorer, ProphetModelScorer)
+    
+    dates = pd.date_range(model.history["ds"].max() - pd.Timedelta(days=5), periods=10, freq="D")
+    yhat, lower, upper = scorer.predict(dates)
+    expected = model.predict(pd.DataFrame({"ds": dates}))
+    np.testing.assert_allclose(yhat, expected["yhat"].to_numpy())
+    assert np.all(lower < yhat) and np.all(yhat < upper)
+
+def test_yhat_from_origin_extrapolates_trend():
+    model = fit()
+    scorer = ProphetScorer.from_model(model)
+    last = model.history["ds"].max()
+    future = pd.date_range(last + pd.Timedelta(days=1), periods=60, freq="D")
+    
+    # From the training end it is the ordinary forecast
+    from_end = scorer.predict_from([last], future.to_numpy()[None, :])
+    for values, expected in zip(from_end, scorer.predict(future)):
+        np.testing.assert_allclose(values[0], expected, rtol=1e-12)
+    
+    # From an earlier origin: the fitted trend up to it, then a straight line
+    origin = model.history["ds"].iloc[300]
+    dates = pd.date_range(origin - pd.Timedelta(days=2), periods=90, freq="D")
+    from_origin = scorer.predict_yhat_from([origin], dates.to_numpy()[None, :])[0]
+    trend = from_origin - scorer._seasonality(dates.as_unit('ns').asi8)
+    np.testing.assert_allclose(from_origin[:3], scorer.predict_yhat(dates[:3]), rtol=1e-12)
+    np.testing.assert_allclose(np.diff(trend[2:], 2), 0, atol=1e-6)
@@ -0,0 +1,22 @@
+"""
+Model registry tests: version ordering
+"""
+import json
+from app.models.registry import ModelRegistry, MANIFEST_FILE
+
+def add_version(root, version, created_at):
+    (root / version).mkdir(parents=True)
+    (root / version / MANIFEST_FILE).write_text(json.dumps({'version': version, 'created_at': created_at, 'artifacts': {}}))
+
+def test_versions_are_ordered_by_creation_time(tmp_path):
+    # A later retrain on an earlier window sorts before it by id
+    add_version(tmp_path, "20181230-ffffffff", "2024-05-01T09:00:00")
+    add_version(tmp_path, "20181230-00000000", "2024-05-02T09:00:00")
+    add_version(tmp_path, "20181201-aaaaaaaa", "2024-05-03T09:00:00.250000")
+    add_version(tmp_path, "20181201-bbbbbbbb", "2024-05-03T09:00:00.500000")
+    (tmp_path / ".publish-1-2").mkdir()
+    
+    assert ModelRegistry(tmp_path).versions() == [
+        "20181230-ffffffff", "20181230-00000000", "20181201-aaaaaaaa", "20181201-bbbbbbbb"
+    ]
+    assert ModelRegistry(tmp_path / "missing").versions() == []
@@ -0,0 +1,151 @@
+"""
+Streaming report tests: NDJSON event order, in-band errors and the explanation cache
+"""
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import reports
+from app.services.llm_cache import LLMCache
+from app.services.llm_gateway import LLMGateway, LLMProvider
+from app.services.llm_service import LLMService, LLM_UNAVAILABLE
+
+FORECAST = {'date': '2019-01-05', 'ensemble_prediction': 5000.0, 'confidence_interval': {'lower': 4000.0, 'upper': 6000.0}}
+RISK = {'risk_score': 40, 'risk_level': 'MEDIUM', 'reliability': 'HIGH'}
+
+class ChunkProvider(LLMProvider):
+    """Yields `chunks`, raising `error` after `fail_after` of them"""
+    
+    def __init__(self, name, chunks, fail_after=None, error=RuntimeError("boom")):
+        super().__init__()
+        self.name = name
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.error = error
+    
+    async def stream(self, prompt, system_prompt):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise self.error
+            yield chunk
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+def test_gateway_falls_through_only_before_the_first_chunk():
+    failing = ChunkProvider("anthropic", ["never"], fail_after=0)
+    gateway = LLMGateway([failing, ChunkProvider("openai", ["a", "b", "c"])])
+    assert asyncio.run(collect(gateway.stream("p", "s"))) == ["a", "b", "c"]
+    assert gateway.stats()['providers']['openai']['wins'] == 1
+    
+    broken = ChunkProvider("anthropic", ["a", "b"], fail_after=1)
+    gateway = LLMGateway([broken, ChunkProvider("openai", ["x"])])
+    received = []
+    
+    async def consume():
+        async for chunk in gateway.stream("p", "s"):
+            received.append(chunk)
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(consume())
+    assert received == ["a"]
+    assert gateway.providers[1].calls == 0
+
+@pytest.fixture
+def service(tmp_path):
+    service = LLMService()
+    service.cache = LLMCache(tmp_path / "cache.sqlite", ttl_seconds=3600, max_entries=100, max_bytes=1 << 20)
+    return service
+
+def test_explanation_is_cached_after_the_stream_completes(service):
+    service.gateway = LLMGateway([ChunkProvider("anthropic", ["Sales ", "look ", "stable."])])
+    assert asyncio.run(collect(service.stream_explanation(FORECAST, RISK))) == ["Sales ", "look ", "stable."]
+    
+    # A hit is served in one chunk, without calling the provider
+    service.gateway = LLMGateway([ChunkProvider("anthropic", ["other"], fail_after=0)])
+    assert asyncio.run(collect(service.stream_explanation(FORECAST, RISK))) == ["Sales look stable."]
+    assert service.gateway.providers[0].calls == 0
+
+def test_unavailable_explanation_is_not_cached(service):
+    service.gateway = LLMGateway([ChunkProvider("anthropic", ["x"], fail_after=0)])
+    assert asyncio.run(collect(service.stream_explanation(FORECAST, RISK))) == [LLM_UNAVAILABLE]
+    assert service.cache.stats()['entries'] == 0
+
+@pytest.fixture
+def client(monkeypatch):
+    async def run_cpu(fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+    
+    async def explanation(forecast, risk):
+        for chunk in ("Sales ", "look ", "stable."):
+            yield chunk
+    
+    monkeypatch.setattr(reports.inference_executor, "run_cpu", run_cpu)
+    monkeypatch.setattr(reports.inference_executor, "run_io", run_cpu)
+    monkeypatch.setattr(reports.forecast_service, "predict", lambda date: {**FORECAST, 'date': date})
+    monkeypatch.setattr(reports.risk_service, "assess_risk", lambda *args: RISK)
+    monkeypatch.setattr(reports.llm_service, "stream_explanation", explanation)
+    app = FastAPI()
+    app.include_router(reports.router)
+    return TestClient(app)
+
+def read_events(response):
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_stream_sends_events_in_order(client, monkeypatch):
+    sent = []
+    
+    async def send_report(report, recipient):
+        sent.append((report, recipient))
+        return True
+    
+    monkeypatch.setattr(reports.email_service, "send_report", send_report)
+    response = client.post("/api/v1/reports/generate/stream", json={'date': '2019-01-05'})
+    events = read_events(response)
+    
+    assert [e['event'] for e in events] == [
+        'forecast', 'risk', 'explanation_delta', 'explanation_delta', 'explanation_delta', 'email', 'done'
+    ]
+    assert events[0]['data']['date'] == '2019-01-05' and events[1]['data'] == RISK
+    assert "".join(e['data'] for e in events if e['event'] == 'explanation_delta') == "Sales look stable."
+    assert events[5]['data'] == {'status': 'skipped'} and not sent
+    
+    response = client.post(
+        "/api/v1/reports/generate/stream",
+        json={'date': '2019-01-05', 'send_email': True, 'recipient_email': 'ops@example.com'}
+    )
+    assert read_events(response)[5]['data'] == {'status': 'sent'}
+    assert sent[0][0]['explanation'] == "Sales look stable." and sent[0][1] == 'ops@example.com'
+
+def test_failures_after_the_headers_are_reported_in_band(client, monkeypatch):
+    async def broken(forecast, risk):
+        yield "Sales "
+        raise RuntimeError("provider went away")
+    
+    monkeypatch.setattr(reports.llm_service, "stream_explanation", broken)
+    events = read_events(client.post("/api/v1/reports/generate/stream", json={'date': '2019-01-05'}))
+    assert [e['event'] for e in events] == ['forecast', 'risk', 'explanation_delta', 'error']
+    assert events[-1]['data'] == {'detail': 'provider went away'}
+
+def test_forecast_failure_is_an_http_error(client, monkeypatch):
+    def predict(date):
+        raise ValueError("bad date")
+    
+    monkeypatch.setattr(reports.forecast_service, "predict", predict)
+    response = client.post("/api/v1/reports/generate/stream", json={'date': 'nope'})
+    assert response.status_code == 500 and response.json() == {'detail': 'bad date'}
+
+def test_risk_is_assessed_off_the_event_loop(client, monkeypatch):
+    offloaded = []
+    
+    async def run_io(fn, *args, **kwargs):
+        offloaded.append(fn)
+        return fn(*args, **kwargs)
+    
+    monkeypatch.setattr(reports.inference_executor, "run_io", run_io)
+    events = read_events(client.post("/api/v1/reports/generate/stream", json={'date': '2019-01-05'}))
+    assert events[1] == {'event': 'risk', 'data': RISK}
+    assert offloaded == [reports.risk_service.assess_risk]
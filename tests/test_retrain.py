@@ -0,0 +1,62 @@
+"""
+Retrain pipeline tests against a copy of the model registry
+"""
+import shutil
+import numpy as np
+import pytest
+from app.config import settings
+from app.models import retrain as retrain_module
+from app.models.registry import ModelRegistry, model_registry, load_json
+from app.models.retrain import retrain, read_history, warm_start_params, RetrainRejected
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    if model_registry.current_version() is None:
+        pytest.skip("no published model version to retrain from")
+    shutil.copytree(model_registry.root, tmp_path / "registry")
+    registry = ModelRegistry(tmp_path / "registry")
+    monkeypatch.setattr(retrain_module, "model_registry", registry)
+    monkeypatch.setattr(settings, "RETRAIN_HISTORY_PATH", tmp_path / "history.jsonl")
+    return registry
+
+def test_warm_start_params_shapes(registry):
+    model = retrain_module.previous_models()['prophet_model']
+    init = warm_start_params(model)
+    assert set(init) == {'k', 'm', 'sigma_obs', 'delta', 'beta'}
+    assert init['delta'].shape == (model.params['delta'].shape[1],)
+    assert init['beta'].shape == (model.params['beta'].shape[1],)
+
+def test_retrain_publishes_and_records(registry):
+    previous = registry.current_version()
+    # The gate compares against the previous models on this run's rows, not a stored score
+    registry.manifest(previous)['metrics']['holdout'] = {'ensemble': {'smape': 1e-6}}
+    report = retrain(holdout_days=14, workers=1, notify=False)
+    
+    assert report['status'] == 'published' and registry.current_version() == report['version'] != previous
+    assert all(fit['warm_start'] for fit in report['fits'].values())
+    registry.verify(report['version'])
+    manifest = registry.manifest(report['version'])
+    assert manifest['metrics']['holdout']['ensemble']['smape'] == report['holdout']['ensemble']['smape']
+    assert manifest['metrics']['retrain']['parent_version'] == previous
+    baseline = report['holdout_previous']
+    assert (baseline['start'], baseline['end'], baseline['samples']) == (
+        report['holdout']['start'], report['holdout']['end'], report['holdout']['samples']
+    )
+    assert np.isfinite(baseline['ensemble']['smape'])
+    config = load_json(registry.artifact_path(report['version'], 'ensemble_config'))
+    assert config['last_training_date'] == report['training_window']['end']
+    assert read_history()[-1]['version'] == report['version']
+    assert set(report['stages']) == {'load', 'fit', 'validate', 'publish'}
+
+def test_retrain_rejects_degraded_candidate(registry, monkeypatch):
+    report = retrain(holdout_days=14, workers=1, notify=False)
+    # Refitting on the same rows cannot halve the previous version's error
+    monkeypatch.setattr(settings, "RETRAIN_MAX_DEGRADATION", -0.5)
+    
+    with pytest.raises(RetrainRejected) as rejected:
+        retrain(holdout_days=14, workers=1, notify=False)
+    assert rejected.value.report['status'] == 'rejected'
+    assert 'on the same rows' in rejected.value.report['reason']
+    assert registry.current_version() == report['version']
+    assert read_history()[-1]['status'] == 'rejected'
+    assert np.isfinite(read_history()[-1]['wall_seconds'])
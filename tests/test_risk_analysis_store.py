@@ -0,0 +1,78 @@
+"""
+Risk analysis store tests against filtering the CSV with pandas per request
+"""
+import json
+import os
+import shutil
+import pandas as pd
+import pytest
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.services.risk_analysis_store import RiskAnalysisStore
+
+@pytest.fixture
+def csv_path(tmp_path):
+    if not settings.RISK_ANALYSIS_PATH.exists():
+        pytest.skip("no risk analysis CSV")
+    path = tmp_path / "risk_analysis.csv"
+    shutil.copy(settings.RISK_ANALYSIS_PATH, path)
+    return path
+
+def query_baseline(path, start_date=None, end_date=None):
+    """get_historical_analysis() before the store: read, filter, sort newest first"""
+    df = pd.read_csv(path).rename(columns={'Order Date': 'date', 'Sales': 'forecast_value'})
+    df['date'] = df['date'].astype(str)
+    if start_date:
+        df = df[df['date'] >= start_date]
+    if end_date:
+        df = df[df['date'] <= end_date]
+    results = df.to_dict(orient='records')
+    results.sort(key=lambda x: x['date'], reverse=True)
+    return results
+
+RANGES = [
+    (None, None), ("2016-03-01", "2016-03-31"), ("2018-12-01", None), (None, "2015-01-10"),
+    ("2017-06-15", "2017-06-15"), ("2020-01-01", None), ("2016-05-01", "2016-04-01"),
+]
+
+@pytest.mark.parametrize("start_date,end_date", RANGES)
+def test_queries_match_pandas_filtering(csv_path, start_date, end_date):
+    store = RiskAnalysisStore(csv_path)
+    expected = query_baseline(csv_path, start_date, end_date)
+    assert store.query(start_date, end_date, descending=True) == expected
+    assert store.query(start_date, end_date) == expected[::-1]
+    # Same bytes as FastAPI serializing the records
+    payload = store.query_json(start_date, end_date)
+    assert payload == JSONResponse(expected).body
+    assert store.query_json(start_date, end_date) is payload
+
+def test_reloads_when_the_file_changes(csv_path):
+    store = RiskAnalysisStore(csv_path)
+    last = store.last_date
+    first = store.query_json(last, None)
+    
+    df = pd.read_csv(csv_path)
+    row = df.iloc[[-1]].copy()
+    row['Order Date'] = (pd.Timestamp(last) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    pd.concat([df, row]).to_csv(csv_path, index=False)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    assert store.last_date == row['Order Date'].iloc[0]
+    assert json.loads(store.query_json(last, None)) == query_baseline(csv_path, last) != json.loads(first)
+    assert RiskAnalysisStore(csv_path.with_name("missing.csv")).query_json() == b"[]"
+
+def test_future_rows_are_merged_newest_first(csv_path, monkeypatch):
+    from app.services import risk_analysis_store as store_module
+    from app.services.risk_service import risk_service
+    monkeypatch.setattr(store_module, "risk_analysis_store", RiskAnalysisStore(csv_path))
+    future = [
+        {'date': d, 'forecast_value': 1000.0, 'risk_score': 15, 'risk_level': 'Low', 'risk_factors': "Stable forecast"}
+        for d in ("2019-01-02", "2019-01-01")
+    ]
+    historical = query_baseline(csv_path, "2018-12-20")
+    assert json.loads(risk_service.get_historical_analysis_json("2018-12-20", None, future)) == future + historical
+    # Overlapping dates fall back to a full merge
+    overlap = [dict(future[0], date="2018-12-25")]
+    merged = sorted(overlap + historical, key=lambda x: x['date'], reverse=True)
+    assert json.loads(risk_service.get_historical_analysis_json("2018-12-20", None, overlap)) == merged
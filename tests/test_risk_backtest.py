@@ -0,0 +1,74 @@
+"""
+Streaming deal risk backtest tests
+"""
+import io
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, recall_score, roc_auc_score
+from app.services.analysis_service import analysis_service
+from app.services.deal_risk_service import deal_risk_service
+from app.services.risk_backtest import RiskBacktest, iter_opportunity_chunks, actual_outcomes
+
+def opportunities(n=600, seed=5):
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    activity = rng.uniform(0, 1, n)
+    won = rng.uniform(0, 1, n) < 0.2 + 0.6 * activity
+    return pd.DataFrame({
+        'Id': [f"006{i:06d}" for i in range(n)],
+        'Amount': rng.lognormal(10.5, 1.0, n).round(2),
+        'CreatedDate': created.strftime("%Y-%m-%d"),
+        'CloseDate': (created + pd.to_timedelta(rng.integers(5, 150, n), unit="D")).strftime("%Y-%m-%d"),
+        'Probability': rng.integers(10, 90, n),
+        'StageName': np.where(rng.uniform(0, 1, n) < 0.5, "Negotiation", "Proposal"),
+        'ActivityScore': (100 * activity).round(1),
+        'IsWon': won,
+        'Notes': "skipped",
+    })
+
+def test_metrics_match_sklearn():
+    deals = opportunities()
+    rng = np.random.default_rng(1)
+    win_prob = np.clip(deals['ActivityScore'].to_numpy() / 100 + rng.normal(0, 0.2, len(deals)), 0, 1)
+    backtest = RiskBacktest()
+    for start in range(0, len(deals), 128):
+        chunk = deals.iloc[start:start + 128]
+        backtest.update(chunk, deal_risk_service.engineer_features_frame(chunk), win_prob[start:start + 128])
+    
+    report = backtest.report()
+    actual = deals['IsWon'].to_numpy()
+    assert report['metrics']['accuracy'] == round(accuracy_score(actual, win_prob > 0.5), 4)
+    assert report['metrics']['recall_on_wins'] == round(recall_score(actual, win_prob > 0.5), 4)
+    assert abs(report['roc']['auc'] - roc_auc_score(actual, win_prob)) < 1e-3
+    assert sum(row['deals'] for row in report['calibration']) == len(deals)
+    assert report['chunks'] == 5
+
+def test_chunk_size_and_input_do_not_change_the_report():
+    deals = opportunities()
+    csv = deals.to_csv(index=False).encode()
+    small = analysis_service.backtest_risk_model_stream(io.BytesIO(csv), chunk_size=7)
+    large = analysis_service.backtest_risk_model_stream(io.BytesIO(csv), chunk_size=1000)
+    records = analysis_service.backtest_risk_model(deals.drop(columns='Notes').to_dict('records'))
+    assert small['chunks'] == 86 and large['chunks'] == 1
+    for report in (large, records):
+        for key in ('metrics', 'roc', 'calibration', 'roi', 'segments', 'patterns'):
+            assert report[key] == small[key], key
+    assert small['metrics']['total_deals_analyzed'] == len(deals)
+    
+    # Loss rates track the activity score the outcomes were drawn from
+    activity = small['segments']['activity']
+    assert activity['low']['win_rate'] < activity['medium']['win_rate'] < activity['high']['win_rate']
+    assert any(pattern.startswith("Deals with activity_score < 0.3 have") for pattern in small['patterns'])
+
+def test_outcomes_and_input_errors():
+    chunk = pd.DataFrame({
+        'IsWon': ["true", "False", "1", None],
+        'StageName': ["Proposal", "Closed Won", "Closed Lost", "Closed Lost"],
+    })
+    assert actual_outcomes(chunk).tolist() == [True, True, True, False]
+    assert analysis_service.backtest_risk_model([])['status'] == "error"
+    try:
+        next(iter_opportunity_chunks(io.BytesIO(b""), 10, format="xlsx"))
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
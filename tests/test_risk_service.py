@@ -0,0 +1,118 @@
+"""
+Historical stats and vectorized risk scoring tests against full recomputes
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.config import settings
+from app.models.ml_models import model_loader
+from app.services.historical_stats import HistoricalStats
+from app.services.risk_service import RiskService
+
+def make_sales(n=4000, seed=2):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    values = 12000 + 2000 * np.sin(2 * np.pi * t / 7) + rng.gamma(2.0, 1500.0, n)
+    return pd.Series(values, index=pd.date_range("2012-01-01", periods=n, freq="D"), name="Sales")
+
+def assert_stats_equal(stats, expected):
+    assert stats.count == expected.count and stats.last_date == expected.last_date
+    for name in ('mean', 'std', 'recent_mean', 'cv'):
+        assert getattr(stats, name) == pytest.approx(getattr(expected, name), rel=1e-10), name
+    for size in HistoricalStats.WINDOWS:
+        for stat in ('mean', 'std', 'cv'):
+            np.testing.assert_allclose(stats.window(size, stat), expected.window(size, stat),
+                                       rtol=1e-9, equal_nan=True, err_msg=f"{size} {stat}")
+
+def test_append_matches_full_recompute():
+    sales = make_sales()
+    full = HistoricalStats(sales)
+    assert full.mean == pytest.approx(sales.mean()) and full.std == pytest.approx(sales.std())
+    np.testing.assert_allclose(full.window(30, 'std'), sales.rolling(30).std().to_numpy(), rtol=1e-12, equal_nan=True)
+    
+    # Thousands of appends at sales magnitudes, starting shorter than the largest window
+    stats = HistoricalStats(sales[:50])
+    for date, value in sales[50:].items():
+        stats.append(value, date)
+    assert_stats_equal(stats, full)
+    
+    stats = HistoricalStats(sales[:3000])
+    stats.extend(sales[2990:])
+    assert_stats_equal(stats, full)
+
+def test_reload_extends_stats_when_history_grows(monkeypatch):
+    sales = make_sales(1000).to_frame()
+    current = [sales[:900]]
+    monkeypatch.setattr(RiskService, "historical_data", property(lambda self: current[0]))
+    service = RiskService()
+    before = service.stats
+    
+    current[0] = sales.copy()
+    extended = service.stats
+    assert extended is not before and before.count == 900
+    assert_stats_equal(extended, HistoricalStats(sales['Sales']))
+    
+    # A revised history is rebuilt from scratch
+    revised = sales.copy()
+    revised.iloc[10, 0] += 500.0
+    current[0] = revised
+    assert_stats_equal(service.stats, HistoricalStats(revised['Sales']))
+
+def assess_risk_baseline(data, forecast_value, date, confidence_interval=None):
+    """RiskService.assess_risk before precomputed stats (one pandas pass per call)"""
+    hist_sales = data['Sales']
+    hist_mean = hist_sales.mean()
+    recent_mean = hist_sales[-30:].mean()
+    deviation_pct = ((forecast_value - hist_mean) / hist_mean) * 100
+    recent_deviation_pct = ((forecast_value - recent_mean) / recent_mean) * 100
+    ci_width_pct = None
+    if confidence_interval:
+        ci_width_pct = ((confidence_interval['upper'] - confidence_interval['lower']) / forecast_value) * 100
+    
+    risk_score, factors = 0, []
+    if abs(deviation_pct) > 50:
+        risk_score += 30
+        factors.append(f"Large deviation from mean ({deviation_pct:+.1f}%)")
+    elif abs(deviation_pct) > 25:
+        risk_score += 15
+    if abs(recent_deviation_pct) > 30:
+        risk_score += 25
+        factors.append(f"Deviates from recent trend ({recent_deviation_pct:+.1f}%)")
+    if ci_width_pct and ci_width_pct > 100:
+        risk_score += 30
+        factors.append(f"Wide confidence interval ({ci_width_pct:.0f}%)")
+    elif ci_width_pct and ci_width_pct > 50:
+        risk_score += 15
+    cv = hist_sales.std() / hist_mean
+    if cv > 1.0:
+        risk_score += 15
+        factors.append(f"High volatility (CV={cv:.2f})")
+    level = 'High' if risk_score >= 70 else 'Medium' if risk_score >= 40 else 'Low'
+    return {
+        'date': date,
+        'risk_score': min(risk_score, 100),
+        'risk_level': level,
+        'reliability': {'High': 'Low', 'Medium': 'Medium', 'Low': 'High'}[level],
+        'deviation_from_mean': deviation_pct,
+        'risk_factors': factors,
+    }
+
+def test_assess_risk_batch_matches_baseline_on_history():
+    if not (settings.HISTORICAL_DATA_PATH.exists() or model_loader.active_version):
+        pytest.skip("no sales history")
+    data = model_loader.get_historical_data()
+    service = RiskService()
+    rng = np.random.default_rng(4)
+    n = 500
+    values = rng.uniform(0.05, 3.0, n) * data['Sales'].mean()
+    dates = [f"2019-01-{i % 28 + 1:02d}" for i in range(n)]
+    width = values * rng.uniform(0.1, 1.5, n)
+    lower, upper = values - width / 2, values + width / 2
+    has_ci = rng.random(n) < 0.7
+    
+    batch = service.assess_risk_batch(values, dates, np.where(has_ci, lower, np.nan), np.where(has_ci, upper, np.nan))
+    for i in range(n):
+        ci = {'lower': lower[i], 'upper': upper[i]} if has_ci[i] else None
+        expected = assess_risk_baseline(data, values[i], dates[i], ci)
+        assert service.assess_risk(values[i], dates[i], ci) == pytest.approx(expected) == batch[i]
+    assert {row['risk_level'] for row in batch} == {'Low', 'Medium', 'High'}
@@ -0,0 +1,108 @@
+"""
+Salesforce service tests against the local fake server
+"""
+import pytest
+from app.config import settings
+from app.services.salesforce_fake import FakeSalesforce, FakeSalesforceError
+from app.services.salesforce_service import SalesforceService
+
+def make_service(opportunities, **kwargs) -> SalesforceService:
+    service = SalesforceService.__new__(SalesforceService)
+    service.mock = True
+    service.sf = FakeSalesforce(opportunities=opportunities, seed=1, **kwargs)
+    return service
+
+def stored(service, sobject):
+    return {
+        key: {k: v for k, v in record.items() if k != 'SystemModstamp'}
+        for key, record in service.sf.records[sobject].items()
+    }
+
+@pytest.fixture
+def updates():
+    opportunities = FakeSalesforce.synthetic_opportunities(450)
+    updates = [{"Id": opp["Id"], "AI_Risk_Score__c": i % 100, "Risk_Category__c": "MEDIUM"} for i, opp in enumerate(opportunities)]
+    # Unknown records fail individually without failing their chunk
+    updates[10]["Id"] = updates[300]["Id"] = "006missing"
+    return opportunities, updates
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_batched_updates_match_per_record_updates(updates, bulk, monkeypatch):
+    opportunities, updates = updates
+    monkeypatch.setattr(settings, "SF_BULK_THRESHOLD", 100 if bulk else 10000)
+    monkeypatch.setattr(settings, "SF_BULK_BATCH_SIZE", 250)
+    sequential, batched = make_service(opportunities), make_service(opportunities)
+    
+    expected = [sequential.update_opportunity(u["Id"], {k: v for k, v in u.items() if k != "Id"}) for u in updates]
+    results = batched.update_opportunities(updates)
+    assert [r["success"] for r in results] == expected and expected.count(False) == 2
+    assert [r["id"] for r in results] == [u["Id"] for u in updates]
+    assert results[10]["errors"][0]["statusCode"] == "INVALID_CROSS_REFERENCE_KEY"
+    assert stored(batched, "Opportunity") == stored(sequential, "Opportunity")
+    # 450 records: 3 Collections requests of up to 200, or 2 Bulk batches of 250
+    assert batched.sf.request_count == (2 if bulk else 3)
+    assert batched.update_opportunities([]) == []
+
+def test_batched_tasks_match_per_record_tasks():
+    tasks = [{"Subject": f"Follow-up {i}", "WhatId": f"006{i:012d}", "Priority": "High"} for i in range(250)]
+    sequential, batched = make_service([]), make_service([])
+    expected = [sequential.create_task(task) for task in tasks]
+    results = batched.create_tasks(tasks)
+    assert results == expected and {r["status"] for r in results} == {"success"}
+    assert stored(batched, "Task") == stored(sequential, "Task")
+    assert batched.sf.request_count == 2
+
+def test_failed_requests_fail_every_record_in_the_chunk(monkeypatch):
+    service = make_service([])
+    
+    def restful(*args, **kwargs):
+        raise FakeSalesforceError("Session expired")
+    monkeypatch.setattr(service.sf, "restful", restful, raising=False)
+    results = service.create_tasks([{"Subject": "a"}, {"Subject": "b"}])
+    assert results == [{"status": "error", "message": "Session expired"}] * 2
+    
+    # Per-record failures keep their Salesforce error message
+    service = make_service([], failure_rate=1.0)
+    assert service.create_tasks([{"Subject": "a"}]) == [{"status": "error", "message": "Simulated create failure"}]
+
+def test_open_opportunities_follow_every_page():
+    opportunities = FakeSalesforce.synthetic_opportunities(530)
+    for opp in opportunities[::7]:
+        opp["IsClosed"] = True
+    service = make_service(opportunities, page_size=100)
+    fields = ["Id", "Name", "Amount", "StageName", "CloseDate", "CreatedDate", "Probability", "OwnerId"]
+    expected = [{k: opp.get(k) for k in fields} for opp in opportunities if not opp.get("IsClosed")]
+    
+    pages = list(service.iter_open_opportunity_pages())
+    assert [len(page) for page in pages] == [100] * 4 + [54]
+    records = service.get_open_opportunities()
+    assert [{k: r[k] for k in fields} for r in records] == expected
+    assert service.sf.request_count == 10
+
+def test_sync_fetches_only_records_modified_since_the_last_run(tmp_path, monkeypatch):
+    from app.services import salesforce_service as module
+    from app.services.opportunity_cache import OpportunityCache
+    cache = OpportunityCache(tmp_path / "opportunities.sqlite")
+    monkeypatch.setattr(module, "opportunity_cache", cache)
+    opportunities = FakeSalesforce.synthetic_opportunities(300)
+    for i, opp in enumerate(opportunities):
+        opp["CloseDate"] = f"2024-0{1 + i % 3}-15"
+        opp["SystemModstamp"] = f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}.000+0000"
+    service = make_service(opportunities, page_size=64)
+    
+    full = service.sync_opportunities("2024-01-01", "2024-02-28")
+    in_range = [opp for opp in opportunities if opp["CloseDate"] <= "2024-02-28"]
+    assert full["mode"] == "full" and full["synced_records"] == len(in_range) == cache.count()
+    assert full["watermark"] == max(opp["SystemModstamp"] for opp in in_range)
+    
+    # Modified records have newer stamps; the record at the watermark second is re-read
+    changed = [opp["Id"] for opp in in_range[:5]]
+    for record_id in changed:
+        service.sf.Opportunity.update(record_id, {"StageName": "Closed Won"})
+    incremental = service.sync_opportunities("2024-01-01", "2024-02-28")
+    assert incremental["mode"] == "incremental" and incremental["synced_records"] == len(changed) + 1
+    assert incremental["cached_records"] == len(in_range)
+    cached = {r["Id"]: r for r in cache.query("2024-01-01", "2024-02-28")}
+    assert all(cached[record_id]["StageName"] == "Closed Won" for record_id in changed)
+    assert cache.get_watermark("2024-01-01:2024-02-28") == incremental["watermark"] > full["watermark"]
+    cache.close()
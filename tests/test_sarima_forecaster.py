@@ -0,0 +1,92 @@
+"""
+Compact SARIMA forecaster tests against statsmodels
+"""
+import warnings
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from app.models.registry import save_sarima, load_sarima, load_sarima_results
+from app.models.sarima_forecaster import SARIMAForecaster
+
+def make_series(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    values = 2000 + 3 * t + 400 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 150, n).cumsum() * 0.2
+    return pd.Series(values, index=pd.date_range("2017-01-01", periods=n, freq="D"), name="Sales")
+
+SPECS = {
+    # The production model (ensemble_config sarima orders)
+    "production": dict(order=(0, 1, 1), seasonal_order=(0, 0, 2, 7), enforce_stationarity=False, enforce_invertibility=False),
+    # AR terms and a constant exercise the state and observation intercepts
+    "ar_with_constant": dict(order=(1, 0, 1), seasonal_order=(1, 0, 0, 7), trend="c"),
+}
+
+@lru_cache(maxsize=None)
+def fit(name):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return SARIMAX(make_series(), **SPECS[name]).fit(disp=False, maxiter=200)
+
+@pytest.mark.parametrize("name", list(SPECS))
+def test_forecast_matches_statsmodels(name):
+    results = fit(name)
+    forecaster = SARIMAForecaster.from_results(results)
+    
+    for steps in (1, 7, 90, 730):
+        expected = results.get_forecast(steps)
+        ci = expected.conf_int(alpha=0.05).to_numpy()
+        mean, lower, upper = forecaster.forecast(steps)
+        np.testing.assert_allclose(mean, expected.predicted_mean.to_numpy(), rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(lower, ci[:, 0], rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(upper, ci[:, 1], rtol=1e-9, atol=1e-6)
+    
+    ci80 = results.get_forecast(30).conf_int(alpha=0.2).to_numpy()
+    _, lower, upper = forecaster.forecast(30, alpha=0.2)
+    np.testing.assert_allclose(np.c_[lower, upper], ci80, rtol=1e-9, atol=1e-6)
+    
+    pd.testing.assert_series_equal(forecaster.fittedvalues, results.fittedvalues, check_names=False)
+
+def test_cached_horizon_grows_consistently():
+    forecaster = SARIMAForecaster.from_results(fit("production"))
+    short = forecaster.forecast(10)[0].copy()
+    long_mean = forecaster.forecast(500)[0]
+    np.testing.assert_array_equal(long_mean[:10], short)
+    assert len(forecaster.forecast(3)[0]) == 3
+    assert len(forecaster.forecast(0)[0]) == 0
+
+def test_registry_round_trip(tmp_path):
+    results = fit("production")
+    path = tmp_path / "sarima_model.npz"
+    save_sarima(results, path)
+    
+    loaded = load_sarima(path)
+    expected = results.get_forecast(60)
+    np.testing.assert_allclose(loaded.forecast(60)[0], expected.predicted_mean.to_numpy(), rtol=1e-9)
+    assert loaded.fittedvalues.index.equals(results.fittedvalues.index)
+    
+    rebuilt = load_sarima_results(path)
+    np.testing.assert_allclose(rebuilt.fittedvalues, results.fittedvalues)
+    np.testing.assert_allclose(rebuilt.params, results.params)
+
+@pytest.mark.parametrize("name", list(SPECS))
+def test_forecast_from_states_matches_refiltered_prefix(name):
+    results = fit(name)
+    forecaster = SARIMAForecaster.from_results(results)
+    origins = np.array([50, 200, 399])
+    means = forecaster.forecast_from_states(results.predicted_state[:, origins], 30)
+    
+    mean, lower, upper = forecaster.forecast_intervals_from_states(
+        results.predicted_state[:, origins], results.predicted_state_cov[:, :, origins], 30
+    )
+    np.testing.assert_array_equal(mean, means)
+    
+    endog = np.asarray(results.model.endog).ravel()
+    for i, origin in enumerate(origins):
+        prefix = results.model.clone(endog[:origin]).filter(results.params).get_forecast(30)
+        np.testing.assert_allclose(means[i], prefix.predicted_mean, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(np.c_[lower[i], upper[i]], prefix.conf_int(alpha=0.05), rtol=1e-9, atol=1e-6)
+    # The final predicted state is the forecaster's own
+    last = forecaster.forecast_from_states(results.predicted_state[:, -1], 30)[0]
+    np.testing.assert_allclose(last, forecaster.forecast(30)[0], rtol=1e-12)